@@ -0,0 +1,110 @@
+"""
+Scum Bard ensemble synchronization benchmark
+
+Starts a conductor and several follower processes on this machine, plays
+the opening of a song on each against a recording key backend, and reports
+the measured inter-instance start skew.
+
+Usage:
+    python benchmarks/bench_ensemble.py [--followers 3] [--seconds 5] [--file song.mid]
+"""
+
+import os
+import sys
+import json
+import glob
+import argparse
+import platform
+import multiprocessing
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BARD_DIR = os.path.join(REPO_ROOT, 'plugins', 'scum_bard')
+sys.path.insert(0, BARD_DIR)
+
+from bard_engine import HybridClock, RecordingBackend, compile_midi, load_midi, conduct, follow
+
+DEFAULT_KEYMAP = {
+    "c": "z", "c#": "5", "d": "u", "d#": "6", "e": "i", "f": "o",
+    "f#": "7", "g": "h", "g#": "8", "a": "j", "a#": "9", "b": "k",
+    "c_high": "l"
+}
+
+# Ephemeral ports are not known up front, so use a fixed one off the default
+BENCH_PORT = 47632
+
+
+def busiest_track(midi):
+    counts = [sum(1 for msg in track if msg.type == 'note_on') for track in midi.tracks]
+    return max(range(len(counts)), key=counts.__getitem__)
+
+
+def make_compile_fn(path, seconds):
+    """Compile the busiest track and keep only its first ``seconds`` of playback"""
+    midi = load_midi(path)
+    track_index = busiest_track(midi)
+
+    def compile_fn():
+        compiled = compile_midi(midi, track_index, DEFAULT_KEYMAP)
+        compiled.events = [event for event in compiled.events if event.time <= seconds]
+        compiled.duration = min(compiled.duration, seconds)
+        return compiled
+
+    return compile_fn
+
+
+def run_follower(path, seconds, name, port):
+    clock = HybridClock()
+    follow(make_compile_fn(path, seconds), RecordingBackend(clock), clock,
+           '127.0.0.1', port=port, name=name)
+
+
+def run(path, followers, seconds, port=BENCH_PORT, delay=1.0):
+    processes = [
+        multiprocessing.Process(target=run_follower, args=(path, seconds, f'follower-{index}', port))
+        for index in range(followers)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        clock = HybridClock()
+        stats, report = conduct(make_compile_fn(path, seconds), RecordingBackend(clock), clock,
+                                followers, port=port, delay=delay, join_timeout=30.0)
+    finally:
+        for process in processes:
+            process.join(timeout=seconds + 10)
+
+    return {
+        'benchmark': 'scum_bard_ensemble',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'file': os.path.relpath(path, REPO_ROOT),
+        'followers': followers,
+        'seconds': seconds,
+        'conductor_jitter': stats.jitter.summary(),
+        **report,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scum Bard ensemble synchronization benchmark")
+    parser.add_argument('--followers', type=int, default=3, help='Number of follower processes')
+    parser.add_argument('--seconds', type=float, default=5.0, help='Seconds of each song to play')
+    parser.add_argument('--file', help='MIDI file to play (default: first file in data/)')
+    parser.add_argument('--port', type=int, default=BENCH_PORT, help='Conductor UDP port')
+    parser.add_argument('-o', '--output', help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    path = args.file or sorted(glob.glob(os.path.join(BARD_DIR, 'data', '*.mid')))[0]
+    report = run(os.path.abspath(path), args.followers, args.seconds, port=args.port)
+    output = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Scum Bard playback benchmark
+
+Runs the real compile + dispatch pipeline against a virtual clock and a
+recording key backend, so timing fidelity and throughput can be measured
+on a headless machine without a game window.
+
+Usage:
+    python benchmarks/bench_scum_bard.py [--output results.json] [--press-cost-ms 0.5]
+
+The corpus is plugins/scum_bard/data/*.mid plus synthetic files of
+increasing note density. Results are written as JSON.
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import random
+import argparse
+import platform
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BARD_DIR = os.path.join(REPO_ROOT, 'plugins', 'scum_bard')
+sys.path.insert(0, BARD_DIR)
+
+import mido
+
+from bard_engine import VirtualClock, RecordingBackend, compile_midi, load_midi, play_compiled
+from bard_engine.compiler import DEFAULT_TEMPO, DEFAULT_TICKS_PER_BEAT, build_tempo_map, collect_notes
+from bard_engine.skyline import reduce_notes
+
+DEFAULT_KEYMAP = {
+    "c": "z", "c#": "5", "d": "u", "d#": "6", "e": "i", "f": "o",
+    "f#": "7", "g": "h", "g#": "8", "a": "j", "a#": "9", "b": "k",
+    "c_high": "l"
+}
+
+# Notes per second for the synthetic corpus
+SYNTHETIC_DENSITIES = [4, 16, 64, 256, 1024]
+
+# Length of each synthetic file in seconds of playback
+SYNTHETIC_SECONDS = 30
+
+# Synthetic files use the MIDI default tempo and resolution
+SECONDS_PER_TICK = DEFAULT_TEMPO / 1e6 / DEFAULT_TICKS_PER_BEAT
+
+
+def write_synthetic_midi(path, notes_per_second, seconds=SYNTHETIC_SECONDS, seed=0):
+    """Write a single-track file with evenly spaced random notes"""
+    rng = random.Random(seed)
+    midi = mido.MidiFile(ticks_per_beat=DEFAULT_TICKS_PER_BEAT)
+    track = mido.MidiTrack()
+    midi.tracks.append(track)
+
+    # Dense files stack several notes on the same tick
+    previous_tick = 0
+    for index in range(notes_per_second * seconds):
+        tick = int(index / notes_per_second / SECONDS_PER_TICK)
+        note = rng.randint(36, 84)
+        track.append(mido.Message('note_on', note=note, velocity=64, time=tick - previous_tick))
+        track.append(mido.Message('note_off', note=note, velocity=0, time=0))
+        previous_tick = tick
+
+    midi.save(path)
+    return path
+
+
+def busiest_track(midi):
+    """Index of the track with the most note_on messages"""
+    counts = [sum(1 for msg in track if msg.type == 'note_on') for track in midi.tracks]
+    return max(range(len(counts)), key=counts.__getitem__)
+
+
+def bench_file(path, press_cost):
+    parse_started = time.perf_counter()
+    midi = load_midi(path)
+    parse_seconds = time.perf_counter() - parse_started
+
+    track_index = busiest_track(midi)
+    compiled = compile_midi(midi, track_index, DEFAULT_KEYMAP)
+
+    clock = VirtualClock()
+    backend = RecordingBackend(clock, press_cost=press_cost)
+
+    dispatch_started = time.perf_counter()
+    stats = play_compiled(compiled, backend, clock)
+    dispatch_seconds = time.perf_counter() - dispatch_started
+
+    notes, _ = collect_notes(midi.tracks[track_index], midi.ticks_per_beat, build_tempo_map(midi))
+    _, skyline = reduce_notes(notes, 'highest')
+
+    events = len(compiled.events)
+    return {
+        'file': os.path.relpath(path, REPO_ROOT) if path.startswith(REPO_ROOT) else os.path.basename(path),
+        'track': track_index,
+        'notes': compiled.note_count,
+        'scheduled_events': events,
+        'unmapped_notes': compiled.unmapped_count,
+        'octave_shifts': compiled.octave_shifts,
+        'parse_ms': round(parse_seconds * 1000, 3),
+        'compile_ms': round(compiled.compile_seconds * 1000, 3),
+        'dispatch_ms': round(dispatch_seconds * 1000, 3),
+        'dispatch_events_per_s': round(events / dispatch_seconds) if dispatch_seconds else None,
+        'skyline_notes': skyline.notes_out,
+        'skyline_ms': round(skyline.seconds * 1000, 3),
+        'song_notes_per_s': round(compiled.note_count / compiled.duration, 2) if compiled.duration else None,
+        'drift_s': round(stats.drift, 6),
+        'jitter': stats.jitter.summary(),
+    }
+
+
+def run(press_cost, include_synthetic=True):
+    corpus = sorted(glob.glob(os.path.join(BARD_DIR, 'data', '*.mid')))
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if include_synthetic:
+            for density in SYNTHETIC_DENSITIES:
+                corpus.append(write_synthetic_midi(
+                    os.path.join(tmp_dir, f'synthetic_{density}nps.mid'), density))
+
+        for path in corpus:
+            try:
+                results.append(bench_file(path, press_cost))
+            except Exception as e:
+                results.append({'file': os.path.basename(path), 'error': str(e)})
+
+    return {
+        'benchmark': 'scum_bard_playback',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'press_cost_ms': press_cost * 1000,
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scum Bard playback benchmark")
+    parser.add_argument('-o', '--output', help='Write JSON results to this file instead of stdout')
+    parser.add_argument('--press-cost-ms', type=float, default=0.0,
+                        help='Simulated time each key injection takes, in milliseconds')
+    parser.add_argument('--no-synthetic', action='store_true', help='Only benchmark data/*.mid')
+    args = parser.parse_args()
+
+    report = run(args.press_cost_ms / 1000, include_synthetic=not args.no_synthetic)
+    output = json.dumps(report, indent=2)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,13 @@
 from .scum_plug import ScumPlug
 from .plugin_button import PluginButton
 from .custom_title_bar import CustomTitleBar
+from .async_loop import install_qt_event_loop, run_coroutine, wait_for_signal
 
 __all__ = [
     "ScumPlug",
     "PluginButton",
-    "CustomTitleBar"
+    "CustomTitleBar",
+    "install_qt_event_loop",
+    "run_coroutine",
+    "wait_for_signal"
 ]
\ No newline at end of file
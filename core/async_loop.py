@@ -0,0 +1,259 @@
+import math
+import heapq
+import asyncio
+import logging
+import selectors
+
+from PyQt5.QtCore import Qt, QTimer, QSocketNotifier
+
+logger = logging.getLogger('AsyncLoop')
+
+_qt_event_loop = None
+
+
+class _NotifyingSelector(selectors.BaseSelector):
+    """
+    Selector that mirrors its registrations as QSocketNotifiers.
+
+    The wrapped selector still does the actual polling; the notifiers only
+    tell the Qt event loop that a socket asyncio waits on became ready, so
+    asyncio gets pumped then instead of being polled on a timer.
+    """
+
+    def __init__(self, on_ready):
+        self._selector = selectors.DefaultSelector()
+        self._on_ready = on_ready
+        self._notifiers = {}
+
+    def _watch(self, fd, events):
+        for notifier in self._notifiers.pop(fd, ()):
+            notifier.setEnabled(False)
+            notifier.deleteLater()
+        notifiers = []
+        for event, kind in ((selectors.EVENT_READ, QSocketNotifier.Read),
+                            (selectors.EVENT_WRITE, QSocketNotifier.Write)):
+            if events & event:
+                notifier = QSocketNotifier(fd, kind)
+                notifier.activated.connect(lambda _: self._on_ready())
+                notifiers.append(notifier)
+        if notifiers:
+            self._notifiers[fd] = notifiers
+
+    def register(self, fileobj, events, data=None):
+        key = self._selector.register(fileobj, events, data)
+        self._watch(key.fd, events)
+        return key
+
+    def unregister(self, fileobj):
+        key = self._selector.unregister(fileobj)
+        self._watch(key.fd, 0)
+        return key
+
+    def modify(self, fileobj, events, data=None):
+        key = self._selector.modify(fileobj, events, data)
+        self._watch(key.fd, events)
+        return key
+
+    def select(self, timeout=None):
+        return self._selector.select(timeout)
+
+    def get_map(self):
+        return self._selector.get_map()
+
+    def close(self):
+        for fd in list(self._notifiers):
+            self._watch(fd, 0)
+        self._selector.close()
+
+
+class _QtSelectorEventLoop(asyncio.SelectorEventLoop):
+    """Selector event loop that asks to be pumped whenever it gets work."""
+
+    def __init__(self, wake):
+        self._wake = wake
+        super().__init__(_NotifyingSelector(lambda: wake(0)))
+
+    def call_soon(self, callback, *args, context=None):
+        # The pump's own stop() must not ask for another pump
+        if callback != self.stop:
+            self._wake(0)
+        return super().call_soon(callback, *args, context=context)
+
+    def call_at(self, when, callback, *args, context=None):
+        self._wake(when)
+        return super().call_at(when, callback, *args, context=context)
+
+
+class QtAsyncioLoop:
+    """
+    Drive an asyncio event loop from the Qt GUI event loop.
+
+    The asyncio loop runs one non-blocking iteration whenever it has
+    something to do: a callback became ready, a timer is due or a socket it
+    waits on is ready (watched with QSocketNotifiers). A single-shot QTimer
+    is armed for the earliest of those, and nothing runs while asyncio is
+    idle. Coroutines, asyncio timers and socket callbacks execute on the GUI
+    thread alongside Qt signals and slots. No extra threads are involved.
+    """
+
+    def __init__(self, app):
+        # Deadlines (loop time) at which the loop asked to be pumped
+        self._wakeups = []
+
+        self._timer = QTimer(app)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.timeout.connect(self._pump)
+
+        self.loop = _QtSelectorEventLoop(self._wake)
+        asyncio.set_event_loop(self.loop)
+
+        # Stop pumping when the application shuts down
+        app.aboutToQuit.connect(self.close)
+
+    def start(self):
+        self._arm()
+        logger.info("Qt asyncio loop started")
+
+    def _wake(self, when):
+        """Pump the loop at ``when`` (loop time; 0 for as soon as possible)"""
+        heapq.heappush(self._wakeups, when)
+        # While a pump is running it re-arms the timer when it returns
+        if not self.loop.is_running():
+            self._arm()
+
+    def _arm(self):
+        if self.loop.is_closed() or not self._wakeups:
+            self._timer.stop()
+            return
+        delay = max(0.0, self._wakeups[0] - self.loop.time())
+        self._timer.start(math.ceil(delay * 1000))
+
+    def _pump(self):
+        """Run exactly one iteration of the asyncio loop without blocking Qt."""
+        # A modal dialog opened from a coroutine spins a nested Qt event loop
+        # while the asyncio loop is still inside this call; do not re-enter it
+        if self.loop.is_running() or self.loop.is_closed():
+            return
+
+        # Everything due now is handled by this iteration
+        now = self.loop.time()
+        while self._wakeups and self._wakeups[0] <= now:
+            heapq.heappop(self._wakeups)
+
+        # The scheduled stop() is a ready callback, which makes the selector
+        # poll with a zero timeout and return after a single pass
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+        self._arm()
+
+    def close(self):
+        """Cancel outstanding tasks and close the asyncio loop."""
+        self._timer.stop()
+        if self.loop.is_closed():
+            return
+
+        pending = asyncio.all_tasks(self.loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+
+        self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        self.loop.close()
+        # Cancelling the tasks above asked for more pumps
+        self._timer.stop()
+        self._wakeups.clear()
+        logger.info("Qt asyncio loop closed")
+
+
+def install_qt_event_loop(app):
+    """
+    Install the Qt-integrated asyncio event loop for the application.
+
+    :param app: Running QApplication instance
+    :return: The asyncio event loop shared with the GUI thread
+    """
+    global _qt_event_loop
+
+    if _qt_event_loop is None:
+        _qt_event_loop = QtAsyncioLoop(app)
+        _qt_event_loop.start()
+
+    return _qt_event_loop.loop
+
+
+def get_event_loop():
+    """
+    Return the Qt-integrated asyncio loop, or the thread's default loop if
+    ScumPlug was started without one (e.g. a plugin run standalone).
+    """
+    if _qt_event_loop is not None:
+        return _qt_event_loop.loop
+
+    try:
+        return asyncio.get_event_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        return loop
+
+
+def _log_task_exception(task):
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        logger.error(f"Unhandled error in task {task.get_name()}: {error}",
+                     exc_info=(type(error), error, error.__traceback__))
+
+
+def run_coroutine(coro, name=None):
+    """
+    Schedule a coroutine on the GUI event loop.
+
+    Safe to call from ``create_plugin`` or any slot; the coroutine starts on
+    the next pump. Unhandled exceptions are logged instead of lost.
+
+    :param coro: Coroutine object to run
+    :param name: Optional task name for logging
+    :return: asyncio.Task wrapping the coroutine
+    """
+    task = get_event_loop().create_task(coro, name=name)
+    task.add_done_callback(_log_task_exception)
+    return task
+
+
+def wait_for_signal(signal, timeout=None):
+    """
+    Turn the next emission of a Qt signal into an awaitable.
+
+    Example::
+
+        await wait_for_signal(web_view.loadFinished, timeout=10)
+
+    :param signal: Bound pyqtSignal
+    :param timeout: Seconds to wait, or None to wait forever
+    :return: Awaitable resolving to the signal arguments (a single value if
+             the signal carries one argument, a tuple otherwise)
+    """
+    loop = get_event_loop()
+    future = loop.create_future()
+
+    def on_emit(*args):
+        if not future.done():
+            future.set_result(args[0] if len(args) == 1 else args)
+
+    def disconnect(_):
+        try:
+            signal.disconnect(on_emit)
+        except TypeError:
+            # Already disconnected
+            pass
+
+    signal.connect(on_emit)
+    future.add_done_callback(disconnect)
+
+    if timeout is None:
+        return future
+    return asyncio.wait_for(future, timeout)
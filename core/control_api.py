@@ -0,0 +1,395 @@
+import os
+import sys
+import hmac
+import json
+import time
+import asyncio
+import logging
+import secrets
+import threading
+from concurrent.futures import Future
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger('ControlAPI')
+
+# Unix socket the control API listens on
+CONTROL_SOCKET_PATH = os.path.join(os.path.expanduser('~'), '.scumplug', 'control.sock')
+
+# Loopback TCP port used where Unix sockets are unavailable (Windows)
+CONTROL_TCP_PORT = 47621
+
+# Per-session secret TCP clients must present; readable by the user only
+CONTROL_TOKEN_PATH = os.path.join(os.path.expanduser('~'), '.scumplug', 'control.token')
+
+# Interval between streamed "metrics" events (seconds)
+METRICS_INTERVAL = 2.0
+
+# How long a request may wait for the GUI thread (seconds)
+GUI_CALL_TIMEOUT = 10.0
+
+JSONRPC_PARSE_ERROR = -32700
+JSONRPC_INVALID_REQUEST = -32600
+JSONRPC_METHOD_NOT_FOUND = -32601
+JSONRPC_INVALID_PARAMS = -32602
+JSONRPC_INTERNAL_ERROR = -32603
+JSONRPC_UNAUTHORIZED = -32001
+JSONRPC_GUI_TIMEOUT = -32002
+
+
+class ControlAPIError(Exception):
+    """Error reported back to the client as a JSON-RPC error object"""
+
+    def __init__(self, message, code=JSONRPC_INVALID_PARAMS):
+        super().__init__(message)
+        self.code = code
+
+
+class _GuiInvoker(QObject):
+    """
+    Run callables on the GUI thread.
+
+    The invoker lives on the GUI thread, so emitting ``invoke`` from the
+    server thread is delivered as a queued call on the Qt event loop.
+    """
+
+    invoke = pyqtSignal(object, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.invoke.connect(self._run)
+
+    @pyqtSlot(object, object)
+    def _run(self, func, future):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func())
+        except Exception as e:
+            future.set_exception(e)
+
+    def call(self, func):
+        """Schedule ``func`` on the GUI thread and return a concurrent Future."""
+        future = Future()
+        self.invoke.emit(func, future)
+        return future
+
+
+class ControlServer:
+    """
+    Local JSON-RPC 2.0 control API for driving ScumPlug from scripts.
+
+    Requests are newline-delimited JSON objects read on a dedicated asyncio
+    thread. Anything that touches widgets is marshalled onto the GUI thread
+    through a queued Qt signal, so clients never block the overlay, and a
+    call the GUI thread does not get to within ``GUI_CALL_TIMEOUT`` fails
+    instead of holding up the server thread.
+
+    The Unix socket is only accessible to the owning user. Any local process
+    can reach the TCP port, so TCP clients must first call ``session.auth``
+    ``{"token"}`` with the secret written to ``~/.scumplug/control.token``
+    (a new one every session); other requests are refused until they do.
+
+    Methods:
+
+    - ``plugins.list``: enabled plugins and their load state
+    - ``plugins.open`` ``{"plugin"}`` / ``plugins.close`` ``{"plugin"}``
+    - ``bard.queue`` ``{"file"}``: queue a MIDI file for Scum Bard playback
+    - ``browser.navigate`` ``{"url", "new_tab"?}``: navigate Scum Browser,
+      optionally in a new tab
+    - ``metrics.get``: process and plugin metrics
+    - ``events.subscribe`` ``{"topics": [...]}``: stream ``event``
+      notifications (e.g. ``metrics``, ``playback``) on this connection
+    """
+
+    def __init__(self, overlay, socket_path=CONTROL_SOCKET_PATH, tcp_port=CONTROL_TCP_PORT,
+                 token_path=CONTROL_TOKEN_PATH):
+        self.overlay = overlay
+        self.socket_path = socket_path
+        self.tcp_port = tcp_port
+        self.token_path = token_path
+        self._token = None
+        self.started_at = time.monotonic()
+
+        self._invoker = _GuiInvoker(overlay)
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+        # writer -> set of subscribed topics (empty set means all topics)
+        self._subscribers = {}
+
+        self._methods = {
+            'plugins.list': self._plugins_list,
+            'plugins.open': self._plugins_open,
+            'plugins.close': self._plugins_close,
+            'bard.queue': self._bard_queue,
+            'browser.navigate': self._browser_navigate,
+            'metrics.get': self._metrics_get,
+        }
+
+    # ----------------------------------------------------------------------
+    # Server thread
+    # ----------------------------------------------------------------------
+
+    def start(self):
+        """Start the server thread; returns once the socket is listening."""
+        self._thread = threading.Thread(target=self._run, name='ControlAPI', daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5)
+
+    def stop(self):
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+        try:
+            self._loop.run_until_complete(self._start_server())
+        except OSError as e:
+            logger.error(f"Control API could not start: {e}")
+            self._ready.set()
+            self._loop.close()
+            return
+
+        self._ready.set()
+        metrics_task = self._loop.create_task(self._stream_metrics())
+
+        try:
+            self._loop.run_forever()
+        finally:
+            metrics_task.cancel()
+            self._server.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            for path in (self.socket_path if sys.platform != 'win32' else None,
+                         self.token_path if self._token is not None else None):
+                if path is None:
+                    continue
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            self._loop.close()
+            logger.info("Control API stopped")
+
+    async def _start_server(self):
+        if sys.platform != 'win32':
+            os.makedirs(os.path.dirname(self.socket_path), mode=0o700, exist_ok=True)
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            # Only the owning user may drive the overlay; the umask makes the
+            # socket private from the moment it is bound
+            old_umask = os.umask(0o077)
+            try:
+                self._server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+            finally:
+                os.umask(old_umask)
+            logger.info(f"Control API listening on {self.socket_path}")
+        else:
+            self._write_token()
+            self._server = await asyncio.start_server(self._handle_client, '127.0.0.1', self.tcp_port)
+            logger.info(f"Control API listening on 127.0.0.1:{self.tcp_port} (token in {self.token_path})")
+
+    def _write_token(self):
+        """Create this session's secret in a file only the user can read"""
+        self._token = secrets.token_hex(32)
+        os.makedirs(os.path.dirname(self.token_path), exist_ok=True)
+        if os.path.exists(self.token_path):
+            os.unlink(self.token_path)
+        # Created with user-only permissions (on Windows the profile folder's ACL applies)
+        fd = os.open(self.token_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            f.write(self._token)
+
+    async def _handle_client(self, reader, writer):
+        # Only the owner can open the Unix socket; TCP clients prove it with the token
+        session = {'authenticated': self._token is None}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self._handle_line(line, writer, session)
+                if response is not None:
+                    await self._send(writer, response)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._subscribers.pop(writer, None)
+            writer.close()
+
+    async def _send(self, writer, message):
+        writer.write(json.dumps(message).encode('utf-8') + b'\n')
+        await writer.drain()
+
+    async def _handle_line(self, line, writer, session):
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            return self._error(None, JSONRPC_PARSE_ERROR, f"Parse error: {e}")
+
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            return self._error(None, JSONRPC_INVALID_REQUEST, "Invalid request")
+
+        request_id = request.get('id')
+        method = request['method']
+        params = request.get('params')
+        if params is None:
+            params = {}
+        elif not isinstance(params, dict):
+            return self._error(request_id, JSONRPC_INVALID_PARAMS, "Invalid params: expected an object")
+
+        try:
+            if method == 'session.auth':
+                result = self._authenticate(session, params)
+            elif not session['authenticated']:
+                raise ControlAPIError("Unauthorized: call session.auth with the token first",
+                                      JSONRPC_UNAUTHORIZED)
+            elif method == 'events.subscribe':
+                result = self._subscribe(writer, params)
+            elif method in self._methods:
+                handler = self._methods[method]
+                result = await self._call_gui(lambda: handler(params))
+            else:
+                raise ControlAPIError(f"Method not found: {method}", JSONRPC_METHOD_NOT_FOUND)
+        except ControlAPIError as e:
+            return self._error(request_id, e.code, str(e))
+        except Exception as e:
+            logger.error(f"Control API method {method} failed: {e}")
+            return self._error(request_id, JSONRPC_INTERNAL_ERROR, str(e))
+
+        # Notifications (no id) get no response
+        if request_id is None:
+            return None
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+    async def _call_gui(self, func):
+        """Run ``func`` on the GUI thread, giving up after GUI_CALL_TIMEOUT"""
+        try:
+            # On timeout the wrapped Future is cancelled, so func never runs late
+            return await asyncio.wait_for(asyncio.wrap_future(self._invoker.call(func)), GUI_CALL_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise ControlAPIError(f"Overlay busy: no response within {GUI_CALL_TIMEOUT:.0f}s",
+                                  JSONRPC_GUI_TIMEOUT)
+
+    def _authenticate(self, session, params):
+        token = params.get('token')
+        if self._token is not None and not (isinstance(token, str) and hmac.compare_digest(token, self._token)):
+            raise ControlAPIError("Invalid token", JSONRPC_UNAUTHORIZED)
+        session['authenticated'] = True
+        return {'authenticated': True}
+
+    def _error(self, request_id, code, message):
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
+
+    def _subscribe(self, writer, params):
+        topics = params.get('topics') or []
+        self._subscribers[writer] = set(topics)
+        return {'subscribed': topics or 'all'}
+
+    async def _broadcast(self, topic, data):
+        message = {'jsonrpc': '2.0', 'method': 'event', 'params': {'topic': topic, 'data': data}}
+        for writer, topics in list(self._subscribers.items()):
+            if topics and topic not in topics:
+                continue
+            try:
+                await self._send(writer, message)
+            except ConnectionError:
+                self._subscribers.pop(writer, None)
+
+    async def _stream_metrics(self):
+        while True:
+            await asyncio.sleep(METRICS_INTERVAL)
+            if not any(not topics or 'metrics' in topics for topics in self._subscribers.values()):
+                continue
+            try:
+                metrics = await self._call_gui(lambda: self._metrics_get({}))
+            except ControlAPIError:
+                continue
+            await self._broadcast('metrics', metrics)
+
+    def publish(self, topic, data):
+        """
+        Stream an event to subscribers. Safe to call from any thread.
+
+        :param topic: Event topic, e.g. ``playback``
+        :param data: JSON-serialisable payload
+        """
+        if self._loop is None or self._loop.is_closed() or not self._subscribers:
+            return
+        asyncio.run_coroutine_threadsafe(self._broadcast(topic, data), self._loop)
+
+    # ----------------------------------------------------------------------
+    # Methods (run on the GUI thread)
+    # ----------------------------------------------------------------------
+
+    def _require(self, params, key):
+        value = params.get(key)
+        if not value:
+            raise ControlAPIError(f"Missing parameter: {key}")
+        return value
+
+    def _plugins_list(self, params):
+        plugins = []
+        for plugin_button in self.overlay.plugin_buttons:
+            widget = plugin_button.active_plugin
+            plugins.append({
+                'name': plugin_button.plugin_name,
+                'loaded': widget is not None,
+                'visible': bool(widget and widget.isVisible()),
+                'suspended': self.overlay.lifecycle.is_suspended(plugin_button.plugin_name),
+            })
+        return plugins
+
+    def _plugins_open(self, params):
+        plugin_name = self._require(params, 'plugin')
+        plugin_button = self.overlay.get_plugin_button(plugin_name)
+        if plugin_button is None:
+            raise ControlAPIError(f"Plugin not enabled: {plugin_name}")
+        return {'opened': plugin_button.open_plugin() is not None}
+
+    def _plugins_close(self, params):
+        plugin_name = self._require(params, 'plugin')
+        plugin_button = self.overlay.get_plugin_button(plugin_name)
+        if plugin_button is None:
+            raise ControlAPIError(f"Plugin not enabled: {plugin_name}")
+        plugin_button.exit_plugin(destroy=bool(params.get('destroy', False)))
+        return {'closed': True}
+
+    def _bard_queue(self, params):
+        midi_file = os.path.abspath(self._require(params, 'file'))
+        if not os.path.exists(midi_file):
+            raise ControlAPIError(f"MIDI file not found: {midi_file}")
+        result = self.overlay.handle_command({'action': 'queue_midi', 'plugin': 'scum_bard',
+                                              'file': midi_file})
+        return result if result is not None else {'queued': midi_file}
+
+    def _browser_navigate(self, params):
+        url = self._require(params, 'url')
+        self.overlay.handle_command({'action': 'navigate', 'plugin': 'scum_browser', 'url': url,
+                                     'new_tab': bool(params.get('new_tab'))})
+        return {'navigating': url}
+
+    def _metrics_get(self, params):
+        metrics = {
+            'uptime': round(time.monotonic() - self.started_at, 1),
+            'plugins_loaded': sum(1 for b in self.overlay.plugin_buttons if b.active_plugin),
+            'plugins_pooled': len(self.overlay.plugin_pool),
+        }
+        if psutil is not None:
+            process = psutil.Process()
+            metrics['rss_mb'] = round(process.memory_info().rss / (1024 * 1024), 1)
+            metrics['cpu_percent'] = process.cpu_percent(interval=None)
+        return metrics
@@ -19,72 +19,62 @@ class PluginButton(QPushButton):
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
         
         # Button styling
-        self.setStyleSheet("""
-            QPushButton {
-                background-color: rgba(50, 100, 200, 230);
+        self.set_active_style(False)
+        
+        # Context menu for button
+        self.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.customContextMenuRequested.connect(self.show_context_menu)
+    
+    def set_active_style(self, active):
+        """Highlight the button while its plugin is visible."""
+        background = "rgba(0, 255, 0, 230)" if active else "rgba(50, 100, 200, 230)"
+        hover = "" if active else """
+            QPushButton:hover {
+                background-color: rgba(70, 120, 220, 250);
+            }"""
+        self.setStyleSheet(f"""
+            QPushButton {{
+                background-color: {background};
                 color: white;
                 border: 3px solid white;
                 border-radius: 15px;
                 font-weight: bold;
                 font-size: 14px;
                 text-transform: uppercase;
-            }
-            QPushButton:hover {
-                background-color: rgba(70, 120, 220, 250);
-            }
+            }}{hover}
         """)
+    
+    def open_plugin(self):
+        """
+        Make sure the plugin is loaded and visible.
         
-        # Context menu for button
-        self.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.customContextMenuRequested.connect(self.show_context_menu)
+        :return: The plugin widget, or None if it failed to load
+        """
+        if not self.active_plugin:
+            self.active_plugin = self.overlay.load_plugin(self.plugin_name, self)
+            
+            # Change button style when plugin is loaded
+            if self.active_plugin:
+                self.set_active_style(True)
+        elif not self.active_plugin.isVisible():
+            self.overlay.lifecycle.resume(self.plugin_name, self.active_plugin)
+            self.set_active_style(True)
+        
+        return self.active_plugin
+    
+    def hide_plugin(self):
+        """Hide the plugin, suspending it while hidden."""
+        if self.active_plugin and self.active_plugin.isVisible():
+            self.overlay.lifecycle.suspend(self.plugin_name, self.active_plugin)
+            self.set_active_style(False)
     
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
             # If not dragging, toggle plugin
-            if not self.active_plugin:
-                self.active_plugin = self.overlay.load_plugin(self.plugin_name, self)
-                
-                # Change button style when plugin is loaded
-                if self.active_plugin:
-                    self.setStyleSheet("""
-                        QPushButton {
-                            background-color: rgba(0, 255, 0, 230);
-                            color: white;
-                            border: 3px solid white;
-                            border-radius: 15px;
-                            font-weight: bold;
-                            font-size: 14px;
-                            text-transform: uppercase;
-                        }
-                    """)
+            if self.active_plugin and self.active_plugin.isVisible():
+                self.hide_plugin()
             else:
-                # Toggle visibility of active plugin
-                if self.active_plugin.isVisible():
-                    self.active_plugin.hide()
-                    self.setStyleSheet("""
-                        QPushButton {
-                            background-color: rgba(50, 100, 200, 230);
-                            color: white;
-                            border: 3px solid white;
-                            border-radius: 15px;
-                            font-weight: bold;
-                            font-size: 14px;
-                            text-transform: uppercase;
-                        }
-                    """)
-                else:
-                    self.active_plugin.show()
-                    self.setStyleSheet("""
-                        QPushButton {
-                            background-color: rgba(0, 255, 0, 230);
-                            color: white;
-                            border: 3px solid white;
-                            border-radius: 15px;
-                            font-weight: bold;
-                            font-size: 14px;
-                            text-transform: uppercase;
-                        }
-                    """)
+                self.open_plugin()
         
         super().mousePressEvent(event)
     
@@ -103,22 +93,22 @@ class PluginButton(QPushButton):
         # Show menu at global position
         context_menu.exec_(self.mapToGlobal(pos))
     
-    def exit_plugin(self):
-        # Close and destroy the active plugin if exists
+    def exit_plugin(self, destroy=False):
+        """
+        Close the active plugin.
+
+        The widget is parked in the overlay's widget pool when the plugin
+        supports it, so reopening is a cheap reset. Pass ``destroy=True`` to
+        release it completely.
+        """
         if self.active_plugin:
-            self.active_plugin.close()
-            self.active_plugin.deleteLater()  # Ensure complete destruction
+            # Let the plugin save its state and release resources first
+            self.overlay.lifecycle.unload(self.plugin_name, self.active_plugin, destroy)
+            
+            if destroy or not self.overlay.plugin_pool.park(self.plugin_name, self.active_plugin):
+                self.active_plugin.close()
+                self.active_plugin.deleteLater()  # Ensure complete destruction
             self.active_plugin = None
             
             # Reset button style
-            self.setStyleSheet("""
-                QPushButton {
-                    background-color: rgba(50, 100, 200, 230);
-                    color: white;
-                    border: 3px solid white;
-                    border-radius: 15px;
-                    font-weight: bold;
-                    font-size: 14px;
-                    text-transform: uppercase;
-                }
-            """)
+            self.set_active_style(False)
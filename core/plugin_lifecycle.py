@@ -0,0 +1,184 @@
+import time
+import logging
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, QTimer
+
+try:
+    import psutil
+except ImportError:
+    # Memory budget enforcement is disabled without psutil
+    psutil = None
+
+logger = logging.getLogger('PluginLifecycle')
+
+# Hidden plugins idle for longer than this are unloaded (milliseconds)
+IDLE_UNLOAD_TIMEOUT_MS = 10 * 60 * 1000
+
+# How often the idle/memory policy is evaluated (milliseconds)
+POLICY_CHECK_INTERVAL_MS = 30 * 1000
+
+# Resident memory (MB) above which hidden plugins are unloaded, LRU first
+MEMORY_BUDGET_MB = 1536
+
+
+def call_hook(widget, hook, *args):
+    """
+    Call an optional lifecycle hook on a plugin widget.
+
+    Plugins opt in to the lifecycle contract by defining any of:
+
+    - ``on_suspend()``: the widget was hidden; release timers, renderers, etc.
+    - ``on_resume()``: the widget is visible again
+    - ``on_unload()``: the widget is about to be destroyed
+    - ``snapshot_state()``: return a JSON-serialisable dict describing the
+      user-visible state (URL, zoom, selected file, ...)
+    - ``restore_state(state)``: re-apply a dict from ``snapshot_state``
+
+    :param widget: Plugin widget
+    :param hook: Hook method name
+    :return: Hook result, or None if the hook is missing or failed
+    """
+    method = getattr(widget, hook, None)
+    if not callable(method):
+        return None
+
+    try:
+        return method(*args)
+    except Exception as e:
+        logger.error(f"Lifecycle hook {hook} failed on {type(widget).__name__}: {e}")
+        return None
+
+
+class PluginLifecycleManager(QObject):
+    """
+    Apply the suspend/resume/unload policy to loaded plugins.
+
+    Hidden plugins are suspended immediately. Suspended plugins are unloaded
+    once they have been idle for ``idle_timeout_ms`` or, least recently used
+    first, while the process exceeds ``memory_budget_mb``. State captured at
+    unload time is restored when the plugin is opened again.
+    """
+
+    def __init__(self, overlay, idle_timeout_ms=IDLE_UNLOAD_TIMEOUT_MS,
+                 memory_budget_mb=MEMORY_BUDGET_MB):
+        super().__init__(overlay)
+
+        self.overlay = overlay
+        self.idle_timeout_ms = idle_timeout_ms
+        self.memory_budget_mb = memory_budget_mb
+
+        # plugin_name -> last time it was used, least recently used first
+        self._last_used = OrderedDict()
+        self._suspended = set()
+        self._saved_state = {}
+
+        self._policy_timer = QTimer(self)
+        self._policy_timer.setInterval(POLICY_CHECK_INTERVAL_MS)
+        self._policy_timer.timeout.connect(self.enforce_policy)
+        self._policy_timer.start()
+
+        if psutil is None:
+            logger.warning(f"psutil is not installed; the {memory_budget_mb} MB plugin memory budget "
+                           f"is not enforced (idle unloading still applies)")
+
+    def _touch(self, plugin_name):
+        self._last_used[plugin_name] = time.monotonic()
+        self._last_used.move_to_end(plugin_name)
+
+    def plugin_loaded(self, plugin_name, widget):
+        """Register a freshly created widget and restore any saved state."""
+        self._touch(plugin_name)
+        self._suspended.discard(plugin_name)
+
+        state = self._saved_state.pop(plugin_name, None)
+        if state is not None:
+            call_hook(widget, 'restore_state', state)
+            logger.info(f"Restored saved state for {plugin_name}")
+
+    def suspend(self, plugin_name, widget):
+        """Hide a plugin and let it release resources it does not need."""
+        widget.hide()
+        if plugin_name not in self._suspended:
+            self._suspended.add(plugin_name)
+            call_hook(widget, 'on_suspend')
+            logger.info(f"Suspended plugin {plugin_name}")
+        self._touch(plugin_name)
+
+    def resume(self, plugin_name, widget):
+        """Show a suspended plugin again."""
+        if plugin_name in self._suspended:
+            self._suspended.discard(plugin_name)
+            call_hook(widget, 'on_resume')
+            logger.info(f"Resumed plugin {plugin_name}")
+        widget.show()
+        self._touch(plugin_name)
+
+    def unload(self, plugin_name, widget, destroy=True):
+        """
+        Capture state before a plugin is closed.
+        The caller remains responsible for closing or parking the widget.
+
+        :param destroy: True if the widget is about to be destroyed, False if
+                        it is being parked in the widget pool for reuse
+        """
+        state = call_hook(widget, 'snapshot_state')
+        if state is not None:
+            self._saved_state[plugin_name] = state
+
+        if destroy:
+            call_hook(widget, 'on_unload')
+
+        self._suspended.discard(plugin_name)
+        self._last_used.pop(plugin_name, None)
+        logger.info(f"Unloaded plugin {plugin_name}")
+
+    def is_suspended(self, plugin_name):
+        return plugin_name in self._suspended
+
+    def _unload_plugin(self, plugin_name):
+        button = self.overlay.get_plugin_button(plugin_name)
+        if button is not None:
+            # Policy unloads exist to free memory, so never park the widget
+            button.exit_plugin(destroy=True)
+        else:
+            # Button was removed (plugin toggled off); just forget the plugin
+            self._suspended.discard(plugin_name)
+            self._last_used.pop(plugin_name, None)
+
+    def _memory_usage_mb(self):
+        if psutil is None:
+            return None
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+
+    def enforce_policy(self):
+        """Unload idle plugins, then LRU plugins while over the memory budget."""
+        now = time.monotonic()
+        idle_limit = self.idle_timeout_ms / 1000.0
+
+        # Iterate over a copy; unloading mutates the LRU order
+        for plugin_name, last_used in list(self._last_used.items()):
+            if plugin_name in self._suspended and now - last_used >= idle_limit:
+                logger.info(f"Plugin {plugin_name} idle for {now - last_used:.0f}s, unloading")
+                self._unload_plugin(plugin_name)
+
+        self.overlay.plugin_pool.evict_idle(idle_limit)
+
+        usage = self._memory_usage_mb()
+        if usage is None or usage <= self.memory_budget_mb:
+            return
+
+        # Parked widgets are the cheapest memory to give back
+        if len(self.overlay.plugin_pool):
+            logger.info(f"Memory usage {usage:.0f} MB over budget, clearing widget pool")
+            self.overlay.plugin_pool.clear()
+            return
+
+        # Memory is released asynchronously after deleteLater, so unload one
+        # plugin per pass and let the next check decide whether to continue
+        for plugin_name in list(self._last_used):
+            if plugin_name in self._suspended:
+                logger.info(f"Memory usage {usage:.0f} MB over budget "
+                            f"({self.memory_budget_mb} MB), unloading {plugin_name}")
+                self._unload_plugin(plugin_name)
+                break
@@ -0,0 +1,82 @@
+import time
+import logging
+
+from .plugin_lifecycle import call_hook
+
+logger = logging.getLogger('PluginPool')
+
+
+class PluginWidgetPool:
+    """
+    Keep one parked widget per plugin so "close then reopen" is a reset
+    instead of a full rebuild.
+
+    Only plugins that implement ``reset_state()`` are pooled. A parked widget
+    is hidden, suspended and reset; acquiring it resumes it, after which the
+    caller restores the saved snapshot through the lifecycle manager.
+    """
+
+    def __init__(self):
+        # plugin_name -> (widget, time parked)
+        self._parked = {}
+
+    def can_pool(self, widget):
+        return callable(getattr(widget, 'reset_state', None))
+
+    def park(self, plugin_name, widget):
+        """
+        Park a widget for reuse.
+
+        :return: True if the widget was parked, False if the caller should
+                 destroy it instead
+        """
+        if not self.can_pool(widget):
+            return False
+
+        # Only one spare instance per plugin
+        self.discard(plugin_name)
+
+        widget.hide()
+        call_hook(widget, 'on_suspend')
+        call_hook(widget, 'reset_state')
+        self._parked[plugin_name] = (widget, time.monotonic())
+        logger.info(f"Parked widget for {plugin_name}")
+        return True
+
+    def acquire(self, plugin_name):
+        """Take the parked widget for a plugin, or None if there is none."""
+        entry = self._parked.pop(plugin_name, None)
+        if entry is None:
+            return None
+
+        widget, _ = entry
+        call_hook(widget, 'on_resume')
+        logger.info(f"Reusing parked widget for {plugin_name}")
+        return widget
+
+    def discard(self, plugin_name):
+        """Destroy the parked widget for a plugin, if any."""
+        entry = self._parked.pop(plugin_name, None)
+        if entry is None:
+            return
+
+        widget, _ = entry
+        call_hook(widget, 'on_unload')
+        widget.close()
+        widget.deleteLater()
+        logger.info(f"Discarded parked widget for {plugin_name}")
+
+    def evict_idle(self, max_idle_seconds):
+        """Destroy widgets that have been parked for too long."""
+        now = time.monotonic()
+        for plugin_name, (_, parked_at) in list(self._parked.items()):
+            if now - parked_at >= max_idle_seconds:
+                self.discard(plugin_name)
+
+    def clear(self):
+        """Destroy every parked widget."""
+        for plugin_name in list(self._parked):
+            self.discard(plugin_name)
+
+    def __len__(self):
+        return len(self._parked)
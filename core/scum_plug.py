@@ -1,22 +1,33 @@
 import os
 import sys
 import json
-import requests
+import asyncio
 import webbrowser
+import logging
 import importlib.util
 from PyQt5.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
                              QPushButton, QMenu, QMessageBox, QMainWindow, 
                              QSystemTrayIcon, QAction, QStyle, QLabel, QSizePolicy)
-from PyQt5.QtCore import Qt, QEvent
+from PyQt5.QtCore import Qt, QEvent, QUrl
+from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkRequest
 from PyQt5.QtGui import QIcon
 
 from .plugin_button import PluginButton
 from .custom_title_bar import CustomTitleBar
+from .async_loop import run_coroutine, wait_for_signal
+from .plugin_lifecycle import PluginLifecycleManager, call_hook
+from .plugin_pool import PluginWidgetPool
+from .control_api import ControlServer
+
+logger = logging.getLogger('ScumPlug')
 
 # Current version of the application
 CURRENT_VERSION = "0.1.0"
 GITHUB_REPO = "cooksta120021/Scum_Plug"
 
+# Seconds to wait for the GitHub API before giving up
+UPDATE_CHECK_TIMEOUT = 10
+
 # Plugins directory
 PLUGINS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'plugins')
 
@@ -33,6 +44,21 @@ class ScumPlug(QMainWindow):
         # Initialize plugin buttons list
         self.plugin_buttons = []
         
+        # Imported plugin modules, so reopening a plugin skips the import
+        self.plugin_modules = {}
+        
+        # Parked plugin widgets reused across exit/reopen
+        self.plugin_pool = PluginWidgetPool()
+        
+        # Suspend/unload policy for loaded plugins
+        self.lifecycle = PluginLifecycleManager(self)
+        
+        # Local JSON-RPC API, started by start_control_server()
+        self.control_server = None
+        
+        # Created on the first update check
+        self.network_manager = None
+        
         # Set window properties
         self.setWindowTitle("ScumPlug")
         self.setGeometry(100, 100, 400, 200)
@@ -145,6 +171,73 @@ class ScumPlug(QMainWindow):
                     # Add to plugin buttons list
                     self.plugin_buttons.append(plugin_button)
     
+    def get_plugin_button(self, plugin_name):
+        """
+        Return the button for a plugin, or None if the plugin is not shown.
+        """
+        for plugin_button in self.plugin_buttons:
+            if plugin_button.plugin_name == plugin_name:
+                return plugin_button
+        return None
+    
+    def start_control_server(self):
+        """
+        Expose the local JSON-RPC control API for scripts.
+        """
+        self.control_server = ControlServer(self)
+        self.control_server.start()
+        QApplication.instance().aboutToQuit.connect(self.control_server.stop)
+    
+    def publish_event(self, topic, data):
+        """
+        Stream an event to control API subscribers. Safe to call from any thread.
+        """
+        if self.control_server is not None:
+            self.control_server.publish(topic, data)
+    
+    def handle_command(self, command):
+        """
+        Execute a command forwarded from another launch or a script.
+        
+        Supported actions:
+        
+        - ``activate``: bring the overlay to the front
+        - ``open_plugin``: open ``plugin``
+        - ``play_midi``: open Scum Bard and play ``file``
+        
+        Any other action that names a ``plugin`` opens it and is passed to
+        the widget's ``handle_command`` method.
+        
+        :param command: Command dict with an ``action`` key
+        :return: Result of the command, or None
+        """
+        action = command.get('action')
+        
+        if action == 'activate':
+            self.show()
+            self.raise_()
+            self.activateWindow()
+            return None
+        
+        if action == 'play_midi':
+            command = dict(command, plugin='scum_bard')
+        
+        plugin_name = command.get('plugin')
+        if not plugin_name:
+            logger.warning(f"Ignoring command without a plugin: {command}")
+            return None
+        
+        plugin_button = self.get_plugin_button(plugin_name)
+        if plugin_button is None:
+            logger.warning(f"Plugin {plugin_name} is not enabled; ignoring {action}")
+            return None
+        
+        plugin_widget = plugin_button.open_plugin()
+        if plugin_widget is None or action == 'open_plugin':
+            return None
+        
+        return call_hook(plugin_widget, 'handle_command', command)
+    
     def show_context_menu(self, pos):
         # Create custom context menu for plugin button toggling
         context_menu = QMenu(self)
@@ -211,6 +304,21 @@ class ScumPlug(QMainWindow):
                     self.plugin_buttons.append(btn)
     
     def load_plugin(self, plugin_name, button):
+        # Reuse a parked widget when one is available
+        plugin_widget = self.plugin_pool.acquire(plugin_name)
+        if plugin_widget is None:
+            plugin_widget = self.create_plugin_widget(plugin_name, button)
+            if plugin_widget is None:
+                return None
+        
+        # Restore state saved when the plugin was last closed
+        self.lifecycle.plugin_loaded(plugin_name, plugin_widget)
+        
+        # Show the plugin widget
+        plugin_widget.show()
+        return plugin_widget
+    
+    def create_plugin_widget(self, plugin_name, button):
         # Import the plugin
         create_plugin = self.import_plugin(plugin_name)
         
@@ -229,9 +337,6 @@ class ScumPlug(QMainWindow):
                 # Ensure plugin widget stays on top and has no window controls
                 plugin_widget.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.Tool | 
                                              Qt.CustomizeWindowHint | Qt.WindowTitleHint)
-                
-                # Show the plugin widget
-                plugin_widget.show()
                 return plugin_widget
             except Exception as e:
                 QMessageBox.critical(None, "Plugin Load Error", 
@@ -247,6 +352,10 @@ class ScumPlug(QMainWindow):
         :param plugin_name: Name of the plugin directory
         :return: Imported plugin module
         """
+        # Modules are only imported once per session
+        if plugin_name in self.plugin_modules:
+            return self.plugin_modules[plugin_name]
+        
         try:
             # Path to plugins directory
             plugins_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'plugins')
@@ -283,6 +392,7 @@ class ScumPlug(QMainWindow):
                 QMessageBox.warning(None, "Plugin Error", f"No create_plugin function found in {plugin_name}")
                 return None
             
+            self.plugin_modules[plugin_name] = module
             return module
         
         except Exception as e:
@@ -291,21 +401,45 @@ class ScumPlug(QMainWindow):
             return None
 
     def check_for_updates(self):
+        # Run the check on the shared event loop so the overlay stays responsive
+        run_coroutine(self.check_for_updates_async(), name="check_for_updates")
+    
+    async def check_for_updates_async(self):
         try:
             # GitHub Releases API URL (public, no authentication)
             url = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
             
             # Set a user agent to comply with GitHub API requirements
-            headers = {
-                'User-Agent': 'ScumPlug-Update-Checker'
-            }
+            request = QNetworkRequest(QUrl(url))
+            request.setRawHeader(b'User-Agent', b'ScumPlug-Update-Checker')
+            
+            # Fetch latest release with Qt's own asynchronous networking,
+            # so neither the GUI thread nor a worker thread waits on it
+            if self.network_manager is None:
+                self.network_manager = QNetworkAccessManager(self)
+            reply = self.network_manager.get(request)
+            try:
+                await wait_for_signal(reply.finished, timeout=UPDATE_CHECK_TIMEOUT)
+            except asyncio.TimeoutError:
+                reply.abort()
+            status_code = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+            error = reply.errorString()
+            body = bytes(reply.readAll())
+            reply.deleteLater()
             
-            # Fetch latest release
-            response = requests.get(url, headers=headers)
+            if status_code is None:
+                # No HTTP response at all (offline, DNS failure, timed out)
+                QMessageBox.warning(
+                    None, 
+                    "Network Error", 
+                    f"A network error occurred:\n{error}\n"
+                    "Please check your internet connection."
+                )
+                return
             
             # Check if request was successful
-            if response.status_code == 200:
-                latest_release = response.json()
+            if status_code == 200:
+                latest_release = json.loads(body)
                 latest_version = latest_release['tag_name'].lstrip('v')
                 
                 # Compare versions
@@ -340,17 +474,9 @@ class ScumPlug(QMainWindow):
                 QMessageBox.warning(
                     None, 
                     "Update Check Failed", 
-                    f"Could not check for updates. Status code: {response.status_code}\n"
+                    f"Could not check for updates. Status code: {status_code}\n"
                     "Please check your internet connection."
                 )
-        except requests.RequestException as e:
-            # Handle network-related errors
-            QMessageBox.warning(
-                None, 
-                "Network Error", 
-                f"A network error occurred:\n{str(e)}\n"
-                "Please check your internet connection."
-            )
         except Exception as e:
             # Handle any unexpected errors
             QMessageBox.critical(
@@ -0,0 +1,142 @@
+import json
+import getpass
+import logging
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+
+logger = logging.getLogger('SingleInstance')
+
+# Per-user name so different accounts on one machine do not collide
+SERVER_NAME = f"ScumPlug-{getpass.getuser()}"
+
+# How long a second launch waits for the running instance (milliseconds)
+FORWARD_TIMEOUT_MS = 500
+
+# Longer wait used when a running instance was found but did not answer at first
+BUSY_FORWARD_TIMEOUT_MS = 5000
+
+
+class SingleInstanceGuard(QObject):
+    """
+    Make sure only one ScumPlug runs per user.
+
+    The first instance listens on a QLocalServer (a Unix socket or a Windows
+    named pipe). Later launches connect to it, forward their command-line
+    request as newline-delimited JSON and exit. Each command is a dict with
+    an ``action`` key, e.g. ``{"action": "open_plugin", "plugin": "scum_bard"}``.
+    """
+
+    command_received = pyqtSignal(dict)
+
+    def __init__(self, server_name=SERVER_NAME, parent=None):
+        super().__init__(parent)
+        self.server_name = server_name
+        self.server = None
+        self._buffers = {}
+
+    def forward(self, commands, timeout_ms=FORWARD_TIMEOUT_MS):
+        """
+        Send commands to an already running instance.
+
+        Once connected, the commands are delivered even if the instance is
+        too busy to acknowledge them within ``timeout_ms``; that is logged
+        but still counts as forwarded, so a busy overlay is never mistaken
+        for a missing one.
+
+        :param commands: List of command dicts
+        :return: True if a running instance was reached
+        """
+        socket = QLocalSocket()
+        socket.connectToServer(self.server_name)
+        if not socket.waitForConnected(timeout_ms):
+            return False
+
+        payload = b''.join(json.dumps(command).encode('utf-8') + b'\n' for command in commands)
+        socket.write(payload)
+        socket.waitForBytesWritten(timeout_ms)
+
+        # Wait for one acknowledgement line per command
+        acknowledged = 0
+        while acknowledged < len(commands):
+            if not socket.canReadLine() and not socket.waitForReadyRead(timeout_ms):
+                break
+            while socket.canReadLine():
+                socket.readLine()
+                acknowledged += 1
+        if acknowledged < len(commands):
+            logger.warning(f"Running instance acknowledged {acknowledged} of {len(commands)} commands "
+                           f"within {timeout_ms} ms; it is busy and will handle them later")
+
+        # Flushes anything still buffered before closing
+        socket.disconnectFromServer()
+        if socket.state() != QLocalSocket.UnconnectedState:
+            socket.waitForDisconnected(timeout_ms)
+        return True
+
+    def instance_running(self, timeout_ms=FORWARD_TIMEOUT_MS):
+        """True if an instance accepts connections on the server name"""
+        socket = QLocalSocket()
+        socket.connectToServer(self.server_name)
+        if not socket.waitForConnected(timeout_ms):
+            return False
+        socket.disconnectFromServer()
+        return True
+
+    def listen(self):
+        """
+        Start accepting commands from later launches.
+
+        A socket left behind by a crashed instance is removed, but only
+        after a fresh connection attempt shows nobody is serving it.
+
+        :return: True if the server is listening; False if another instance
+                 is (check instance_running()) or listening failed
+        """
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self._on_new_connection)
+
+        if not self.server.listen(self.server_name):
+            if self.instance_running():
+                logger.warning(f"Another instance is listening on {self.server_name}")
+                return False
+            # Nobody answers: a crashed instance left a stale socket file behind on Unix
+            QLocalServer.removeServer(self.server_name)
+            if not self.server.listen(self.server_name):
+                logger.error(f"Could not listen on {self.server_name}: {self.server.errorString()}")
+                return False
+
+        logger.info(f"Single-instance server listening on {self.server_name}")
+        return True
+
+    def _on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self._buffers[socket] = b''
+            socket.readyRead.connect(lambda s=socket: self._on_ready_read(s))
+            socket.disconnected.connect(lambda s=socket: self._on_disconnected(s))
+
+    def _on_ready_read(self, socket):
+        self._buffers[socket] += bytes(socket.readAll())
+        *lines, self._buffers[socket] = self._buffers[socket].split(b'\n')
+
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                command = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Ignoring malformed command: {line!r}")
+                socket.write(b'{"ok": false}\n')
+                continue
+
+            # Acknowledge before handling so the sender can exit right away
+            socket.write(b'{"ok": true}\n')
+            socket.flush()
+
+            logger.info(f"Received command from another instance: {command}")
+            self.command_received.emit(command)
+
+    def _on_disconnected(self, socket):
+        self._buffers.pop(socket, None)
+        socket.deleteLater()
@@ -43,7 +43,10 @@ try:
     import requests
     import webbrowser
     from PyQt5.QtWidgets import QApplication, QSystemTrayIcon, QMenu, QAction, QStyle
-    from core import ScumPlug
+    import argparse
+    from PyQt5.QtCore import QTimer
+    from core import ScumPlug, install_qt_event_loop
+    from core.single_instance import SingleInstanceGuard, BUSY_FORWARD_TIMEOUT_MS
 
     # Ensure requests is installed
     try:
@@ -54,15 +57,61 @@ try:
         subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'requests'])
         import requests
 
+    def parse_arguments(argv):
+        parser = argparse.ArgumentParser(description="ScumPlug Overlay")
+        parser.add_argument('--open-plugin', metavar='NAME', help='Open a plugin by name')
+        parser.add_argument('--play-midi', metavar='FILE', help='Play a MIDI file with Scum Bard')
+        
+        # Leave Qt's own arguments (e.g. -platform) to QApplication
+        args, _ = parser.parse_known_args(argv)
+        return args
+    
+    def build_commands(args):
+        commands = []
+        if args.open_plugin:
+            commands.append({'action': 'open_plugin', 'plugin': args.open_plugin})
+        if args.play_midi:
+            # The running instance may have a different working directory
+            commands.append({'action': 'play_midi', 'file': os.path.abspath(args.play_midi)})
+        return commands
+    
     def main():
+        commands = build_commands(parse_arguments(sys.argv[1:]))
+        
         # Ensure QApplication is created
         app = QApplication.instance()
         if not app:
             app = QApplication(sys.argv)
         
+        # Hand the request to an already running overlay and exit
+        guard = SingleInstanceGuard()
+        request = commands or [{'action': 'activate'}]
+        if guard.forward(request):
+            logger.info("ScumPlug is already running; forwarded request and exiting")
+            sys.exit(0)
+        if not guard.listen() and guard.instance_running():
+            # Another instance started meanwhile, or was too slow to accept the
+            # first connection; hand over to it rather than run a second overlay
+            if not guard.forward(request, timeout_ms=BUSY_FORWARD_TIMEOUT_MS):
+                logger.error("ScumPlug is already running but could not be reached; exiting")
+                sys.exit(1)
+            logger.info("ScumPlug is already running; forwarded request and exiting")
+            sys.exit(0)
+        
+        # Share the GUI event loop with asyncio so plugins can use async/await
+        install_qt_event_loop(app)
+        
         # Create the main window
         main_window = ScumPlug()
         
+        # Let scripts drive the overlay over the local control API
+        main_window.start_control_server()
+        
+        # Accept requests from later launches, then run our own once the loop starts
+        guard.command_received.connect(main_window.handle_command)
+        for command in commands:
+            QTimer.singleShot(0, lambda c=command: main_window.handle_command(c))
+        
         # Create system tray icon
         tray_icon = QSystemTrayIcon()
         # Use a default system icon
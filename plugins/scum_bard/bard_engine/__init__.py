@@ -0,0 +1,40 @@
+"""
+Scum Bard playback engine.
+
+Kept free of Qt, mido and pyautogui imports at package level so tools can
+load it cheaply; modules import those dependencies where they need them.
+"""
+
+from .timing import MonotonicClock, HybridClock, VirtualClock, JitterHistogram
+from .keymap import DEFAULT_KEYMAP, KeyTable, KeymapError, midi_to_note_name
+from .compiler import CompiledTrack, compile_track, compile_midi, load_midi
+from .backends import PyAutoGuiBackend, RecordingBackend
+from .player import PlaybackControl, PlaybackStats, play_compiled
+from .live import LivePassthrough, list_input_ports
+from .ensemble import Conductor, Follower, conduct, follow
+
+__all__ = [
+    'MonotonicClock',
+    'HybridClock',
+    'VirtualClock',
+    'JitterHistogram',
+    'DEFAULT_KEYMAP',
+    'KeyTable',
+    'KeymapError',
+    'CompiledTrack',
+    'compile_track',
+    'compile_midi',
+    'load_midi',
+    'midi_to_note_name',
+    'PyAutoGuiBackend',
+    'RecordingBackend',
+    'PlaybackControl',
+    'PlaybackStats',
+    'play_compiled',
+    'LivePassthrough',
+    'list_input_ports',
+    'Conductor',
+    'Follower',
+    'conduct',
+    'follow',
+]
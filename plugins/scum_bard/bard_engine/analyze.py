@@ -0,0 +1,220 @@
+"""
+Library-wide playability analysis.
+
+Compiles every track of every MIDI file in a directory across a process
+pool and estimates how well it will come out in game: how many notes have
+no key, how many octave shifts it needs, how its busiest second compares
+with what the key backend can sustain, and how late notes will land. Late
+notes are measured by dispatching the schedule against a virtual clock
+whose backend charges a fixed cost per key action.
+
+Run from the plugin directory::
+
+    python -m bard_engine.analyze ~/midi -o report.csv --sort p99_late_ms
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .compiler import ACTION_KEY_DOWN, compile_midi, load_midi
+from .thinning import peak_rate
+from .keymap import DEFAULT_KEYMAP, KeyTable, KeymapError
+from .timing import VirtualClock
+from .backends import RecordingBackend
+from .player import play_compiled
+
+# Seconds one key action is assumed to take in the real backend
+DEFAULT_PRESS_COST = 0.002
+
+# Rating thresholds
+FAIR_UNMAPPED_RATIO = 0.0
+POOR_UNMAPPED_RATIO = 0.1
+FAIR_P99_LATE_MS = 10.0
+POOR_P99_LATE_MS = 50.0
+
+MIDI_EXTENSIONS = ('.mid', '.midi')
+
+REPORT_COLUMNS = [
+    'file', 'track', 'rating', 'notes', 'unmapped_notes', 'unmapped_ratio',
+    'octave_shifts', 'peak_notes_per_s', 'peak_actions_per_s', 'backend_actions_per_s',
+    'p99_late_ms', 'max_late_ms', 'drift_ms', 'duration_s',
+]
+
+
+def find_midi_files(directory):
+    """Every MIDI file below ``directory``, sorted"""
+    found = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(MIDI_EXTENSIONS):
+                found.append(os.path.join(root, name))
+    return sorted(found)
+
+
+def rate_track(unmapped_ratio, p99_late_ms, peak_actions_per_s, backend_actions_per_s):
+    """Classify a track as good, fair or poor"""
+    if (unmapped_ratio > POOR_UNMAPPED_RATIO or p99_late_ms > POOR_P99_LATE_MS
+            or peak_actions_per_s > backend_actions_per_s):
+        return 'poor'
+    if unmapped_ratio > FAIR_UNMAPPED_RATIO or p99_late_ms > FAIR_P99_LATE_MS:
+        return 'fair'
+    return 'good'
+
+
+def analyze_track(midi, track_index, keymap, press_cost=DEFAULT_PRESS_COST):
+    """
+    Playability figures for one MIDI track
+
+    :param midi: mido MidiFile
+    :param track_index: Track to analyze
+    :param keymap: KeyTable, or a dict mapping note names to keys
+    :param press_cost: Seconds each key action takes in the backend
+    :return: Dict of report columns (without file and track), or None if
+             the track has no notes
+    """
+    compiled = compile_midi(midi, track_index, keymap)
+    if not compiled.note_count:
+        return None
+
+    note_times = [event.time for event in compiled.events if event.action == ACTION_KEY_DOWN]
+    action_times = [event.time for event in compiled.events]
+
+    clock = VirtualClock()
+    stats = play_compiled(compiled, RecordingBackend(clock, press_cost=press_cost), clock,
+                          logger=logging.getLogger(__name__))
+    jitter = stats.jitter.summary()
+
+    unmapped_ratio = compiled.unmapped_count / compiled.note_count
+    peak_actions = peak_rate(action_times)
+    backend_rate = 1.0 / press_cost if press_cost else float('inf')
+    p99_late_ms = jitter['p99_us'] / 1000
+
+    return {
+        'rating': rate_track(unmapped_ratio, p99_late_ms, peak_actions, backend_rate),
+        'notes': compiled.note_count,
+        'unmapped_notes': compiled.unmapped_count,
+        'unmapped_ratio': round(unmapped_ratio, 4),
+        'octave_shifts': compiled.octave_shifts,
+        'peak_notes_per_s': peak_rate(note_times),
+        'peak_actions_per_s': peak_actions,
+        'backend_actions_per_s': round(backend_rate, 1),
+        'p99_late_ms': round(p99_late_ms, 3),
+        'max_late_ms': round(jitter['max_us'] / 1000, 3),
+        'drift_ms': round(stats.drift * 1000, 3),
+        'duration_s': round(compiled.duration, 3),
+    }
+
+
+def analyze_file(path, keymap=None, press_cost=DEFAULT_PRESS_COST):
+    """
+    Analyze every track of one MIDI file (runs in a worker process)
+
+    :return: List of report rows; a single row with an ``error`` on failure
+    """
+    key_table = KeyTable(keymap or DEFAULT_KEYMAP)
+    try:
+        midi = load_midi(path)
+    except Exception as e:
+        return [{'file': path, 'track': None, 'rating': 'error', 'error': f"{type(e).__name__}: {e}"}]
+
+    rows = []
+    for index in range(len(midi.tracks)):
+        try:
+            result = analyze_track(midi, index, key_table, press_cost)
+        except Exception as e:
+            result = {'rating': 'error', 'error': f"{type(e).__name__}: {e}"}
+        if result is not None:
+            rows.append({'file': path, 'track': index, **result})
+    return rows
+
+
+def analyze_library(paths, keymap=None, press_cost=DEFAULT_PRESS_COST, jobs=None, progress=None):
+    """
+    Analyze many files in parallel
+
+    :param paths: MIDI file paths
+    :param jobs: Worker processes (default: one per core)
+    :param progress: Optional callable(done, total, path) after each file
+    :return: List of report rows for every track with notes
+    """
+    rows = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(analyze_file, path, keymap, press_cost): path for path in paths}
+        for done, future in enumerate(as_completed(futures), 1):
+            rows.extend(future.result())
+            if progress:
+                progress(done, len(futures), futures[future])
+    return rows
+
+
+def sort_rows(rows, column, descending=False):
+    """Sort report rows by a column; rows missing it go last"""
+    present = [row for row in rows if row.get(column) is not None]
+    missing = [row for row in rows if row.get(column) is None]
+    return sorted(present, key=lambda row: row[column], reverse=descending) + missing
+
+
+def write_report(rows, output, fmt):
+    if fmt == 'json':
+        json.dump(rows, output, indent=2)
+        output.write('\n')
+        return
+
+    writer = csv.DictWriter(output, fieldnames=REPORT_COLUMNS + ['error'], extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rate how playable a MIDI library is in game")
+    parser.add_argument('directory', help='Directory to scan for MIDI files')
+    parser.add_argument('-k', '--keymap', help='Custom keymap JSON file')
+    parser.add_argument('-j', '--jobs', type=int, help='Worker processes (default: one per core)')
+    parser.add_argument('--press-cost-ms', type=float, default=DEFAULT_PRESS_COST * 1000,
+                        help='Milliseconds each key action takes in the backend')
+    parser.add_argument('--sort', default='file', choices=REPORT_COLUMNS, help='Column to sort by')
+    parser.add_argument('--descending', action='store_true', help='Sort in descending order')
+    parser.add_argument('--format', choices=['csv', 'json'],
+                        help='Report format (default: from the output extension, else csv)')
+    parser.add_argument('-o', '--output', help='Write the report here instead of stdout')
+    args = parser.parse_args()
+
+    keymap = None
+    if args.keymap:
+        with open(args.keymap, 'r') as f:
+            keymap = json.load(f)
+        try:
+            KeyTable(keymap)
+        except KeymapError as e:
+            parser.error(str(e))
+
+    paths = find_midi_files(args.directory)
+    if not paths:
+        parser.error(f"No MIDI files found in {args.directory}")
+
+    def progress(done, total, path):
+        print(f"[{done}/{total}] {os.path.basename(path)}", file=sys.stderr)
+
+    started = time.perf_counter()
+    rows = analyze_library(paths, keymap, args.press_cost_ms / 1000, args.jobs, progress)
+    rows = sort_rows(rows, args.sort, args.descending)
+    elapsed = time.perf_counter() - started
+    print(f"Analyzed {len(paths)} files ({len(rows)} tracks) in {elapsed:.2f}s", file=sys.stderr)
+
+    fmt = args.format or ('json' if args.output and args.output.endswith('.json') else 'csv')
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            write_report(rows, f, fmt)
+    else:
+        write_report(rows, sys.stdout, fmt)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Key injection backends.
+
+A backend receives key actions from the dispatcher through ``press``,
+``key_down`` and ``key_up``. ``PyAutoGuiBackend`` drives the game;
+``RecordingBackend`` captures a timeline for benchmarks.
+"""
+
+
+class PyAutoGuiBackend:
+    """Inject keys with pyautogui (imported lazily)"""
+
+    def __init__(self):
+        import pyautogui
+
+        # pyautogui sleeps 0.1 s after every call by default; the dispatcher
+        # owns timing, so that pause would only make every note late
+        pyautogui.PAUSE = 0
+        self._pyautogui = pyautogui
+
+    def press(self, key):
+        self._pyautogui.press(key)
+
+    def key_down(self, key):
+        self._pyautogui.keyDown(key)
+
+    def key_up(self, key):
+        self._pyautogui.keyUp(key)
+
+
+class RecordingBackend:
+    """
+    Record key actions against a clock instead of injecting them
+
+    :param clock: Clock used to timestamp actions
+    :param press_cost: Seconds charged to a VirtualClock per action, to model
+                       the throughput of a real backend
+    """
+
+    def __init__(self, clock, press_cost=0.0):
+        self.clock = clock
+        self.press_cost = press_cost
+        self.timeline = []
+
+    def _record(self, action, key):
+        self.timeline.append((self.clock.now(), action, key))
+        if self.press_cost and hasattr(self.clock, 'advance'):
+            self.clock.advance(self.press_cost)
+
+    def press(self, key):
+        self._record('press', key)
+
+    def key_down(self, key):
+        self._record('down', key)
+
+    def key_up(self, key):
+        self._record('up', key)
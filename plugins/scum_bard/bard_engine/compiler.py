@@ -0,0 +1,450 @@
+"""
+Compile a MIDI track into a flat, time-stamped playback schedule.
+
+Parsing and note-to-key mapping happen once, up front; the dispatcher then
+only walks a list of ``(time, action, key, note)`` tuples. Notes become
+explicit key-down/key-up pairs so held notes sound for their full length.
+Times are real seconds from the file's tempo map; playback speed is applied
+by the dispatcher, not baked into the schedule.
+"""
+
+import time
+import heapq
+import bisect
+from collections import namedtuple, Counter
+
+from .keymap import MIDI_NOTE_COUNT, OCTAVE_UP_KEY, OCTAVE_DOWN_KEY, KeyTable, note_octave
+from .thinning import thin_notes
+
+# MIDI defaults when a file has no tempo or resolution information
+DEFAULT_TEMPO = 500000  # microseconds per beat (120 bpm)
+DEFAULT_TICKS_PER_BEAT = 480
+
+# Octave the character starts from when a track has no notes
+DEFAULT_OCTAVE = 3
+
+# Schedule actions
+ACTION_KEY_DOWN = 0
+ACTION_KEY_UP = 1
+ACTION_OCTAVE_UP = 2
+ACTION_OCTAVE_DOWN = 3
+
+ScheduleEvent = namedtuple('ScheduleEvent', ['time', 'action', 'key', 'note'])
+
+# Events between seek checkpoints
+CHECKPOINT_INTERVAL = 64
+
+# Octave state in effect just before ``events[index]``, which plays at ``time``
+Checkpoint = namedtuple('Checkpoint', ['time', 'index', 'octave'])
+
+
+class CompiledTrack:
+    """
+    Playback schedule for one MIDI track
+
+    :ivar events: ScheduleEvent tuples sorted by time (seconds from start)
+    :ivar keys: Every note key the schedule may hold down
+    :ivar duration: Time of the last message in seconds
+    :ivar note_count: Number of note_on events in the track
+    :ivar unmapped_count: Notes with no key in the keymap
+    :ivar octave_shifts: Octave modifier presses in the schedule
+    :ivar first_octave: Octave the schedule assumes the character starts in
+    :ivar compile_seconds: Wall time spent compiling
+    :ivar checkpoints: Seek index; see build_checkpoints()
+    :ivar notes: Source notes as [start, end, note], kept so the track can be
+                 transposed without touching the MIDI file again
+    :ivar key_table: KeyTable the schedule was compiled with
+    :ivar octave_management: Whether the schedule contains octave shifts
+    :ivar transpose: Semitones the notes were shifted by
+    :ivar thinning: ThinningReport if the notes were thinned, else None
+    :ivar skyline: SkylineReport if the notes were reduced to one voice, else None
+    """
+
+    def __init__(self, events, keys, duration, note_count, unmapped_count, octave_shifts,
+                 first_octave, compile_seconds, checkpoints=None, notes=None, key_table=None,
+                 octave_management=True, transpose=0):
+        self.events = events
+        self.keys = keys
+        self.duration = duration
+        self.note_count = note_count
+        self.unmapped_count = unmapped_count
+        self.octave_shifts = octave_shifts
+        self.first_octave = first_octave
+        self.compile_seconds = compile_seconds
+        self.checkpoints = checkpoints if checkpoints is not None else build_checkpoints(events, first_octave)
+        self.notes = notes
+        self.key_table = key_table
+        self.octave_management = octave_management
+        self.transpose = transpose
+        self.thinning = None
+        self.skyline = None
+        self._transposed = {transpose: self}
+
+    def __len__(self):
+        return len(self.events)
+
+    def transposed(self, semitones):
+        """
+        The same track shifted by ``semitones`` relative to the source notes
+
+        Rebuilt from the stored notes and cached, so switching back and forth
+        during playback never re-parses the MIDI file.
+
+        :return: CompiledTrack
+        """
+        if semitones not in self._transposed:
+            if self.notes is None:
+                raise ValueError("Track was compiled without its notes and cannot be transposed")
+            compiled = schedule_notes(self.notes, self.duration, self.key_table,
+                                      self.octave_management, transpose=semitones)
+            # Share one cache between every transposition of the track
+            compiled._transposed = self._transposed
+            compiled.thinning = self.thinning
+            compiled.skyline = self.skyline
+            self._transposed[semitones] = compiled
+        return self._transposed[semitones]
+
+
+def build_checkpoints(events, first_octave, interval=CHECKPOINT_INTERVAL):
+    """
+    Record the octave state every ``interval`` events
+
+    The instrument octave at any point depends on every shift before it;
+    checkpoints let seek() recover it without replaying from the start.
+
+    :param events: Sequence of ScheduleEvent
+    :param first_octave: Octave before the first event
+    :return: List of Checkpoint sorted by time and index
+    """
+    checkpoints = []
+    octave = first_octave
+    for index, event in enumerate(events):
+        if index % interval == 0:
+            checkpoints.append(Checkpoint(event.time, index, octave))
+        if event.action == ACTION_OCTAVE_UP:
+            octave += 1
+        elif event.action == ACTION_OCTAVE_DOWN:
+            octave -= 1
+    return checkpoints
+
+
+def seek(compiled, position):
+    """
+    Find where playback resumes at ``position`` seconds into a schedule
+
+    Binary-searches the checkpoints, then scans at most one checkpoint
+    interval of events, applying the octave shifts it skips over.
+
+    :param compiled: CompiledTrack (or anything with ``events``,
+                     ``checkpoints`` and ``first_octave``)
+    :return: (index of the first event at or after ``position``,
+              octave the instrument must be in before that event)
+    """
+    if position <= 0:
+        return 0, compiled.first_octave
+
+    checkpoints = compiled.checkpoints
+    # Last checkpoint strictly before position; (position,) sorts before
+    # any checkpoint at exactly that time
+    found = bisect.bisect_left(checkpoints, (position,))
+    if found:
+        _, index, octave = checkpoints[found - 1]
+    else:
+        index, octave = 0, compiled.first_octave
+
+    events = compiled.events
+    event_count = len(events)
+    while index < event_count:
+        event = events[index]
+        if event.time >= position:
+            break
+        if event.action == ACTION_OCTAVE_UP:
+            octave += 1
+        elif event.action == ACTION_OCTAVE_DOWN:
+            octave -= 1
+        index += 1
+
+    return index, octave
+
+
+def load_midi(midi_file):
+    """Parse a MIDI file with mido (imported lazily)"""
+    import mido
+    return mido.MidiFile(midi_file)
+
+
+def octave_shift(current_octave, target_octave):
+    """
+    Plan the modifier presses that move the instrument between octaves
+
+    :return: (action, key, count); count is 0 if no shift is needed
+    """
+    if target_octave > current_octave:
+        return ACTION_OCTAVE_UP, OCTAVE_UP_KEY, target_octave - current_octave
+    if target_octave < current_octave:
+        return ACTION_OCTAVE_DOWN, OCTAVE_DOWN_KEY, current_octave - target_octave
+    return None, None, 0
+
+
+# Every shift between two playable octaves, planned once: (current, target) -> (action, key, count)
+_OCTAVES = range(note_octave(0), note_octave(MIDI_NOTE_COUNT - 1) + 1)
+_SHIFT_PLAN = {(current, target): octave_shift(current, target) for current in _OCTAVES for target in _OCTAVES}
+
+
+def get_first_octave(track):
+    """
+    Determine the lowest octave played in the track
+
+    :param track: Iterable of mido messages
+    :return: Lowest octave, or DEFAULT_OCTAVE if the track has no notes
+    """
+    octaves = [note_octave(msg.note) for msg in track
+               if msg.type == 'note_on' and msg.velocity > 0]
+    return min(octaves) if octaves else DEFAULT_OCTAVE
+
+
+def busiest_track(midi):
+    """Index of the track with the most notes (0 for a file without notes)"""
+    counts = [sum(1 for msg in track if msg.type == 'note_on' and msg.velocity > 0)
+              for track in midi.tracks]
+    return max(range(len(counts)), key=counts.__getitem__) if counts else 0
+
+
+def build_tempo_map(midi):
+    """
+    Collect tempo changes from every track of a MIDI file
+
+    Type 1 files keep tempo changes in the first track but they apply to
+    all of them, so the changes are merged by absolute tick.
+
+    :param midi: mido MidiFile
+    :return: List of (tick, microseconds per beat) sorted by tick, starting at tick 0
+    """
+    changes = {}
+    for track in midi.tracks:
+        tick = 0
+        for msg in track:
+            tick += msg.time
+            if msg.type == 'set_tempo':
+                changes[tick] = msg.tempo
+    changes.setdefault(0, DEFAULT_TEMPO)
+    return sorted(changes.items())
+
+
+class TickConverter:
+    """
+    Convert absolute ticks to seconds through a tempo map
+
+    Conversions must be asked for in non-decreasing tick order, which is how
+    a track is walked; each call is then amortised O(1).
+    """
+
+    def __init__(self, tempo_map=None, ticks_per_beat=DEFAULT_TICKS_PER_BEAT):
+        self.ticks_per_beat = ticks_per_beat
+        self.tempo_map = tempo_map or [(0, DEFAULT_TEMPO)]
+        self._segment = 0
+        self._segment_tick = 0
+        self._segment_seconds = 0.0
+        self._seconds_per_tick = self.tempo_map[0][1] / 1e6 / ticks_per_beat
+
+    def seconds(self, tick):
+        tempo_map = self.tempo_map
+        while self._segment + 1 < len(tempo_map) and tempo_map[self._segment + 1][0] <= tick:
+            next_tick, tempo = tempo_map[self._segment + 1]
+            self._segment_seconds += (next_tick - self._segment_tick) * self._seconds_per_tick
+            self._segment_tick = next_tick
+            self._seconds_per_tick = tempo / 1e6 / self.ticks_per_beat
+            self._segment += 1
+        return self._segment_seconds + (tick - self._segment_tick) * self._seconds_per_tick
+
+
+def collect_notes(track, ticks_per_beat=DEFAULT_TICKS_PER_BEAT, tempo_map=None):
+    """
+    Pair note_on with note_off messages (or velocity-0 note_ons)
+
+    Overlapping notes of the same pitch are paired first-in, first-out.
+    Notes still sounding at the end of the track end with it.
+
+    :param track: mido track
+    :param ticks_per_beat: Resolution of the file
+    :param tempo_map: List of (tick, microseconds per beat); see build_tempo_map()
+    :return: (list of [start, end, note] in seconds sorted by start, track duration)
+    """
+    converter = TickConverter(tempo_map, ticks_per_beat)
+    notes = []
+    sounding = {}
+    tick = 0
+    now = 0.0
+
+    for msg in track:
+        if msg.time:
+            tick += msg.time
+            now = converter.seconds(tick)
+
+        if msg.type == 'note_on' and msg.velocity > 0:
+            sounding.setdefault(msg.note, []).append(len(notes))
+            notes.append([now, None, msg.note])
+        elif msg.type == 'note_off' or msg.type == 'note_on':
+            started = sounding.get(msg.note)
+            if started:
+                notes[started.pop(0)][1] = now
+
+    for entry in notes:
+        if entry[1] is None:
+            entry[1] = now
+
+    return notes, now
+
+
+def compile_track(track, keymap, octave_management=True, ticks_per_beat=DEFAULT_TICKS_PER_BEAT,
+                  tempo_map=None, transpose=0, max_rate=None, skyline_mode=None, speed=1.0):
+    """
+    Compile a MIDI track into a playback schedule
+
+    :param track: mido track (iterable of messages with delta times in ticks)
+    :param keymap: KeyTable, or a dict mapping note names to keys
+    :param octave_management: Insert octave shift presses
+    :param ticks_per_beat: Resolution of the file the track belongs to
+    :param tempo_map: List of (tick, microseconds per beat); default 120 bpm
+    :param transpose: Semitones to shift every note by
+    :param max_rate: Key actions per second the backend can sustain; when
+                     given, dense passages are thinned to fit (see thin_notes())
+    :param skyline_mode: Reduce the track to one voice first ('highest' or
+                         'salient', see skyline()); requires numpy
+    :param speed: Playback speed the thinning budget applies at; timing is
+                  otherwise independent of speed
+    :return: CompiledTrack
+    :raises KeymapError: If a keymap dict fails validation
+    """
+    started = time.perf_counter()
+    notes, duration = collect_notes(track, ticks_per_beat, tempo_map)
+    skyline_report = None
+    if skyline_mode:
+        from .skyline import reduce_notes
+        notes, skyline_report = reduce_notes(notes, skyline_mode)
+    key_table = KeyTable.from_keymap(keymap)
+    thinning_report = None
+    if max_rate:
+        octaves = None
+        if octave_management:
+            # Unmapped notes are skipped by schedule_notes() and cost no shifts
+            octaves = [octave if key is not None else None
+                       for octave, key in zip(key_table.octaves, key_table.keys)]
+        notes, thinning_report = thin_notes(notes, max_rate, speed=speed, transpose=transpose,
+                                            octaves=octaves)
+    compiled = schedule_notes(notes, duration, key_table, octave_management, transpose)
+    compiled.skyline = skyline_report
+    compiled.thinning = thinning_report
+    compiled.compile_seconds = time.perf_counter() - started
+    return compiled
+
+
+def compile_midi(midi, track_index, keymap, octave_management=True, transpose=0, max_rate=None,
+                 skyline_mode=None, speed=1.0):
+    """
+    Compile one track of a parsed MIDI file using the file's tempo map
+
+    :param midi: mido MidiFile
+    :param track_index: Track to compile
+    :return: CompiledTrack
+    """
+    return compile_track(midi.tracks[track_index], keymap, octave_management,
+                         ticks_per_beat=midi.ticks_per_beat, tempo_map=build_tempo_map(midi),
+                         transpose=transpose, max_rate=max_rate, skyline_mode=skyline_mode,
+                         speed=speed)
+
+
+def schedule_notes(notes, duration, key_table, octave_management=True, transpose=0):
+    """
+    Turn timed notes into a playback schedule
+
+    Key-downs are emitted in note order while a min-heap of pending key-ups,
+    ordered by release time, is drained in between, producing one merged
+    timeline. Overlapping holds of the same key are reference counted: a
+    new note re-articulates the key (up then down) and only the last hold
+    to end releases it.
+
+    :param notes: List of [start, end, note] sorted by start; see collect_notes()
+    :param duration: Track duration in seconds
+    :param key_table: KeyTable
+    :param octave_management: Insert octave shift presses
+    :param transpose: Semitones to shift every note by; notes pushed outside
+                      the MIDI range count as unmapped
+    :return: CompiledTrack
+    """
+    started = time.perf_counter()
+    note_keys = key_table.keys
+    note_octaves = key_table.octaves
+    note_range = range(len(note_keys))
+    shift_plan = _SHIFT_PLAN
+
+    events = []
+    unmapped_count = 0
+    octave_shifts = 0
+
+    if octave_management:
+        octaves = [note_octaves[note + transpose] for _, _, note in notes
+                   if note + transpose in note_range and note_keys[note + transpose] is not None]
+        first_octave = min(octaves) if octaves else DEFAULT_OCTAVE
+    else:
+        first_octave = DEFAULT_OCTAVE
+    current_octave = first_octave
+
+    # Pending releases as (end, sequence, key, note); sequence keeps ties stable
+    releases = []
+    held = Counter()
+
+    def release_until(limit):
+        while releases and releases[0][0] <= limit:
+            end, _, key, note = heapq.heappop(releases)
+            held[key] -= 1
+            if not held[key]:
+                events.append(ScheduleEvent(end, ACTION_KEY_UP, key, note))
+
+    for sequence, (start, end, note) in enumerate(notes):
+        # Releases at or before this note come first on the timeline
+        release_until(start)
+
+        note += transpose
+        if note not in note_range:
+            unmapped_count += 1
+            continue
+
+        key = note_keys[note]
+        if key is None:
+            # Not played, so never worth an octave shift
+            unmapped_count += 1
+            continue
+
+        if octave_management:
+            target_octave = note_octaves[note]
+            if target_octave != current_octave:
+                action, shift_key, count = shift_plan[current_octave, target_octave]
+                events.extend([ScheduleEvent(start, action, shift_key, note)] * count)
+                octave_shifts += count
+                current_octave = target_octave
+
+        if held[key]:
+            # Key is still held by an earlier note; strike it again
+            events.append(ScheduleEvent(start, ACTION_KEY_UP, key, note))
+        events.append(ScheduleEvent(start, ACTION_KEY_DOWN, key, note))
+
+        held[key] += 1
+        heapq.heappush(releases, (end, sequence, key, note))
+
+    release_until(float('inf'))
+
+    return CompiledTrack(
+        events=events,
+        keys=set(held),
+        duration=duration,
+        note_count=len(notes),
+        unmapped_count=unmapped_count,
+        octave_shifts=octave_shifts,
+        first_octave=first_octave,
+        compile_seconds=time.perf_counter() - started,
+        notes=notes,
+        key_table=key_table,
+        octave_management=octave_management,
+        transpose=transpose,
+    )
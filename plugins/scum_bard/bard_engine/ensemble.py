@@ -0,0 +1,477 @@
+"""
+Synchronized ensemble playback across several Scum Bard instances.
+
+One instance conducts: it answers clock-sync probes, collects followers and
+broadcasts a start time and playback speed. Followers estimate their clock offset to
+the conductor NTP-style, convert the start time to their own clock and play
+their compiled track against it. Every participant reports when its first
+note actually went out, from which the conductor estimates inter-instance
+skew.
+
+The conductor listens on the loopback interface unless it is given a LAN
+address (or ``LAN_HOST``) explicitly; there is no authentication, so only
+open it on a network you trust. Malformed datagrams are dropped.
+
+The protocol is JSON over UDP datagrams:
+
+- ``sync``  {t0}             -> ``sync_reply`` {t0, t1, t2}
+- ``join``  {name, track}    -> ``joined``
+- ``start`` {start_at, speed} (conductor -> followers)
+- ``started`` {name, first_note_at, first_event_time, offset, rtt}
+  (followers -> conductor; times on the conductor clock)
+
+Timestamps are ``time.perf_counter()`` values of the sender's process.
+"""
+
+import json
+import time
+import socket
+import logging
+import threading
+
+from .player import MIN_SPEED, MAX_SPEED
+
+DEFAULT_PORT = 47622
+
+# Interface the conductor binds by default: this machine only
+DEFAULT_HOST = '127.0.0.1'
+
+# Bind address that lets followers on other machines join
+LAN_HOST = '0.0.0.0'
+
+# Seconds between the start broadcast and the first beat
+DEFAULT_START_DELAY = 2.0
+
+# Clock-sync probes per follower; the lowest-delay probe wins
+SYNC_SAMPLES = 16
+
+# Seconds to wait for each clock-sync reply
+SYNC_PROBE_TIMEOUT = 0.2
+
+# Seconds a follower keeps trying to reach a conductor that is not up yet
+CONNECT_TIMEOUT = 30.0
+
+MAX_DATAGRAM = 4096
+
+_NUMBER = (int, float)
+
+# Required fields of each message type, with their types
+MESSAGE_FIELDS = {
+    'sync': {'t0': _NUMBER},
+    'sync_reply': {'t0': _NUMBER, 't1': _NUMBER, 't2': _NUMBER},
+    'join': {'name': str},
+    'joined': {},
+    'start': {'start_at': _NUMBER},
+    'started': {'name': str},
+}
+
+# Optional fields, which may also be null
+OPTIONAL_FIELDS = {
+    'start': {'speed': _NUMBER},
+    'started': {'first_note_at': _NUMBER, 'first_event_time': _NUMBER,
+                'offset': _NUMBER, 'rtt': _NUMBER},
+}
+
+
+def _send(sock, address, message):
+    sock.sendto(json.dumps(message).encode('utf-8'), address)
+
+
+def validate_message(message):
+    """
+    Check a decoded datagram against the protocol
+
+    :return: The message
+    :raises ValueError: If it is not an object of a known type with the
+                        fields that type needs
+    """
+    if not isinstance(message, dict) or message.get('type') not in MESSAGE_FIELDS:
+        raise ValueError("not an ensemble message")
+    kind = message['type']
+    for field, types in MESSAGE_FIELDS[kind].items():
+        if not isinstance(message.get(field), types):
+            raise ValueError(f"{kind} message without a valid {field}")
+    for field, types in OPTIONAL_FIELDS.get(kind, {}).items():
+        if message.get(field) is not None and not isinstance(message[field], types):
+            raise ValueError(f"{kind} message with an invalid {field}")
+    return message
+
+
+def _receive(sock):
+    """
+    Next datagram as a validated message
+
+    :raises ValueError: For undecodable or malformed datagrams
+    """
+    data, address = sock.recvfrom(MAX_DATAGRAM)
+    return validate_message(json.loads(data)), address
+
+
+def estimate_offset(t0, t1, t2, t3):
+    """
+    NTP offset and round-trip delay from one probe
+
+    :param t0: Client send time (client clock)
+    :param t1: Server receive time (server clock)
+    :param t2: Server send time (server clock)
+    :param t3: Client receive time (client clock)
+    :return: (offset, delay); server_time = client_time + offset
+    """
+    offset = ((t1 - t0) + (t2 - t3)) / 2
+    delay = (t3 - t0) - (t2 - t1)
+    return offset, delay
+
+
+def first_key_down_time(compiled, speed=1.0):
+    """Seconds from the start to the first key-down at ``speed``, or None for an empty schedule"""
+    from .compiler import ACTION_KEY_DOWN
+
+    for event in compiled.events:
+        if event.action == ACTION_KEY_DOWN:
+            return event.time / speed
+    return None
+
+
+class Conductor:
+    """
+    Conductor side of the ensemble protocol
+
+    :param port: UDP port to listen on
+    :param host: Interface to bind; the loopback interface by default, so
+                 followers on other machines need ``LAN_HOST`` or a LAN address
+    """
+
+    def __init__(self, port=DEFAULT_PORT, host=DEFAULT_HOST, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+
+        self.followers = {}
+        self.reports = {}
+        self.start_at = None
+
+        self._joined = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name='EnsembleConductor', daemon=True)
+        self._thread.start()
+        self.logger.info(f"Ensemble conductor listening on UDP {host}:{self.port}")
+
+    def _serve(self):
+        while self._running:
+            try:
+                message, address = _receive(self.sock)
+            except socket.timeout:
+                continue
+            except ValueError as e:
+                self.logger.debug(f"Dropped ensemble datagram: {e}")
+                continue
+            except OSError:
+                if not self._running:
+                    return
+                continue
+
+            received = time.perf_counter()
+            # One bad datagram must never end the session
+            try:
+                self._handle(message, address, received)
+            except Exception as e:
+                self.logger.warning(f"Failed to handle ensemble message from {address}: {e}")
+
+    def _handle(self, message, address, received):
+        kind = message['type']
+
+        if kind == 'sync':
+            _send(self.sock, address, {'type': 'sync_reply', 't0': message['t0'],
+                                       't1': received, 't2': time.perf_counter()})
+        elif kind == 'join':
+            with self._joined:
+                self.followers[message['name']] = address
+                self._joined.notify_all()
+            _send(self.sock, address, {'type': 'joined'})
+            self.logger.info(f"Follower {message['name']} joined for track {message.get('track')}")
+        elif kind == 'started':
+            with self._joined:
+                self.reports[message['name']] = message
+                self._joined.notify_all()
+
+    def wait_for_followers(self, count, timeout=None):
+        """Block until ``count`` followers have joined; returns True on success"""
+        with self._joined:
+            return self._joined.wait_for(lambda: len(self.followers) >= count, timeout)
+
+    def start(self, delay=DEFAULT_START_DELAY, speed=1.0):
+        """
+        Broadcast the shared start time to every follower
+
+        :param delay: Seconds from now until the start
+        :param speed: Playback speed every participant plays at
+        :return: Start time on the conductor clock
+        """
+        self.start_at = time.perf_counter() + delay
+        message = {'type': 'start', 'start_at': self.start_at, 'speed': speed}
+        for address in list(self.followers.values()):
+            _send(self.sock, address, message)
+        self.logger.info(f"Ensemble start broadcast to {len(self.followers)} followers, "
+                         f"starting in {delay:.2f}s")
+        return self.start_at
+
+    def record_local(self, name, stats, compiled, speed=1.0):
+        """Record the conductor's own playback for the skew report"""
+        self.reports[name] = {
+            'name': name,
+            'first_note_at': stats.first_note_at,
+            'first_event_time': first_key_down_time(compiled, speed),
+            'offset': 0.0,
+            'rtt': 0.0,
+        }
+
+    def wait_for_reports(self, count, timeout=None):
+        with self._joined:
+            return self._joined.wait_for(lambda: len(self.reports) >= count, timeout)
+
+    def skew_report(self):
+        """
+        Estimate how far apart the participants' timelines started
+
+        The origin of a participant's timeline is its first note time minus
+        that note's schedule position, on the conductor clock; skew is the
+        spread of those origins.
+
+        This is an estimate, not an independent measurement: followers
+        convert their first note time with their own clock-offset estimate,
+        the same one they started by, so an offset error shifts both and
+        does not show up. Each follower's offset is only known to within
+        half its sync round trip; ``uncertainty_ms`` bounds how far the true
+        skew can be from ``skew_ms`` because of that.
+
+        :return: Dict with per-participant start error, the estimated skew
+                 and its uncertainty (ms)
+        """
+        origins = {}
+        for name, report in self.reports.items():
+            if report.get('first_note_at') is None or report.get('first_event_time') is None:
+                continue
+            origins[name] = report['first_note_at'] - report['first_event_time']
+
+        participants = {
+            name: {
+                'start_error_ms': round((origin - self.start_at) * 1000, 3),
+                'sync_uncertainty_ms': round((self.reports[name].get('rtt') or 0.0) / 2 * 1000, 3),
+            }
+            for name, origin in origins.items()
+        }
+        skew = (max(origins.values()) - min(origins.values())) if origins else 0.0
+        # Two participants' offset errors can add up
+        errors = sorted((self.reports[name].get('rtt') or 0.0) / 2 for name in origins)
+        uncertainty = sum(errors[-2:])
+        return {'participants': participants, 'skew_ms': round(skew * 1000, 3),
+                'uncertainty_ms': round(uncertainty * 1000, 3), 'estimate': True}
+
+    def close(self):
+        self._running = False
+        self._thread.join(timeout=1)
+        self.sock.close()
+
+
+class Follower:
+    """
+    Follower side of the ensemble protocol
+
+    :param host: Conductor host
+    :param port: Conductor UDP port
+    :param name: Unique participant name
+    """
+
+    def __init__(self, host, port=DEFAULT_PORT, name=None, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.address = (socket.gethostbyname(host), port)
+        self.name = name or f"{socket.gethostname()}-{id(self):x}"
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.settimeout(1.0)
+
+        self.offset = 0.0
+        self.rtt = 0.0
+        self._pending_start = None
+
+    def synchronize(self, samples=SYNC_SAMPLES):
+        """
+        Estimate the offset to the conductor clock
+
+        Uses the probe with the smallest round-trip delay, which has the
+        least room for asymmetric network delay.
+
+        :return: (offset, rtt) in seconds
+        """
+        best = None
+        self.sock.settimeout(SYNC_PROBE_TIMEOUT)
+        for _ in range(samples):
+            t0 = time.perf_counter()
+            _send(self.sock, self.address, {'type': 'sync', 't0': t0})
+            try:
+                reply, _ = _receive(self.sock)
+            except (socket.timeout, ValueError):
+                continue
+            t3 = time.perf_counter()
+            if reply.get('type') != 'sync_reply' or reply.get('t0') != t0:
+                continue
+
+            offset, delay = estimate_offset(t0, reply['t1'], reply['t2'], t3)
+            if best is None or delay < best[1]:
+                best = (offset, delay)
+
+        self.sock.settimeout(1.0)
+        if best is None:
+            raise ConnectionError(f"No clock-sync reply from conductor at {self.address}")
+
+        self.offset, self.rtt = best
+        self.logger.info(f"Clock offset to conductor {self.offset * 1000:.3f} ms "
+                         f"(rtt {self.rtt * 1000:.3f} ms)")
+        return best
+
+    def join(self, track=0, attempts=5):
+        """
+        Register with the conductor, retrying lost datagrams
+
+        Late clock-sync replies are skipped. A start broadcast that overtakes
+        the join acknowledgement counts as joined and is kept for
+        wait_for_start().
+        """
+        for _ in range(attempts):
+            _send(self.sock, self.address, {'type': 'join', 'name': self.name, 'track': track})
+            try:
+                while True:
+                    try:
+                        reply, _ = _receive(self.sock)
+                    except ValueError:
+                        continue
+                    if reply.get('type') == 'joined':
+                        return
+                    if reply.get('type') == 'start':
+                        self._pending_start = reply
+                        return
+            except socket.timeout:
+                continue
+        raise ConnectionError(f"Conductor at {self.address} did not acknowledge join")
+
+    def wait_for_start(self, timeout=None):
+        """
+        Wait for the start broadcast
+
+        A start whose speed is outside MIN_SPEED..MAX_SPEED is ignored.
+
+        :return: (start time on the local clock, playback speed)
+        """
+        message, self._pending_start = self._pending_start, None
+        self.sock.settimeout(timeout)
+        while True:
+            if message is not None:
+                speed = message.get('speed')
+                speed = 1.0 if speed is None else speed
+                if MIN_SPEED <= speed <= MAX_SPEED:
+                    break
+                self.logger.warning(f"Ignored ensemble start with speed {speed!r}; "
+                                    f"expected {MIN_SPEED} to {MAX_SPEED}")
+                message = None
+            try:
+                received, _ = _receive(self.sock)
+            except ValueError:
+                continue
+            if received.get('type') == 'start':
+                message = received
+        self.sock.settimeout(1.0)
+
+        local_start = message['start_at'] - self.offset
+        return local_start, speed
+
+    def report(self, stats, compiled, speed=1.0):
+        """Send this follower's first-note time (conductor clock) to the conductor"""
+        first_note_at = stats.first_note_at + self.offset if stats.first_note_at is not None else None
+        _send(self.sock, self.address, {
+            'type': 'started',
+            'name': self.name,
+            'first_note_at': first_note_at,
+            'first_event_time': first_key_down_time(compiled, speed),
+            'offset': self.offset,
+            'rtt': self.rtt,
+        })
+
+    def close(self):
+        self.sock.close()
+
+
+def conduct(compile_fn, backend, clock, followers, port=DEFAULT_PORT,
+            delay=DEFAULT_START_DELAY, speed=1.0, name='conductor',
+            join_timeout=60.0, report_timeout=10.0, host=DEFAULT_HOST, logger=None):
+    """
+    Run a whole ensemble performance as the conductor
+
+    :param compile_fn: Callable returning the CompiledTrack to play
+    :param backend: Key backend
+    :param clock: Clock whose ``now()`` is time.perf_counter
+    :param followers: Number of followers to wait for
+    :param speed: Playback speed shared by every participant
+    :param host: Interface to listen on (``LAN_HOST`` for followers on other machines)
+    :return: (PlaybackStats, skew report dict)
+    """
+    from .player import play_compiled, PlaybackControl
+
+    logger = logger or logging.getLogger(__name__)
+    conductor = Conductor(port, host, logger=logger)
+    try:
+        compiled = compile_fn()
+        if not conductor.wait_for_followers(followers, join_timeout):
+            raise TimeoutError(f"Only {len(conductor.followers)} of {followers} followers joined")
+
+        start_at = conductor.start(delay, speed)
+        stats = play_compiled(compiled, backend, clock, logger=logger, start_time=start_at,
+                              control=PlaybackControl(speed=speed) if speed != 1.0 else None)
+        conductor.record_local(name, stats, compiled, speed)
+
+        conductor.wait_for_reports(followers + 1, report_timeout)
+        report = conductor.skew_report()
+        logger.info(f"Estimated ensemble skew across {len(report['participants'])} instances: "
+                    f"{report['skew_ms']:.3f} ms (clock-sync uncertainty {report['uncertainty_ms']:.3f} ms)")
+        return stats, report
+    finally:
+        conductor.close()
+
+
+def follow(compile_fn, backend, clock, host, port=DEFAULT_PORT, name=None, track=0,
+           connect_timeout=CONNECT_TIMEOUT, start_timeout=None, logger=None):
+    """
+    Run a whole ensemble performance as a follower
+
+    :param compile_fn: Callable returning the CompiledTrack to play
+    :param backend: Key backend
+    :param clock: Clock whose ``now()`` is time.perf_counter
+    :param host: Conductor host
+    :param track: Track this follower plays (reported to the conductor)
+    :return: PlaybackStats
+    """
+    from .player import play_compiled, PlaybackControl
+
+    logger = logger or logging.getLogger(__name__)
+    follower = Follower(host, port, name, logger=logger)
+    try:
+        # Compile before joining so the start delay never has to cover it
+        compiled = compile_fn()
+
+        give_up_at = time.monotonic() + connect_timeout
+        while True:
+            try:
+                follower.synchronize()
+                break
+            except ConnectionError:
+                if time.monotonic() >= give_up_at:
+                    raise
+        follower.join(track)
+        local_start, speed = follower.wait_for_start(start_timeout)
+
+        stats = play_compiled(compiled, backend, clock, logger=logger, start_time=local_start,
+                              control=PlaybackControl(speed=speed) if speed != 1.0 else None)
+        follower.report(stats, compiled, speed)
+        return stats
+    finally:
+        follower.close()
@@ -0,0 +1,105 @@
+"""
+Note-to-key mapping.
+
+A keymap maps note names (``c``, ``c#``, ... ``b`` and ``c_high`` for any C
+above octave 3) to game keys. ``KeyTable`` compiles it once into flat
+128-entry lists indexed by MIDI note number, so resolving a note while
+compiling or passing through live input is a single index operation, and
+a broken keymap is rejected before anything plays.
+"""
+
+NOTE_NAMES = ['c', 'c#', 'd', 'd#', 'e', 'f', 'f#', 'g', 'g#', 'a', 'a#', 'b']
+
+# Name used for every C above octave 3
+HIGH_C = 'c_high'
+
+# Highest octave whose C is still a plain "c"
+HIGH_C_OCTAVE = 3
+
+# Keys the game uses to shift the instrument octave
+OCTAVE_UP_KEY = 'shift'
+OCTAVE_DOWN_KEY = 'ctrl'
+
+# Default keymap: note name -> game key
+DEFAULT_KEYMAP = {
+    "c": "z",    # Low C
+    "c#": "5",   # C#
+    "d": "u",    # D
+    "d#": "6",   # D#
+    "e": "i",    # E
+    "f": "o",    # F
+    "f#": "7",   # F#
+    "g": "h",    # G
+    "g#": "8",   # G#
+    "a": "j",    # A
+    "a#": "9",   # A#
+    "b": "k",    # B
+    "c_high": "l"  # High C
+}
+
+MIDI_NOTE_COUNT = 128
+
+
+class KeymapError(Exception):
+    """Raised when a keymap cannot be used for playback"""
+    pass
+
+
+def note_octave(midi_number):
+    return (midi_number // 12) - 1
+
+
+def midi_to_note_name(midi_number):
+    """Convert MIDI note number to note name"""
+    note_name = NOTE_NAMES[midi_number % 12]
+
+    # Special handling for high C
+    if note_name == 'c' and note_octave(midi_number) > HIGH_C_OCTAVE:
+        return HIGH_C
+
+    return note_name
+
+
+class KeyTable:
+    """
+    A keymap compiled into lookup tables indexed by MIDI note number
+
+    :ivar keys: Game key for each of the 128 notes, or None if unmapped
+    :ivar octaves: Instrument octave of each note
+    :ivar names: Note name of each note
+    :ivar missing: Note names the keymap leaves unmapped
+    :raises KeymapError: If the keymap has unknown note names, keys that are
+                         not non-empty strings, or keys that collide with the
+                         octave modifier keys
+    """
+
+    def __init__(self, keymap):
+        if not isinstance(keymap, dict):
+            raise KeymapError(f"Keymap must be a JSON object, got {type(keymap).__name__}")
+
+        valid_names = set(NOTE_NAMES) | {HIGH_C}
+        errors = []
+        for name, key in keymap.items():
+            if name not in valid_names:
+                errors.append(f"unknown note name {name!r}")
+            elif not isinstance(key, str) or not key:
+                errors.append(f"{name!r} must map to a key name, got {key!r}")
+            elif key.lower() in (OCTAVE_UP_KEY, OCTAVE_DOWN_KEY):
+                errors.append(f"{name!r} maps to {key!r}, which is reserved for octave shifts")
+        if errors:
+            raise KeymapError("Invalid keymap: " + "; ".join(errors))
+
+        self.keymap = dict(keymap)
+        self.missing = sorted(valid_names - set(keymap))
+
+        self.names = [midi_to_note_name(note) for note in range(MIDI_NOTE_COUNT)]
+        self.octaves = [note_octave(note) for note in range(MIDI_NOTE_COUNT)]
+        self.keys = [keymap.get(name) for name in self.names]
+
+    @classmethod
+    def from_keymap(cls, keymap):
+        """Return ``keymap`` if it is already a KeyTable, else compile it"""
+        return keymap if isinstance(keymap, cls) else cls(keymap)
+
+    def __getitem__(self, midi_number):
+        return self.keys[midi_number]
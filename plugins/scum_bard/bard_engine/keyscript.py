@@ -0,0 +1,275 @@
+"""
+Compact binary "key scripts": compiled performances saved to disk.
+
+A key script holds everything the dispatcher needs and nothing else, so a
+set list can be compiled once with mido and later played by a player that
+never imports mido or parses MIDI.
+
+Layout (little-endian):
+
+- header      ``HEADER`` (magic, version, counts, duration, first octave)
+- key table   ``key_count`` entries of (u8 length, utf-8 key name); the
+              first ``held_key_count`` keys are the ones notes hold down
+- metadata    ``metadata_length`` bytes of UTF-8 JSON (source file, track, ...)
+- events      ``event_count`` fixed-size ``EVENT`` records:
+              (u32 time in microseconds, u8 action, u8 MIDI note, u16 key index)
+
+Events are read straight out of a memory map while playing, so opening a
+script costs the same however long the song is.
+
+Run from the plugin directory::
+
+    python -m bard_engine.keyscript play song.sbks [--precision]
+    python -m bard_engine.keyscript info song.sbks
+"""
+
+import os
+import json
+import mmap
+import time
+import struct
+import logging
+
+from .compiler import ScheduleEvent, build_checkpoints
+
+MAGIC = b'SBKS'
+VERSION = 1
+
+FILE_EXTENSION = '.sbks'
+
+# magic, version, first_octave, event_count, note_count, unmapped_count,
+# octave_shifts, key_count, held_key_count, metadata_length, duration
+HEADER = struct.Struct('<4sHbIIIIHHId')
+
+# time (microseconds), action, note, key index
+EVENT = struct.Struct('<IBBH')
+
+# Event times are stored as u32 microseconds, which caps a script at ~71 minutes
+MAX_EVENT_TIME = (2 ** 32 - 1) / 1e6
+
+
+class KeyScriptError(Exception):
+    """Raised for unreadable or incompatible key script files"""
+    pass
+
+
+def export_keyscript(compiled, path, metadata=None):
+    """
+    Write a compiled track as a key script
+
+    :param compiled: CompiledTrack
+    :param path: Output file path
+    :param metadata: Optional JSON-serialisable dict stored with the script
+    :return: Size of the written file in bytes
+    """
+    # Sorted so the same track always exports byte-identical scripts
+    held_keys = sorted(compiled.keys)
+    other_keys = sorted({event.key for event in compiled.events} - set(held_keys))
+    key_table = held_keys + other_keys
+    key_index = {key: index for index, key in enumerate(key_table)}
+
+    encoded_keys = [key.encode('utf-8') for key in key_table]
+    if any(len(key) > 255 for key in encoded_keys):
+        raise KeyScriptError("Key names longer than 255 bytes cannot be stored")
+
+    metadata_bytes = json.dumps(metadata or {}).encode('utf-8')
+
+    records = bytearray(EVENT.size * len(compiled.events))
+    for index, (event_time, action, key, note) in enumerate(compiled.events):
+        if event_time > MAX_EVENT_TIME:
+            raise KeyScriptError(f"Event at {event_time:.0f}s is beyond the "
+                                 f"{MAX_EVENT_TIME:.0f}s key script limit")
+        EVENT.pack_into(records, index * EVENT.size, round(event_time * 1e6), action,
+                        note if note is not None else 0, key_index[key])
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, compiled.first_octave, len(compiled.events),
+                            compiled.note_count, compiled.unmapped_count, compiled.octave_shifts,
+                            len(key_table), len(held_keys), len(metadata_bytes), compiled.duration))
+        for key in encoded_keys:
+            f.write(bytes([len(key)]))
+            f.write(key)
+        f.write(metadata_bytes)
+        f.write(records)
+        return f.tell()
+
+
+class _EventView:
+    """Read-only sequence of ScheduleEvent decoded from fixed-size records"""
+
+    def __init__(self, buffer, offset, count, key_table):
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+        self._key_table = key_table
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("key script event index out of range")
+        micros, action, note, key = EVENT.unpack_from(self._buffer, self._offset + index * EVENT.size)
+        return ScheduleEvent(micros / 1e6, action, self._key_table[key], note)
+
+    def __iter__(self):
+        key_table = self._key_table
+        view = memoryview(self._buffer)[self._offset:self._offset + self._count * EVENT.size]
+        try:
+            for micros, action, note, key in EVENT.iter_unpack(view):
+                yield ScheduleEvent(micros / 1e6, action, key_table[key], note)
+        finally:
+            view.release()
+
+
+class KeyScript:
+    """
+    A memory-mapped key script
+
+    Exposes the same attributes the dispatcher reads from a CompiledTrack
+    (``events``, ``keys``, ``duration``, ...), so it can be passed straight
+    to ``play_compiled``. ``events`` is decoded lazily from the map, and the
+    seek checkpoints are built the first time they are needed.
+    """
+
+    def __init__(self, path):
+        load_started = time.perf_counter()
+        self.path = path
+
+        with open(path, 'rb') as f:
+            # mmap refuses empty files; anything shorter than a header is not a script
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise KeyScriptError(f"Not a key script: {path}")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._read_header()
+        except KeyScriptError:
+            self.close()
+            raise
+        except (struct.error, IndexError, ValueError) as e:
+            self.close()
+            raise KeyScriptError(f"Corrupt key script {path}: {e}")
+
+        self.compile_seconds = time.perf_counter() - load_started
+
+    def _read_header(self):
+        if len(self._map) < HEADER.size:
+            raise KeyScriptError(f"Not a key script: {self.path}")
+
+        (magic, version, self.first_octave, self.event_count, self.note_count,
+         self.unmapped_count, self.octave_shifts, key_count, held_key_count,
+         metadata_length, self.duration) = HEADER.unpack_from(self._map, 0)
+
+        if magic != MAGIC:
+            raise KeyScriptError(f"Not a key script: {self.path}")
+        if version != VERSION:
+            raise KeyScriptError(f"Unsupported key script version {version} in {self.path}")
+
+        offset = HEADER.size
+        key_table = []
+        for _ in range(key_count):
+            length = self._map[offset]
+            key_table.append(self._map[offset + 1:offset + 1 + length].decode('utf-8'))
+            offset += 1 + length
+
+        self.key_table = key_table
+        self.keys = key_table[:held_key_count]
+
+        self.metadata = json.loads(self._map[offset:offset + metadata_length].decode('utf-8') or '{}')
+        offset += metadata_length
+
+        if offset + self.event_count * EVENT.size > len(self._map):
+            raise KeyScriptError(f"Truncated key script: {self.path}")
+        self.events = _EventView(self._map, offset, self.event_count, key_table)
+        self._checkpoints = None
+
+    @property
+    def checkpoints(self):
+        """Seek index, built on first use by scanning the events once"""
+        if self._checkpoints is None:
+            self._checkpoints = build_checkpoints(self.events, self.first_octave)
+        return self._checkpoints
+
+    def __len__(self):
+        return self.event_count
+
+    def close(self):
+        if not self._map.closed:
+            self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    import argparse
+    import threading
+
+    parser = argparse.ArgumentParser(description="Play or inspect a Scum Bard key script")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    play_parser = subparsers.add_parser('play', help='Play a key script')
+    play_parser.add_argument('script', help='Key script file')
+    play_parser.add_argument('--precision', action='store_true',
+                             help='Use hybrid sleep/spin timing and report jitter')
+    play_parser.add_argument('--debug', action='store_true', help='Enable debug logging')
+    play_parser.add_argument('--speed', type=float, default=1.0, help='Playback speed factor')
+    play_parser.add_argument('--start', type=float, default=0.0, help='Seconds into the song to start at')
+    play_parser.add_argument('--end', type=float, help='Seconds into the song to stop at')
+
+    info_parser = subparsers.add_parser('info', help='Show what a key script contains')
+    info_parser.add_argument('script', help='Key script file')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.DEBUG if getattr(args, 'debug', False) else logging.INFO,
+                        format='%(asctime)s - %(levelname)s: %(message)s')
+    logger = logging.getLogger('ScumBardKeyScript')
+
+    if args.command == 'info':
+        with KeyScript(args.script) as script:
+            print(json.dumps({
+                'file': os.path.abspath(args.script),
+                'version': VERSION,
+                'events': script.event_count,
+                'notes': script.note_count,
+                'unmapped_notes': script.unmapped_count,
+                'octave_shifts': script.octave_shifts,
+                'first_octave': script.first_octave,
+                'duration_s': round(script.duration, 3),
+                'keys': script.key_table,
+                'metadata': script.metadata,
+            }, indent=2))
+        return
+
+    from .backends import PyAutoGuiBackend
+    from .player import play_compiled, PlaybackControl
+    from .timing import MonotonicClock, HybridClock
+
+    # pyautogui is the slowest import left; load it while the script is mapped
+    backend_holder = {}
+    loader = threading.Thread(target=lambda: backend_holder.setdefault('backend', PyAutoGuiBackend()))
+    loader.start()
+
+    with KeyScript(args.script) as script:
+        loader.join()
+        if 'backend' not in backend_holder:
+            raise SystemExit("Could not load pyautogui for key injection")
+
+        logger.info(f"Loaded {script.event_count} events from {args.script} "
+                    f"in {script.compile_seconds * 1000:.2f} ms")
+        clock = HybridClock() if args.precision else MonotonicClock()
+        stats = play_compiled(script, backend_holder['backend'], clock, logger=logger,
+                              position=args.start, end=args.end,
+                              control=PlaybackControl(speed=args.speed) if args.speed != 1.0 else None)
+        logger.info(f"Key script playback completed. Key Presses: {stats.key_presses}")
+        logger.info(stats.jitter.format_summary())
+
+
+if __name__ == '__main__':
+    main()
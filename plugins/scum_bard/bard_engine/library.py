@@ -0,0 +1,410 @@
+"""
+Searchable index of a MIDI library.
+
+Every file gets a title and tags: the title is the first track name found in
+the file, and the tags are the other track and instrument names plus the
+folders the file sits in below the library root. Names are read straight
+from the track chunks up to each track's first channel event, where
+sequencers put them, so indexing never parses the music itself; the
+results are cached by file size and modification time, so rescanning a
+library only reads files that changed.
+
+Searching is fuzzy: every whitespace-separated term must appear in an
+entry's name, title or tags with its characters in order, not necessarily
+next to each other; contiguous and word-start matches rank higher. The
+whole index is one newline-separated string held as a numpy array of code
+points, so matching a term is a handful of array passes over every entry at
+once: the greedy fuzzy match advances through sorted per-character
+positions with ``searchsorted``. Each term's match is cached and extended
+from its longest cached prefix, so a keystroke only advances the matches
+still alive by one character and stays well under 10 ms on 10k+ files.
+
+Run from the plugin directory to try it on a folder::
+
+    python -m bard_engine.library ~/midi "moon sonata"
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .analyze import find_midi_files
+
+LIBRARY_VERSION = 1
+
+# Meta event types read from track chunks
+META_TRACK_NAME = 0x03
+META_INSTRUMENT_NAME = 0x04
+META_END_OF_TRACK = 0x2F
+
+# Scores of a term matched fuzzily (minus the characters skipped inside the
+# match) and contiguously, and the bonus for matching at the start of a word
+FUZZY_SCORE = 100
+CONTIGUOUS_SCORE = 150
+WORD_START_BONUS = 20
+
+# Terms (and prefixes of terms) whose matches are kept for the following searches
+TERM_CACHE_SIZE = 64
+
+WORD_CHARACTERS = 'abcdefghijklmnopqrstuvwxyz0123456789'
+
+
+def _read_varlen(data, pos):
+    value = 0
+    while pos < len(data):
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            break
+    return value, pos
+
+
+def _decode(raw):
+    try:
+        return raw.decode('utf-8').strip()
+    except UnicodeDecodeError:
+        return raw.decode('latin-1').strip()
+
+
+def read_midi_names(path):
+    """
+    Track and instrument names of a standard MIDI file
+
+    Each track is read up to its first channel event and then skipped by
+    its chunk length, so only the leading meta events are decoded.
+
+    :return: (track names, instrument names) in file order
+    :raises ValueError: If the file is not a standard MIDI file
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != b'MThd':
+        raise ValueError(f"Not a standard MIDI file: {path}")
+
+    track_names = []
+    instrument_names = []
+    pos = 8 + int.from_bytes(data[4:8], 'big')
+    while pos + 8 <= len(data):
+        chunk_type = data[pos:pos + 4]
+        chunk_end = min(pos + 8 + int.from_bytes(data[pos + 4:pos + 8], 'big'), len(data))
+        event = pos + 8
+        pos = chunk_end
+        if chunk_type != b'MTrk':
+            continue
+
+        while event < chunk_end:
+            _, event = _read_varlen(data, event)
+            if event >= chunk_end:
+                break
+            status = data[event]
+            if status == 0xFF and event + 1 < chunk_end:
+                meta_type = data[event + 1]
+                length, event = _read_varlen(data, event + 2)
+                if meta_type == META_TRACK_NAME:
+                    track_names.append(_decode(data[event:event + length]))
+                elif meta_type == META_INSTRUMENT_NAME:
+                    instrument_names.append(_decode(data[event:event + length]))
+                elif meta_type == META_END_OF_TRACK:
+                    break
+                event += length
+            elif status in (0xF0, 0xF7):
+                length, event = _read_varlen(data, event + 1)
+                event += length
+            else:
+                # The music starts here; names come before it
+                break
+
+    return [name for name in track_names if name], [name for name in instrument_names if name]
+
+
+class LibraryEntry:
+    """
+    One indexed MIDI file
+
+    :ivar path: File path
+    :ivar name: File name without extension
+    :ivar title: First track name in the file, or ''
+    :ivar tags: Other track and instrument names and the folders below the root
+    """
+
+    __slots__ = ('path', 'name', 'title', 'tags', 'text')
+
+    def __init__(self, path, title='', tags=()):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.title = title
+        self.tags = list(tags)
+        # Lower-case text searched by every query; one line in the index
+        self.text = ' \t'.join([self.name, title] + self.tags).lower().replace('\n', ' ')
+
+    def __repr__(self):
+        return f"LibraryEntry({self.path!r}, title={self.title!r}, tags={self.tags!r})"
+
+
+class _TermMatch:
+    """
+    Where one term matches: for every matching entry the greedy fuzzy span,
+    plus the positions of its contiguous occurrences. Extending the term by
+    a character only has to look at these.
+    """
+
+    __slots__ = ('rows', 'starts', 'ends', 'contiguous', 'scores')
+
+    def __init__(self, rows, starts, ends, contiguous):
+        self.rows = rows
+        self.starts = starts
+        self.ends = ends
+        self.contiguous = contiguous
+        self.scores = None
+
+
+class _IndexData:
+    """One scan's entries laid out for searching; replaced, never modified, by a rescan"""
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.text = ''.join(entry.text + '\n' for entry in entries)
+        lengths = [len(entry.text) for entry in entries]
+        self.lengths = np.array(lengths, dtype=np.int64)
+        self.offsets = np.cumsum([0] + [length + 1 for length in lengths[:-1]], dtype=np.int64)
+        self.by_name = sorted(range(len(entries)), key=lambda index: entries[index].name.lower())
+
+        # Code point at, and whether a word starts at, each position of the text
+        self.codes = np.frombuffer(self.text.encode('utf-32-le'), dtype=np.uint32)
+        word = np.isin(self.codes, np.frombuffer(WORD_CHARACTERS.encode('utf-32-le'), dtype=np.uint32))
+        self.word_start = np.ones(len(self.codes), dtype=bool)
+        self.word_start[1:] = ~word[:-1]
+
+        self.char_positions = {}
+        self.matches = OrderedDict()
+        self.lock = threading.Lock()
+
+    def rows(self, positions):
+        return np.searchsorted(self.offsets, positions, side='right') - 1
+
+    def positions(self, character):
+        """Sorted positions of ``character`` in the text"""
+        with self.lock:
+            found = self.char_positions.get(character)
+        if found is None:
+            found = np.flatnonzero(self.codes == ord(character))
+            with self.lock:
+                self.char_positions[character] = found
+        return found
+
+    def match(self, term):
+        """_TermMatch of ``term``, extended from its longest cached prefix"""
+        with self.lock:
+            length = len(term)
+            while length and term[:length] not in self.matches:
+                length -= 1
+            match = self.matches[term[:length]] if length else None
+
+        if match is None:
+            # Greedy fuzzy matches start at the first occurrence in each entry
+            firsts = self.positions(term[0])
+            rows = self.rows(firsts)
+            leading = np.flatnonzero(np.diff(rows, prepend=-1))
+            match = _TermMatch(rows[leading], firsts[leading], firsts[leading], firsts)
+            length = 1
+            self._cache(term[:1], match)
+
+        last = len(self.codes) - 1
+        for length in range(length + 1, len(term) + 1):
+            character = term[length - 1]
+            following = self.positions(character)
+            if len(following):
+                after = np.searchsorted(following, match.ends, side='right')
+                ends = following[np.minimum(after, len(following) - 1)]
+                found = (after < len(following)) & (self.rows(ends) == match.rows)
+            else:
+                ends = match.ends
+                found = np.zeros(len(ends), dtype=bool)
+            contiguous = match.contiguous[
+                self.codes[np.minimum(match.contiguous + length - 1, last)] == ord(character)
+            ]
+            match = _TermMatch(match.rows[found], match.starts[found], ends[found], contiguous)
+            self._cache(term[:length], match)
+        return match
+
+    def term_score(self, term):
+        """Score of ``term`` for every entry; -inf where it does not match"""
+        match = self.match(term)
+        if match.scores is None:
+            scores = np.full(len(self.entries), -np.inf)
+            if len(term) > 1:
+                skipped = match.ends - match.starts + 1 - len(term)
+                scores[match.rows] = FUZZY_SCORE - skipped + WORD_START_BONUS * self.word_start[match.starts]
+            # A contiguous occurrence outranks any fuzzy one, more so at the start of a word
+            contiguous = match.contiguous
+            scores[self.rows(contiguous)] = CONTIGUOUS_SCORE
+            scores[self.rows(contiguous[self.word_start[contiguous]])] += WORD_START_BONUS
+            match.scores = scores
+        return match.scores
+
+    def _cache(self, term, match):
+        with self.lock:
+            self.matches[term] = match
+            self.matches.move_to_end(term)
+            if len(self.matches) > TERM_CACHE_SIZE:
+                self.matches.popitem(last=False)
+
+
+class LibraryIndex:
+    """
+    In-memory search index over the MIDI files below a directory
+
+    Safe to scan on a background thread while another thread searches;
+    searches see the previous index until a scan completes. The name cache
+    is read by the first scan, so creating an index does no file I/O.
+
+    :param cache_path: JSON file of names read on earlier scans (None keeps
+                       them in memory only)
+    """
+
+    def __init__(self, cache_path=None, logger=None):
+        self.cache_path = cache_path
+        self.logger = logger or logging.getLogger(__name__)
+        self.root = None
+        self._data = _IndexData([])
+        self._scan_lock = threading.Lock()
+        self._cache = None
+
+    def __len__(self):
+        return len(self._data.entries)
+
+    @property
+    def entries(self):
+        return self._data.entries
+
+    def scan(self, directory, progress=None):
+        """
+        Index every MIDI file below ``directory``, replacing the current index
+
+        :param progress: Optional callable(done, total) called every 100 files
+        :return: Seconds the scan took
+        """
+        started = time.perf_counter()
+        with self._scan_lock:
+            if self._cache is None:
+                self._cache = self._load_cache()
+            paths = find_midi_files(directory)
+            entries = []
+            cache = {}
+            for done, path in enumerate(paths, 1):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                cached = self._cache.get(path)
+                if cached is not None and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+                    title, tags = cached[2], cached[3]
+                else:
+                    title, tags = self._read_file(path, directory)
+                cache[path] = [stat.st_size, stat.st_mtime_ns, title, tags]
+                entries.append(LibraryEntry(path, title, tags))
+                if progress and done % 100 == 0:
+                    progress(done, len(paths))
+
+            # Searches running now finish on the old data
+            self._data = _IndexData(entries)
+            self.root = directory
+            self._cache = cache
+            self._save_cache()
+
+        seconds = time.perf_counter() - started
+        self.logger.info(f"Indexed {len(entries)} MIDI files in {directory} in {seconds:.2f}s")
+        return seconds
+
+    def search(self, query):
+        """
+        Entries matching every term of ``query``, best first
+
+        An empty query returns every entry sorted by name.
+
+        :return: List of LibraryEntry
+        """
+        data = self._data
+        terms = query.lower().split()
+        if not terms:
+            return [data.entries[index] for index in data.by_name]
+
+        total = np.zeros(len(data.entries))
+        for term in terms:
+            total += data.term_score(term)
+        matched = np.flatnonzero(np.isfinite(total))
+        # Best score first, then the shortest text
+        order = matched[np.lexsort((data.lengths[matched], -total[matched]))]
+        return [data.entries[index] for index in order.tolist()]
+
+    def _read_file(self, path, root):
+        folders = os.path.relpath(os.path.dirname(path), root).split(os.sep)
+        tags = [folder for folder in folders if folder not in ('', '.')]
+        try:
+            track_names, instrument_names = read_midi_names(path)
+        except (OSError, ValueError) as e:
+            self.logger.debug(f"No names read from {path}: {e}")
+            return '', tags
+        title = track_names[0] if track_names else ''
+        for name in track_names[1:] + instrument_names:
+            if name not in tags:
+                tags.append(name)
+        return title, tags
+
+    def _load_cache(self):
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') != LIBRARY_VERSION:
+                return {}
+            return dict(data['files'])
+        except FileNotFoundError:
+            return {}
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.logger.error(f"Ignoring unreadable library cache {self.cache_path}: {e}")
+            return {}
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+            temp_path = self.cache_path + '.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump({'version': LIBRARY_VERSION, 'files': self._cache}, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            self.logger.error(f"Failed to save library cache {self.cache_path}: {e}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Index a MIDI library and search it")
+    parser.add_argument('directory', help='Library folder')
+    parser.add_argument('query', nargs='*', help='Search terms')
+    parser.add_argument('-n', '--limit', type=int, default=20, help='Results to show')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+    index = LibraryIndex()
+    index.scan(args.directory)
+
+    started = time.perf_counter()
+    results = index.search(' '.join(args.query))
+    elapsed = time.perf_counter() - started
+    for entry in results[:args.limit]:
+        print(f"{entry.name}\t{entry.title}\t{', '.join(entry.tags)}")
+    print(f"{len(results)} of {len(index)} files matched in {elapsed * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
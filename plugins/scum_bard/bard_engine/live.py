@@ -0,0 +1,150 @@
+"""
+Live MIDI input passthrough.
+
+Incoming notes from a MIDI input port go through the same key lookup and
+octave planner as compiled songs and are injected immediately. Latency from
+message receipt to key-down is measured for every note.
+"""
+
+import time
+import logging
+import threading
+from collections import Counter
+
+from .timing import JitterHistogram
+from .compiler import DEFAULT_OCTAVE, octave_shift
+from .keymap import KeyTable
+
+# Target time from MIDI message to key-down (seconds)
+LATENCY_BUDGET = 0.005
+
+
+def list_input_ports():
+    """Names of the MIDI input ports mido can open"""
+    import mido
+    return mido.get_input_names()
+
+
+class LivePassthrough:
+    """
+    Map live MIDI notes to key injection
+
+    Open a real port with ``start(port_name)``, hand ``start(port=...)`` an
+    open port or an in-memory stand-in, or push messages directly with
+    ``feed(msg)``. Anything with ``type``, ``note`` and ``velocity``
+    attributes works as a message.
+
+    :param keymap: KeyTable, or a dict mapping note names to keys
+    :param backend: Key backend with ``press``, ``key_down`` and ``key_up``
+    :param octave_management: Shift octaves to follow the played notes
+    :param start_octave: Octave the character is in when passthrough starts
+    """
+
+    def __init__(self, keymap, backend, octave_management=True, start_octave=DEFAULT_OCTAVE,
+                 logger=None):
+        self.key_table = KeyTable.from_keymap(keymap)
+        self.backend = backend
+        self.octave_management = octave_management
+        self.current_octave = start_octave
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.latency = JitterHistogram()
+        self.unmapped_count = 0
+        self.octave_shifts = 0
+
+        self._held = Counter()
+        self._lock = threading.Lock()
+        self._port = None
+
+    def start(self, port_name=None, virtual=False, port=None):
+        """
+        Open a MIDI input port and start passing notes through
+
+        :param port_name: Port name; None opens the default input
+        :param virtual: Create a virtual port with this name (rtmidi only)
+        :param port: Already open input port to listen on instead, or any
+                     stand-in with ``name``, a ``callback`` attribute and
+                     ``close()``
+        """
+        if port is None:
+            import mido
+            port = mido.open_input(port_name, virtual=virtual, callback=self.feed)
+        else:
+            port.callback = self.feed
+        self._port = port
+        self.logger.info(f"Live MIDI input opened: {self._port.name}")
+
+    def stop(self):
+        """Close the port, release held keys and report latency"""
+        if self._port is not None:
+            self._port.close()
+            self._port = None
+
+        with self._lock:
+            for key in list(self._held):
+                self.backend.key_up(key)
+            self._held.clear()
+
+        return self.report()
+
+    def feed(self, msg, received_at=None):
+        """
+        Handle one MIDI message
+
+        :param msg: mido Message (or compatible object)
+        :param received_at: perf_counter timestamp of receipt; defaults to now
+        """
+        received_at = time.perf_counter() if received_at is None else received_at
+
+        if msg.type == 'note_on' and msg.velocity > 0:
+            with self._lock:
+                self._note_on(msg.note, received_at)
+        elif msg.type in ('note_off', 'note_on'):
+            with self._lock:
+                self._note_off(msg.note)
+
+    def _note_on(self, note, received_at):
+        if self.octave_management:
+            target_octave = self.key_table.octaves[note]
+            _, shift_key, count = octave_shift(self.current_octave, target_octave)
+            for _ in range(count):
+                self.backend.press(shift_key)
+            self.octave_shifts += count
+            self.current_octave = target_octave
+
+        key = self.key_table.keys[note]
+        if key is None:
+            self.unmapped_count += 1
+            return
+
+        if self._held[key]:
+            # Re-strike a key that is still held by an earlier note
+            self.backend.key_up(key)
+        self.backend.key_down(key)
+        self._held[key] += 1
+
+        self.latency.record(time.perf_counter() - received_at)
+
+    def _note_off(self, note):
+        key = self.key_table.keys[note]
+        if key is None or not self._held[key]:
+            return
+
+        self._held[key] -= 1
+        if not self._held[key]:
+            del self._held[key]
+            self.backend.key_up(key)
+
+    def report(self):
+        """
+        Log latency statistics against the budget
+
+        :return: Latency statistics in microseconds
+        """
+        stats = self.latency.summary()
+        budget_us = LATENCY_BUDGET * 1e6
+        within = "within" if stats['p99_us'] <= budget_us else "OVER"
+        self.logger.info(f"Live input latency over {stats['events']} notes: "
+                         f"p50={stats['p50_us']:.0f}us p99={stats['p99_us']:.0f}us "
+                         f"max={stats['max_us']:.0f}us ({within} {budget_us:.0f}us budget)")
+        return stats
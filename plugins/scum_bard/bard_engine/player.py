@@ -0,0 +1,294 @@
+"""
+Dispatch a compiled schedule to a key backend against a clock.
+"""
+
+import time
+import logging
+import threading
+
+from .timing import JitterHistogram
+from .compiler import ACTION_KEY_DOWN, ACTION_KEY_UP, ACTION_OCTAVE_UP, octave_shift, seek
+
+# Longest a controlled playback waits between checks of its control (seconds)
+CONTROL_POLL_INTERVAL = 0.05
+
+# Limits for live speed and transpose changes
+MIN_SPEED = 0.25
+MAX_SPEED = 4.0
+MAX_TRANSPOSE = 24
+
+
+class PlaybackStats:
+    """
+    Outcome of one playback
+
+    :ivar key_presses: Note key-downs sent to the backend
+    :ivar octave_shifts: Octave modifier keys sent to the backend
+    :ivar failed_presses: Keys the backend raised on
+    :ivar jitter: JitterHistogram of note lateness
+    :ivar drift: Seconds the final event finished after its deadline
+    :ivar elapsed: Clock seconds from start to the final event
+    :ivar first_note_at: Clock time the first key-down was sent, or None
+    :ivar stopped: Playback was stopped through its PlaybackControl
+    :ivar position: Schedule seconds reached; pass back as ``position`` to resume
+    :ivar end_octave: Octave the instrument was left in
+    :ivar actions: Key actions sent to the backend during the schedule
+    :ivar backend_seconds: Clock seconds spent inside those backend calls
+    """
+
+    def __init__(self):
+        self.key_presses = 0
+        self.octave_shifts = 0
+        self.failed_presses = 0
+        self.jitter = JitterHistogram()
+        self.drift = 0.0
+        self.elapsed = 0.0
+        self.first_note_at = None
+        self.stopped = False
+        self.position = 0.0
+        self.end_octave = None
+        self.actions = 0
+        self.backend_seconds = 0.0
+
+    @property
+    def backend_rate(self):
+        """Key actions per second the backend managed, or None if unmeasured"""
+        if not self.actions or self.backend_seconds <= 0:
+            return None
+        return self.actions / self.backend_seconds
+
+    def summary(self):
+        return {
+            'key_presses': self.key_presses,
+            'octave_shifts': self.octave_shifts,
+            'failed_presses': self.failed_presses,
+            'drift_s': round(self.drift, 6),
+            'elapsed_s': round(self.elapsed, 6),
+            'stopped': self.stopped,
+            'position_s': round(self.position, 6),
+            'backend_actions_per_s': round(self.backend_rate, 1) if self.backend_rate else None,
+            'jitter': self.jitter.summary(),
+        }
+
+
+class PlaybackControl:
+    """
+    Live requests to a running playback from another thread
+
+    play_compiled() checks the control before each event and at least every
+    CONTROL_POLL_INTERVAL seconds while waiting for one, so a change lands
+    before the next note.
+
+    :ivar speed: Playback speed factor (1.0 plays at the file's tempo)
+    :ivar transpose: Semitones to shift the source notes by, or None to play
+                     the schedule as it was compiled
+    """
+
+    def __init__(self, speed=1.0, transpose=None):
+        self._stop = threading.Event()
+        self._timeline = None
+        self.speed = 1.0
+        self.transpose = None
+        self.set_speed(speed)
+        if transpose is not None:
+            self.set_transpose(transpose)
+
+    def set_speed(self, speed):
+        """
+        Change the speed; the schedule is rebased at the current position
+
+        :raises ValueError: Outside MIN_SPEED..MAX_SPEED
+        """
+        if not MIN_SPEED <= speed <= MAX_SPEED:
+            raise ValueError(f"Speed must be between {MIN_SPEED} and {MAX_SPEED}, got {speed}")
+        self.speed = float(speed)
+
+    def set_transpose(self, semitones):
+        """
+        Change the transposition; the track is re-scheduled from its notes
+
+        :raises ValueError: More than MAX_TRANSPOSE semitones either way
+        """
+        if not -MAX_TRANSPOSE <= semitones <= MAX_TRANSPOSE:
+            raise ValueError(f"Transpose must be within +/-{MAX_TRANSPOSE} semitones, got {semitones}")
+        self.transpose = int(semitones)
+
+    def stop(self):
+        """Stop playback before its next event"""
+        self._stop.set()
+
+    @property
+    def stop_requested(self):
+        return self._stop.is_set()
+
+    def update_timeline(self, anchor_time, anchor_position, speed):
+        """Record the player's timeline; called whenever it is (re)anchored"""
+        self._timeline = (anchor_time, anchor_position, speed)
+
+    def position(self, now=None):
+        """
+        Schedule seconds being played now, for displays on other threads
+
+        :param now: Clock time (default: time.perf_counter(), the clock of
+                    MonotonicClock and HybridClock)
+        :return: Seconds into the schedule, or None before playback starts
+        """
+        timeline = self._timeline
+        if timeline is None:
+            return None
+        anchor_time, anchor_position, speed = timeline
+        now = time.perf_counter() if now is None else now
+        return anchor_position + max(0.0, now - anchor_time) * speed
+
+
+def shift_to(backend, current_octave, target_octave):
+    """Press modifiers to move the instrument between octaves; returns the press count"""
+    _, shift_key, count = octave_shift(current_octave, target_octave)
+    for _ in range(count):
+        backend.press(shift_key)
+    return count
+
+
+def play_compiled(compiled, backend, clock, logger=None, start_time=None, position=0.0,
+                  end=None, from_octave=None, control=None):
+    """
+    Play a compiled track, or a section of it
+
+    Deadlines run on a timeline anchored at (clock time, schedule position).
+    A speed change re-anchors it at the current position, so nothing jumps;
+    a transposition switches to the re-scheduled track at the same position.
+
+    :param compiled: CompiledTrack
+    :param backend: Key backend with ``press``, ``key_down`` and ``key_up``
+    :param clock: Clock with ``now()`` and ``sleep_until(deadline)``
+    :param logger: Optional logger for per-key debug output
+    :param start_time: Clock time of the schedule origin; defaults to now.
+                       Used to line up several instances on a shared start.
+    :param position: Seconds into the schedule to start from
+    :param end: Seconds into the schedule to stop at (default: the end)
+    :param from_octave: Octave the instrument is in now; defaults to the
+                        schedule's first octave. Modifier presses move it to
+                        the octave the schedule expects at ``position``.
+    :param control: Optional PlaybackControl for stop, speed and transpose
+                    changes from another thread
+    :return: PlaybackStats; ``position`` and ``end_octave`` resume a stopped playback
+    """
+    logger = logger or logging.getLogger(__name__)
+    stats = PlaybackStats()
+
+    can_transpose = callable(getattr(compiled, 'transposed', None))
+    if control is not None and control.transpose is not None:
+        if can_transpose:
+            compiled = compiled.transposed(control.transpose)
+        else:
+            logger.warning("This schedule cannot be transposed; playing it as compiled")
+
+    speed = control.speed if control is not None else 1.0
+    events = compiled.events
+    index, target_octave = seek(compiled, position)
+    stop_index = len(events) if end is None else seek(compiled, end)[0]
+    octave = compiled.first_octave if from_octave is None else from_octave
+
+    # Schedule position ``anchor_position`` plays at clock time ``anchor_time``
+    anchor_time = clock.now() if start_time is None else start_time
+    anchor_position = position
+    started_at = anchor_time
+    deadline = anchor_time
+    finished = False
+    if control is not None:
+        control.update_timeline(anchor_time, anchor_position, speed)
+
+    try:
+        # Bring the instrument to the octave the schedule expects here
+        stats.octave_shifts += shift_to(backend, octave, target_octave)
+        octave = target_octave
+
+        while index < stop_index:
+            event_time, action, key, note = events[index]
+
+            if control is None:
+                deadline = anchor_time + (event_time - anchor_position) / speed
+                clock.sleep_until(deadline)
+            else:
+                if control.stop_requested:
+                    stats.stopped = True
+                    stats.position = event_time
+                    break
+
+                transpose_changed = (can_transpose and control.transpose is not None
+                                     and control.transpose != compiled.transpose)
+                if control.speed != speed or transpose_changed:
+                    now = clock.now()
+                    # Never rebase past the event we are waiting for
+                    current = min(anchor_position + (now - anchor_time) * speed, event_time)
+                    anchor_time, anchor_position = now, current
+                    speed = control.speed
+                    control.update_timeline(anchor_time, anchor_position, speed)
+
+                    if transpose_changed:
+                        release_all(backend, compiled.keys)
+                        compiled = compiled.transposed(control.transpose)
+                        events = compiled.events
+                        index, target_octave = seek(compiled, current)
+                        stop_index = len(events) if end is None else seek(compiled, end)[0]
+                        stats.octave_shifts += shift_to(backend, octave, target_octave)
+                        octave = target_octave
+                        logger.info(f"Transposed to {compiled.transpose:+d} semitones at {current:.2f}s")
+                    continue
+
+                deadline = anchor_time + (event_time - anchor_position) / speed
+                now = clock.now()
+                if deadline - now > CONTROL_POLL_INTERVAL:
+                    # Wait in slices so changes take effect before this event
+                    clock.sleep_until(now + CONTROL_POLL_INTERVAL)
+                    continue
+                clock.sleep_until(deadline)
+
+            now = clock.now()
+            try:
+                if action == ACTION_KEY_DOWN:
+                    stats.jitter.record(now - deadline)
+                    if stats.first_note_at is None:
+                        stats.first_note_at = now
+                    backend.key_down(key)
+                    stats.key_presses += 1
+                    logger.debug(f"Key down: {key} for note: {note}")
+                elif action == ACTION_KEY_UP:
+                    backend.key_up(key)
+                else:
+                    # Octave modifiers are tapped, not held
+                    backend.press(key)
+                    stats.octave_shifts += 1
+                    octave += 1 if action == ACTION_OCTAVE_UP else -1
+            except Exception as press_error:
+                stats.failed_presses += 1
+                logger.error(f"Failed to send key {key}: {press_error}")
+            stats.actions += 1
+            stats.backend_seconds += clock.now() - now
+            index += 1
+        else:
+            stats.position = compiled.duration if end is None else end
+        finished = True
+    finally:
+        if not finished or stats.stopped or stop_index < len(events):
+            # Never leave a note key stuck down in the game
+            release_all(backend, compiled.keys)
+
+    end_time = clock.now()
+    if control is not None:
+        # Freeze the reported position where playback ended
+        control.update_timeline(end_time, stats.position, 0.0)
+    stats.elapsed = end_time - started_at
+    stats.end_octave = octave
+    # How far the last event landed behind schedule, including its own dispatch
+    stats.drift = max(0.0, end_time - deadline)
+    return stats
+
+
+def release_all(backend, keys):
+    """Release every key that may still be held"""
+    for key in keys:
+        try:
+            backend.key_up(key)
+        except Exception:
+            pass
@@ -0,0 +1,260 @@
+"""
+Persistent playlist and background preparation of upcoming songs.
+
+``Playlist`` is a thread-safe list of songs with a current position that
+is saved as JSON after every change. ``Preparer`` runs one preparation at a
+time on a background thread (parse, track selection, transposition and
+octave plan) so the next song is compiled while the current one plays and
+the transition between them is gapless.
+
+A thread is used rather than a process pool: the overlay ships as a
+PyInstaller bundle, where worker processes would re-launch the app on
+Windows.
+"""
+
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PLAYLIST_VERSION = 1
+
+
+class PlaylistEntry:
+    """
+    One song in a playlist
+
+    :ivar file: MIDI file path
+    :ivar track: Track to play, or None for the busiest track
+    :ivar transpose: Semitones to shift the song by
+    """
+
+    def __init__(self, file, track=None, transpose=0):
+        self.file = file
+        self.track = track
+        self.transpose = transpose
+
+    @property
+    def name(self):
+        return os.path.basename(self.file)
+
+    def to_dict(self):
+        return {'file': self.file, 'track': self.track, 'transpose': self.transpose}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['file'], data.get('track'), data.get('transpose', 0))
+
+    def __repr__(self):
+        return f"PlaylistEntry({self.file!r}, track={self.track!r}, transpose={self.transpose!r})"
+
+
+class Playlist:
+    """
+    Ordered songs with a current position
+
+    :param path: JSON file the playlist is loaded from and saved to after
+                 every change (None keeps it in memory)
+    :param on_change: Optional callable() run after every change, on the
+                      thread that made it
+    """
+
+    def __init__(self, path=None, on_change=None, logger=None):
+        self.path = path
+        self.on_change = on_change
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._entries = []
+        self._current = None
+        if path:
+            self.load()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __getitem__(self, index):
+        with self._lock:
+            return self._entries[index]
+
+    @property
+    def entries(self):
+        """Snapshot of the entries"""
+        with self._lock:
+            return list(self._entries)
+
+    @property
+    def current(self):
+        """Index of the song playing or last played, or None"""
+        with self._lock:
+            return self._current
+
+    def add(self, file, track=None, transpose=0):
+        """Append a song; returns its index"""
+        with self._lock:
+            self._entries.append(PlaylistEntry(file, track, transpose))
+            index = len(self._entries) - 1
+        self._changed()
+        return index
+
+    def remove(self, index):
+        with self._lock:
+            del self._entries[index]
+            if self._current is not None:
+                if index < self._current:
+                    self._current -= 1
+                elif index == self._current:
+                    self._current = None
+        self._changed()
+
+    def move(self, index, new_index):
+        """Move a song, keeping the current position on the same song"""
+        with self._lock:
+            current_entry = self._entries[self._current] if self._current is not None else None
+            self._entries.insert(new_index, self._entries.pop(index))
+            if current_entry is not None:
+                self._current = self._entries.index(current_entry)
+        self._changed()
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._current = None
+        self._changed()
+
+    def set_current(self, index):
+        with self._lock:
+            if index is not None and not 0 <= index < len(self._entries):
+                raise IndexError(f"Playlist has no song {index}")
+            self._current = index
+        self._changed()
+
+    def next_index(self, index=None):
+        """Index of the song after ``index`` (default: the current one), or None at the end"""
+        with self._lock:
+            index = self._current if index is None else index
+            following = 0 if index is None else index + 1
+            return following if following < len(self._entries) else None
+
+    def remaining(self):
+        """Songs after the current one"""
+        with self._lock:
+            return len(self._entries) - (0 if self._current is None else self._current + 1)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'version': PLAYLIST_VERSION,
+                'current': self._current,
+                'entries': [entry.to_dict() for entry in self._entries],
+            }
+
+    def load(self):
+        """Load the playlist file; a missing or unreadable file leaves the playlist empty"""
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            entries = [PlaylistEntry.from_dict(entry) for entry in data.get('entries', [])]
+        except FileNotFoundError:
+            return
+        except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+            self.logger.error(f"Ignoring unreadable playlist {self.path}: {e}")
+            return
+
+        current = data.get('current')
+        with self._lock:
+            self._entries = entries
+            self._current = current if isinstance(current, int) and 0 <= current < len(entries) else None
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def _changed(self):
+        try:
+            self.save()
+        except OSError as e:
+            self.logger.error(f"Failed to save playlist {self.path}: {e}")
+        if self.on_change is not None:
+            self.on_change()
+
+
+def preparation_key(entry, precision, max_rate, skyline_mode, speed, profile=None):
+    """
+    Everything a prepared song depends on; doubles as its Preparer key
+
+    :param entry: PlaylistEntry
+    :param max_rate: Thinning budget, or None when thinning is off. Pass the
+                     budget fixed when the entry was first prepared, not the
+                     current measured rate, or the key drifts between
+                     prepare() and take()
+    :param profile: Optional SongProfile whose track and budget fill in
+    :return: Arguments for the preparation function, as a hashable tuple
+    """
+    track = entry.track
+    if track is None and profile is not None:
+        track = profile.track
+    # A saved budget keeps the song's cached notes usable as the measured rate drifts
+    if max_rate and profile is not None and profile.max_rate:
+        max_rate = profile.max_rate
+    # Speed only changes what is compiled when thinning is on
+    return (entry.file, track, entry.transpose, precision, max_rate, skyline_mode, speed if max_rate else 1.0)
+
+
+class Preparer:
+    """
+    Prepare songs ahead of time on one background thread
+
+    Results are keyed by whatever describes a preparation (file, track and
+    playback settings); a request for a key that is no longer wanted is
+    simply never taken.
+
+    :param prepare_fn: Callable(*args) doing the work; its result or
+                       exception is handed back by take()
+    """
+
+    def __init__(self, prepare_fn):
+        self.prepare_fn = prepare_fn
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ScumBardPrepare')
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def prepare(self, key, *args):
+        """Start preparing ``key`` unless it is already prepared or underway; drops other keys"""
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None:
+                future = self._executor.submit(self.prepare_fn, *args)
+            self._futures = {key: future}
+            return future
+
+    def take(self, key, *args):
+        """
+        Result for ``key``: waits for a preparation already underway, or
+        prepares it now on the calling thread if none was started
+
+        :raises: Whatever the preparation raised
+        """
+        with self._lock:
+            future = self._futures.pop(key, None)
+        if future is None:
+            return self.prepare_fn(*args)
+        return future.result()
+
+    def is_prepared(self, key):
+        with self._lock:
+            future = self._futures.get(key)
+            return future is not None and future.done()
+
+    def discard(self):
+        """Forget every preparation; one already running finishes unused"""
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures = {}
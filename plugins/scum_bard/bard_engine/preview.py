@@ -0,0 +1,269 @@
+"""
+Offline audio preview of what a compiled schedule plays in game.
+
+The preview follows the key timeline, not the source notes: every key-down
+is turned back into the pitch the game sounds for that key in the current
+instrument octave, so keymap gaps, octave folding and the ``c_high`` key
+are heard exactly as they will come out. Notes are rendered with numpy
+additive synthesis from per-pitch tone tables, far faster than real time,
+and written as a 16-bit mono WAV or handed to a sink callable.
+
+Run from the plugin directory to A/B variants of one track::
+
+    python -m bard_engine.preview song.mid -t 1 -o preview.wav --transpose 0 -2 --skyline none highest
+"""
+
+import time
+import wave
+import logging
+
+import numpy as np
+
+from .compiler import ACTION_KEY_DOWN, ACTION_KEY_UP, ACTION_OCTAVE_UP, ACTION_OCTAVE_DOWN
+from .keymap import NOTE_NAMES, HIGH_C, DEFAULT_KEYMAP
+
+DEFAULT_SAMPLE_RATE = 22050
+
+# Relative amplitude of each harmonic, fundamental first
+HARMONICS = (1.0, 0.5, 0.25, 0.125)
+
+# Envelope (seconds): linear attack, exponential decay while held, linear release
+ATTACK = 0.005
+DECAY = 0.8
+RELEASE = 0.05
+
+# Held notes are cut off after this long (seconds)
+MAX_NOTE_LENGTH = 4.0
+
+# Peak level of the normalised output (full scale = 1.0)
+PEAK_LEVEL = 0.9
+
+
+class PreviewError(Exception):
+    """Raised when a preview cannot be rendered or played"""
+    pass
+
+
+def key_pitches(keymap=None):
+    """
+    Map each game key to its pitch class, and whether it is the high C key
+
+    :param keymap: Dict mapping note names to keys (or a KeyTable)
+    :return: Dict key -> (semitone within the octave, is_high_c)
+    """
+    keymap = getattr(keymap, 'keymap', keymap) or DEFAULT_KEYMAP
+    pitches = {}
+    for name, key in keymap.items():
+        if name == HIGH_C:
+            pitches[key] = (0, True)
+        elif name in NOTE_NAMES:
+            pitches[key] = (NOTE_NAMES.index(name), False)
+    return pitches
+
+
+def sounded_notes(compiled, keymap=None):
+    """
+    Replay a schedule's key timeline into the pitches the game sounds
+
+    The instrument octave starts at the schedule's first octave and follows
+    its octave shifts; a key sounds its pitch class in that octave, and the
+    high C key the C above it.
+
+    :param compiled: CompiledTrack or KeyScript
+    :param keymap: Keymap the schedule was compiled with (default: the
+                   track's own key table, else DEFAULT_KEYMAP)
+    :return: List of (start, end, MIDI pitch) sorted by start
+    """
+    pitches = key_pitches(keymap or getattr(compiled, 'key_table', None))
+    octave = compiled.first_octave
+    sounding = {}
+    notes = []
+
+    for event_time, action, key, _ in compiled.events:
+        if action == ACTION_KEY_DOWN:
+            if key in pitches:
+                semitone, high = pitches[key]
+                sounding[key] = (event_time, (octave + 1 + high) * 12 + semitone)
+        elif action == ACTION_KEY_UP:
+            started = sounding.pop(key, None)
+            if started is not None:
+                notes.append((started[0], event_time, started[1]))
+        elif action == ACTION_OCTAVE_UP:
+            octave += 1
+        elif action == ACTION_OCTAVE_DOWN:
+            octave -= 1
+
+    end = compiled.duration
+    notes.extend((start, max(start, end), pitch) for start, pitch in sounding.values())
+    notes.sort()
+    return notes
+
+
+class ToneBank:
+    """
+    Per-pitch tone tables: harmonics times attack/decay envelope, rendered
+    once for MAX_NOTE_LENGTH and sliced for every note of that pitch
+    """
+
+    def __init__(self, sample_rate=DEFAULT_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        length = int(MAX_NOTE_LENGTH * sample_rate)
+        self._t = np.arange(length) / sample_rate
+        attack = np.minimum(self._t / ATTACK, 1.0)
+        self._envelope = attack * np.exp(-self._t / DECAY)
+        self._release = np.linspace(1.0, 0.0, max(1, int(RELEASE * sample_rate)), dtype=np.float32)
+        self._tones = {}
+
+    def tone(self, pitch):
+        if pitch not in self._tones:
+            frequency = 440.0 * 2 ** ((pitch - 69) / 12)
+            nyquist = self.sample_rate / 2
+            partials = np.zeros_like(self._t)
+            for harmonic, amplitude in enumerate(HARMONICS, 1):
+                if frequency * harmonic < nyquist:
+                    partials += amplitude * np.sin(2 * np.pi * frequency * harmonic * self._t)
+            self._tones[pitch] = (partials * self._envelope).astype(np.float32)
+        return self._tones[pitch]
+
+    def note(self, pitch, held_samples):
+        """Samples of one note held for ``held_samples``, including its release"""
+        tone = self.tone(pitch)
+        held = min(held_samples, len(tone) - len(self._release))
+        samples = tone[:held + len(self._release)].copy()
+        samples[held:] *= self._release[:len(samples) - held]
+        return samples
+
+
+def render(notes, duration, sample_rate=DEFAULT_SAMPLE_RATE, bank=None):
+    """
+    Synthesize notes to PCM
+
+    :param notes: Iterable of (start, end, MIDI pitch) in seconds
+    :param duration: Length of the track in seconds
+    :param bank: ToneBank to reuse between renders at the same sample rate
+    :return: float32 numpy array of samples peaking at PEAK_LEVEL
+    """
+    bank = bank or ToneBank(sample_rate)
+    release_samples = int(RELEASE * sample_rate)
+    output = np.zeros(int(duration * sample_rate) + release_samples + 1, dtype=np.float32)
+
+    for start, end, pitch in notes:
+        if not 0 <= pitch < 128:
+            continue
+        first = int(start * sample_rate)
+        samples = bank.note(pitch, max(1, int((end - start) * sample_rate)))
+        last = min(first + len(samples), len(output))
+        output[first:last] += samples[:last - first]
+
+    peak = float(np.abs(output).max()) if len(output) else 0.0
+    if peak > 0:
+        output *= PEAK_LEVEL / peak
+    return output
+
+
+def write_wav(path, samples, sample_rate=DEFAULT_SAMPLE_RATE):
+    """Write float samples in -1..1 as a 16-bit mono WAV file"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+
+def sounddevice_sink(samples, sample_rate):
+    """Play samples on the default output device (needs the optional sounddevice package)"""
+    try:
+        import sounddevice
+    except ImportError:
+        raise PreviewError("Playing previews needs sounddevice: pip install sounddevice")
+    sounddevice.play(samples, sample_rate)
+    sounddevice.wait()
+
+
+def preview(compiled, path=None, sink=None, keymap=None, sample_rate=DEFAULT_SAMPLE_RATE, bank=None):
+    """
+    Render what a schedule plays in game
+
+    :param compiled: CompiledTrack or KeyScript
+    :param path: WAV file to write, if any
+    :param sink: Optional callable(samples, sample_rate) to play the audio
+    :param keymap: Keymap the schedule was compiled with
+    :return: (float32 samples, seconds spent rendering)
+    """
+    started = time.perf_counter()
+    samples = render(sounded_notes(compiled, keymap), compiled.duration, sample_rate, bank)
+    render_seconds = time.perf_counter() - started
+    if path:
+        write_wav(path, samples, sample_rate)
+    if sink is not None:
+        sink(samples, sample_rate)
+    return samples, render_seconds
+
+
+def main():
+    import os
+    import json
+    import argparse
+    import itertools
+
+    from .compiler import compile_midi, load_midi
+    from .keymap import KeyTable, KeymapError
+    from .skyline import SKYLINE_MODES
+
+    parser = argparse.ArgumentParser(description="Render what Scum Bard would play to a WAV file")
+    parser.add_argument('midi_file', help='MIDI file to preview')
+    parser.add_argument('-t', '--track', type=int, default=0, help='Track to preview')
+    parser.add_argument('-k', '--keymap', help='Custom keymap JSON file')
+    parser.add_argument('-o', '--output', default='preview.wav',
+                        help='WAV file to write; variants get a suffix per setting')
+    parser.add_argument('--transpose', type=int, nargs='+', default=[0], metavar='SEMITONES',
+                        help='One or more transpositions to render')
+    parser.add_argument('--skyline', nargs='+', default=['none'], choices=('none',) + SKYLINE_MODES,
+                        help='One or more voice reductions to render')
+    parser.add_argument('--thin', type=float, metavar='RATE',
+                        help='Thin dense passages to RATE key actions per second')
+    parser.add_argument('--no-octaves', action='store_true', help='Preview without octave management')
+    parser.add_argument('--sample-rate', type=int, default=DEFAULT_SAMPLE_RATE)
+    parser.add_argument('--play', action='store_true', help='Also play each render (needs sounddevice)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+    logger = logging.getLogger('ScumBardPreview')
+
+    keymap = DEFAULT_KEYMAP
+    if args.keymap:
+        with open(args.keymap, 'r') as f:
+            keymap = json.load(f)
+    try:
+        key_table = KeyTable(keymap)
+    except KeymapError as e:
+        parser.error(str(e))
+
+    midi = load_midi(args.midi_file)
+    if not 0 <= args.track < len(midi.tracks):
+        parser.error(f"{args.midi_file} has {len(midi.tracks)} tracks")
+    bank = ToneBank(args.sample_rate)
+    variants = list(itertools.product(args.transpose, args.skyline))
+    root, extension = os.path.splitext(args.output)
+
+    for transpose, skyline_mode in variants:
+        compiled = compile_midi(midi, args.track, key_table, octave_management=not args.no_octaves,
+                                transpose=transpose, max_rate=args.thin,
+                                skyline_mode=None if skyline_mode == 'none' else skyline_mode)
+        path = args.output
+        if len(variants) > 1:
+            path = f"{root}_t{transpose:+d}_{skyline_mode}{extension or '.wav'}"
+        try:
+            _, render_seconds = preview(compiled, path, sink=sounddevice_sink if args.play else None,
+                                        keymap=key_table, sample_rate=args.sample_rate, bank=bank)
+        except PreviewError as e:
+            raise SystemExit(str(e))
+        speedup = compiled.duration / render_seconds if render_seconds else float('inf')
+        logger.info(f"{path}: {compiled.note_count} notes, {compiled.unmapped_count} unmapped, "
+                    f"{compiled.duration:.1f}s rendered in {render_seconds * 1000:.1f} ms "
+                    f"({speedup:.0f}x real time)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,513 @@
+"""
+Per-song performance profiles keyed by MIDI content hash.
+
+A profile remembers how a song was last performed (track, keymap,
+transposition, speed, voice reduction and thinning budget) so selecting it
+again restores the tuned performance without re-deciding anything. The
+store is one JSON file indexed by the SHA-256 of the MIDI file, so a song is
+recognised after being renamed, moved or copied to another machine, and
+profiles can be exported and imported as a unit.
+
+Next to the profiles, the store caches compiled notes: the song's notes
+after tempo mapping, voice reduction and thinning, written as a small
+binary file per (song, track, reduction, budget). Loading one skips MIDI
+parsing and all of those passes; only the linear key scheduling is redone,
+so the result is a full CompiledTrack that can still be transposed live.
+The cache is capped at ``CACHE_MAX_BYTES``; the least recently used files
+are removed first.
+
+Cache layout (little-endian): ``CACHE_HEADER`` (magic, version, note count,
+duration), then ``note count`` x 3 float64 (start, end, MIDI note).
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import array
+import struct
+import hashlib
+import logging
+import threading
+
+from .compiler import schedule_notes
+from .player import MIN_SPEED, MAX_SPEED, MAX_TRANSPOSE
+
+PROFILE_VERSION = 1
+
+CACHE_MAGIC = b'SBNC'
+CACHE_VERSION = 1
+CACHE_EXTENSION = '.sbnc'
+
+# magic, version, note_count, duration
+CACHE_HEADER = struct.Struct('<4sHId')
+
+# Largest the compiled-note cache may grow before old files are removed
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Bytes read at a time while hashing a file
+HASH_CHUNK = 1 << 16
+
+
+def content_hash(path):
+    """SHA-256 of a file's contents as a hex string"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SongProfile:
+    """
+    Tuned performance of one song
+
+    :ivar content_hash: SHA-256 of the MIDI file
+    :ivar name: File name the song was last seen under (display only)
+    :ivar track: Track played
+    :ivar keymap: Custom keymap file, or None for the default keymap
+    :ivar transpose: Semitones the song is shifted by
+    :ivar speed: Playback speed factor
+    :ivar skyline: Voice reduction mode, or None for every voice
+    :ivar max_rate: Thinning budget in key actions per second, or None
+    :ivar analysis: Figures from the last compile (notes, unmapped, ...)
+    :ivar updated: Unix time the profile was last saved
+    """
+
+    SETTINGS = ('track', 'keymap', 'transpose', 'speed', 'skyline', 'max_rate')
+
+    def __init__(self, content_hash, name=None, track=0, keymap=None, transpose=0, speed=1.0,
+                 skyline=None, max_rate=None, analysis=None, updated=None):
+        self.content_hash = content_hash
+        self.name = name
+        self.track = track
+        self.keymap = keymap
+        self.transpose = transpose
+        self.speed = speed
+        self.skyline = skyline
+        self.max_rate = max_rate
+        self.analysis = analysis or {}
+        self.updated = updated
+
+    def to_dict(self):
+        data = {'hash': self.content_hash, 'name': self.name}
+        data.update((setting, getattr(self, setting)) for setting in self.SETTINGS)
+        data['analysis'] = self.analysis
+        data['updated'] = self.updated
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Profile from to_dict() output, possibly hand-edited or from another machine
+
+        Numbers given as strings are converted, speed and transposition are
+        clamped to what playback supports and the skyline must be one of
+        SKYLINE_MODES.
+
+        :raises ValueError: If a field has an unusable type or value
+        """
+        if not isinstance(data, dict):
+            raise ValueError(f"profile must be an object, got {type(data).__name__}")
+        song_hash = data.get('hash')
+        if not isinstance(song_hash, str) or not song_hash:
+            raise ValueError(f"invalid content hash {song_hash!r}")
+
+        settings = {}
+        if data.get('track') is not None:
+            settings['track'] = _integer(data['track'], 'track')
+            if settings['track'] < 0:
+                raise ValueError(f"invalid track {data['track']!r}")
+        if data.get('transpose') is not None:
+            transpose = _integer(data['transpose'], 'transpose')
+            settings['transpose'] = max(-MAX_TRANSPOSE, min(MAX_TRANSPOSE, transpose))
+        if data.get('speed') is not None:
+            settings['speed'] = max(MIN_SPEED, min(MAX_SPEED, _number(data['speed'], 'speed')))
+        if data.get('max_rate'):
+            settings['max_rate'] = _number(data['max_rate'], 'max_rate')
+            if settings['max_rate'] <= 0:
+                raise ValueError(f"invalid max_rate {data['max_rate']!r}")
+        for setting in ('keymap', 'skyline'):
+            value = data.get(setting)
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"invalid {setting} {value!r}")
+            settings[setting] = value or None
+        if settings['skyline'] is not None:
+            # Imported here: the reduction itself needs numpy
+            from .skyline import SKYLINE_MODES
+            if settings['skyline'] not in SKYLINE_MODES:
+                raise ValueError(f"invalid skyline {settings['skyline']!r}")
+
+        name = data.get('name')
+        analysis = data.get('analysis')
+        updated = data.get('updated')
+        return cls(song_hash, name if isinstance(name, str) else None,
+                   analysis=analysis if isinstance(analysis, dict) else None,
+                   updated=updated if isinstance(updated, (int, float)) and not isinstance(updated, bool)
+                   else None,
+                   **settings)
+
+    def __repr__(self):
+        return (f"SongProfile({self.name or self.content_hash[:12]!r}, track={self.track}, "
+                f"transpose={self.transpose}, speed={self.speed}, skyline={self.skyline!r}, "
+                f"max_rate={self.max_rate})")
+
+
+def _number(value, name):
+    """Finite float from a number or numeric string"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"invalid {name} {value!r}")
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"invalid {name} {value!r}")
+    if not math.isfinite(number):
+        raise ValueError(f"invalid {name} {value!r}")
+    return number
+
+
+def _integer(value, name):
+    """int from a whole number or numeric string"""
+    number = _number(value, name)
+    if not number.is_integer():
+        raise ValueError(f"invalid {name} {value!r}")
+    return int(number)
+
+
+def analysis_summary(compiled):
+    """Figures worth keeping from a compiled track"""
+    summary = {
+        'notes': compiled.note_count,
+        'unmapped': compiled.unmapped_count,
+        'octave_shifts': compiled.octave_shifts,
+        'duration_s': round(compiled.duration, 3),
+    }
+    if compiled.thinning is not None:
+        summary['thinning'] = compiled.thinning.summary()
+    if compiled.skyline is not None:
+        summary['skyline'] = {'mode': compiled.skyline.mode, 'notes_in': compiled.skyline.notes_in,
+                              'notes_out': compiled.skyline.notes_out}
+    return summary
+
+
+class ProfileStore:
+    """
+    Song profiles and compiled-note cache
+
+    Safe to share between the GUI and playback threads.
+
+    :param path: JSON file the profiles are loaded from and saved to (None
+                 keeps them in memory)
+    :param cache_dir: Directory for compiled notes (None disables the cache)
+    :param cache_limit: Bytes of compiled notes kept before the least
+                        recently used files are removed
+    """
+
+    def __init__(self, path=None, cache_dir=None, logger=None, cache_limit=CACHE_MAX_BYTES):
+        self.path = path
+        self.cache_dir = cache_dir
+        self.cache_limit = cache_limit
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._profiles = {}
+        # (path, size, mtime) -> content hash, so a song is only hashed once per change
+        self._hashes = {}
+        if path:
+            self.load()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._profiles)
+
+    def __contains__(self, song_hash):
+        with self._lock:
+            return song_hash in self._profiles
+
+    def hash_file(self, midi_file):
+        """Content hash of a MIDI file, remembered until the file changes"""
+        midi_file = os.path.abspath(midi_file)
+        stat = os.stat(midi_file)
+        key = (midi_file, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            song_hash = self._hashes.get(key)
+        if song_hash is None:
+            song_hash = content_hash(midi_file)
+            with self._lock:
+                self._hashes[key] = song_hash
+        return song_hash
+
+    def get(self, song_hash):
+        """Profile for a content hash, or None"""
+        with self._lock:
+            return self._profiles.get(song_hash)
+
+    def lookup(self, midi_file):
+        """Profile for a MIDI file, or None if the song has none or cannot be read"""
+        try:
+            return self.get(self.hash_file(midi_file))
+        except OSError:
+            return None
+
+    def remember(self, midi_file, compiled=None, **settings):
+        """
+        Save the settings a song was performed with
+
+        :param midi_file: MIDI file performed
+        :param compiled: CompiledTrack it was performed from, for the analysis figures
+        :param settings: Any of SongProfile.SETTINGS; others keep their saved values
+        :return: SongProfile
+        :raises ValueError: For an unknown setting
+        """
+        unknown = set(settings) - set(SongProfile.SETTINGS)
+        if unknown:
+            raise ValueError(f"Unknown profile settings: {', '.join(sorted(unknown))}")
+
+        song_hash = self.hash_file(midi_file)
+        with self._lock:
+            profile = self._profiles.get(song_hash) or SongProfile(song_hash)
+            same_reduction = all(settings.get(setting, getattr(profile, setting)) == getattr(profile, setting)
+                                 for setting in ('track', 'skyline', 'max_rate'))
+            profile.name = os.path.basename(midi_file)
+            for setting, value in settings.items():
+                setattr(profile, setting, value)
+            if compiled is not None:
+                analysis = analysis_summary(compiled)
+                # Tracks loaded from the note cache carry no reduction reports;
+                # keep the saved ones while they still describe the same reduction
+                if same_reduction:
+                    for report in ('skyline', 'thinning'):
+                        if report not in analysis and report in profile.analysis:
+                            analysis[report] = profile.analysis[report]
+                profile.analysis = analysis
+            profile.updated = round(time.time())
+            self._profiles[song_hash] = profile
+        self._save_logged()
+        return profile
+
+    def forget(self, song_hash):
+        with self._lock:
+            removed = self._profiles.pop(song_hash, None)
+        if removed is not None:
+            self._save_logged()
+        return removed
+
+    def to_dict(self, hashes=None):
+        with self._lock:
+            profiles = [profile.to_dict() for song_hash, profile in sorted(self._profiles.items())
+                        if hashes is None or song_hash in hashes]
+        return {'version': PROFILE_VERSION, 'profiles': profiles}
+
+    def load(self):
+        """Load the profile file; a missing or unreadable file leaves the store empty"""
+        try:
+            with open(self.path, 'r') as f:
+                profiles = self._read_profiles(json.load(f), self.path)
+        except FileNotFoundError:
+            return
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.logger.error(f"Ignoring unreadable profiles {self.path}: {e}")
+            return
+        with self._lock:
+            self._profiles = {profile.content_hash: profile for profile in profiles}
+
+    def save(self):
+        if not self.path:
+            return
+        self._write_json(self.path, self.to_dict())
+
+    def export_profiles(self, path, hashes=None):
+        """
+        Write profiles to a file another machine can import
+
+        Only settings and analysis are exported; compiled notes are rebuilt
+        on the other side on first play.
+
+        :param hashes: Content hashes to export (default: every profile)
+        :return: Number of profiles written
+        """
+        data = self.to_dict(hashes)
+        self._write_json(path, data)
+        return len(data['profiles'])
+
+    def import_profiles(self, path, replace=True):
+        """
+        Merge profiles exported by export_profiles()
+
+        A custom keymap that is not a file on this machine is dropped, so the
+        song plays with the default keymap instead of failing to load.
+
+        :param replace: Overwrite profiles this store already has for a song;
+                        otherwise only new songs are added
+        :return: Number of profiles added or replaced
+        :raises ValueError: If the file is not a profile export
+        """
+        with open(path, 'r') as f:
+            try:
+                profiles = self._read_profiles(json.load(f), path)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                raise ValueError(f"Not a profile export: {path} ({e})")
+        for profile in profiles:
+            if profile.keymap and not os.path.isfile(profile.keymap):
+                self.logger.warning(f"Dropping missing keymap {profile.keymap} from imported profile "
+                                    f"{profile.name or profile.content_hash[:12]}")
+                profile.keymap = None
+
+        imported = 0
+        with self._lock:
+            for profile in profiles:
+                if replace or profile.content_hash not in self._profiles:
+                    self._profiles[profile.content_hash] = profile
+                    imported += 1
+        if imported:
+            self._save_logged()
+        return imported
+
+    def cache_path(self, song_hash, track, skyline=None, max_rate=None, speed=1.0, transpose=0,
+                   octave_management=True):
+        """
+        Compiled-note file for one way of reducing a song's track
+
+        Thinned notes also depend on the playback speed and, through the
+        octave shifts counted against the budget, on the transposition.
+        """
+        rate = 'all'
+        if max_rate:
+            rate = f"{float(max_rate):g}x{float(speed):g}" + (f"o{transpose:+d}" if octave_management else '')
+        return os.path.join(self.cache_dir,
+                            f"{song_hash}_t{track}_{skyline or 'all'}_{rate}{CACHE_EXTENSION}")
+
+    def store_notes(self, midi_file, track, compiled, skyline=None, max_rate=None, speed=1.0):
+        """
+        Cache a compiled track's notes for load_compiled()
+
+        :return: Cache file written, or None when caching is disabled or failed
+        """
+        if not self.cache_dir or compiled.notes is None:
+            return None
+        path = self.cache_path(self.hash_file(midi_file), track, skyline, max_rate, speed,
+                               compiled.transpose, compiled.octave_management)
+        values = array.array('d', (value for note in compiled.notes for value in note))
+        if sys.byteorder == 'big':
+            values.byteswap()
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, len(compiled.notes),
+                                          compiled.duration))
+                values.tofile(f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            self.logger.error(f"Failed to cache compiled notes {path}: {e}")
+            return None
+        self.prune_cache(keep=path)
+        return path
+
+    def prune_cache(self, keep=None):
+        """
+        Remove the least recently used compiled-note files until the cache fits cache_limit
+
+        :param keep: Cache file never to remove (the one just written)
+        :return: Number of files removed
+        """
+        if not self.cache_dir:
+            return 0
+        files = []
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(CACHE_EXTENSION) and entry.is_file():
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError as e:
+            self.logger.error(f"Failed to list note cache {self.cache_dir}: {e}")
+            return 0
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.cache_limit:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                self.logger.error(f"Failed to remove cached notes {path}: {e}")
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def load_compiled(self, midi_file, track, key_table, skyline=None, max_rate=None,
+                      octave_management=True, transpose=0, speed=1.0):
+        """
+        Rebuild a compiled track from cached notes without parsing the MIDI file
+
+        :param key_table: KeyTable to schedule with
+        :return: CompiledTrack, or None if nothing usable is cached
+        """
+        if not self.cache_dir:
+            return None
+        started = time.perf_counter()
+        try:
+            path = self.cache_path(self.hash_file(midi_file), track, skyline, max_rate, speed,
+                                   transpose, octave_management)
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            # Marks the file recently used for prune_cache()
+            os.utime(path)
+        except OSError:
+            pass
+
+        try:
+            magic, version, note_count, duration = CACHE_HEADER.unpack_from(data, 0)
+        except struct.error:
+            magic = version = None
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            self.logger.warning(f"Ignoring unreadable note cache {path}")
+            return None
+        values = array.array('d')
+        values.frombytes(data[CACHE_HEADER.size:CACHE_HEADER.size + note_count * 3 * values.itemsize])
+        if len(values) != note_count * 3:
+            self.logger.warning(f"Ignoring truncated note cache {path}")
+            return None
+        if sys.byteorder == 'big':
+            values.byteswap()
+
+        notes = [[values[index], values[index + 1], int(values[index + 2])]
+                 for index in range(0, len(values), 3)]
+        compiled = schedule_notes(notes, duration, key_table, octave_management, transpose)
+        compiled.compile_seconds = time.perf_counter() - started
+        return compiled
+
+    def _read_profiles(self, data, source):
+        """Profiles in a profile file; entries that fail validation are skipped and logged"""
+        version = data.get('version', PROFILE_VERSION)
+        if version > PROFILE_VERSION:
+            raise ValueError(f"profile version {version} is newer than supported")
+        profiles = []
+        for index, entry in enumerate(data['profiles']):
+            try:
+                profiles.append(SongProfile.from_dict(entry))
+            except ValueError as e:
+                self.logger.warning(f"Skipping profile {index} in {source}: {e}")
+        return profiles
+
+    def _write_json(self, path, data):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, path)
+
+    def _save_logged(self):
+        try:
+            self.save()
+        except OSError as e:
+            self.logger.error(f"Failed to save profiles {self.path}: {e}")
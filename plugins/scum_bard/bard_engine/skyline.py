@@ -0,0 +1,118 @@
+"""
+Reduce polyphonic notes to a single voice ("skyline").
+
+In-game instruments sound one key at a time, so pressing every note of a
+chord only spends injection throughput. The skyline cuts the track into
+time slices at every note boundary and keeps one note per slice:
+
+- ``highest``: the highest note sounding in the slice
+- ``salient``: the highest note struck within the last ``salience_window``
+  seconds, falling back to the highest held note, so a moving melody is not
+  masked by a long note held above it
+
+Slices are computed with numpy over a pitch x slice coverage matrix built
+from difference arrays, so a 10k-note track reduces in milliseconds. A
+winning note that is only uncovered by a higher note ending is not struck
+again; the reduced voice contains only notes that start with a key press.
+"""
+
+import time
+from collections import namedtuple
+
+import numpy as np
+
+SKYLINE_MODES = ('highest', 'salient')
+
+# Seconds after its onset during which a note outranks notes only being held
+SALIENCE_WINDOW = 0.25
+
+# Length given to zero-length notes so they can win a slice (seconds)
+MIN_NOTE_LENGTH = 0.001
+
+SkylineReport = namedtuple('SkylineReport', ['mode', 'notes_in', 'notes_out', 'seconds'])
+
+
+def _coverage(rows, first, last, height, width):
+    """Boolean (height, width - 1) matrix: row covers slice ``first..last - 1``"""
+    size = height * width
+    diff = (np.bincount(rows * width + first, minlength=size)
+            - np.bincount(rows * width + last, minlength=size))
+    return np.cumsum(diff.reshape(height, width), axis=1)[:, :-1] > 0
+
+
+def _top_row(active):
+    """Highest active row of every column, or -1 where none is active"""
+    height = active.shape[0]
+    top = height - 1 - np.argmax(active[::-1], axis=0)
+    return np.where(active.any(axis=0), top, -1)
+
+
+def skyline(notes, mode='highest', salience_window=SALIENCE_WINDOW):
+    """
+    Keep one voice of a polyphonic track
+
+    :param notes: List of [start, end, note] sorted by start; see collect_notes()
+    :param mode: One of SKYLINE_MODES
+    :param salience_window: Seconds a struck note outranks held ones (``salient``)
+    :return: New list of [start, end, note] sorted by start, never overlapping
+    :raises ValueError: For an unknown mode
+    """
+    if mode not in SKYLINE_MODES:
+        raise ValueError(f"Unknown skyline mode {mode!r}; expected one of {', '.join(SKYLINE_MODES)}")
+    if not notes:
+        return []
+
+    data = np.asarray(notes, dtype=np.float64)
+    starts = data[:, 0]
+    ends = np.maximum(data[:, 1], starts + MIN_NOTE_LENGTH)
+    pitches = data[:, 2].astype(np.int64)
+
+    # Only the pitch range in use gets a row
+    low = int(pitches.min())
+    rows = pitches - low
+    height = int(pitches.max()) - low + 1
+
+    cuts = [starts, ends]
+    if mode == 'salient':
+        fresh_ends = np.minimum(ends, starts + salience_window)
+        cuts.append(fresh_ends)
+    bounds = np.unique(np.concatenate(cuts))
+    width = len(bounds)
+    first = np.searchsorted(bounds, starts)
+
+    winner = _top_row(_coverage(rows, first, np.searchsorted(bounds, ends), height, width))
+    if mode == 'salient':
+        fresh = _top_row(_coverage(rows, first, np.searchsorted(bounds, fresh_ends), height, width))
+        winner = np.where(fresh >= 0, fresh, winner)
+
+    # Whether the winning pitch is struck at the start of each slice
+    struck_at = np.zeros((height, width), dtype=bool)
+    struck_at[rows, first] = True
+    slices = np.arange(width - 1)
+    struck = (winner >= 0) & struck_at[np.maximum(winner, 0), slices]
+
+    # A new segment starts wherever the winner changes or is struck again
+    segment_start = struck.copy()
+    segment_start[0] = True
+    segment_start[1:] |= winner[1:] != winner[:-1]
+    segment_starts = np.flatnonzero(segment_start)
+    segment_ends = np.append(segment_starts[1:], width - 1)
+
+    played = struck[segment_starts]
+    return [
+        [start, end, pitch]
+        for start, end, pitch in zip(bounds[segment_starts[played]].tolist(),
+                                     bounds[segment_ends[played]].tolist(),
+                                     (winner[segment_starts[played]] + low).tolist())
+    ]
+
+
+def reduce_notes(notes, mode='highest', salience_window=SALIENCE_WINDOW):
+    """
+    skyline() with a report of what it did
+
+    :return: (reduced notes, SkylineReport)
+    """
+    started = time.perf_counter()
+    reduced = skyline(notes, mode, salience_window)
+    return reduced, SkylineReport(mode, len(notes), len(reduced), time.perf_counter() - started)
@@ -0,0 +1,276 @@
+"""
+Thin dense passages so the key backend can keep up.
+
+Fast ornaments and stacked doublings can ask for more key actions per
+second than the game registers or the backend can inject; playback then
+falls behind and never catches up. ``thin_notes`` rewrites a track's notes
+against a key action budget before they are scheduled:
+
+1. short grace notes too close to the note they lead into are merged into it,
+2. octave doublings inside a chord are dropped (every octave of a pitch
+   class plays the same key, so only the top one is kept),
+3. chords that cannot be injected before the next onset keep their top voice,
+4. a note that starts before the backend has finished injecting the chord
+   before it is pushed back until it has; a note that would land more than
+   ``max_shift`` late is dropped instead of letting the whole passage drift.
+   Notes the budget can keep up with are never moved.
+
+The budget counts the octave-shift presses schedule_notes() will add
+between notes, and is in key actions per second of playback: at a faster
+speed the same notes are injected in less time, so fewer fit.
+"""
+
+# Key actions each note costs the backend (key-down and key-up)
+ACTIONS_PER_NOTE = 2
+
+# Key actions each octave of a shift costs (one modifier press)
+ACTIONS_PER_OCTAVE_SHIFT = 1
+
+# Key actions per second the game reliably registers (two per frame at 60 fps)
+DEFAULT_MAX_RATE = 120.0
+
+# Onsets closer than this (seconds) are treated as one chord
+CHORD_WINDOW = 0.03
+
+# Notes no longer than this (seconds) may be merged as grace notes
+GRACE_DURATION = 0.08
+
+# Latest a quantized note may land behind its written time (seconds)
+MAX_QUANTIZE_SHIFT = 0.05
+
+# Window over which peak rates are measured (seconds)
+PEAK_WINDOW = 1.0
+
+
+def peak_rate(times, window=PEAK_WINDOW):
+    """Most events inside any ``window``-second span, per second"""
+    peak = 0
+    first = 0
+    for last, event_time in enumerate(times):
+        while event_time - times[first] >= window:
+            first += 1
+        peak = max(peak, last - first + 1)
+    return round(peak / window, 2)
+
+
+class ThinningReport:
+    """
+    What thin_notes() changed
+
+    :ivar max_rate: Key action budget the notes were thinned to (per second)
+    :ivar speed: Playback speed the budget was applied at
+    :ivar notes_in: Notes before thinning
+    :ivar notes_out: Notes after thinning
+    :ivar octave_doubles: Octave (and unison) doublings dropped from chords
+    :ivar chord_notes: Lower chord voices dropped to fit the budget
+    :ivar grace_notes: Grace notes merged into the note they lead into
+    :ivar rate_drops: Notes dropped because quantizing would make them too late
+    :ivar quantized: Notes whose start moved
+    :ivar max_shift: Largest start delay applied to any note (seconds)
+    :ivar peak_notes_before: Peak note onsets per second before thinning
+    :ivar peak_notes_after: Peak note onsets per second after thinning
+    """
+
+    def __init__(self, max_rate, speed=1.0):
+        self.max_rate = max_rate
+        self.speed = speed
+        self.notes_in = 0
+        self.notes_out = 0
+        self.octave_doubles = 0
+        self.chord_notes = 0
+        self.grace_notes = 0
+        self.rate_drops = 0
+        self.quantized = 0
+        self.max_shift = 0.0
+        self.peak_notes_before = 0.0
+        self.peak_notes_after = 0.0
+
+    @property
+    def changed(self):
+        return self.notes_in != self.notes_out or self.quantized > 0
+
+    def summary(self):
+        return {
+            'max_rate': self.max_rate,
+            'speed': self.speed,
+            'notes_in': self.notes_in,
+            'notes_out': self.notes_out,
+            'octave_doubles': self.octave_doubles,
+            'chord_notes': self.chord_notes,
+            'grace_notes': self.grace_notes,
+            'rate_drops': self.rate_drops,
+            'quantized': self.quantized,
+            'max_shift_ms': round(self.max_shift * 1000, 3),
+            'peak_notes_per_s_before': self.peak_notes_before,
+            'peak_notes_per_s_after': self.peak_notes_after,
+        }
+
+    def format_summary(self):
+        budget = f"{self.max_rate:.0f} actions/s" + (f" at {self.speed:g}x speed" if self.speed != 1.0 else "")
+        if not self.changed:
+            return f"Thinning at {budget}: no changes needed"
+        return (f"Thinning at {budget}: {self.notes_in} -> {self.notes_out} notes "
+                f"({self.octave_doubles} octave doubles, {self.chord_notes} chord voices, "
+                f"{self.grace_notes} grace notes, {self.rate_drops} over-budget), "
+                f"{self.quantized} quantized by up to {self.max_shift * 1000:.1f} ms, "
+                f"peak {self.peak_notes_before:.0f} -> {self.peak_notes_after:.0f} notes/s")
+
+
+def group_chords(notes, window=CHORD_WINDOW):
+    """
+    Split notes into chords of onsets within ``window`` of the chord's first note
+
+    :param notes: List of [start, end, note] sorted by start
+    :return: List of chords, each a list of notes in their original order
+    """
+    chords = []
+    for entry in notes:
+        if chords and entry[0] - chords[-1][0][0] <= window:
+            chords[-1].append(entry)
+        else:
+            chords.append([entry])
+    return chords
+
+
+def drop_octave_doubles(chord):
+    """
+    Keep only the highest note of each pitch class sounding together, in order
+
+    Notes of one pitch class that do not overlap in time are a repeated
+    or legato line, not a doubling, and are all kept.
+    """
+    def doubled(index, entry):
+        # The higher note wins; of equal notes, the one written first
+        return any(other[2] % 12 == entry[2] % 12 and other[0] < entry[1] and entry[0] < other[1]
+                   and (other[2], -other_index) > (entry[2], -index)
+                   for other_index, other in enumerate(chord) if other_index != index)
+    return [entry for index, entry in enumerate(chord) if not doubled(index, entry)]
+
+
+def merge_grace_notes(notes, min_gap, grace_duration=GRACE_DURATION, chord_window=CHORD_WINDOW):
+    """
+    Drop short notes that lead into a later note sooner than ``min_gap``
+
+    A grace note is short and released by the time the note after it
+    sounds; notes held across the next onset belong to a chord and are
+    left alone. Notes are walked last to first so a fast run is thinned to
+    the notes that fit rather than collapsed into its final note.
+
+    :param notes: List of [start, end, note] sorted by start
+    :return: (kept notes in order, number merged)
+    """
+    kept = []
+    merged = 0
+    next_onset = float('inf')
+    for entry in reversed(notes):
+        start, end, _ = entry
+        if (end - start <= grace_duration and start < next_onset
+                and next_onset - start < min_gap and end <= next_onset + chord_window):
+            merged += 1
+            continue
+        kept.append(entry)
+        if start < next_onset:
+            next_onset = start
+    kept.reverse()
+    return kept, merged
+
+
+def thin_notes(notes, max_rate=DEFAULT_MAX_RATE, chord_window=CHORD_WINDOW,
+               grace_duration=GRACE_DURATION, max_shift=MAX_QUANTIZE_SHIFT, speed=1.0,
+               octaves=None, transpose=0):
+    """
+    Thin and quantize notes so they fit a key action budget
+
+    :param notes: List of [start, end, note] sorted by start; see collect_notes()
+    :param max_rate: Key actions per second the game and backend can sustain
+    :param chord_window: Seconds within which onsets form one chord
+    :param grace_duration: Longest note that may be merged as a grace note
+    :param max_shift: Latest a note may be pushed back before it is dropped
+    :param speed: Playback speed factor the notes will be played at
+    :param octaves: Instrument octave of each MIDI note (KeyTable.octaves),
+                    with None for unmapped notes, to count octave-shift
+                    presses against the budget; None when the schedule has
+                    no octave shifts
+    :param transpose: Semitones the notes will be shifted by when scheduled
+    :return: (new list of [start, end, note] sorted by start, ThinningReport)
+    :raises ValueError: If ``max_rate`` or ``speed`` is not positive
+    """
+    if max_rate <= 0:
+        raise ValueError(f"Key action budget must be positive, got {max_rate}")
+    if speed <= 0:
+        raise ValueError(f"Playback speed must be positive, got {speed}")
+
+    # Seconds of song time the backend needs for one key action
+    action_cost = speed / max_rate
+    note_cost = ACTIONS_PER_NOTE * action_cost
+
+    def octave_of(note):
+        note += transpose
+        return octaves[note] if octaves is not None and 0 <= note < len(octaves) else None
+
+    def shift_actions(previous, octave):
+        if previous is None or octave is None:
+            return 0
+        return abs(octave - previous) * ACTIONS_PER_OCTAVE_SHIFT
+
+    report = ThinningReport(max_rate, speed)
+    report.notes_in = len(notes)
+    report.peak_notes_before = peak_rate([start for start, _, _ in notes])
+
+    notes, report.grace_notes = merge_grace_notes(notes, note_cost, grace_duration, chord_window)
+
+    chords = []
+    for chord in group_chords(notes, chord_window):
+        kept = drop_octave_doubles(chord)
+        report.octave_doubles += len(chord) - len(kept)
+        chords.append(kept)
+
+    # Walk backwards so every chord sees the gap to the next onset that will
+    # actually be played
+    playable = []
+    next_onset = float('inf')
+    for chord in reversed(chords):
+        onset = chord[0][0]
+        gap = next_onset - onset
+        if len(chord) > 1:
+            actions = ACTIONS_PER_NOTE * len(chord)
+            chord_octaves = [octave_of(note) for _, _, note in chord]
+            actions += sum(shift_actions(previous, octave)
+                           for previous, octave in zip(chord_octaves, chord_octaves[1:]))
+            if actions * action_cost > gap:
+                report.chord_notes += len(chord) - 1
+                chord = [max(chord, key=lambda entry: entry[2])]
+        playable.append(chord)
+        next_onset = onset
+    playable.reverse()
+
+    # schedule_notes() starts in the lowest octave played
+    played_octaves = [octave for octave in (octave_of(note) for _, _, note in notes) if octave is not None]
+    current_octave = min(played_octaves) if played_octaves else None
+
+    # A chord's notes may start together, but not before the backend has
+    # injected every action of the chord before it
+    thinned = []
+    ready_at = float('-inf')
+    for chord in playable:
+        earliest = ready_at
+        for start, end, note in chord:
+            onset = max(start, earliest)
+            if onset - start > max_shift:
+                report.rate_drops += 1
+                continue
+
+            if onset != start:
+                report.quantized += 1
+                report.max_shift = max(report.max_shift, onset - start)
+            thinned.append([onset, max(end, onset), note])
+
+            octave = octave_of(note)
+            actions = ACTIONS_PER_NOTE + shift_actions(current_octave, octave)
+            if octave is not None:
+                current_octave = octave
+            ready_at = max(ready_at, onset) + actions * action_cost
+
+    report.notes_out = len(thinned)
+    report.peak_notes_after = peak_rate([start for start, _, _ in thinned])
+    return thinned, report
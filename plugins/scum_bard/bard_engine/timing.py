@@ -0,0 +1,144 @@
+"""
+Playback clocks and timing statistics for Scum Bard.
+
+Clocks expose ``now()`` and ``sleep_until(deadline)`` on a monotonic
+seconds timeline. ``HybridClock`` trades a little CPU for sub-millisecond
+accuracy by sleeping coarsely and spinning through the last stretch.
+"""
+
+import time
+
+# Stop sleeping this long before a deadline and spin the rest (seconds)
+DEFAULT_SPIN_THRESHOLD = 0.002
+
+# Never spin longer than this, even if a sleep returned early (seconds)
+MAX_SPIN_DURATION = 0.005
+
+# Jitter histogram resolution and range
+HISTOGRAM_BUCKET_US = 10
+HISTOGRAM_RANGE_US = 100000
+
+
+class MonotonicClock:
+    """Wall clock that relies on time.sleep alone"""
+
+    def now(self):
+        return time.perf_counter()
+
+    def sleep_until(self, deadline):
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+
+
+class HybridClock(MonotonicClock):
+    """
+    Precision clock: coarse sleep until close to the deadline, then a short,
+    bounded spin on perf_counter.
+
+    :param spin_threshold: Seconds before the deadline at which to start spinning
+    :param max_spin: Upper bound on the spin phase in seconds
+    """
+
+    def __init__(self, spin_threshold=DEFAULT_SPIN_THRESHOLD, max_spin=MAX_SPIN_DURATION):
+        self.spin_threshold = spin_threshold
+        self.max_spin = max_spin
+
+    def sleep_until(self, deadline):
+        remaining = deadline - time.perf_counter()
+        if remaining > self.spin_threshold:
+            time.sleep(remaining - self.spin_threshold)
+
+        spin_end = min(deadline, time.perf_counter() + self.max_spin)
+        while time.perf_counter() < spin_end:
+            pass
+
+
+class JitterHistogram:
+    """
+    Fixed-bucket histogram of event lateness.
+
+    Lateness is how far after its deadline an event was dispatched; early
+    events count as zero. Buckets are ``HISTOGRAM_BUCKET_US`` wide and values
+    beyond ``HISTOGRAM_RANGE_US`` land in the last bucket; the exact maximum is
+    tracked separately.
+    """
+
+    def __init__(self, bucket_us=HISTOGRAM_BUCKET_US, range_us=HISTOGRAM_RANGE_US):
+        self.bucket_us = bucket_us
+        self.buckets = [0] * (range_us // bucket_us + 1)
+        self.count = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+
+    def record(self, lateness):
+        """
+        Record one event.
+
+        :param lateness: Seconds the event was dispatched after its deadline
+        """
+        lateness_us = max(0.0, lateness * 1e6)
+        index = min(int(lateness_us // self.bucket_us), len(self.buckets) - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_us += lateness_us
+        if lateness_us > self.max_us:
+            self.max_us = lateness_us
+
+    def percentile(self, percent):
+        """
+        Upper bound of the bucket containing the given percentile, in microseconds
+
+        The last bucket is open-ended, so a percentile landing there is the
+        exact maximum.
+        """
+        if not self.count:
+            return 0.0
+
+        target = self.count * percent / 100.0
+        seen = 0
+        last = len(self.buckets) - 1
+        for index, bucket_count in enumerate(self.buckets[:last]):
+            seen += bucket_count
+            if seen >= target:
+                return round(min((index + 1) * self.bucket_us, self.max_us), 1)
+        return round(self.max_us, 1)
+
+    def summary(self):
+        """Return jitter statistics in microseconds"""
+        return {
+            'events': self.count,
+            'mean_us': round(self.total_us / self.count, 1) if self.count else 0.0,
+            'p50_us': self.percentile(50),
+            'p99_us': self.percentile(99),
+            'max_us': round(self.max_us, 1),
+        }
+
+    def format_summary(self):
+        stats = self.summary()
+        return (f"Timing jitter over {stats['events']} events: "
+                f"p50={stats['p50_us']:.0f}us p99={stats['p99_us']:.0f}us "
+                f"max={stats['max_us']:.0f}us")
+
+
+class VirtualClock:
+    """
+    Deterministic clock for benchmarks and tests.
+
+    Sleeping jumps straight to the deadline, so a whole song "plays" in as
+    long as the engine needs to process it. ``advance`` lets a simulated key
+    backend charge time for each injected key.
+    """
+
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    def sleep_until(self, deadline):
+        if deadline > self.time:
+            self.time = deadline
+
+    def advance(self, seconds):
+        self.time += seconds
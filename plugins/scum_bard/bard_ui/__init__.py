@@ -0,0 +1,15 @@
+"""
+Qt widgets for the Scum Bard plugin.
+
+Unlike bard_engine this package imports PyQt5 at module level; load it only
+where a GUI exists.
+"""
+
+from .piano_roll import PianoRollWidget, roll_items
+from .library_model import LibraryModel
+
+__all__ = [
+    'LibraryModel',
+    'PianoRollWidget',
+    'roll_items',
+]
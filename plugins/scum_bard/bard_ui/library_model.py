@@ -0,0 +1,66 @@
+"""
+List model over library search results.
+
+A search can match the whole library; the model hands rows to the view in
+batches as it scrolls (``canFetchMore``/``fetchMore``), so replacing the
+results on every keystroke costs the same for ten matches or ten thousand.
+"""
+
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+
+# Rows handed to the view at a time
+BATCH_SIZE = 100
+
+
+class LibraryModel(QAbstractListModel):
+    """
+    Search results as "name - title" rows; UserRole holds the file path
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entries = []
+        self._loaded = 0
+
+    def set_results(self, entries):
+        """Replace the results with a list of LibraryEntry"""
+        self.beginResetModel()
+        self._entries = entries
+        self._loaded = min(BATCH_SIZE, len(entries))
+        self.endResetModel()
+
+    def result_count(self):
+        """Number of results, loaded into the view or not"""
+        return len(self._entries)
+
+    def path(self, row):
+        return self._entries[row].path
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and self._loaded < len(self._entries)
+
+    def fetchMore(self, parent):
+        if parent.isValid():
+            return
+        count = min(BATCH_SIZE, len(self._entries) - self._loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < self._loaded:
+            return None
+        entry = self._entries[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{entry.name} - {entry.title}" if entry.title else entry.name
+        if role == Qt.ToolTipRole:
+            tags = ', '.join(entry.tags)
+            return f"{entry.path}\n{tags}" if tags else entry.path
+        if role == Qt.UserRole:
+            return entry.path
+        return None
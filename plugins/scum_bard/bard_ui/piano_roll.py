@@ -0,0 +1,242 @@
+"""
+Piano-roll view of a compiled schedule with a live playhead.
+
+The roll is drawn once per tile into cached QPixmaps. The view shows one
+page of the song at a time and the playhead sweeps across it; each frame
+repaints only the strip the playhead left and the strip it entered, so the
+cost of a frame does not depend on how many notes the song has. The page
+flips (one full repaint) when the playhead runs off the right edge.
+"""
+
+from collections import OrderedDict
+
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import Qt, QTimer, QRect
+from PyQt5.QtGui import QPainter, QPixmap, QColor, QPen
+
+from bard_engine.compiler import ACTION_KEY_DOWN, ACTION_KEY_UP, ACTION_OCTAVE_UP, ACTION_OCTAVE_DOWN
+
+# Horizontal scale of the roll
+PIXELS_PER_SECOND = 60
+
+# Width of one cached tile in pixels
+TILE_WIDTH = 512
+
+# Most tiles kept rendered at once
+MAX_CACHED_TILES = 64
+
+# Playhead refresh interval (milliseconds)
+FRAME_INTERVAL = 33
+
+# Width of the strip repainted around the playhead (pixels)
+PLAYHEAD_STRIP = 6
+
+BACKGROUND_COLOR = QColor(20, 20, 30)
+C_ROW_COLOR = QColor(40, 40, 55)
+MAPPED_COLOR = QColor(80, 200, 120)
+UNMAPPED_COLOR = QColor(220, 70, 70)
+OCTAVE_UP_COLOR = QColor(240, 220, 80)
+OCTAVE_DOWN_COLOR = QColor(240, 140, 40)
+PLAYHEAD_COLOR = QColor(255, 255, 255)
+
+
+def roll_items(compiled):
+    """
+    Collect what the roll draws from a schedule
+
+    Mapped notes come from the key timeline; notes the keymap could not
+    play come from the track's source notes (CompiledTrack only).
+
+    :param compiled: CompiledTrack or KeyScript
+    :return: (notes as (start, end, pitch, mapped), octave shifts as (time, up))
+    """
+    notes = []
+    shifts = []
+    held = {}
+    for event_time, action, key, note in compiled.events:
+        if action == ACTION_KEY_DOWN:
+            held[key] = (event_time, note)
+        elif action == ACTION_KEY_UP:
+            started = held.pop(key, None)
+            if started is not None:
+                notes.append((started[0], event_time, started[1], True))
+        elif action in (ACTION_OCTAVE_UP, ACTION_OCTAVE_DOWN):
+            shifts.append((event_time, action == ACTION_OCTAVE_UP))
+    for key, (start, note) in held.items():
+        notes.append((start, max(start, compiled.duration), note, True))
+
+    source = getattr(compiled, 'notes', None)
+    key_table = getattr(compiled, 'key_table', None)
+    if source is not None and key_table is not None:
+        transpose = compiled.transpose
+        keys = key_table.keys
+        for start, end, note in source:
+            pitch = note + transpose
+            if not 0 <= pitch < len(keys) or keys[pitch] is None:
+                notes.append((start, end, min(max(pitch, 0), len(keys) - 1), False))
+
+    return notes, shifts
+
+
+class PianoRollWidget(QWidget):
+    """
+    Paged piano roll with a playhead
+
+    Call set_track() with a compiled schedule, then either set_position()
+    directly or follow() a callable that returns the playing position.
+    """
+
+    def __init__(self, parent=None, pixels_per_second=PIXELS_PER_SECOND):
+        super().__init__(parent)
+        self.setMinimumHeight(100)
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.pixels_per_second = pixels_per_second
+
+        self.track = None
+        self._notes = []
+        self._shifts = []
+        self._tile_notes = {}
+        self._tile_shifts = {}
+        self._tiles = OrderedDict()
+        self._low = 0
+        self._high = 127
+        self._position = 0.0
+        self._page = 0
+
+        self._position_source = None
+        self._timer = QTimer(self)
+        self._timer.setInterval(FRAME_INTERVAL)
+        self._timer.timeout.connect(self._poll_position)
+
+    def set_track(self, compiled):
+        """Show a new schedule; tiles are rendered again on demand"""
+        self.track = compiled
+        self._notes, self._shifts = roll_items(compiled) if compiled is not None else ([], [])
+
+        pitches = [note[2] for note in self._notes]
+        self._low = min(pitches) - 1 if pitches else 59
+        self._high = max(pitches) + 1 if pitches else 73
+
+        # Bucket everything by the tiles it touches so a tile renders only its own notes
+        self._tile_notes = {}
+        for index, (start, end, _, _) in enumerate(self._notes):
+            for tile in range(self._tile_at(start), self._tile_at(end) + 1):
+                self._tile_notes.setdefault(tile, []).append(index)
+        self._tile_shifts = {}
+        for index, (shift_time, _) in enumerate(self._shifts):
+            self._tile_shifts.setdefault(self._tile_at(shift_time), []).append(index)
+
+        self._tiles.clear()
+        self._position = 0.0
+        self._page = 0
+        self.update()
+
+    def follow(self, position_source):
+        """
+        Move the playhead from ``position_source()`` every frame
+
+        :param position_source: Callable returning schedule seconds, or None
+                                while nothing is playing; None stops following
+        """
+        self._position_source = position_source
+        if position_source is None:
+            self._timer.stop()
+        else:
+            self._timer.start()
+
+    def set_position(self, seconds):
+        """Move the playhead, repainting only the strips it moved between"""
+        if seconds == self._position:
+            return
+        page_width = max(1, self.width())
+        old_x = self._playhead_x()
+        self._position = seconds
+        page = int(seconds * self.pixels_per_second // page_width)
+        if page != self._page:
+            self._page = page
+            self.update()
+            return
+        new_x = self._playhead_x()
+        self.update(QRect(old_x - PLAYHEAD_STRIP // 2, 0, PLAYHEAD_STRIP, self.height()))
+        self.update(QRect(new_x - PLAYHEAD_STRIP // 2, 0, PLAYHEAD_STRIP, self.height()))
+
+    def _poll_position(self):
+        if self._position_source is None or not self.isVisible():
+            return
+        position = self._position_source()
+        if position is not None:
+            self.set_position(position)
+
+    def _tile_at(self, seconds):
+        return int(seconds * self.pixels_per_second) // TILE_WIDTH
+
+    def _playhead_x(self):
+        return int(self._position * self.pixels_per_second) - self._page * max(1, self.width())
+
+    def _pitch_y(self, pitch, row_height):
+        return int((self._high - pitch) * row_height)
+
+    def _tile(self, index):
+        """Cached pixmap for tile ``index``, rendered on first use"""
+        pixmap = self._tiles.get(index)
+        if pixmap is not None:
+            self._tiles.move_to_end(index)
+            return pixmap
+
+        height = max(1, self.height())
+        pixmap = QPixmap(TILE_WIDTH, height)
+        pixmap.fill(BACKGROUND_COLOR)
+        painter = QPainter(pixmap)
+        row_height = height / (self._high - self._low + 1)
+        origin = index * TILE_WIDTH
+        scale = self.pixels_per_second
+
+        for pitch in range(self._low, self._high + 1):
+            if pitch % 12 == 0:
+                painter.fillRect(0, self._pitch_y(pitch, row_height), TILE_WIDTH,
+                                 max(1, int(row_height)), C_ROW_COLOR)
+
+        for note_index in self._tile_notes.get(index, ()):
+            start, end, pitch, mapped = self._notes[note_index]
+            x = int(start * scale) - origin
+            width = max(2, int((end - start) * scale))
+            painter.fillRect(x, self._pitch_y(pitch, row_height), width, max(2, int(row_height)),
+                             MAPPED_COLOR if mapped else UNMAPPED_COLOR)
+
+        for shift_index in self._tile_shifts.get(index, ()):
+            shift_time, up = self._shifts[shift_index]
+            painter.setPen(QPen(OCTAVE_UP_COLOR if up else OCTAVE_DOWN_COLOR, 1))
+            x = int(shift_time * scale) - origin
+            painter.drawLine(x, 0, x, height)
+        painter.end()
+
+        self._tiles[index] = pixmap
+        if len(self._tiles) > MAX_CACHED_TILES:
+            self._tiles.popitem(last=False)
+        return pixmap
+
+    def resizeEvent(self, event):
+        # Tiles are rendered at the widget height
+        self._tiles.clear()
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        area = event.rect()
+        painter.fillRect(area, BACKGROUND_COLOR)
+
+        if self.track is not None:
+            offset = self._page * max(1, self.width())
+            first = (offset + area.left()) // TILE_WIDTH
+            last = (offset + area.right()) // TILE_WIDTH
+            for index in range(first, last + 1):
+                tile_x = index * TILE_WIDTH - offset
+                visible = area.intersected(QRect(tile_x, 0, TILE_WIDTH, self.height()))
+                if not visible.isEmpty():
+                    painter.drawPixmap(visible, self._tile(index), visible.translated(-tile_x, 0))
+
+        x = self._playhead_x()
+        if area.left() - 1 <= x <= area.right() + 1:
+            painter.setPen(QPen(PLAYHEAD_COLOR, 2))
+            painter.drawLine(x, 0, x, self.height())
+        painter.end()
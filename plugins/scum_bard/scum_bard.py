@@ -11,6 +11,7 @@ import argparse
 import logging
 import traceback
 import threading
+import weakref
 
 try:
     import mido
@@ -21,12 +22,51 @@ except ImportError as e:
     print("Please install requirements: pip install -r requirements.txt")
     sys.exit(1)
 
+# Make the bundled playback engine importable whether this file is loaded as
+# part of the plugins package or directly by the overlay's plugin loader
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+if PLUGIN_DIR not in sys.path:
+    sys.path.insert(0, PLUGIN_DIR)
+
+from bard_engine import (MonotonicClock, HybridClock, JitterHistogram, PyAutoGuiBackend,
+                         LivePassthrough, load_midi,
+                         play_compiled, list_input_ports)
+from bard_engine import conduct, follow, PlaybackControl
+from bard_engine.player import MIN_SPEED, MAX_SPEED, MAX_TRANSPOSE
+from bard_engine.keyscript import export_keyscript
+from bard_engine.thinning import DEFAULT_MAX_RATE
+from bard_engine.skyline import SKYLINE_MODES
+from bard_engine.preview import preview, sounddevice_sink, PreviewError
+from bard_engine.compiler import get_first_octave, compile_midi, busiest_track
+from bard_engine.playlist import Playlist, Preparer, preparation_key
+from bard_engine.profiles import ProfileStore
+from bard_engine.library import LibraryIndex
+from bard_engine.keymap import DEFAULT_KEYMAP, KeyTable, KeymapError
+from bard_engine.ensemble import (DEFAULT_PORT as ENSEMBLE_PORT, DEFAULT_START_DELAY as ENSEMBLE_START_DELAY,
+                                  DEFAULT_HOST as ENSEMBLE_HOST, LAN_HOST)
+from bard_engine.timing import DEFAULT_SPIN_THRESHOLD
+
+# Playlist kept between sessions
+PLAYLIST_PATH = os.path.join(os.path.expanduser('~'), '.scumplug', 'scum_bard_playlist.json')
+
+# Per-song performance profiles and their compiled-note cache
+PROFILES_PATH = os.path.join(os.path.expanduser('~'), '.scumplug', 'scum_bard_profiles.json')
+PROFILE_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.scumplug', 'scum_bard_cache')
+
+# Names and tags of the files in the MIDI library, reused by the next scan
+LIBRARY_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.scumplug', 'scum_bard_library.json')
+
+# Songs bundled with the plugin; the file dialogs and library search start here
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
 class ScumBardError(Exception):
     """Custom exception for Scum Bard errors"""
     pass
 
 class ScumBard:
-    def __init__(self, midi_file=None, track=0, keymap_path=None, log_level=logging.INFO):
+    def __init__(self, midi_file=None, track=0, keymap_path=None, log_level=logging.INFO,
+                 precision=False, spin_threshold=DEFAULT_SPIN_THRESHOLD, live=False,
+                 speed=1.0, transpose=0, max_rate=None, skyline_mode=None, profiles=None):
         """
         Initialize ScumBard MIDI player with updated keymap
         
@@ -34,6 +74,16 @@ class ScumBard:
         :param track: Track number to play (default 0)
         :param keymap_path: Custom keymap JSON file
         :param log_level: Logging level
+        :param precision: Use the hybrid sleep/spin clock for note dispatch
+        :param spin_threshold: Seconds before each note to switch from sleeping to spinning
+        :param live: Live MIDI input mode; no MIDI file is required
+        :param speed: Playback speed factor (1.0 plays at the file's tempo)
+        :param transpose: Semitones to shift every note by
+        :param max_rate: Key actions per second the game and backend sustain;
+                         dense passages are thinned to fit (None plays every note)
+        :param skyline_mode: Reduce the track to one voice ('highest' or 'salient');
+                             None plays every voice
+        :param profiles: ProfileStore whose compiled-note cache compile() uses
         """
         logging.basicConfig(
             level=log_level, 
@@ -45,28 +95,37 @@ class ScumBard:
         )
         self.logger = logging.getLogger(__name__)
         
-        if not midi_file or not os.path.exists(midi_file):
+        # Live input mode plays without a file
+        if not live and (not midi_file or not os.path.exists(midi_file)):
             raise ScumBardError(f"MIDI file not found: {midi_file}")
         
         self.midi_file = midi_file
         self.track = track
+        self.keymap_path = keymap_path
+        self.profiles = profiles
+        self.precision = precision
+        self.spin_threshold = spin_threshold
+        if not MIN_SPEED <= speed <= MAX_SPEED:
+            raise ScumBardError(f"Speed must be between {MIN_SPEED} and {MAX_SPEED}")
+        self.speed = speed
+        if not -MAX_TRANSPOSE <= transpose <= MAX_TRANSPOSE:
+            raise ScumBardError(f"Transpose must be within +/-{MAX_TRANSPOSE} semitones")
+        self.transpose = transpose
+        if max_rate is not None and max_rate <= 0:
+            raise ScumBardError(f"Key action rate must be positive, got {max_rate}")
+        self.max_rate = max_rate
+        if skyline_mode is not None and skyline_mode not in SKYLINE_MODES:
+            raise ScumBardError(f"Unknown skyline mode: {skyline_mode}")
+        self.skyline_mode = skyline_mode
+        
+        # Key actions per second the backend managed in the last playback
+        self.backend_rate = None
+        
+        # Lateness of every dispatched note in the last playback
+        self.jitter = JitterHistogram()
         
         # Updated keymap matching the specified mapping
-        default_keymap = {
-            "c": "z",    # Low C
-            "c#": "5",   # C#
-            "d": "u",    # D
-            "d#": "6",   # D#
-            "e": "i",    # E
-            "f": "o",    # F
-            "f#": "7",   # F#
-            "g": "h",    # G
-            "g#": "8",   # G#
-            "a": "j",    # A
-            "a#": "9",   # A#
-            "b": "k",    # B
-            "c_high": "l"  # High C
-        }
+        default_keymap = dict(DEFAULT_KEYMAP)
         
         # Load custom keymap if provided
         try:
@@ -80,6 +139,35 @@ class ScumBard:
         except json.JSONDecodeError:
             self.logger.error(f"Invalid keymap file: {keymap_path}")
             self.keymap = default_keymap
+        
+        # Compile the keymap into a per-note lookup table; a broken keymap is
+        # reported here rather than as missing notes halfway through a song
+        try:
+            self.key_table = KeyTable(self.keymap)
+        except KeymapError as e:
+            raise ScumBardError(f"{e} ({keymap_path or 'default keymap'})")
+        if self.key_table.missing:
+            self.logger.warning(f"Keymap has no key for: {', '.join(self.key_table.missing)}")
+
+    def create_clock(self):
+        """
+        Create the clock used to dispatch notes
+        
+        :return: HybridClock in precision mode, otherwise a sleep-only clock
+        """
+        if self.precision:
+            return HybridClock(self.spin_threshold)
+        return MonotonicClock()
+
+    def report_jitter(self):
+        """
+        Log timing accuracy of the last playback
+        
+        :return: Jitter statistics in microseconds
+        """
+        mode = "precision" if self.precision else "sleep"
+        self.logger.info(f"[{mode} mode] {self.jitter.format_summary()}")
+        return self.jitter.summary()
 
     def reset_character_octave(self):
         """
@@ -113,20 +201,14 @@ class ScumBard:
         :param track: MIDI track to analyze
         :return: Base octave of the track
         """
-        octaves = []
-        for msg in track:
-            if not msg.is_meta and msg.type == 'note_on' and msg.velocity > 0:
-                octave = (msg.note // 12) - 1
-                octaves.append(octave)
-        
-        return min(octaves) if octaves else 3  # Default to octave 3 if no notes found
+        return get_first_octave(track)
 
     def list_tracks(self):
         """
         List available tracks in the MIDI file
         """
         try:
-            midi = mido.MidiFile(self.midi_file)
+            midi = load_midi(self.midi_file)
             self.logger.info(f"Tracks in {self.midi_file}:")
             for i, track in enumerate(midi.tracks):
                 self.logger.info(f"Track {i}: {len(track)} messages")
@@ -134,45 +216,123 @@ class ScumBard:
             self.logger.error(f"Error listing tracks: {e}")
             traceback.print_exc()
 
+    def compile(self, octave_management=True, transpose=None, midi=None):
+        """
+        Parse the MIDI file and compile the selected track into a schedule
+        
+        Note times come from the file's tempo map; speed is applied while
+        playing, so the schedule never has to be rebuilt for it. Only the
+        thinning budget depends on it, and uses self.speed.
+        
+        :param octave_management: Insert octave shifts into the schedule
+        :param transpose: Semitones to shift every note by (default: self.transpose)
+        :param midi: Already parsed MidiFile of self.midi_file, to skip parsing it again
+        :return: CompiledTrack
+        """
+        transpose = self.transpose if transpose is None else transpose
+        if self.profiles is not None:
+            compiled = self.profiles.load_compiled(self.midi_file, self.track, self.key_table,
+                                                   self.skyline_mode, self.max_rate,
+                                                   octave_management, transpose, self.speed)
+            if compiled is not None:
+                self.logger.info(f"Loaded track {self.track} from the profile cache: "
+                                 f"{compiled.note_count} notes, {compiled.unmapped_count} unmapped "
+                                 f"in {compiled.compile_seconds * 1000:.1f} ms")
+                return compiled
+        
+        if midi is None:
+            midi = load_midi(self.midi_file)
+        compiled = compile_midi(midi, self.track, self.key_table,
+                                octave_management=octave_management, transpose=transpose,
+                                max_rate=self.max_rate, skyline_mode=self.skyline_mode,
+                                speed=self.speed)
+        self.logger.info(f"Compiled track {self.track}: {compiled.note_count} notes, "
+                         f"{compiled.unmapped_count} unmapped, {compiled.octave_shifts} octave shifts "
+                         f"in {compiled.compile_seconds * 1000:.1f} ms")
+        if compiled.skyline is not None:
+            self.logger.info(f"Skyline ({compiled.skyline.mode}) kept {compiled.skyline.notes_out} "
+                             f"of {compiled.skyline.notes_in} notes "
+                             f"in {compiled.skyline.seconds * 1000:.1f} ms")
+        if compiled.thinning is not None:
+            self.logger.info(compiled.thinning.format_summary())
+        if self.profiles is not None:
+            self.profiles.store_notes(self.midi_file, self.track, compiled,
+                                      self.skyline_mode, self.max_rate, self.speed)
+        return compiled
+
+    def remember_profile(self, compiled=None, transpose=None, speed=None):
+        """
+        Save the current settings as the song's profile
+        
+        :param compiled: CompiledTrack performed, for the profile's analysis figures
+        :param transpose: Transposition to save (default: self.transpose)
+        :param speed: Speed to save (default: self.speed)
+        :return: SongProfile, or None without a profile store
+        """
+        if self.profiles is None:
+            return None
+        return self.profiles.remember(
+            self.midi_file, compiled, track=self.track, keymap=self.keymap_path,
+            transpose=self.transpose if transpose is None else transpose,
+            speed=self.speed if speed is None else speed,
+            skyline=self.skyline_mode, max_rate=self.max_rate,
+        )
+
+    def play_schedule(self, compiled, backend=None, clock=None, start_time=None, position=0.0,
+                      end=None, from_octave=None, control=None):
+        """
+        Play a compiled track and log its timing statistics
+        
+        :param compiled: CompiledTrack from compile()
+        :param backend: Key backend (default: pyautogui)
+        :param clock: Clock (default: create_clock())
+        :param start_time: Clock time to start at (default: now)
+        :param position: Seconds into the track to start from
+        :param end: Seconds into the track to stop at (default: the end)
+        :param from_octave: Octave the character is in (default: the track's first octave)
+        :param control: PlaybackControl for stop, speed and transpose changes
+                        (default: plays at self.speed)
+        :return: PlaybackStats
+        """
+        if control is None and self.speed != 1.0:
+            control = PlaybackControl(speed=self.speed)
+        stats = play_compiled(compiled, backend or PyAutoGuiBackend(),
+                              clock or self.create_clock(), logger=self.logger,
+                              start_time=start_time, position=position, end=end,
+                              from_octave=from_octave, control=control)
+        self.jitter = stats.jitter
+        self.backend_rate = stats.backend_rate
+        self.logger.info(f"MIDI playback completed. Total Notes: {compiled.note_count}, "
+                         f"Key Presses: {stats.key_presses}")
+        if self.backend_rate:
+            self.logger.info(f"Key backend sustained {self.backend_rate:.0f} actions/s")
+        self.report_jitter()
+        return stats
+
     def play_midi(self):
         """
         Play MIDI file using keyboard mapping
         """
-        print(f"Total track messages: {len(mido.MidiFile(self.midi_file).tracks[self.track])}")
-        print(f"Current Keymap: {self.keymap}")
-        
         try:
-            midi = mido.MidiFile(self.midi_file)
+            midi = load_midi(self.midi_file)
             track = midi.tracks[self.track]
+            print(f"Total track messages: {len(track)}")
+            print(f"Current Keymap: {self.keymap}")
             print(f"Playing track {self.track} from {self.midi_file}")
 
-            def midi_to_note_name(midi_number):
-                """Convert MIDI note number to note name"""
-                notes = ['c', 'c#', 'd', 'd#', 'e', 'f', 'f#', 'g', 'g#', 'a', 'a#', 'b']
-                octave = (midi_number // 12) - 1
-                note_index = midi_number % 12
-                
-                # Special handling for high C
-                if notes[note_index] == 'c' and octave > 3:
-                    return 'c_high'
-                
-                return notes[note_index]
-
             # Collect ALL unique notes in the track
             all_notes = {}
             
             for msg in track:
                 if not msg.is_meta:
                     if msg.type in ['note_on', 'note_off'] and msg.velocity > 0:
-                        note_name = midi_to_note_name(msg.note)
-                        note_without_octave = ''.join([c for c in note_name if c.isalpha() or c == '#'])
+                        note_name = self.key_table.names[msg.note]
                         
                         if note_name not in all_notes:
                             all_notes[note_name] = {
                                 'full_name': note_name,
-                                'without_octave': note_without_octave,
                                 'midi_number': msg.note,
-                                'mapped_key': self.keymap.get(note_without_octave, 'NO MAPPING'),
+                                'mapped_key': self.key_table.keys[msg.note] or 'NO MAPPING',
                                 'count': 1
                             }
                         else:
@@ -186,51 +346,10 @@ class ScumBard:
                       f"Occurrences: {details['count']}")
             
             print("\n--- NOTES THAT WILL BE PLAYED ---")
-            # Actual playback logic
-            def playback_thread():
-                note_count = 0
-                key_press_count = 0
-
-                try:
-                    for msg in track:
-                        if not msg.is_meta:
-                            if msg.type == 'note_on' and msg.velocity > 0:
-                                note_name = midi_to_note_name(msg.note)
-                                note_count += 1
-                                
-                                # Strip octave for keymap lookup
-                                note_without_octave = ''.join([c for c in note_name if c.isalpha() or c == '#'])
-                                
-                                if note_without_octave in self.keymap:
-                                    key = self.keymap[note_without_octave]
-                                    
-                                    try:
-                                        pyautogui.press(key)
-                                        key_press_count += 1
-                                        print(f"Pressed key: {key} for note: {note_name}")
-                                    except Exception as press_error:
-                                        print(f"Failed to press key {key}: {press_error}")
-                                else:
-                                    print(f"No key mapping for note: {note_name}")
-
-                        # Slow down to make key presses observable
-                        time.sleep(msg.time * 0.1)  # Slow down playback
-
-                    print(f"MIDI playback completed. Total Notes: {note_count}, Key Presses: {key_press_count}")
-
-                except Exception as playback_error:
-                    print(f"Error during MIDI playback: {playback_error}")
-                    import traceback
-                    traceback.print_exc()
-
-            # Start playback in a separate thread
-            thread = threading.Thread(target=playback_thread)
-            thread.start()
-            thread.join()  # Wait for thread to complete
+            self.play_schedule(self.compile(octave_management=False))
 
         except Exception as e:
-            print(f"Error preparing MIDI playback: {e}")
-            import traceback
+            print(f"Error during MIDI playback: {e}")
             traceback.print_exc()
 
     def play_midi_with_octave_management(self):
@@ -238,88 +357,189 @@ class ScumBard:
         Play MIDI file with octave management
         """
         try:
-            midi = mido.MidiFile(self.midi_file)
-            track = midi.tracks[self.track]
-            
-            # Determine first octave
-            first_octave = self.get_first_octave(track)
-            current_octave = first_octave
-            
-            self.logger.info(f"First track octave: {first_octave}")
+            compiled = self.compile(octave_management=True)
+            self.logger.info(f"First track octave: {compiled.first_octave}")
             
             # Reset to base octave
             self.reset_character_octave()
+            
+            self.play_schedule(compiled)
 
-            def midi_to_note_name(midi_number):
-                """Convert MIDI note number to note name"""
-                notes = ['c', 'c#', 'd', 'd#', 'e', 'f', 'f#', 'g', 'g#', 'a', 'a#', 'b']
-                octave = (midi_number // 12) - 1
-                note_index = midi_number % 12
-                
-                # Special handling for high C
-                if notes[note_index] == 'c' and octave > 3:
-                    return 'c_high'
-                
-                return notes[note_index]
-
-            def playback_thread():
-                nonlocal current_octave
-                note_count = 0
-                key_press_count = 0
-
-                for msg in track:
-                    if not msg.is_meta and msg.type == 'note_on' and msg.velocity > 0:
-                        note_name = midi_to_note_name(msg.note)
-                        note_octave = (msg.note // 12) - 1
-                        
-                        # Shift octave if needed
-                        if note_octave != current_octave:
-                            self.shift_octave(note_octave, current_octave)
-                            current_octave = note_octave
-                        
-                        if note_name in self.keymap:
-                            key = self.keymap[note_name]
-                            
-                            try:
-                                pyautogui.press(key)
-                                key_press_count += 1
-                                self.logger.info(f"Pressed key: {key} for note: {note_name} (Octave: {note_octave})")
-                            except Exception as press_error:
-                                self.logger.error(f"Failed to press key {key}: {press_error}")
-                        
-                        note_count += 1
-                        time.sleep(msg.time * 0.1)  # Maintain original timing
-
-                self.logger.info(f"MIDI playback completed. Total Notes: {note_count}, Key Presses: {key_press_count}")
+        except Exception as e:
+            self.logger.error(f"Error playing MIDI: {e}")
+            traceback.print_exc()
 
-            # Start playback
-            thread = threading.Thread(target=playback_thread)
-            thread.start()
-            thread.join()
+    def play_section(self, start=0.0, end=None, loops=1):
+        """
+        Play part of the track, optionally looping it
+        
+        The track is compiled once; each pass seeks straight to ``start`` and
+        shifts the octave from wherever the previous pass left it.
+        
+        :param start: Seconds into the track to start from
+        :param end: Seconds into the track to stop at (default: the end)
+        :param loops: Number of times to play the section
+        """
+        try:
+            compiled = self.compile(octave_management=True)
+            self.reset_character_octave()
+            
+            octave = None
+            for loop in range(loops):
+                self.logger.info(f"Playing {start:.1f}s to "
+                                 f"{'end' if end is None else f'{end:.1f}s'} "
+                                 f"(pass {loop + 1} of {loops})")
+                stats = self.play_schedule(compiled, position=start, end=end, from_octave=octave)
+                octave = stats.end_octave
 
         except Exception as e:
             self.logger.error(f"Error playing MIDI: {e}")
             traceback.print_exc()
 
+    def export_keyscript(self, output_path):
+        """
+        Compile the selected track and save it as a key script for the
+        mido-free player (python -m bard_engine.keyscript play ...)
+        
+        :param output_path: Key script file to write
+        :return: Size of the written file in bytes
+        """
+        compiled = self.compile(octave_management=True)
+        size = export_keyscript(compiled, output_path, metadata={
+            'source': os.path.basename(self.midi_file),
+            'track': self.track,
+            'transpose': compiled.transpose,
+            'skyline': self.skyline_mode,
+            'thinning': compiled.thinning.summary() if compiled.thinning is not None else None,
+        })
+        self.logger.info(f"Exported {len(compiled)} events to {output_path} ({size} bytes)")
+        return size
+
+    def preview(self, output_path=None, play=False):
+        """
+        Render what the selected track will play in game, without pressing keys
+        
+        :param output_path: WAV file to write
+        :param play: Also play the render (needs the sounddevice package)
+        :return: Seconds spent rendering
+        """
+        compiled = self.compile(octave_management=True)
+        try:
+            _, render_seconds = preview(compiled, output_path, sink=sounddevice_sink if play else None,
+                                        keymap=self.key_table)
+        except PreviewError as e:
+            raise ScumBardError(str(e))
+        self.logger.info(f"Rendered {compiled.duration:.1f}s preview in {render_seconds * 1000:.1f} ms"
+                         + (f" to {output_path}" if output_path else ""))
+        return render_seconds
+
+    def conduct(self, followers, port=ENSEMBLE_PORT, delay=ENSEMBLE_START_DELAY, host=ENSEMBLE_HOST):
+        """
+        Conduct an ensemble: wait for followers, broadcast the start and
+        play this instance's track against the shared timeline
+        
+        :param followers: Number of followers to wait for
+        :param port: UDP port to listen on
+        :param delay: Seconds between the start broadcast and the first beat
+        :param host: Interface to listen on (this machine only by default)
+        :return: Skew report dict (an estimate; see Conductor.skew_report)
+        """
+        self.reset_character_octave()
+        stats, report = conduct(
+            self.compile, PyAutoGuiBackend(), self.create_clock(), followers,
+            port=port, delay=delay, speed=self.speed, host=host, logger=self.logger
+        )
+        self.jitter = stats.jitter
+        self.report_jitter()
+        for name, participant in report['participants'].items():
+            self.logger.info(f"  {name}: start error {participant['start_error_ms']:.3f} ms "
+                             f"(sync uncertainty {participant['sync_uncertainty_ms']:.3f} ms)")
+        return report
+
+    def follow(self, host, port=ENSEMBLE_PORT, name=None):
+        """
+        Join a conductor's ensemble and play this instance's track on cue
+        
+        :param host: Conductor host
+        :param port: Conductor UDP port
+        :param name: Participant name shown in the skew report
+        :return: PlaybackStats
+        """
+        self.reset_character_octave()
+        stats = follow(
+            self.compile, PyAutoGuiBackend(), self.create_clock(), host,
+            port=port, name=name, track=self.track, logger=self.logger
+        )
+        self.jitter = stats.jitter
+        self.report_jitter()
+        return stats
+
+    def start_live(self, port_name=None, backend=None, port=None):
+        """
+        Start passing a live MIDI input port through to key injection
+        
+        :param port_name: MIDI input port name (default input if None)
+        :param backend: Key backend (default: pyautogui)
+        :param port: Open input port (or in-memory stand-in) to use instead
+        :return: LivePassthrough; call stop() on it to end live mode
+        """
+        passthrough = LivePassthrough(self.key_table, backend or PyAutoGuiBackend(), logger=self.logger)
+        passthrough.start(port_name, port=port)
+        return passthrough
+
+    def play_live(self, port_name=None):
+        """
+        Play from a live MIDI input port until interrupted (Ctrl+C)
+        """
+        passthrough = self.start_live(port_name)
+        print("Live MIDI input active. Press Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            passthrough.stop()
+
 def create_plugin(button=None):
     """
     Create and return a QWidget for the Scum Bard MIDI plugin
     
-    :param button: Optional button that triggered the plugin (not used)
+    :param button: Optional button that triggered the plugin; its overlay
+                   receives playback events
     :return: QWidget for the plugin
     """
     try:
         from PyQt5.QtWidgets import (
             QWidget, QVBoxLayout, QPushButton, 
-            QLabel, QFileDialog, QMessageBox
+            QLabel, QFileDialog, QMessageBox, QCheckBox, QSlider, QComboBox,
+            QHBoxLayout, QListWidget, QLineEdit, QListView
         )
+        from PyQt5.QtCore import Qt, pyqtSignal
         import logging
         import sys
         
+        from bard_ui import PianoRollWidget, LibraryModel
+        
         class ScumBardPluginWidget(QWidget):
-            def __init__(self, parent=None):
+            # Status text posted from the playback thread
+            status_changed = pyqtSignal(str)
+            
+            # Schedule about to play, posted from the playback thread
+            track_compiled = pyqtSignal(object)
+            
+            # Playlist entries or position changed, possibly on the playback thread
+            playlist_changed = pyqtSignal()
+            
+            # Library scan finished (or failed), posted from the scan thread
+            library_indexed = pyqtSignal(str)
+            
+            def __init__(self, parent=None, overlay=None):
                 super().__init__(parent)
                 
+                # Overlay used to publish playback events (may be None)
+                self.overlay = overlay
+                
                 # Main layout
                 layout = QVBoxLayout()
                 
@@ -332,46 +552,302 @@ def create_plugin(button=None):
                 select_midi_btn.clicked.connect(self.select_midi_file)
                 layout.addWidget(select_midi_btn)
                 
+                # Fuzzy search over every MIDI file in the library folder;
+                # results are searched on each keystroke and listed lazily
+                self.library = LibraryIndex(LIBRARY_CACHE_PATH)
+                self.library_dir = None
+                self.library_thread = None
+                self.library_pending = None
+                library_bar = QHBoxLayout()
+                self.library_search = QLineEdit()
+                self.library_search.setPlaceholderText("Search library...")
+                self.library_search.setClearButtonEnabled(True)
+                self.library_search.textChanged.connect(self.search_library)
+                library_bar.addWidget(self.library_search)
+                library_folder_btn = QPushButton("Library Folder")
+                library_folder_btn.clicked.connect(self.select_library_folder)
+                library_bar.addWidget(library_folder_btn)
+                layout.addLayout(library_bar)
+                self.library_model = LibraryModel(self)
+                self.library_view = QListView()
+                self.library_view.setModel(self.library_model)
+                self.library_view.setUniformItemSizes(True)
+                self.library_view.activated.connect(
+                    lambda index: self.set_midi_file(self.library_model.path(index.row()))
+                )
+                layout.addWidget(self.library_view)
+                
                 # Play Button
                 play_btn = QPushButton("Play MIDI")
                 play_btn.clicked.connect(self.play_midi)
                 layout.addWidget(play_btn)
                 
+                # Pause/resume the song that is playing
+                self.pause_btn = QPushButton("Pause")
+                self.pause_btn.setCheckable(True)
+                self.pause_btn.toggled.connect(self.toggle_pause)
+                layout.addWidget(self.pause_btn)
+                
+                # Live speed and transpose; applied to the playing song
+                # before its next note
+                self.speed = 1.0
+                self.speed_label = QLabel("Speed: 100%")
+                layout.addWidget(self.speed_label)
+                self.speed_slider = QSlider(Qt.Horizontal)
+                self.speed_slider.setRange(int(MIN_SPEED * 100), int(MAX_SPEED * 100))
+                self.speed_slider.setValue(100)
+                self.speed_slider.valueChanged.connect(self.set_speed)
+                layout.addWidget(self.speed_slider)
+                
+                self.transpose = 0
+                self.transpose_label = QLabel("Transpose: 0")
+                layout.addWidget(self.transpose_label)
+                self.transpose_slider = QSlider(Qt.Horizontal)
+                self.transpose_slider.setRange(-12, 12)
+                self.transpose_slider.setValue(0)
+                self.transpose_slider.valueChanged.connect(self.set_transpose)
+                layout.addWidget(self.transpose_slider)
+                
+                # Precision timing toggle (hybrid sleep/spin dispatch)
+                self.precision = False
+                precision_checkbox = QCheckBox("Precision timing")
+                precision_checkbox.toggled.connect(self.set_precision)
+                layout.addWidget(precision_checkbox)
+                
+                # Thin passages the backend cannot keep up with; the budget
+                # follows the rate measured while playing earlier songs
+                self.thin = False
+                self.measured_rate = None
+                # Thinning budget of each playlist entry, fixed when it is first prepared
+                self.entry_rates = weakref.WeakKeyDictionary()
+                self.thin_checkbox = QCheckBox("Thin dense passages")
+                self.thin_checkbox.toggled.connect(self.set_thin)
+                layout.addWidget(self.thin_checkbox)
+                
+                # Voices to play, remembered for each song
+                self.song_voices = {}
+                self.voices_combo = QComboBox()
+                self.voices_combo.addItem("All voices", None)
+                self.voices_combo.addItem("Top voice", 'highest')
+                self.voices_combo.addItem("Melody", 'salient')
+                self.voices_combo.currentIndexChanged.connect(self.set_voices)
+                layout.addWidget(self.voices_combo)
+                
+                # Live MIDI input toggle
+                self.live_passthrough = None
+                live_btn = QPushButton("Live MIDI Input")
+                live_btn.setCheckable(True)
+                live_btn.toggled.connect(self.toggle_live_input)
+                layout.addWidget(live_btn)
+                
                 # Status Label
                 self.status_label = QLabel("No MIDI file selected")
                 layout.addWidget(self.status_label)
                 
+                # Playlist; the next song is compiled in the background while
+                # the current one plays
+                self.playlist_view = QListWidget()
+                self.playlist_view.itemDoubleClicked.connect(
+                    lambda item: self.play_playlist(self.playlist_view.row(item))
+                )
+                layout.addWidget(self.playlist_view)
+                
+                playlist_buttons = QHBoxLayout()
+                for label, slot in (("Add Songs", self.add_songs),
+                                    ("Remove", self.remove_song),
+                                    ("Clear", self.clear_playlist),
+                                    ("Play Playlist", self.play_playlist),
+                                    ("Next", self.skip_song)):
+                    button = QPushButton(label)
+                    button.clicked.connect(lambda checked=False, slot=slot: slot())
+                    playlist_buttons.addWidget(button)
+                layout.addLayout(playlist_buttons)
+                
+                # Tuned settings remembered for every song played, keyed by
+                # file contents so they survive renames and other machines
+                self.profiles = ProfileStore(PROFILES_PATH, PROFILE_CACHE_DIR)
+                profile_buttons = QHBoxLayout()
+                export_profiles_btn = QPushButton("Export Profiles")
+                export_profiles_btn.clicked.connect(self.export_profiles)
+                profile_buttons.addWidget(export_profiles_btn)
+                import_profiles_btn = QPushButton("Import Profiles")
+                import_profiles_btn.clicked.connect(self.import_profiles)
+                profile_buttons.addWidget(import_profiles_btn)
+                layout.addLayout(profile_buttons)
+                
+                # Piano roll of the playing song: mapped notes green, unmapped
+                # red, octave shifts as yellow (up) and orange (down) lines
+                self.piano_roll = PianoRollWidget()
+                layout.addWidget(self.piano_roll)
+                self.piano_roll.follow(self.playback_position)
+                
                 self.setLayout(layout)
                 self.midi_file = None
-            
-            def select_midi_file(self):
-                """Open file dialog to select MIDI file"""
-                # Get the absolute path to the data directory
-                data_dir = os.path.abspath(os.path.join(
-                    os.path.dirname(__file__), 'data'
-                ))
                 
-                # Ensure the data directory exists
-                if not os.path.exists(data_dir):
+                # Songs to play, saved between sessions; the playback thread
+                # works through it from the current entry
+                self.playlist = Playlist(PLAYLIST_PATH, on_change=self.playlist_changed.emit)
+                self.preparer = Preparer(self.prepare_song)
+                self.playlist_changed.connect(self.refresh_playlist)
+                self.skip_event = threading.Event()
+                self.next_request = None
+                self.playback_thread = None
+                # Whether the playback thread is running (or about to exit) and
+                # next_request are only read and changed under this lock, so a
+                # song queued just as the thread finishes is played exactly once
+                self.playback_lock = threading.RLock()
+                self.playback_running = False
+                
+                # Stops the current song; replaced for every pass of playback
+                self.playback_control = None
+                self.paused = False
+                self.resume_event = threading.Event()
+                self.cancel_playback = threading.Event()
+                self.status_changed.connect(self.status_label.setText)
+                self.track_compiled.connect(self.show_track)
+                self.library_indexed.connect(self.library_ready)
+                self.refresh_playlist()
+                # Only the bundled data folder is indexed up front; the library
+                # folder button or a restored session picks any other
+                data_dir = self.data_directory()
+                if data_dir is not None:
+                    self.scan_library(data_dir)
+            
+            def playback_position(self):
+                """Seconds into the playing song, or None when nothing plays"""
+                control = self.playback_control
+                return control.position() if control is not None else None
+            
+            def publish_event(self, data):
+                """Publish a playback event to control API subscribers"""
+                if self.overlay is not None and hasattr(self.overlay, 'publish_event'):
+                    self.overlay.publish_event('playback', data)
+            
+            def set_precision(self, enabled):
+                """Enable or disable precision timing for the next song"""
+                self.precision = enabled
+            
+            def set_thin(self, enabled):
+                """Enable or disable passage thinning for the next song"""
+                self.thin = enabled
+                self.entry_rates.clear()
+            
+            def thinning_rate(self):
+                """Key action budget for the next song, or None when thinning is off"""
+                if not self.thin:
+                    return None
+                if self.measured_rate:
+                    return min(DEFAULT_MAX_RATE, self.measured_rate)
+                return DEFAULT_MAX_RATE
+            
+            def set_voices(self, index):
+                """Remember the voice reduction chosen for the selected song"""
+                if not self.midi_file:
+                    return
+                mode = self.voices_combo.itemData(index)
+                if mode:
+                    self.song_voices[self.midi_file] = mode
+                else:
+                    self.song_voices.pop(self.midi_file, None)
+            
+            def set_midi_file(self, midi_file):
+                """Select a song and restore the performance saved for it"""
+                self.midi_file = midi_file
+                # Show just the filename for cleaner display
+                filename = os.path.basename(midi_file)
+                profile = self.profiles.lookup(midi_file)
+                if profile is None:
+                    self.status_label.setText(f"Selected: {filename}")
+                else:
+                    # The sliders act on the song playing now; leave it alone
+                    if self.playback_thread is None or not self.playback_thread.is_alive():
+                        self.speed_slider.setValue(round(profile.speed * 100))
+                        self.transpose_slider.setValue(profile.transpose)
+                    self.thin_checkbox.setChecked(bool(profile.max_rate))
+                    if profile.skyline:
+                        self.song_voices[midi_file] = profile.skyline
+                    else:
+                        self.song_voices.pop(midi_file, None)
+                    self.status_label.setText(f"Selected: {filename} (saved profile, track {profile.track})")
+                index = self.voices_combo.findData(self.song_voices.get(midi_file))
+                self.voices_combo.blockSignals(True)
+                self.voices_combo.setCurrentIndex(max(index, 0))
+                self.voices_combo.blockSignals(False)
+            
+            def data_directory(self):
+                """The plugin's bundled data directory, or None if it is missing"""
+                return DATA_DIR if os.path.isdir(DATA_DIR) else None
+            
+            def midi_directory(self):
+                """Folder the file dialogs open in: the plugin's data directory, else home"""
+                data_dir = self.data_directory()
+                if data_dir is None:
                     QMessageBox.warning(
                         self, 
                         "Directory Not Found", 
-                        f"MIDI directory not found: {data_dir}"
+                        f"MIDI directory not found: {DATA_DIR}"
                     )
                     data_dir = os.path.expanduser('~')  # Fallback to user home
-                
+                return data_dir
+            
+            def select_midi_file(self):
+                """Open file dialog to select MIDI file"""
                 file_path, _ = QFileDialog.getOpenFileName(
                     self, 
                     "Select MIDI File", 
-                    data_dir,  # Use full path to data directory 
+                    self.midi_directory(),  # Use full path to data directory 
                     "MIDI Files (*.mid)"
                 )
                 
                 if file_path:
-                    self.midi_file = file_path
-                    # Show just the filename for cleaner display
-                    filename = os.path.basename(file_path)
-                    self.status_label.setText(f"Selected: {filename}")
+                    self.set_midi_file(file_path)
+            
+            def select_library_folder(self):
+                """Choose the folder the library search covers"""
+                directory = QFileDialog.getExistingDirectory(
+                    self,
+                    "Select Library Folder",
+                    self.library_dir or self.midi_directory()
+                )
+                if directory:
+                    self.scan_library(directory)
+            
+            def scan_library(self, directory):
+                """Index ``directory`` on a background thread; unchanged files come from the cache"""
+                if not os.path.isdir(directory):
+                    self.status_label.setText(f"Library folder not found: {directory}")
+                    return
+                if self.library_thread is not None and self.library_thread.is_alive():
+                    # Scanned once the running scan finishes
+                    self.library_pending = directory
+                    return
+                self.library_dir = directory
+                self.status_label.setText(f"Indexing {directory}...")
+                
+                def scan():
+                    try:
+                        seconds = self.library.scan(directory)
+                        self.library_indexed.emit(
+                            f"Library: {len(self.library)} MIDI files ({seconds:.2f}s)"
+                        )
+                    except Exception as e:
+                        logging.getLogger(__name__).error(f"Library scan failed: {e}")
+                        self.library_indexed.emit(f"Library scan failed: {str(e)}")
+                
+                self.library_thread = threading.Thread(target=scan, daemon=True)
+                self.library_thread.start()
+            
+            def library_ready(self, message):
+                """Show the scan result and refresh the results for the current query"""
+                self.status_label.setText(message)
+                self.search_library(self.library_search.text())
+                if self.library_pending is not None:
+                    directory, self.library_pending = self.library_pending, None
+                    self.library_thread.join()
+                    self.scan_library(directory)
+            
+            def search_library(self, query):
+                self.library_model.set_results(self.library.search(query))
             
             def play_midi(self):
                 """Play selected MIDI file"""
@@ -383,16 +859,412 @@ def create_plugin(button=None):
                     )
                     return
                 
+                self.queue_midi(self.midi_file)
+            
+            def queue_midi(self, midi_file, track=None, transpose=None):
+                """
+                Add a MIDI file to the playlist without blocking the GUI;
+                playback starts from it when nothing is playing
+                
+                :param midi_file: Path to MIDI file
+                :param track: Track to play (default: the busiest track)
+                :param transpose: Semitones to shift by (default: the song's profile, else
+                                  the transpose slider)
+                :return: Dict describing the queued entry
+                """
+                if transpose is None:
+                    transpose = self.song_transpose(midi_file)
+                # Added under the lock: a thread finishing now either plays the
+                # new entry itself or has already exited and a new one starts
+                with self.playback_lock:
+                    index = self.playlist.add(midi_file, track, transpose)
+                    started = self.start_playlist(index)
+                self.publish_event({'state': 'queued', 'file': midi_file})
+                
+                if not started:
+                    self.status_label.setText(f"Queued: {os.path.basename(midi_file)}")
+                    # The song after the current one may have just changed
+                    self.prepare_next(self.playlist.current)
+                
+                return {'queued': midi_file, 'pending': self.playlist.remaining()}
+            
+            def song_transpose(self, midi_file):
+                """Transposition to queue a song at: its profile's, else the slider's"""
+                profile = self.profiles.lookup(midi_file)
+                return profile.transpose if profile is not None else self.transpose
+            
+            def start_playlist(self, index, interrupt=False):
+                """
+                Play the playlist from entry ``index``
+                
+                Starts the playback thread when it is not running. A running
+                thread that was stopped, or is told to ``interrupt``, goes on
+                with ``index`` next; otherwise it reaches ``index`` in order.
+                
+                :return: True if a new playback thread was started
+                """
+                with self.playback_lock:
+                    if self.playback_running:
+                        if interrupt or self.cancel_playback.is_set():
+                            self.next_request = index
+                        return False
+                    self.playback_running = True
+                    self.cancel_playback.clear()
+                    self.skip_event.clear()
+                    self.next_request = None
+                    self.playback_thread = threading.Thread(
+                        target=self.playback_worker, args=(index,), name='ScumBardPlayback', daemon=True
+                    )
+                    self.playback_thread.start()
+                return True
+            
+            def preparation(self, entry):
+                """Everything a prepared song depends on; doubles as its preparation key"""
+                # The measured rate changes after every song; fixing the budget when the
+                # entry is first prepared keeps the key of a prepared song stable
+                max_rate = self.entry_rates.setdefault(entry, self.thinning_rate())
+                return preparation_key(entry, self.precision, max_rate, self.song_voices.get(entry.file),
+                                       self.speed, self.profiles.lookup(entry.file))
+            
+            def prepare_song(self, midi_file, track, transpose, precision, max_rate, skyline_mode, speed):
+                """
+                Parse and compile one song (runs on the preparation thread)
+                
+                :return: (ScumBard, CompiledTrack)
+                """
+                midi = None
+                if track is None:
+                    midi = load_midi(midi_file)
+                    track = busiest_track(midi)
+                bard = ScumBard(midi_file, track, precision=precision, speed=speed, transpose=transpose,
+                                max_rate=max_rate, skyline_mode=skyline_mode, profiles=self.profiles)
+                return bard, bard.compile(octave_management=True, midi=midi)
+            
+            def prepare_next(self, index):
+                """Start compiling the song after playlist entry ``index`` in the background"""
+                following = self.playlist.next_index(index) if index is not None else None
+                if following is not None:
+                    args = self.preparation(self.playlist[following])
+                    self.preparer.prepare(args, *args)
+            
+            def playback_worker(self, index):
+                """Play the playlist from entry ``index`` until it runs out or playback is stopped"""
+                while True:
+                    try:
+                        self.play_entry(index)
+                    except Exception as e:
+                        logging.error(f"Playlist entry {index} failed: {e}")
+                    
+                    # Deciding to exit and clearing playback_running happen
+                    # together, so start_playlist() either sees the thread
+                    # running and leaves it the work, or starts a new one
+                    with self.playback_lock:
+                        index = self.following_entry(index)
+                        if index is None:
+                            self.playback_running = False
+                            return
+            
+            def following_entry(self, index):
+                """Entry to play after entry ``index``, or None to stop (call with playback_lock held)"""
+                if self.next_request is not None:
+                    index, self.next_request = self.next_request, None
+                    self.cancel_playback.clear()
+                    self.skip_event.clear()
+                    return index
+                if self.cancel_playback.is_set():
+                    return None
+                # Continue after the current entry, wherever edits moved it
+                current = self.playlist.current
+                if current is not None:
+                    return self.playlist.next_index(current)
+                # The song that just played was removed; its successor took its place
+                return index if index < len(self.playlist) else None
+            
+            def play_entry(self, index):
+                """Prepare and play playlist entry ``index`` (runs on the playback thread)"""
+                if self.cancel_playback.is_set():
+                    return
+                try:
+                    entry = self.playlist[index]
+                except IndexError:
+                    return
+                self.playlist.set_current(index)
+                midi_file = entry.file
+                filename = os.path.basename(midi_file)
+                self.status_changed.emit(f"Preparing: {filename}")
                 try:
-                    bard = ScumBard(self.midi_file)
-                    bard.play_midi_with_octave_management()
-                    self.status_label.setText(f"Playing: {self.midi_file}")
+                    args = self.preparation(entry)
+                    bard, compiled = self.preparer.take(args, *args)
+                    self.entry_rates.pop(entry, None)
+                    self.prepare_next(index)
+                    if self.cancel_playback.is_set():
+                        return
+                    
+                    self.status_changed.emit(f"Playing: {filename}")
+                    self.publish_event({'state': 'started', 'file': midi_file})
+                    self.play_pausable(bard, midi_file, compiled)
+                    bard.remember_profile(compiled, transpose=self.playback_control.transpose,
+                                          speed=self.speed)
+                    if bard.backend_rate:
+                        self.measured_rate = bard.backend_rate
+                    if self.cancel_playback.is_set():
+                        return
+                    self.status_changed.emit(f"Finished: {filename}")
+                    self.publish_event({'state': 'finished', 'file': midi_file,
+                                        'jitter': bard.jitter.summary()})
                 except Exception as e:
-                    QMessageBox.critical(
-                        self, 
-                        "Playback Error", 
-                        f"Failed to play MIDI: {str(e)}"
+                    logging.error(f"Failed to play MIDI {midi_file}: {e}")
+                    self.status_changed.emit(f"Playback error: {e}")
+                    self.publish_event({'state': 'error', 'file': midi_file, 'error': str(e)})
+            
+            def play_pausable(self, bard, midi_file, compiled=None):
+                """
+                Play one song, waiting out pauses and resuming where it stopped
+                
+                :param compiled: Schedule prepared in advance (default: compile it now)
+                :return: PlaybackStats of the last pass
+                """
+                if compiled is None:
+                    compiled = bard.compile(octave_management=True)
+                self.track_compiled.emit(compiled)
+                bard.reset_character_octave()
+                filename = os.path.basename(midi_file)
+                
+                position, octave, transpose = 0.0, None, compiled.transpose
+                while True:
+                    self.playback_control = PlaybackControl(speed=self.speed, transpose=transpose)
+                    if self.paused or self.cancel_playback.is_set() or self.skip_event.is_set():
+                        self.playback_control.stop()
+                    stats = bard.play_schedule(compiled, position=position, from_octave=octave,
+                                               control=self.playback_control)
+                    if self.skip_event.is_set():
+                        self.skip_event.clear()
+                        return stats
+                    if not stats.stopped or self.cancel_playback.is_set():
+                        return stats
+                    
+                    # Keep any live transpose change for the rest of the song
+                    position, octave = stats.position, stats.end_octave
+                    transpose = self.playback_control.transpose
+                    self.status_changed.emit(f"Paused: {filename} at {position:.1f}s")
+                    self.publish_event({'state': 'paused', 'file': midi_file, 'position': position})
+                    self.resume_event.wait()
+                    self.resume_event.clear()
+                    if self.cancel_playback.is_set() or self.skip_event.is_set():
+                        self.skip_event.clear()
+                        return stats
+                    self.status_changed.emit(f"Playing: {filename}")
+                    self.publish_event({'state': 'resumed', 'file': midi_file, 'position': position})
+            
+            def show_track(self, compiled):
+                """Show the song about to play and move the transpose slider to its transposition"""
+                self.piano_roll.set_track(compiled)
+                self.transpose = compiled.transpose
+                self.transpose_label.setText(f"Transpose: {self.transpose:+d}" if self.transpose else "Transpose: 0")
+                self.transpose_slider.blockSignals(True)
+                self.transpose_slider.setValue(self.transpose)
+                self.transpose_slider.blockSignals(False)
+            
+            def refresh_playlist(self):
+                """Redraw the playlist, with the current song in bold"""
+                row = self.playlist_view.currentRow()
+                self.playlist_view.clear()
+                current = self.playlist.current
+                for index, entry in enumerate(self.playlist.entries):
+                    label = entry.name
+                    if entry.transpose:
+                        label += f" ({entry.transpose:+d})"
+                    self.playlist_view.addItem(label)
+                    if index == current:
+                        item = self.playlist_view.item(index)
+                        font = item.font()
+                        font.setBold(True)
+                        item.setFont(font)
+                self.playlist_view.setCurrentRow(min(row, self.playlist_view.count() - 1))
+            
+            def add_songs(self):
+                """Add MIDI files to the end of the playlist"""
+                file_paths, _ = QFileDialog.getOpenFileNames(
+                    self, "Add Songs", self.midi_directory(), "MIDI Files (*.mid)"
+                )
+                for file_path in file_paths:
+                    self.playlist.add(file_path, transpose=self.song_transpose(file_path))
+                if file_paths and self.playback_thread is not None and self.playback_thread.is_alive():
+                    self.prepare_next(self.playlist.current)
+            
+            def remove_song(self):
+                """Remove the selected song from the playlist"""
+                row = self.playlist_view.currentRow()
+                if row >= 0:
+                    self.playlist.remove(row)
+            
+            def clear_playlist(self):
+                """Stop playback and empty the playlist"""
+                self.stop_playback()
+                self.playlist.clear()
+            
+            def play_playlist(self, row=None):
+                """
+                Play the playlist from ``row`` (default: the selected song, else
+                the start); a song already playing is cut short
+                """
+                if row is None:
+                    row = max(self.playlist_view.currentRow(), 0)
+                if row >= len(self.playlist):
+                    self.status_label.setText("Playlist is empty")
+                    return
+                if not self.start_playlist(row, interrupt=True):
+                    self.skip_song()
+            
+            def skip_song(self):
+                """Cut the current song short and go on to the next one"""
+                if self.playback_thread is None or not self.playback_thread.is_alive():
+                    return
+                self.skip_event.set()
+                if self.playback_control is not None:
+                    self.playback_control.stop()
+                self.resume_event.set()
+            
+            def set_speed(self, percent):
+                """Change the playback speed, including the song playing now"""
+                self.speed = percent / 100
+                self.speed_label.setText(f"Speed: {percent}%")
+                if self.playback_control is not None:
+                    self.playback_control.set_speed(self.speed)
+            
+            def set_transpose(self, semitones):
+                """Transpose the playing song without re-reading the MIDI file"""
+                self.transpose = semitones
+                self.transpose_label.setText(f"Transpose: {semitones:+d}" if semitones else "Transpose: 0")
+                if self.playback_control is not None:
+                    self.playback_control.set_transpose(semitones)
+                track = self.piano_roll.track
+                if track is not None and hasattr(track, 'transposed'):
+                    self.piano_roll.set_track(track.transposed(semitones))
+            
+            def toggle_pause(self, paused):
+                """Pause the current song, or resume it from where it stopped"""
+                self.paused = paused
+                if paused:
+                    self.resume_event.clear()
+                    if self.playback_control is not None:
+                        self.playback_control.stop()
+                else:
+                    self.resume_event.set()
+            
+            def export_profiles(self):
+                """Save every song profile to a file for another machine"""
+                file_path, _ = QFileDialog.getSaveFileName(
+                    self, "Export Profiles", "scum_bard_profiles.json", "JSON Files (*.json)"
+                )
+                if not file_path:
+                    return
+                try:
+                    count = self.profiles.export_profiles(file_path)
+                except OSError as e:
+                    QMessageBox.critical(self, "Export Error", f"Failed to export profiles: {str(e)}")
+                    return
+                self.status_label.setText(f"Exported {count} profiles")
+            
+            def import_profiles(self):
+                """Merge song profiles exported on another machine"""
+                file_path, _ = QFileDialog.getOpenFileName(
+                    self, "Import Profiles", "", "JSON Files (*.json)"
+                )
+                if not file_path:
+                    return
+                try:
+                    count = self.profiles.import_profiles(file_path)
+                except (OSError, ValueError) as e:
+                    QMessageBox.critical(self, "Import Error", f"Failed to import profiles: {str(e)}")
+                    return
+                self.status_label.setText(f"Imported {count} profiles")
+            
+            def stop_playback(self):
+                """Stop the current song; the playlist is kept"""
+                self.cancel_playback.set()
+                self.preparer.discard()
+                if self.playback_control is not None:
+                    self.playback_control.stop()
+                self.resume_event.set()
+                self.pause_btn.setChecked(False)
+            
+            def toggle_live_input(self, enabled):
+                """Start or stop passing the default MIDI input through to the game"""
+                if enabled:
+                    try:
+                        self.live_passthrough = ScumBard(live=True).start_live()
+                        self.status_label.setText("Live MIDI input active")
+                    except Exception as e:
+                        self.sender().setChecked(False)
+                        QMessageBox.critical(self, "Live Input Error",
+                                             f"Failed to open MIDI input: {str(e)}")
+                elif self.live_passthrough is not None:
+                    stats = self.live_passthrough.stop()
+                    self.live_passthrough = None
+                    self.status_label.setText(
+                        f"Live input stopped (p99 latency {stats['p99_us'] / 1000:.2f} ms)"
                     )
+            
+            def on_suspend(self):
+                """Stop animating the piano roll while hidden; playback carries on"""
+                self.piano_roll.follow(None)
+            
+            def on_resume(self):
+                self.piano_roll.follow(self.playback_position)
+            
+            def on_unload(self):
+                """Stop playback and close the MIDI input port before the widget is destroyed"""
+                self.stop_playback()
+                self.piano_roll.follow(None)
+                if self.live_passthrough is not None:
+                    self.live_passthrough.stop()
+                    self.live_passthrough = None
+            
+            def handle_command(self, command):
+                """Handle a command forwarded by the overlay"""
+                if command.get('action') in ('play_midi', 'queue_midi'):
+                    midi_file = command.get('file')
+                    if not midi_file or not os.path.exists(midi_file):
+                        self.status_label.setText(f"MIDI file not found: {midi_file}")
+                        return None
+                    self.set_midi_file(midi_file)
+                    return self.queue_midi(midi_file, command.get('track'), command.get('transpose'))
+                return None
+            
+            def snapshot_state(self):
+                """Return the selected MIDI file and playback settings for later restoration"""
+                return {'midi_file': self.midi_file, 'speed': self.speed, 'transpose': self.transpose,
+                        'thin': self.thin, 'voices': dict(self.song_voices),
+                        'library_dir': self.library_dir, 'library_query': self.library_search.text()}
+            
+            def reset_state(self):
+                """Clear the selection so the widget can be pooled and reused"""
+                self.on_unload()
+                self.midi_file = None
+                self.piano_roll.set_track(None)
+                self.piano_roll.follow(self.playback_position)
+                self.speed_slider.setValue(100)
+                self.transpose_slider.setValue(0)
+                self.thin_checkbox.setChecked(False)
+                self.song_voices = {}
+                self.voices_combo.setCurrentIndex(0)
+                self.library_search.clear()
+                self.status_label.setText("No MIDI file selected")
+            
+            def restore_state(self, state):
+                """Re-select the MIDI file and settings captured by snapshot_state"""
+                self.speed_slider.setValue(round(state.get('speed', 1.0) * 100))
+                self.transpose_slider.setValue(state.get('transpose', 0))
+                self.thin_checkbox.setChecked(state.get('thin', False))
+                self.song_voices = dict(state.get('voices', {}))
+                library_dir = state.get('library_dir')
+                if library_dir and library_dir != self.library_dir and os.path.isdir(library_dir):
+                    self.scan_library(library_dir)
+                self.library_search.setText(state.get('library_query', ''))
+                midi_file = state.get('midi_file')
+                if midi_file and os.path.exists(midi_file):
+                    self.set_midi_file(midi_file)
         
         # Ensure QApplication exists
         from PyQt5.QtWidgets import QApplication
@@ -401,7 +1273,7 @@ def create_plugin(button=None):
             app = QApplication(sys.argv)
         
         # Create widget
-        widget = ScumBardPluginWidget()
+        widget = ScumBardPluginWidget(overlay=getattr(button, 'overlay', None))
         
         # Log and verify widget type
         logging.info(f"Created Scum Bard plugin widget: {type(widget)}")
@@ -412,24 +1284,129 @@ def create_plugin(button=None):
         logging.error(f"Failed to create Scum Bard plugin: {e}")
         raise
 
+def transpose_argument(value):
+    """argparse type for --transpose: whole semitones within +/-MAX_TRANSPOSE"""
+    try:
+        semitones = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid semitone count: {value!r}")
+    if not -MAX_TRANSPOSE <= semitones <= MAX_TRANSPOSE:
+        raise argparse.ArgumentTypeError(f"must be within +/-{MAX_TRANSPOSE} semitones, got {semitones}")
+    return semitones
+
 def main():
     parser = argparse.ArgumentParser(description="Scum Bard MIDI Player")
-    parser.add_argument('-f', '--file', required=True, help='MIDI file to play')
-    parser.add_argument('-t', '--track', type=int, default=0, help='Track to play')
+    parser.add_argument('-f', '--file', help='MIDI file to play')
+    parser.add_argument('-t', '--track', type=int, help='Track to play (default 0)')
     parser.add_argument('-k', '--keymap', help='Custom keymap JSON file')
     parser.add_argument('-l', '--list-tracks', action='store_true', help='List tracks in MIDI file')
     parser.add_argument('--debug', action='store_true', help='Enable debug logging')
+    parser.add_argument('--precision', action='store_true',
+                        help='Use hybrid sleep/spin timing and report jitter')
+    parser.add_argument('--spin-threshold', type=float, default=DEFAULT_SPIN_THRESHOLD * 1000,
+                        help='Milliseconds before each note to start spinning (precision mode)')
+    parser.add_argument('--live', nargs='?', const='', metavar='PORT',
+                        help='Play from a live MIDI input port (default port if no name given)')
+    parser.add_argument('--list-ports', action='store_true', help='List MIDI input ports')
+    parser.add_argument('--conduct', type=int, metavar='FOLLOWERS',
+                        help='Conduct an ensemble of this many followers')
+    parser.add_argument('--follow', metavar='HOST', help='Follow the ensemble conductor at HOST')
+    parser.add_argument('--ensemble-port', type=int, default=ENSEMBLE_PORT,
+                        help='UDP port of the ensemble conductor')
+    parser.add_argument('--name', help='Name of this instance in the ensemble')
+    parser.add_argument('--lan', action='store_true',
+                        help='Let followers on other machines join (the conductor listens on all interfaces)')
+    parser.add_argument('--speed', type=float,
+                        help='Playback speed factor (e.g. 0.5 for half speed)')
+    parser.add_argument('--transpose', type=transpose_argument, metavar='SEMITONES',
+                        help=f'Shift every note by this many semitones (at most {MAX_TRANSPOSE} either way)')
+    parser.add_argument('--thin', nargs='?', type=float, const=DEFAULT_MAX_RATE, metavar='RATE',
+                        help='Thin dense passages to RATE key actions per second '
+                             f'(default {DEFAULT_MAX_RATE:.0f} if no rate given)')
+    parser.add_argument('--skyline', nargs='?', const='highest', choices=SKYLINE_MODES,
+                        help='Play a single voice: the highest note (default) or the most salient one')
+    parser.add_argument('--start', type=float, default=0.0, help='Seconds into the track to start at')
+    parser.add_argument('--end', type=float, help='Seconds into the track to stop at')
+    parser.add_argument('--loop', type=int, default=1, metavar='N', help='Play the section N times')
+    parser.add_argument('--preview', metavar='WAV',
+                        help='Render what the track will play to a WAV file instead of playing it')
+    parser.add_argument('--play-preview', action='store_true',
+                        help='Play the rendered preview (needs the sounddevice package)')
+    parser.add_argument('--export', metavar='SCRIPT',
+                        help='Compile the track to a key script file instead of playing it')
+    parser.add_argument('--profile', action='store_true',
+                        help="Use the song's saved profile for settings not given, cache its "
+                             "compiled notes and save the settings used")
+    parser.add_argument('--export-profiles', metavar='FILE', help='Write every song profile to FILE')
+    parser.add_argument('--import-profiles', metavar='FILE', help='Merge song profiles from FILE')
 
     args = parser.parse_args()
 
+    if args.list_ports:
+        for port_name in list_input_ports():
+            print(port_name)
+        return
+
+    profiles = None
+    if args.profile or args.export_profiles or args.import_profiles:
+        profiles = ProfileStore(PROFILES_PATH, PROFILE_CACHE_DIR)
+    if args.import_profiles or args.export_profiles:
+        try:
+            if args.import_profiles:
+                count = profiles.import_profiles(args.import_profiles)
+                print(f"Imported {count} profiles from {args.import_profiles}")
+            if args.export_profiles:
+                count = profiles.export_profiles(args.export_profiles)
+                print(f"Exported {count} profiles to {args.export_profiles}")
+        except (OSError, ValueError) as e:
+            print(f"Scum Bard Error: {e}")
+            sys.exit(1)
+        return
+
+    live = args.live is not None
+    if not args.file and not live:
+        parser.error("the following arguments are required: -f/--file")
+
+    # Settings not given on the command line come from the song's profile
+    profile = profiles.lookup(args.file) if args.profile and args.file else None
+    if profile is not None:
+        print(f"Using saved profile: {profile}")
+
+    def setting(value, name, default):
+        if value is not None:
+            return value
+        return getattr(profile, name) if profile is not None else default
+
     # Set log level based on debug flag
     log_level = logging.DEBUG if args.debug else logging.INFO
 
     try:
-        bard = ScumBard(args.file, args.track, args.keymap, log_level)
+        bard = ScumBard(args.file, setting(args.track, 'track', 0), setting(args.keymap, 'keymap', None),
+                        log_level, precision=args.precision,
+                        spin_threshold=args.spin_threshold / 1000, live=live,
+                        speed=setting(args.speed, 'speed', 1.0),
+                        transpose=setting(args.transpose, 'transpose', 0),
+                        max_rate=setting(args.thin, 'max_rate', None),
+                        skyline_mode=setting(args.skyline, 'skyline', None),
+                        profiles=profiles if args.profile else None)
+
+        if args.profile and not live and not args.list_tracks:
+            bard.remember_profile(bard.compile(octave_management=True))
 
-        if args.list_tracks:
+        if live:
+            bard.play_live(args.live or None)
+        elif args.conduct is not None:
+            bard.conduct(args.conduct, port=args.ensemble_port, host=LAN_HOST if args.lan else ENSEMBLE_HOST)
+        elif args.follow:
+            bard.follow(args.follow, port=args.ensemble_port, name=args.name)
+        elif args.export:
+            bard.export_keyscript(args.export)
+        elif args.preview or args.play_preview:
+            bard.preview(args.preview, play=args.play_preview)
+        elif args.list_tracks:
             bard.list_tracks()
+        elif args.start or args.end is not None or args.loop > 1:
+            bard.play_section(args.start, args.end, args.loop)
         else:
             bard.play_midi_with_octave_management()
 
@@ -4,10 +4,19 @@ import logging
 import os
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLineEdit, 
                              QMessageBox, QApplication, QShortcut, QHBoxLayout, 
-                             QPushButton, QSlider, QMenu, QAction, QLabel)
+                             QPushButton, QSlider, QMenu, QAction, QLabel, QTabWidget)
 from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEngineSettings, QWebEnginePage
 from PyQt5.QtGui import QKeySequence
-from PyQt5.QtCore import QUrl, Qt
+from PyQt5.QtCore import QUrl, Qt, QTimer
+
+# Make the bundled browser_web package importable whether this file is loaded
+# as part of the plugins package or directly by the overlay's plugin loader
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+if PLUGIN_DIR not in sys.path:
+    sys.path.insert(0, PLUGIN_DIR)
+
+from browser_web import (shared_profile, warm_cache_later, load_profile_settings, TabLifecycle,
+                         content_blocker, set_content_blocking, page_key)
 
 # Set up logging
 log_dir = os.path.join(os.path.dirname(__file__), 'logs')
@@ -20,8 +29,8 @@ logging.basicConfig(
 )
 
 class CustomWebEnginePage(QWebEnginePage):
-    def __init__(self, parent=None):
-        super().__init__(parent)
+    def __init__(self, profile, parent=None):
+        super().__init__(profile, parent)
         
     def javaScriptConsoleMessage(self, level, message, lineNumber, sourceID):
         # Suppress specific non-critical warnings
@@ -38,6 +47,10 @@ class CustomWebEnginePage(QWebEnginePage):
 
 class ScumBrowserWidget(QWidget):
     DEFAULT_SEARCH_ENGINE = "https://www.google.com/search?q="
+    HOMEPAGE = "https://www.google.com"
+    
+    # Longest tab title shown before eliding
+    MAX_TAB_TITLE = 24
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -70,18 +83,30 @@ class ScumBrowserWidget(QWidget):
             # Add navigation layout to main layout
             main_layout.addLayout(nav_layout)
             
-            # Create web view with custom page
-            self.web_view = QWebEngineView(self)
-            custom_page = CustomWebEnginePage(self.web_view)
-            self.web_view.setPage(custom_page)
+            # Tabs of web views on the shared persistent profile, so the disk
+            # cache and cookies outlive this widget
+            self.profile = shared_profile()
+            self.tabs = QTabWidget(self)
+            self.tabs.setTabsClosable(True)
+            self.tabs.setMovable(True)
+            self.tabs.setDocumentMode(True)
+            self.tabs.tabCloseRequested.connect(self.close_tab)
+            self.tabs.currentChanged.connect(self.current_tab_changed)
+            new_tab_button = QPushButton("+", self)
+            new_tab_button.clicked.connect(lambda: self.new_tab(self.HOMEPAGE))
+            self.tabs.setCornerWidget(new_tab_button, Qt.TopRightCorner)
+            main_layout.addWidget(self.tabs)
             
-            # Disable JavaScript warnings and non-critical console messages
-            settings = self.web_view.settings()
-            settings.setAttribute(QWebEngineSettings.JavascriptCanOpenWindows, False)
-            settings.setAttribute(QWebEngineSettings.JavascriptEnabled, True)
-            settings.setAttribute(QWebEngineSettings.AutoLoadImages, True)
-            
-            main_layout.addWidget(self.web_view)
+            # Background tabs are frozen, then discarded, so only the visible
+            # tab costs CPU and memory stays under budget
+            settings = load_profile_settings()
+            self.tab_lifecycle = TabLifecycle(
+                self.tabs,
+                freeze_after_ms=settings['tab_freeze_after_s'] * 1000,
+                discard_after_ms=settings['tab_discard_after_s'] * 1000,
+                memory_budget_mb=settings['tab_memory_budget_mb'],
+                parent=self
+            )
             
             # Create transparency slider
             transparency_layout = QHBoxLayout()
@@ -94,6 +119,17 @@ class ScumBrowserWidget(QWidget):
             
             transparency_layout.addWidget(transparency_label)
             transparency_layout.addWidget(self.transparency_slider)
+            
+            # Requests blocked on the visible page and what matching costs;
+            # refreshed at most every 250 ms while a page loads
+            self.blocker = content_blocker()
+            self.blocked_label = QLabel(self)
+            transparency_layout.addWidget(self.blocked_label)
+            self.blocked_label_timer = QTimer(self)
+            self.blocked_label_timer.setSingleShot(True)
+            self.blocked_label_timer.setInterval(250)
+            self.blocked_label_timer.timeout.connect(self.update_blocked_label)
+            self.blocker.request_blocked.connect(self.page_request_blocked)
             main_layout.addLayout(transparency_layout)
             
             # Set layout
@@ -108,8 +144,9 @@ class ScumBrowserWidget(QWidget):
             # Set initial zoom level
             self.current_zoom = 1.0
             
-            # Add zoom shortcuts
+            # Add zoom and tab shortcuts
             self.setup_zoom_shortcuts()
+            self.setup_tab_shortcuts()
             
             # Setup context menu
             self.setup_context_menu()
@@ -127,6 +164,126 @@ class ScumBrowserWidget(QWidget):
                                  f"Check log at {log_file} for details")
             raise
     
+    @property
+    def web_view(self):
+        """View of the visible tab."""
+        return self.tabs.currentWidget()
+    
+    def tab_views(self):
+        return [self.tabs.widget(index) for index in range(self.tabs.count())]
+    
+    def new_tab(self, url=None, index=None, background=False, lazy=False):
+        """
+        Open a tab on the shared profile.
+        
+        :param url: URL to open (default: the homepage)
+        :param index: Position of the tab (default: last)
+        :param background: Keep the current tab visible
+        :param lazy: Load ``url`` only when the tab is first shown
+        :return: The tab's QWebEngineView
+        """
+        url = url or self.HOMEPAGE
+        view = QWebEngineView(self)
+        view.setPage(CustomWebEnginePage(self.profile, view))
+        
+        # Disable JavaScript warnings and non-critical console messages
+        settings = view.settings()
+        settings.setAttribute(QWebEngineSettings.JavascriptCanOpenWindows, False)
+        settings.setAttribute(QWebEngineSettings.JavascriptEnabled, True)
+        settings.setAttribute(QWebEngineSettings.AutoLoadImages, True)
+        view.setZoomFactor(self.current_zoom)
+        
+        view.titleChanged.connect(lambda title: self.set_tab_title(view, title))
+        view.urlChanged.connect(lambda changed: self.tab_url_changed(view, changed))
+        # Blocked counts start again when a page is reloaded or navigated to
+        view.loadStarted.connect(lambda: self.reset_blocked_count(view.url()))
+        
+        # Tracked before it is added, so the tab becoming current activates it
+        self.tab_lifecycle.track(view, pending_url=url if lazy else None)
+        if index is None:
+            index = self.tabs.addTab(view, "New Tab")
+        else:
+            index = self.tabs.insertTab(index, view, "New Tab")
+        if lazy:
+            # Named after the site until the page loads and has a title
+            self.tabs.setTabText(index, QUrl(url).host() or url)
+            self.tabs.setTabToolTip(index, url)
+        else:
+            view.setUrl(QUrl(url))
+        if not background:
+            self.tabs.setCurrentIndex(index)
+        logging.info(f"Opened tab {url}{' (lazy)' if lazy else ''}")
+        return view
+    
+    def close_tab(self, index):
+        """Close a tab; closing the last one opens the homepage."""
+        self._remove_tab(index)
+        if self.tabs.count() == 0:
+            self.new_tab(self.HOMEPAGE)
+    
+    def close_current_tab(self):
+        self.close_tab(self.tabs.currentIndex())
+    
+    def _remove_tab(self, index):
+        view = self.tabs.widget(index)
+        self.tab_lifecycle.forget(view)
+        self.tabs.removeTab(index)
+        view.stop()
+        view.deleteLater()
+    
+    def set_tab_title(self, view, title):
+        index = self.tabs.indexOf(view)
+        if index < 0:
+            return
+        if len(title) > self.MAX_TAB_TITLE:
+            self.tabs.setTabText(index, title[:self.MAX_TAB_TITLE - 1] + "…")
+        else:
+            self.tabs.setTabText(index, title or "New Tab")
+        self.tabs.setTabToolTip(index, title)
+    
+    def tab_url_changed(self, view, url):
+        """Keep the address bar on the visible tab's URL."""
+        self.reset_blocked_count(url)
+        if view is self.web_view:
+            self.url_input.setText(url.toString())
+    
+    def reset_blocked_count(self, url):
+        self.blocker.content_filter.reset_page(page_key(url))
+        self.blocked_label_timer.start()
+    
+    def page_request_blocked(self, page):
+        """Refresh the blocked count soon if the visible page had a request blocked."""
+        view = self.web_view
+        if view is not None and page == page_key(view.url()) and not self.blocked_label_timer.isActive():
+            self.blocked_label_timer.start()
+    
+    def update_blocked_label(self):
+        content_filter = self.blocker.content_filter
+        if not content_filter.enabled:
+            self.blocked_label.setText("Blocking off")
+            return
+        view = self.web_view
+        count = content_filter.page_blocked(page_key(view.url())) if view is not None else 0
+        p99 = content_filter.latency_us(99)
+        self.blocked_label.setText(f"Blocked: {count}" + (f" (p99 {p99:.0f} µs)" if p99 is not None else ""))
+        self.blocked_label.setToolTip(
+            f"{content_filter.rule_count} filter rules, {content_filter.blocked} of "
+            f"{content_filter.requests} requests blocked"
+        )
+    
+    def toggle_content_blocking(self, enabled):
+        set_content_blocking(enabled)
+        logging.info(f"Content blocking {'enabled' if enabled else 'disabled'}")
+        self.update_blocked_label()
+    
+    def current_tab_changed(self, index):
+        view = self.tabs.widget(index)
+        if view is None:
+            return
+        self.url_input.setText(self.tab_lifecycle.url(view))
+        view.setZoomFactor(self.current_zoom)
+        self.update_blocked_label()
+    
     def go_back(self):
         """Navigate to the previous page in browsing history."""
         if self.web_view.history().canGoBack():
@@ -152,11 +309,13 @@ class ScumBrowserWidget(QWidget):
         return not current_js_state
     
     def navigate_to_homepage(self):
-        """Navigate to the default homepage (Google)."""
-        homepage = "https://www.google.com"
-        logging.info(f"Navigating to homepage: {homepage}")
-        self.web_view.setUrl(QUrl(homepage))
-        self.url_input.setText(homepage)
+        """Navigate the visible tab to the default homepage (Google), opening a tab if there is none."""
+        logging.info(f"Navigating to homepage: {self.HOMEPAGE}")
+        if self.web_view is None:
+            self.new_tab(self.HOMEPAGE)
+        else:
+            self.web_view.setUrl(QUrl(self.HOMEPAGE))
+        self.url_input.setText(self.HOMEPAGE)
     
     def navigate(self):
         try:
@@ -202,6 +361,15 @@ class ScumBrowserWidget(QWidget):
         reset_zoom_shortcut = QShortcut(QKeySequence(Qt.CTRL + Qt.Key_0), self)
         reset_zoom_shortcut.activated.connect(self.reset_zoom)
     
+    def setup_tab_shortcuts(self):
+        # New tab shortcut (Ctrl + T)
+        new_tab_shortcut = QShortcut(QKeySequence(Qt.CTRL + Qt.Key_T), self)
+        new_tab_shortcut.activated.connect(lambda: self.new_tab(self.HOMEPAGE))
+        
+        # Close tab shortcut (Ctrl + W)
+        close_tab_shortcut = QShortcut(QKeySequence(Qt.CTRL + Qt.Key_W), self)
+        close_tab_shortcut.activated.connect(self.close_current_tab)
+    
     def zoom_in(self):
         self.current_zoom = min(5.0, self.current_zoom + 0.1)
         self.web_view.setZoomFactor(self.current_zoom)
@@ -247,8 +415,23 @@ class ScumBrowserWidget(QWidget):
         js_toggle = context_menu.addAction("Toggle JavaScript")
         js_toggle.triggered.connect(self.toggle_javascript)
         
+        # Ad and tracker blocking
+        blocking_toggle = context_menu.addAction("Block Ads and Trackers")
+        blocking_toggle.setCheckable(True)
+        blocking_toggle.setChecked(self.blocker.content_filter.enabled)
+        blocking_toggle.toggled.connect(self.toggle_content_blocking)
+        
+        # Drop cached pages and resources (cookies are kept)
+        clear_cache = context_menu.addAction("Clear Cache")
+        clear_cache.triggered.connect(self.clear_cache)
+        
         context_menu.exec_(self.mapToGlobal(pos))
     
+    def clear_cache(self):
+        """Clear the shared profile's HTTP cache."""
+        self.profile.clearHttpCache()
+        logging.info(f"Cleared browser cache in {self.profile.cachePath()}")
+    
     def adjust_transparency(self, value):
         """Adjust window transparency based on slider value."""
         # Convert percentage to opacity (0.0 to 1.0)
@@ -260,6 +443,85 @@ class ScumBrowserWidget(QWidget):
         """Set transparency to a specific value."""
         self.transparency_slider.setValue(value)
         self.adjust_transparency(value)
+    
+    def handle_command(self, command):
+        """Handle a command forwarded by the overlay."""
+        if command.get('action') == 'navigate':
+            if command.get('new_tab'):
+                self.new_tab("about:blank")
+            self.url_input.setText(command.get('url', ''))
+            self.navigate()
+        return None
+    
+    def on_suspend(self):
+        """Freeze every tab while hidden so JS timers and rendering stop."""
+        self.tab_lifecycle.suspend()
+        logging.info("Browser suspended")
+    
+    def on_resume(self):
+        """Thaw the visible tab when the browser is shown again."""
+        self.tab_lifecycle.resume()
+        logging.info("Browser resumed")
+    
+    def on_unload(self):
+        """Stop any in-flight loads before the widget is destroyed."""
+        for view in self.tab_views():
+            view.stop()
+        logging.info(f"Browser unloaded; content blocking: {self.blocker.content_filter.stats()}")
+    
+    def snapshot_state(self):
+        """Return the user-visible browser state for later restoration."""
+        return {
+            'url': self.tab_lifecycle.url(self.web_view),
+            'tabs': [
+                {'url': self.tab_lifecycle.url(view),
+                 'scroll': list(self.tab_lifecycle.scroll_position(view))}
+                for view in self.tab_views()
+            ],
+            'current_tab': self.tabs.currentIndex(),
+            'zoom': self.current_zoom,
+            'transparency': self.transparency_slider.value()
+        }
+    
+    def reset_state(self):
+        """
+        Return to a single blank tab so the widget can be pooled and reused.
+        The renderer process and profile stay alive for the next open.
+        """
+        while self.tabs.count():
+            self._remove_tab(0)
+        self.new_tab("about:blank")
+        self.url_input.clear()
+        self.reset_zoom()
+        self.set_transparency(100)
+        logging.info("Browser reset for reuse")
+    
+    def restore_state(self, state):
+        """
+        Re-apply state captured by snapshot_state. Only the visible tab
+        loads now; the others load when they are first shown.
+        """
+        self.current_zoom = state.get('zoom', 1.0)
+        
+        tabs = state.get('tabs')
+        if tabs is None and state.get('url'):
+            # Snapshot taken before the browser had tabs
+            tabs = [{'url': state['url']}]
+        if tabs:
+            while self.tabs.count():
+                self._remove_tab(0)
+            current = min(max(state.get('current_tab', 0), 0), len(tabs) - 1)
+            view = self.new_tab(tabs[current]['url'])
+            self.tab_lifecycle.set_scroll_position(view, tabs[current].get('scroll', (0, 0)))
+            # Inserted around the visible tab in their original order
+            for index, tab in enumerate(tabs):
+                if index != current:
+                    view = self.new_tab(tab['url'], index=index, background=True, lazy=True)
+                    self.tab_lifecycle.set_scroll_position(view, tab.get('scroll', (0, 0)))
+        
+        self.web_view.setZoomFactor(self.current_zoom)
+        self.set_transparency(state.get('transparency', 100))
+        logging.info(f"Restored browser state: {len(tabs or [])} tabs")
 
 def create_plugin(button=None):
     # Ensure QApplication exists
@@ -270,6 +532,9 @@ def create_plugin(button=None):
     # Create widget
     widget = ScumBrowserWidget()
     
+    # Fetch the pages visited every session into the disk cache
+    warm_cache_later()
+    
     # Explicitly log and verify widget type
     logging.info(f"Created plugin widget: {type(widget)}")
     
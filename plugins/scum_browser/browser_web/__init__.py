@@ -0,0 +1,24 @@
+"""
+QtWebEngine plumbing for the Scum Browser plugin.
+
+Like bard_ui this package imports PyQt5 (and QtWebEngine) at module level;
+load it only where a GUI exists.
+"""
+
+from .profile import (shared_profile, warm_cache_later, load_profile_settings,
+                      content_blocker, set_content_blocking, CacheWarmer, PROFILE_SETTINGS_PATH)
+from .interceptor import ContentBlocker, page_key
+from .tabs import TabLifecycle
+
+__all__ = [
+    'CacheWarmer',
+    'ContentBlocker',
+    'PROFILE_SETTINGS_PATH',
+    'TabLifecycle',
+    'content_blocker',
+    'load_profile_settings',
+    'page_key',
+    'set_content_blocking',
+    'shared_profile',
+    'warm_cache_later',
+]
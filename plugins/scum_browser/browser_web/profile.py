@@ -0,0 +1,280 @@
+"""
+The browser's persistent web profile and its cache warmer.
+
+Every browser widget shares one named ``QWebEngineProfile`` stored under
+``~/.scumplug``, so cookies, logins and the HTTP disk cache survive closing
+the plugin and restarting the overlay; a widget rebuilt after the plugin was
+unloaded reuses the same warm cache. Where the cache lives, how large it may
+grow, the cache type and the cookie policy come from
+``~/.scumplug/scum_browser.json``, which is written with the defaults on
+first use.
+
+Every request goes through a ContentBlocker (see interceptor) that blocks
+ads and trackers unless ``content_blocking`` is off; ``filter_dir`` holds
+extra filter lists.
+
+The settings also list pages worth keeping warm (the wiki and the map,
+which are heavy and visited every session). ``CacheWarmer`` loads them one
+at a time in a hidden, muted page shortly after the browser opens, at most
+once per ``warm_interval_hours``, so the next visit is served from disk.
+"""
+
+import os
+import json
+import time
+import logging
+
+from PyQt5.QtCore import QObject, QTimer, QUrl, pyqtSignal
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtWebEngineWidgets import QWebEngineProfile, QWebEnginePage
+
+from content_filter import ContentFilter
+
+from .interceptor import ContentBlocker
+
+CONFIG_DIR = os.path.join(os.path.expanduser('~'), '.scumplug')
+
+# User-editable profile settings (and when the cache was last warmed)
+PROFILE_SETTINGS_PATH = os.path.join(CONFIG_DIR, 'scum_browser.json')
+
+# Storage name of the shared profile; also names its folders
+PROFILE_NAME = 'scum_browser'
+
+DEFAULT_SETTINGS = {
+    'storage_dir': os.path.join(CONFIG_DIR, 'scum_browser_profile'),
+    'cache_dir': os.path.join(CONFIG_DIR, 'scum_browser_cache'),
+    'cache_size_mb': 256,
+    'http_cache': 'disk',
+    'persistent_cookies': 'allow',
+    'warm_urls': [
+        'https://scum.fandom.com/wiki/SCUM_Wiki',
+        'https://scum-map.com/en/interactive_map',
+    ],
+    'warm_interval_hours': 12,
+    'last_warmed': 0,
+    # Background tabs are frozen, then discarded, after this long; and
+    # discarded early while the browser uses more memory than the budget
+    'tab_freeze_after_s': 60,
+    'tab_discard_after_s': 600,
+    'tab_memory_budget_mb': 1024,
+    # Block ads and trackers with the bundled list plus the .txt lists here
+    'content_blocking': True,
+    'filter_dir': os.path.join(CONFIG_DIR, 'filters'),
+}
+
+HTTP_CACHE_TYPES = {
+    'disk': QWebEngineProfile.DiskHttpCache,
+    'memory': QWebEngineProfile.MemoryHttpCache,
+    'none': QWebEngineProfile.NoCache,
+}
+
+COOKIE_POLICIES = {
+    'none': QWebEngineProfile.NoPersistentCookies,
+    'allow': QWebEngineProfile.AllowPersistentCookies,
+    'force': QWebEngineProfile.ForcePersistentCookies,
+}
+
+# Delay before warming starts, leaving the first page load alone (milliseconds)
+WARM_DELAY_MS = 5000
+
+# Longest wait for one page to finish warming (milliseconds)
+WARM_TIMEOUT_MS = 30000
+
+_profile = None
+_blocker = None
+_warmer = None
+
+
+def load_profile_settings(path=PROFILE_SETTINGS_PATH):
+    """
+    Read the profile settings, falling back to the default for anything
+    missing or invalid; writes the defaults when there is no file yet
+
+    :return: Settings dict with every key of DEFAULT_SETTINGS
+    """
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(path, 'r') as f:
+            stored = json.load(f)
+        if not isinstance(stored, dict):
+            raise ValueError("settings must be a JSON object")
+    except FileNotFoundError:
+        save_profile_settings(settings, path)
+        return settings
+    except (json.JSONDecodeError, ValueError) as e:
+        logging.error(f"Ignoring unreadable browser settings {path}: {e}")
+        return settings
+
+    for key, default in DEFAULT_SETTINGS.items():
+        value = stored.get(key, default)
+        # bool is an int subclass: switches take only true/false, and numbers never take either
+        if isinstance(default, bool):
+            valid = isinstance(value, bool)
+        elif isinstance(default, (int, float)):
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+        elif isinstance(default, list):
+            valid = isinstance(value, list) and all(isinstance(url, str) for url in value)
+        else:
+            valid = isinstance(value, str)
+        if key == 'http_cache':
+            valid = valid and value in HTTP_CACHE_TYPES
+        elif key == 'persistent_cookies':
+            valid = valid and value in COOKIE_POLICIES
+        if valid:
+            settings[key] = value
+        else:
+            logging.warning(f"Invalid browser setting {key}={value!r}; using {default!r}")
+    return settings
+
+
+def save_profile_settings(settings, path=PROFILE_SETTINGS_PATH):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(settings, f, indent=2)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logging.error(f"Failed to save browser settings {path}: {e}")
+
+
+def shared_profile():
+    """
+    The profile every browser widget uses, created on first call
+
+    The profile is parented to the application so it outlives the widgets
+    (and their pages) that are created and destroyed as the plugin opens
+    and closes.
+    """
+    global _profile, _blocker
+    if _profile is not None:
+        return _profile
+
+    settings = load_profile_settings()
+    profile = QWebEngineProfile(PROFILE_NAME, QApplication.instance())
+    # Paths must be set before any page uses the profile
+    profile.setPersistentStoragePath(settings['storage_dir'])
+    profile.setCachePath(settings['cache_dir'])
+    profile.setHttpCacheType(HTTP_CACHE_TYPES[settings['http_cache']])
+    profile.setHttpCacheMaximumSize(int(settings['cache_size_mb'] * 1024 * 1024))
+    profile.setPersistentCookiesPolicy(COOKIE_POLICIES[settings['persistent_cookies']])
+    logging.info(
+        f"Browser profile: {settings['http_cache']} cache of {settings['cache_size_mb']} MB "
+        f"in {profile.cachePath()}, {settings['persistent_cookies']} persistent cookies"
+    )
+
+    # Installed even when blocking is off, so it can be switched on live
+    content_filter = ContentFilter(directory=settings['filter_dir'])
+    content_filter.enabled = settings['content_blocking']
+    _blocker = ContentBlocker(content_filter, profile)
+    _blocker.install(profile)
+
+    _profile = profile
+    return profile
+
+
+def content_blocker():
+    """ContentBlocker of the shared profile (created with it)"""
+    shared_profile()
+    return _blocker
+
+
+def set_content_blocking(enabled):
+    """Switch blocking on or off now and for later sessions"""
+    content_blocker().content_filter.enabled = enabled
+    settings = load_profile_settings()
+    settings['content_blocking'] = enabled
+    save_profile_settings(settings)
+
+
+def warm_cache_later(delay_ms=WARM_DELAY_MS):
+    """
+    Warm the shared profile's cache with the configured pages after
+    ``delay_ms``, unless that was done within ``warm_interval_hours`` or is
+    already underway
+    """
+    global _warmer
+    if _warmer is not None:
+        return
+    settings = load_profile_settings()
+    if settings['http_cache'] != 'disk' or not settings['warm_urls']:
+        return
+    age = time.time() - settings['last_warmed']
+    if age < settings['warm_interval_hours'] * 3600:
+        logging.info(f"Browser cache warmed {age / 3600:.1f} h ago; not warming")
+        return
+
+    _warmer = CacheWarmer(shared_profile(), settings['warm_urls'], shared_profile())
+    _warmer.finished.connect(_warming_finished)
+    QTimer.singleShot(delay_ms, _warmer.start)
+
+
+def _warming_finished(loaded, failed):
+    global _warmer
+    # Offline: try again next time the browser opens
+    if loaded:
+        settings = load_profile_settings()
+        settings['last_warmed'] = time.time()
+        save_profile_settings(settings)
+    _warmer.deleteLater()
+    _warmer = None
+
+
+class CacheWarmer(QObject):
+    """
+    Load pages one after another in a hidden page so their resources land
+    in the profile's disk cache
+
+    ``finished(loaded, failed)`` is emitted with the number of pages that
+    loaded and that failed or timed out.
+    """
+
+    finished = pyqtSignal(int, int)
+
+    def __init__(self, profile, urls, parent=None):
+        super().__init__(parent)
+        self.profile = profile
+        self.urls = list(urls)
+        self.loaded = 0
+        self.failed = 0
+        self._page = None
+        self._started = 0.0
+        self._timeout = QTimer(self)
+        self._timeout.setSingleShot(True)
+        self._timeout.timeout.connect(lambda: self._page_done(self._page, False))
+
+    def start(self):
+        self._load_next()
+
+    def _load_next(self):
+        if self._page is not None:
+            # Deleting the page also aborts a load that timed out
+            self._page.deleteLater()
+            self._page = None
+        if not self.urls:
+            logging.info(f"Browser cache warmed: {self.loaded} pages loaded, {self.failed} failed")
+            self.finished.emit(self.loaded, self.failed)
+            return
+
+        page = QWebEnginePage(self.profile, self)
+        page.setAudioMuted(True)
+        page.loadFinished.connect(lambda ok: self._page_done(page, ok))
+        self._page = page
+        self._started = time.perf_counter()
+        self._timeout.start(WARM_TIMEOUT_MS)
+        page.load(QUrl(self.urls[0]))
+
+    def _page_done(self, page, ok):
+        # Ignore pages given up on earlier
+        if page is not self._page:
+            return
+        self._timeout.stop()
+        url = self.urls.pop(0)
+        seconds = time.perf_counter() - self._started
+        if ok:
+            self.loaded += 1
+            logging.info(f"Warmed {url} in {seconds:.1f}s")
+        else:
+            self.failed += 1
+            logging.warning(f"Failed to warm {url} after {seconds:.1f}s")
+        self._load_next()
@@ -0,0 +1,242 @@
+"""
+Lifecycle policy for background browser tabs.
+
+Only the visible tab should cost CPU while a game is running. A tab that
+has been in the background for ``freeze_after_ms`` is Frozen (its scripts,
+timers and rendering stop but it keeps its memory); after
+``discard_after_ms`` it is Discarded (Chromium drops the page entirely and
+reloads it when the tab is shown again). While the browser's processes use
+more than ``memory_budget_mb``, background tabs are discarded early, least
+recently shown first. A discarded tab gets its scroll position back once
+it has reloaded.
+
+Lifecycle states need Qt 5.14+; on older versions tabs simply stay active.
+Tabs can also be added lazily with a URL that is only loaded the first time
+they are shown, which is how restored sessions avoid loading every tab.
+"""
+
+import time
+import logging
+
+from PyQt5.QtCore import QObject, QTimer, QUrl
+from PyQt5.QtWebEngineWidgets import QWebEnginePage
+
+try:
+    import psutil
+except ImportError:
+    # Memory budget enforcement is disabled without psutil
+    psutil = None
+
+_warned_no_psutil = False
+
+# Background tabs are frozen after this long (milliseconds)
+FREEZE_AFTER_MS = 60 * 1000
+
+# Background tabs are discarded after this long (milliseconds)
+DISCARD_AFTER_MS = 10 * 60 * 1000
+
+# Memory (MB) of the browser's processes above which background tabs are discarded
+MEMORY_BUDGET_MB = 1024
+
+# How often the policy is evaluated (milliseconds)
+TAB_CHECK_INTERVAL_MS = 15 * 1000
+
+HAS_LIFECYCLE = hasattr(QWebEnginePage, 'LifecycleState')
+if HAS_LIFECYCLE:
+    ACTIVE = QWebEnginePage.LifecycleState.Active
+    FROZEN = QWebEnginePage.LifecycleState.Frozen
+    DISCARDED = QWebEnginePage.LifecycleState.Discarded
+
+
+class _TabInfo:
+    """What the policy knows about one tab"""
+
+    __slots__ = ('hidden_since', 'scroll', 'pending_url')
+
+    def __init__(self, pending_url=None):
+        self.hidden_since = time.monotonic()
+        self.scroll = None
+        self.pending_url = pending_url
+
+
+class TabLifecycle(QObject):
+    """
+    Freeze and discard the background tabs of a QTabWidget of QWebEngineViews
+
+    Views are registered with ``track()`` when their tab is added and
+    ``forget()`` before it is closed.
+    """
+
+    def __init__(self, tab_widget, freeze_after_ms=FREEZE_AFTER_MS,
+                 discard_after_ms=DISCARD_AFTER_MS, memory_budget_mb=MEMORY_BUDGET_MB,
+                 parent=None):
+        super().__init__(parent)
+        self.tab_widget = tab_widget
+        self.freeze_after_ms = freeze_after_ms
+        self.discard_after_ms = discard_after_ms
+        self.memory_budget_mb = memory_budget_mb
+        self.suspended = False
+        self._tabs = {}
+        self._current = None
+
+        tab_widget.currentChanged.connect(self._current_changed)
+
+        self._policy_timer = QTimer(self)
+        self._policy_timer.setInterval(TAB_CHECK_INTERVAL_MS)
+        self._policy_timer.timeout.connect(self.enforce_policy)
+        self._policy_timer.start()
+
+        global _warned_no_psutil
+        if psutil is None and not _warned_no_psutil:
+            _warned_no_psutil = True
+            logging.warning(f"psutil is not installed; the {memory_budget_mb} MB browser memory budget "
+                            f"is not enforced (tabs are still frozen and discarded on their timers)")
+
+    def track(self, view, pending_url=None):
+        """
+        Start managing a tab's view
+
+        :param pending_url: URL to load the first time the tab is shown,
+                            instead of loading it now
+        """
+        self._tabs[view] = _TabInfo(pending_url)
+        view.loadFinished.connect(lambda ok: self._restore_scroll(view, ok))
+        if view is self.tab_widget.currentWidget():
+            self._current = view
+            self.activate(view)
+
+    def forget(self, view):
+        self._tabs.pop(view, None)
+        if view is self._current:
+            self._current = None
+
+    def url(self, view):
+        """URL the tab shows, or will show once it is first activated"""
+        info = self._tabs.get(view)
+        if info is not None and info.pending_url:
+            return info.pending_url
+        return view.url().toString()
+
+    def scroll_position(self, view):
+        """Scroll position (x, y) of the tab, remembered while it is discarded"""
+        info = self._tabs.get(view)
+        if info is not None and info.scroll is not None:
+            return info.scroll
+        position = view.page().scrollPosition()
+        return (position.x(), position.y())
+
+    def set_scroll_position(self, view, scroll):
+        """Scroll the tab to ``scroll`` (x, y) once its page has loaded"""
+        info = self._tabs.get(view)
+        if info is not None:
+            info.scroll = tuple(scroll) if any(scroll) else None
+
+    def state(self, view):
+        """'pending', 'active', 'frozen' or 'discarded'"""
+        info = self._tabs.get(view)
+        if info is not None and info.pending_url:
+            return 'pending'
+        if not HAS_LIFECYCLE:
+            return 'active'
+        return {ACTIVE: 'active', FROZEN: 'frozen', DISCARDED: 'discarded'}[view.page().lifecycleState()]
+
+    def activate(self, view):
+        """Bring a tab back to the Active state (loading it if it is pending)"""
+        info = self._tabs.get(view)
+        if info is None:
+            return
+        if info.pending_url:
+            url, info.pending_url = info.pending_url, None
+            view.setUrl(QUrl(url))
+            logging.info(f"Loading restored tab {url}")
+        elif HAS_LIFECYCLE and view.page().lifecycleState() != ACTIVE:
+            # A discarded page reloads here; its scroll position is restored
+            # when the load finishes
+            view.page().setLifecycleState(ACTIVE)
+
+    def suspend(self):
+        """Freeze every tab, the visible one included (the browser is hidden)"""
+        self.suspended = True
+        if self._current in self._tabs:
+            self._tabs[self._current].hidden_since = time.monotonic()
+        for view in self._tabs:
+            self._freeze(view)
+
+    def resume(self):
+        self.suspended = False
+        current = self.tab_widget.currentWidget()
+        if current is not None:
+            self.activate(current)
+
+    def enforce_policy(self):
+        """Freeze or discard tabs hidden for too long, then discard LRU tabs while over budget"""
+        if not HAS_LIFECYCLE:
+            return
+        now = time.monotonic()
+        current = self.tab_widget.currentWidget()
+        for view, info in self._tabs.items():
+            if view is current and not self.suspended:
+                continue
+            hidden_ms = (now - info.hidden_since) * 1000
+            if hidden_ms >= self.discard_after_ms:
+                self._discard(view)
+            elif hidden_ms >= self.freeze_after_ms:
+                self._freeze(view)
+
+        usage = self._memory_usage_mb()
+        if usage is None or usage <= self.memory_budget_mb:
+            return
+
+        # Memory is released asynchronously, so discard one tab per pass and
+        # let the next check decide whether to continue
+        background = [view for view in self._tabs
+                      if view is not current and self.state(view) in ('active', 'frozen')]
+        if background:
+            view = min(background, key=lambda view: self._tabs[view].hidden_since)
+            logging.info(f"Browser memory {usage:.0f} MB over budget ({self.memory_budget_mb} MB), "
+                         f"discarding {view.url().toString()}")
+            self._discard(view)
+
+    def _current_changed(self, index):
+        # The tab being left starts its background time now
+        if self._current in self._tabs:
+            self._tabs[self._current].hidden_since = time.monotonic()
+        self._current = self.tab_widget.widget(index)
+        if self._current is not None and not self.suspended:
+            self.activate(self._current)
+
+    def _freeze(self, view):
+        if HAS_LIFECYCLE and self.state(view) == 'active':
+            view.page().setLifecycleState(FROZEN)
+            logging.info(f"Froze tab {view.url().toString()}")
+
+    def _discard(self, view):
+        if self.state(view) not in ('active', 'frozen'):
+            return
+        info = self._tabs[view]
+        info.scroll = self.scroll_position(view)
+        # Active pages have to be frozen before they can be discarded
+        self._freeze(view)
+        view.page().setLifecycleState(DISCARDED)
+        logging.info(f"Discarded tab {view.url().toString()}")
+
+    def _restore_scroll(self, view, ok):
+        info = self._tabs.get(view)
+        if not ok or info is None or info.scroll is None:
+            return
+        x, y = info.scroll
+        info.scroll = None
+        view.page().runJavaScript(f"window.scrollTo({x}, {y});")
+
+    def _memory_usage_mb(self):
+        """Resident memory of the browser's processes (the overlay and its renderers)"""
+        if psutil is None:
+            return None
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total / (1024 * 1024)
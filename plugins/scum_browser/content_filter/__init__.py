@@ -0,0 +1,27 @@
+"""
+Request filtering for the Scum Browser plugin.
+
+Qt-free: filter lists are parsed and compiled here, and browser_web's
+request interceptor asks ``ContentFilter.should_block()`` about every
+request a page makes.
+"""
+
+from .engine import ContentFilter, DEFAULT_FILTER_PATH, list_files
+from .matcher import FilterSet, Request, DomainTrie, SubstringAutomaton, base_domain
+from .rules import Rule, RuleOptions, parse_rule, parse_filter_list, RESOURCE_TYPES
+
+__all__ = [
+    'ContentFilter',
+    'DEFAULT_FILTER_PATH',
+    'DomainTrie',
+    'FilterSet',
+    'RESOURCE_TYPES',
+    'Request',
+    'Rule',
+    'RuleOptions',
+    'SubstringAutomaton',
+    'base_domain',
+    'list_files',
+    'parse_filter_list',
+    'parse_rule',
+]
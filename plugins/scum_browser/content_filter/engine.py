@@ -0,0 +1,247 @@
+"""
+Content filter: filter lists loaded from local files, compiled for fast
+per-request matching, with blocking statistics.
+
+``ContentFilter`` reads the bundled default list plus every ``*.txt`` in a
+filter directory, compiles them into a blocking and an exception
+``FilterSet`` and answers ``should_block()`` for each request. ``refresh()``
+recompiles when any list file was added, removed or modified; it is meant
+to run off the GUI thread, and requests keep using the previous rules
+until the new ones are swapped in.
+
+Matching cost is recorded for every request, along with blocked counts for
+each page, so the browser can show what was blocked and what it cost.
+Requests are matched on Qt's IO thread while the GUI reads the figures, so
+the statistics are only touched under a lock and read as snapshots.
+
+Try a list against URLs from the plugin directory::
+
+    python -m content_filter easylist.txt https://ads.example.com/x.js
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import threading
+from collections import OrderedDict, deque
+
+from .rules import parse_filter_list
+from .matcher import FilterSet, Request
+
+DEFAULT_FILTER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'default_filters.txt')
+
+# Pages whose blocked counts are kept, most recent first
+MAX_TRACKED_PAGES = 256
+
+# Recent match durations kept for latency percentiles
+LATENCY_SAMPLES = 4096
+
+
+def list_files(paths=(), directory=None):
+    """Filter list files: ``paths`` plus every .txt file in ``directory``"""
+    files = list(paths)
+    if directory and os.path.isdir(directory):
+        files.extend(
+            os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.lower().endswith('.txt')
+        )
+    return files
+
+
+class ContentFilter:
+    """
+    Decide which requests to block
+
+    :param paths: Filter list files always loaded
+    :param directory: Folder whose .txt filter lists are loaded and watched
+    """
+
+    def __init__(self, paths=(DEFAULT_FILTER_PATH,), directory=None, logger=None):
+        self.paths = list(paths)
+        self.directory = directory
+        self.logger = logger or logging.getLogger(__name__)
+        self.enabled = True
+        self._sets = (FilterSet(), FilterSet())
+        self._signature = None
+        self._load_lock = threading.Lock()
+
+        self.rule_count = 0
+        self.skipped_count = 0
+        # Guards the counters below: updated per request, read from the GUI
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.blocked = 0
+        self._page_blocked = OrderedDict()
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def _files_signature(self):
+        signature = []
+        for path in list_files(self.paths, self.directory):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature.append((path, stat.st_size, stat.st_mtime_ns))
+        return tuple(signature)
+
+    def load(self):
+        """
+        Read and compile every filter list, then start using them
+
+        :return: Seconds taken
+        """
+        started = time.perf_counter()
+        with self._load_lock:
+            signature = self._files_signature()
+            blocking = FilterSet()
+            exceptions = FilterSet()
+            rule_count = 0
+            skipped = 0
+            for path, _, _ in signature:
+                try:
+                    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                        rules, file_skipped = parse_filter_list(f)
+                except OSError as e:
+                    self.logger.error(f"Failed to read filter list {path}: {e}")
+                    continue
+                for rule in rules:
+                    (exceptions if rule.exception else blocking).add(rule)
+                rule_count += len(rules)
+                skipped += file_skipped
+            blocking.compile()
+            exceptions.compile()
+
+            # One assignment, so a request sees either the old or the new rules
+            self._sets = (blocking, exceptions)
+            self._signature = signature
+            self.rule_count = rule_count
+            self.skipped_count = skipped
+
+        seconds = time.perf_counter() - started
+        self.logger.info(f"Compiled {rule_count} filter rules from {len(signature)} lists in {seconds:.2f}s "
+                         f"({skipped} unsupported skipped)")
+        return seconds
+
+    def refresh(self):
+        """Reload if a list file was added, removed or changed; returns True if reloaded"""
+        if self._files_signature() == self._signature:
+            return False
+        self.load()
+        return True
+
+    def match(self, url, first_party_url='', resource_type='other'):
+        """
+        Blocking rule for a request, or None if it is allowed (no rule or an exception)
+
+        Unlike should_block() this records nothing.
+        """
+        blocking, exceptions = self._sets
+        request = Request(url, first_party_url, resource_type)
+        rule = blocking.match(request)
+        if rule is not None and exceptions.size and exceptions.match(request) is not None:
+            return None
+        return rule
+
+    def should_block(self, url, first_party_url='', resource_type='other'):
+        """
+        True if the request should be blocked; counts it and times the match
+
+        :param first_party_url: URL of the page making the request
+        :param resource_type: One of rules.RESOURCE_TYPES' values
+        """
+        if not self.enabled:
+            return False
+        started = time.perf_counter()
+        rule = self.match(url, first_party_url, resource_type)
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self._latencies.append(elapsed)
+            self.requests += 1
+            if rule is None:
+                return False
+
+            self.blocked += 1
+            self._page_blocked[first_party_url] = self._page_blocked.pop(first_party_url, 0) + 1
+            if len(self._page_blocked) > MAX_TRACKED_PAGES:
+                self._page_blocked.popitem(last=False)
+        self.logger.debug(f"Blocked {url} on {first_party_url} by {rule.text}")
+        return True
+
+    def page_blocked(self, page_url):
+        """Requests blocked so far on a page"""
+        with self._stats_lock:
+            return self._page_blocked.get(page_url, 0)
+
+    def reset_page(self, page_url):
+        """Start counting a page again (it was reloaded or navigated to anew)"""
+        with self._stats_lock:
+            self._page_blocked.pop(page_url, None)
+
+    def _latency_samples(self):
+        """Sorted copy of the recent match durations; sorted outside the lock"""
+        with self._stats_lock:
+            samples = list(self._latencies)
+        samples.sort()
+        return samples
+
+    def latency_us(self, percentile, samples=None):
+        """
+        Match duration (microseconds) at ``percentile`` over recent requests, or None
+
+        :param samples: Sorted durations to use instead of a fresh snapshot
+        """
+        if samples is None:
+            samples = self._latency_samples()
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[index] * 1e6
+
+    def stats(self):
+        """Rule, request and latency figures for display and logging"""
+        # One snapshot, so the counts, percentiles and maximum describe the same requests
+        with self._stats_lock:
+            requests, blocked = self.requests, self.blocked
+            samples = list(self._latencies)
+        samples.sort()
+        return {
+            'rules': self.rule_count,
+            'skipped_rules': self.skipped_count,
+            'requests': requests,
+            'blocked': blocked,
+            'p50_us': self.latency_us(50, samples),
+            'p99_us': self.latency_us(99, samples),
+            'max_us': samples[-1] * 1e6 if samples else None,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Match URLs against filter lists')
+    parser.add_argument('list', nargs='+', help='Filter list files (or URLs after the lists)')
+    parser.add_argument('--page', default='', help='URL of the page making the requests')
+    parser.add_argument('--type', default='other', help='Resource type of the requests')
+    parser.add_argument('--no-default', action='store_true', help='Leave out the bundled default list')
+    args = parser.parse_args(argv)
+
+    lists = [item for item in args.list if os.path.exists(item)]
+    urls = [item for item in args.list if not os.path.exists(item)]
+    paths = ([] if args.no_default else [DEFAULT_FILTER_PATH]) + lists
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+    content_filter = ContentFilter(paths)
+    content_filter.load()
+
+    for url in urls:
+        rule = content_filter.match(url, args.page, args.type)
+        content_filter.should_block(url, args.page, args.type)
+        print(f"{'BLOCK' if rule else 'allow'}\t{url}" + (f"\t{rule.text}" if rule else ''))
+    stats = content_filter.stats()
+    if stats['requests']:
+        print(f"{stats['blocked']} of {stats['requests']} blocked; "
+              f"match p50 {stats['p50_us']:.1f} us, p99 {stats['p99_us']:.1f} us")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Compiled lookup structures for network rules.
+
+A request is matched in three steps, none of which walks the rule list:
+
+- Domain rules live in a trie keyed by host labels in reverse order
+  (``com`` -> ``example`` -> ``ads``); a host is looked up with one step per
+  label.
+- URL rules are indexed by a token (a run of letters, digits and ``%``)
+  that must appear whole in every URL the rule can match. The request URL
+  is split into tokens with one regex pass and each token is a dict lookup,
+  so only rules sharing a token with the URL are tried.
+- The few URL rules without such a token are keyed by their longest literal
+  piece in an Aho-Corasick automaton, which finds every piece occurring in
+  the URL in a single pass over it.
+
+The token index replaces a full automaton over every rule: for an
+EasyList-sized list that automaton runs to hundreds of thousands of states,
+where the index is one dict entry per rule.
+"""
+
+import re
+from collections import deque
+
+TOKEN_RE = re.compile(r'[a-z0-9%]{2,}')
+
+# Tokens found in nearly every URL; a rule indexed by one would be tried
+# on almost every request
+COMMON_TOKENS = {'http', 'https', 'www', 'com', 'net', 'org', 'js', 'html', 'php', 'cdn', 'static'}
+
+# Second-level labels under which registrations happen (example.co.uk);
+# stands in for the public suffix list when telling third parties apart
+SECOND_LEVEL_LABELS = {'co', 'com', 'net', 'org', 'gov', 'ac', 'edu', 'ne', 'or', 'go'}
+
+
+def base_domain(host):
+    """Registrable part of a host (approximate: no public suffix list)"""
+    labels = host.rsplit('.', 3)
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in SECOND_LEVEL_LABELS:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def host_of(url):
+    """Lower-case host of a URL without parsing the whole URL"""
+    start = url.find('://')
+    start = start + 3 if start >= 0 else 0
+    end = len(url)
+    for separator in '/?#':
+        position = url.find(separator, start)
+        if 0 <= position < end:
+            end = position
+    host = url[start:end]
+    if '@' in host:
+        host = host.rsplit('@', 1)[1]
+    if host.startswith('['):
+        return host[:host.find(']') + 1]
+    return host.split(':', 1)[0].lower()
+
+
+class Request:
+    """
+    What rules are matched against: the lower-cased URL, its host and the
+    page it was made from
+    """
+
+    __slots__ = ('url', 'host', 'first_party_host', 'resource_type', '_third_party')
+
+    def __init__(self, url, first_party_url='', resource_type='other'):
+        self.url = url.lower()
+        self.host = host_of(self.url)
+        self.first_party_host = host_of(first_party_url) if first_party_url else ''
+        self.resource_type = resource_type
+        self._third_party = None
+
+    @property
+    def third_party(self):
+        if self._third_party is None:
+            self._third_party = bool(self.first_party_host) and \
+                base_domain(self.host) != base_domain(self.first_party_host)
+        return self._third_party
+
+
+class DomainTrie:
+    """Rules keyed by host, found for a host and all of its parent domains"""
+
+    # Key of the rules stored at a node; not a valid label
+    RULES = ''
+
+    def __init__(self):
+        self._root = {}
+        self.size = 0
+
+    def add(self, host, rule):
+        node = self._root
+        for label in reversed(host.split('.')):
+            node = node.setdefault(label, {})
+        node.setdefault(self.RULES, []).append(rule)
+        self.size += 1
+
+    def lookup(self, host):
+        """Rules for ``host`` or any domain it belongs to, most general first"""
+        node = self._root
+        found = []
+        for label in reversed(host.split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            rules = node.get(self.RULES)
+            if rules:
+                found.extend(rules)
+        return found
+
+
+class SubstringAutomaton:
+    """Aho-Corasick automaton: every added key occurring in a text, in one pass"""
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._values = [[]]
+        self.size = 0
+
+    def add(self, key, value):
+        state = 0
+        for character in key:
+            following = self._goto[state].get(character)
+            if following is None:
+                following = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._values.append([])
+                self._goto[state][character] = following
+            state = following
+        self._values[state].append(value)
+        self.size += 1
+
+    def compile(self):
+        """Build the failure links; call once after the last add()"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for character, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and character not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(character, 0)
+                self._fail[following] = target if target != following else 0
+                self._values[following] = self._values[following] + self._values[self._fail[following]]
+
+    def search(self, text):
+        """Values of every key found in ``text`` (a value once per occurrence)"""
+        goto = self._goto
+        fail = self._fail
+        values = self._values
+        found = []
+        state = 0
+        for character in text:
+            while state and character not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(character, 0)
+            if values[state]:
+                found.extend(values[state])
+        return found
+
+
+def _index_token(rule):
+    """Longest token that every URL matched by the rule contains whole, or None"""
+    pattern = rule.pattern
+    start_anchored, end_anchored = rule.anchored
+    best = None
+    for match in TOKEN_RE.finditer(pattern):
+        start, end = match.span()
+        # The URL could continue the token past an unanchored edge or a wildcard
+        if start == 0 and not start_anchored:
+            continue
+        if end == len(pattern) and not end_anchored:
+            continue
+        if (start and pattern[start - 1] == '*') or (end < len(pattern) and pattern[end] == '*'):
+            continue
+        token = match.group()
+        if token in COMMON_TOKENS and best is not None:
+            continue
+        if best is None or best in COMMON_TOKENS or len(token) > len(best):
+            best = token
+    return best
+
+
+def _longest_piece(pattern):
+    return max(re.split(r'[*^|]', pattern), key=len)
+
+
+class FilterSet:
+    """
+    Compiled rules of one kind (blocking or exceptions)
+
+    Add every rule, call compile(), then match().
+    """
+
+    def __init__(self):
+        self.domains = DomainTrie()
+        self.tokens = {}
+        self.automaton = SubstringAutomaton()
+        # Rules without even a literal piece to key them by; tried on every request
+        self.generic = []
+        self.size = 0
+
+    def add(self, rule):
+        self.size += 1
+        if rule.host is not None:
+            self.domains.add(rule.host, rule)
+            return
+        token = _index_token(rule)
+        if token is not None:
+            self.tokens.setdefault(token, []).append(rule)
+            return
+        piece = _longest_piece(rule.pattern)
+        if len(piece) >= 2:
+            self.automaton.add(piece, rule)
+        else:
+            self.generic.append(rule)
+
+    def compile(self):
+        self.automaton.compile()
+
+    def match(self, request):
+        """First rule matching the request, or None"""
+        for rule in self.domains.lookup(request.host):
+            if rule.matches(request):
+                return rule
+
+        tokens = self.tokens
+        if tokens:
+            for token in TOKEN_RE.findall(request.url):
+                for rule in tokens.get(token, ()):
+                    if rule.matches(request):
+                        return rule
+
+        if self.automaton.size:
+            for rule in self.automaton.search(request.url):
+                if rule.matches(request):
+                    return rule
+
+        for rule in self.generic:
+            if rule.matches(request):
+                return rule
+        return None
@@ -0,0 +1,288 @@
+"""
+Parsing of filter list lines into network rules.
+
+Understood syntax (a subset of Adblock Plus / EasyList):
+
+- ``||ads.example.com^`` blocks a domain and its subdomains
+- ``0.0.0.0 ads.example.com`` (hosts files) and bare ``ads.example.com``
+  lines do the same
+- ``/banner/ads/*``, ``|https://cdn.example.com/ad*.js``, ``||example.com/track^``
+  match URLs, with ``*`` wildcards, ``^`` separators and ``|`` anchors
+- ``/banner/ads/`` is a regular expression (matching ``banner/ads``); one
+  without metacharacters (escaped ``\\/``, ``\\.``, ... allowed) matches as a
+  plain substring, the others are left to full blockers and skipped
+- ``@@`` turns any of those into an exception
+- ``$third-party``, ``$~third-party``, resource types (``script``, ``image``,
+  ``~xmlhttprequest``, ...) and ``$domain=a.com|~b.com`` restrict a rule
+
+Comments, element hiding (``##``) and rules with options that cannot be
+honoured by a request filter (``redirect``, ``csp``, ``popup``, ...) are
+skipped rather than applied too broadly.
+"""
+
+import re
+
+# Resource types a rule option can name, with the ABP aliases uBlock lists use
+RESOURCE_TYPES = {
+    'script': 'script',
+    'image': 'image',
+    'stylesheet': 'stylesheet',
+    'css': 'stylesheet',
+    'xmlhttprequest': 'xmlhttprequest',
+    'xhr': 'xmlhttprequest',
+    'subdocument': 'subdocument',
+    'frame': 'subdocument',
+    'media': 'media',
+    'font': 'font',
+    'object': 'object',
+    'ping': 'ping',
+    'beacon': 'ping',
+    'websocket': 'websocket',
+    'other': 'other',
+}
+
+# Options that do not change which requests a rule matches
+IGNORED_OPTIONS = {'important', 'match-case', 'all'}
+
+HOSTS_LINE_RE = re.compile(r'^(?:0\.0\.0\.0|127\.0\.0\.1|::1?)\s+([^\s#]+)')
+DOMAIN_RE = re.compile(r'^[a-z0-9-]+(?:\.[a-z0-9-]+)+$')
+
+# Characters that make a /.../ rule a real regular expression when unescaped
+REGEX_METACHARACTERS = set('.^$*+?()[]{}|\\')
+
+# Hosts files list the machine itself; never block those names
+LOCAL_HOSTS = {'localhost', 'localhost.localdomain', 'local', 'broadcasthost', '0.0.0.0'}
+
+
+class RuleOptions:
+    """
+    Restrictions from a rule's ``$`` options
+
+    :ivar types: Resource types the rule applies to, or None for all
+    :ivar third_party: True (third-party requests only), False (first-party
+                       only) or None (both)
+    :ivar include_domains: Page domains the rule is limited to (empty: all)
+    :ivar exclude_domains: Page domains the rule never applies on
+    """
+
+    __slots__ = ('types', 'third_party', 'include_domains', 'exclude_domains')
+
+    def __init__(self, types=None, third_party=None, include_domains=(), exclude_domains=()):
+        self.types = types
+        self.third_party = third_party
+        self.include_domains = include_domains
+        self.exclude_domains = exclude_domains
+
+    def allow(self, request):
+        """True if a request satisfies these restrictions"""
+        if self.types is not None and request.resource_type not in self.types:
+            return False
+        if self.third_party is not None and request.third_party != self.third_party:
+            return False
+        if self.include_domains or self.exclude_domains:
+            page = request.first_party_host
+            if any(_on_domain(page, domain) for domain in self.exclude_domains):
+                return False
+            if self.include_domains and not any(_on_domain(page, domain) for domain in self.include_domains):
+                return False
+        return True
+
+
+class Rule:
+    """
+    One network rule
+
+    Domain rules have ``host`` set and are matched through the domain trie;
+    other rules match the lower-cased URL against ``literal`` (a plain
+    substring) or ``regex``.
+    """
+
+    __slots__ = ('text', 'exception', 'host', 'literal', 'regex', 'pattern', 'anchored', 'options')
+
+    def __init__(self, text, exception=False, host=None, literal=None, regex=None,
+                 pattern='', anchored=(False, False), options=None):
+        self.text = text
+        self.exception = exception
+        self.host = host
+        self.literal = literal
+        self.regex = regex
+        # Pattern without anchors, and whether it was anchored at its start
+        # (| or ||) and end (|); used to index the rule
+        self.pattern = pattern
+        self.anchored = anchored
+        self.options = options
+
+    def matches(self, request):
+        """True if the request's URL and context satisfy the rule (the host of domain rules is not checked)"""
+        if self.literal is not None:
+            if self.literal not in request.url:
+                return False
+        elif self.regex is not None and not self.regex.search(request.url):
+            return False
+        return self.options is None or self.options.allow(request)
+
+    def __repr__(self):
+        return f"Rule({self.text!r})"
+
+
+def _on_domain(host, domain):
+    return host == domain or host.endswith('.' + domain)
+
+
+def _parse_options(text):
+    """RuleOptions for an option string, or None if any option is unsupported"""
+    types = set()
+    excluded_types = set()
+    third_party = None
+    include_domains = []
+    exclude_domains = []
+    for option in text.split(','):
+        option = option.strip()
+        negated = option.startswith('~')
+        name = option.lstrip('~')
+        if name in ('third-party', '3p'):
+            third_party = not negated
+        elif name in ('first-party', '1p'):
+            third_party = negated
+        elif name in RESOURCE_TYPES:
+            (excluded_types if negated else types).add(RESOURCE_TYPES[name])
+        elif name.startswith('domain='):
+            for domain in name[len('domain='):].split('|'):
+                if domain.startswith('~'):
+                    exclude_domains.append(domain[1:])
+                elif domain:
+                    include_domains.append(domain)
+        elif name in IGNORED_OPTIONS:
+            continue
+        else:
+            return None
+
+    if excluded_types and not types:
+        types = set(RESOURCE_TYPES.values()) - excluded_types
+    return RuleOptions(frozenset(types) if types else None, third_party,
+                       tuple(include_domains), tuple(exclude_domains))
+
+
+def _pattern_regex(pattern, host_anchor, start_anchor, end_anchor):
+    parts = []
+    if host_anchor:
+        parts.append(r'^[a-z][a-z0-9+.-]*://(?:[^/?#]*\.)?')
+    elif start_anchor:
+        parts.append('^')
+    for character in pattern:
+        if character == '*':
+            parts.append('.*')
+        elif character == '^':
+            parts.append(r'(?:[^a-z0-9_\-.%]|$)')
+        else:
+            parts.append(re.escape(character))
+    if end_anchor:
+        parts.append('$')
+    return re.compile(''.join(parts))
+
+
+def _regex_literal(body):
+    """The substring a regular expression body matches, or None if it uses any metacharacter"""
+    literal = []
+    escaped = False
+    for character in body:
+        if escaped:
+            # \d, \b, ... are classes and assertions, not characters
+            if character.isalnum():
+                return None
+            literal.append(character)
+            escaped = False
+        elif character == '\\':
+            escaped = True
+        elif character in REGEX_METACHARACTERS:
+            return None
+        else:
+            literal.append(character)
+    return None if escaped else ''.join(literal)
+
+
+def parse_rule(line):
+    """
+    Parse one filter list line
+
+    :return: Rule, or None for comments, cosmetic and unsupported rules
+    """
+    line = line.strip().lower()
+    if not line or line.startswith(('!', '[', '#')):
+        return None
+    if '##' in line or '#@#' in line or '#?#' in line or '#$#' in line:
+        return None
+
+    hosts_match = HOSTS_LINE_RE.match(line)
+    if hosts_match:
+        host = hosts_match.group(1)
+        if host in LOCAL_HOSTS or not DOMAIN_RE.match(host):
+            return None
+        return Rule(line, host=host)
+    if DOMAIN_RE.match(line):
+        return Rule(line, host=line)
+
+    text = line
+    exception = line.startswith('@@')
+    if exception:
+        line = line[2:]
+
+    options = None
+    dollar = line.rfind('$')
+    if dollar >= 0 and not (line.startswith('/') and line.endswith('/')):
+        options = _parse_options(line[dollar + 1:])
+        if options is None:
+            return None
+        line = line[:dollar]
+
+    # Regular expression rules are left to full blockers, unless they are
+    # just a substring written between slashes
+    if line.startswith('/') and line.endswith('/') and len(line) > 2:
+        literal = _regex_literal(line[1:-1])
+        if not literal:
+            return None
+        return Rule(text, exception, literal=literal, pattern=literal, options=options)
+
+    host_anchor = line.startswith('||')
+    start_anchor = not host_anchor and line.startswith('|')
+    pattern = line[2:] if host_anchor else line[1:] if start_anchor else line
+    end_anchor = pattern.endswith('|')
+    if end_anchor:
+        pattern = pattern[:-1]
+    pattern = pattern.strip('*') if not (host_anchor or start_anchor or end_anchor) else pattern
+    if not pattern or not pattern.strip('*^'):
+        return None
+
+    # ||host^ and ||host (nothing after the host) are domain rules
+    if host_anchor and not end_anchor:
+        host = pattern[:-1] if pattern.endswith('^') else pattern
+        if DOMAIN_RE.match(host):
+            return Rule(text, exception, host=host, options=options)
+
+    if not (host_anchor or start_anchor or end_anchor) and not any(c in pattern for c in '*^'):
+        return Rule(text, exception, literal=pattern, pattern=pattern, options=options)
+    return Rule(text, exception,
+                regex=_pattern_regex(pattern, host_anchor, start_anchor, end_anchor),
+                pattern=pattern, anchored=(host_anchor or start_anchor, end_anchor),
+                options=options)
+
+
+def parse_filter_list(lines):
+    """
+    Parse the lines of a filter list
+
+    :return: (list of Rule, number of lines skipped as unsupported)
+    """
+    rules = []
+    skipped = 0
+    for line in lines:
+        stripped = line.strip()
+        # ! and [ start list comments and headers; # starts hosts file comments
+        if not stripped or stripped.startswith(('!', '[')) or (stripped.startswith('#') and not stripped.startswith('##')):
+            continue
+        rule = parse_rule(stripped)
+        if rule is None:
+            skipped += 1
+        else:
+            rules.append(rule)
+    return rules, skipped
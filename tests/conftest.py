@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The overlay's core package, importable however pytest is started
+sys.path.insert(0, REPO_ROOT)
+
+# Qt widgets and timers work without a display
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+# Plugins import their bundled packages (bard_engine, content_filter, ...)
+# from their own folder, which the overlay puts on sys.path
+for plugin in ('scum_bard', 'scum_browser'):
+    sys.path.insert(0, os.path.join(REPO_ROOT, 'plugins', plugin))
+
+# QtWebEngine refuses to load once a QApplication exists, so load it before
+# the qapp fixture can run; browser tests skip themselves where it is missing
+try:
+    import PyQt5.QtWebEngineWidgets  # noqa: F401
+except ImportError:
+    pass
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    """The QApplication Qt timers and widgets need, created once"""
+    QtWidgets = pytest.importorskip('PyQt5.QtWidgets')
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
@@ -0,0 +1,87 @@
+import io
+import os
+import csv
+import shutil
+
+import pytest
+
+pytest.importorskip('mido')
+
+from bard_engine.analyze import (REPORT_COLUMNS, analyze_file, analyze_library, find_midi_files, rate_track,
+                                 sort_rows, write_report)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'plugins', 'scum_bard', 'data')
+
+
+@pytest.fixture(scope='module')
+def library(tmp_path_factory):
+    root = tmp_path_factory.mktemp('library')
+    for name in sorted(os.listdir(DATA_DIR)):
+        if name.endswith('.mid'):
+            shutil.copy(os.path.join(DATA_DIR, name), root / name)
+    (root / 'nested').mkdir()
+    shutil.copy(os.path.join(DATA_DIR, 'blues1.mid'), root / 'nested' / 'blues1.MIDI')
+    (root / 'broken.mid').write_bytes(b'MThd not really')
+    (root / 'notes.txt').write_text('not a song')
+    return root
+
+
+def by_track(rows):
+    return sorted(rows, key=lambda row: (row['file'], row['track'] if row['track'] is not None else -1))
+
+
+def test_finds_midi_files_recursively(library):
+    paths = find_midi_files(str(library))
+    assert str(library / 'nested' / 'blues1.MIDI') in paths
+    assert not any(path.endswith('.txt') for path in paths)
+    assert paths == sorted(paths)
+
+
+def test_parallel_run_matches_a_serial_run(library):
+    paths = find_midi_files(str(library))
+    serial = [row for path in paths for row in analyze_file(path)]
+    done = []
+    parallel = analyze_library(paths, jobs=2, progress=lambda count, total, path: done.append((count, total)))
+
+    assert by_track(parallel) == by_track(serial)
+    assert done[-1] == (len(paths), len(paths))
+    assert len({row['file'] for row in serial}) == len(paths)
+
+
+def test_unreadable_file_is_reported_not_raised(library):
+    rows = analyze_file(str(library / 'broken.mid'))
+    assert len(rows) == 1 and rows[0]['rating'] == 'error' and rows[0]['error']
+
+
+def test_slower_backend_rates_worse(library):
+    path = str(library / '15.mid')
+    fast = analyze_file(path, press_cost=0.0001)
+    slow = analyze_file(path, press_cost=0.05)
+    assert [row['track'] for row in fast] == [row['track'] for row in slow]
+    assert max(row['p99_late_ms'] for row in slow) > max(row['p99_late_ms'] for row in fast)
+    assert any(row['rating'] == 'poor' for row in slow)
+
+
+@pytest.mark.parametrize('unmapped, p99_ms, peak, backend, rating', [
+    (0.0, 1.0, 10, 500, 'good'),
+    (0.05, 1.0, 10, 500, 'fair'),
+    (0.0, 20.0, 10, 500, 'fair'),
+    (0.2, 1.0, 10, 500, 'poor'),
+    (0.0, 60.0, 10, 500, 'poor'),
+    (0.0, 1.0, 600, 500, 'poor'),
+])
+def test_rate_track(unmapped, p99_ms, peak, backend, rating):
+    assert rate_track(unmapped, p99_ms, peak, backend) == rating
+
+
+def test_sort_and_csv_report():
+    rows = [{'file': 'b.mid', 'track': 0, 'notes': 5}, {'file': 'a.mid', 'track': 1, 'notes': None},
+            {'file': 'c.mid', 'track': 0, 'notes': 9}]
+    assert [row['file'] for row in sort_rows(rows, 'notes', descending=True)] == ['c.mid', 'b.mid', 'a.mid']
+
+    output = io.StringIO()
+    write_report(rows, output, 'csv')
+    read = list(csv.DictReader(io.StringIO(output.getvalue())))
+    assert list(read[0]) == REPORT_COLUMNS + ['error']
+    assert [row['file'] for row in read] == ['b.mid', 'a.mid', 'c.mid']
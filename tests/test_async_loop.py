@@ -0,0 +1,131 @@
+import time
+import socket
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from PyQt5.QtCore import QEventLoop, QObject, QTimer, pyqtSignal
+
+from core.async_loop import QtAsyncioLoop, wait_for_signal
+
+
+class Emitter(QObject):
+    single = pyqtSignal(int)
+    pair = pyqtSignal(str, int)
+
+
+@pytest.fixture
+def qt_loop(qapp):
+    qt_loop = QtAsyncioLoop(qapp)
+    qt_loop.start()
+    yield qt_loop
+    qt_loop.close()
+    asyncio.set_event_loop(None)
+
+
+def run(qt_loop, coro, timeout=5.0):
+    """Run ``coro`` to completion by spinning only the Qt event loop"""
+    task = qt_loop.loop.create_task(coro)
+    events = QEventLoop()
+    task.add_done_callback(lambda _: events.quit())
+    QTimer.singleShot(int(timeout * 1000), events.quit)
+    events.exec_()
+    assert task.done(), "coroutine did not finish on the Qt event loop"
+    return task.result()
+
+
+def test_coroutines_run_on_the_gui_thread(qt_loop):
+    async def job():
+        await asyncio.sleep(0.02)
+        return threading.get_ident()
+
+    started = time.monotonic()
+    assert run(qt_loop, job()) == threading.get_ident()
+    assert time.monotonic() - started >= 0.02
+
+
+def test_timers_fire_in_order(qt_loop):
+    fired = []
+
+    async def job():
+        for delay in (0.03, 0.01, 0.02):
+            qt_loop.loop.call_later(delay, fired.append, delay)
+        await asyncio.sleep(0.05)
+
+    run(qt_loop, job())
+    assert fired == [0.01, 0.02, 0.03]
+
+
+def test_other_threads_wake_the_loop(qt_loop):
+    async def job():
+        future = qt_loop.loop.create_future()
+        threading.Timer(0.05, qt_loop.loop.call_soon_threadsafe, (future.set_result, 'woken')).start()
+        from_executor = await qt_loop.loop.run_in_executor(None, lambda: threading.get_ident())
+        return await future, from_executor
+
+    woken, executor_thread = run(qt_loop, job())
+    assert woken == 'woken' and executor_thread != threading.get_ident()
+
+
+def test_socket_readiness_pumps_the_loop(qt_loop):
+    ours, theirs = socket.socketpair()
+    ours.setblocking(False)
+    sender = threading.Timer(0.05, theirs.sendall, (b'ping',))
+
+    async def job():
+        sender.start()
+        return await qt_loop.loop.sock_recv(ours, 16)
+
+    try:
+        assert run(qt_loop, job()) == b'ping'
+    finally:
+        ours.close()
+        theirs.close()
+
+
+def test_idle_loop_is_not_polled(qt_loop, qapp):
+    run(qt_loop, asyncio.sleep(0))
+    qapp.processEvents()
+    assert not qt_loop._timer.isActive()
+
+    handle = qt_loop.loop.call_later(60, lambda: None)
+    assert qt_loop._timer.isActive() and qt_loop._timer.remainingTime() > 50 * 1000
+    handle.cancel()
+
+
+def test_wait_for_signal(qt_loop):
+    emitter = Emitter()
+
+    async def job():
+        QTimer.singleShot(10, lambda: emitter.single.emit(7))
+        QTimer.singleShot(20, lambda: emitter.pair.emit('a', 2))
+        single = await wait_for_signal(emitter.single)
+        pair = await wait_for_signal(emitter.pair, timeout=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await wait_for_signal(emitter.single, timeout=0.02)
+        return single, pair
+
+    assert run(qt_loop, job()) == (7, ('a', 2))
+
+
+def test_close_cancels_pending_tasks(qapp):
+    qt_loop = QtAsyncioLoop(qapp)
+    qt_loop.start()
+    cancelled = []
+
+    async def forever():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    qt_loop.loop.create_task(forever())
+    qapp.processEvents()
+    qt_loop.close()
+    asyncio.set_event_loop(None)
+    assert cancelled == [True] and qt_loop.loop.is_closed()
+    assert not qt_loop._timer.isActive()
@@ -0,0 +1,51 @@
+import os
+import sys
+import json
+import subprocess
+import importlib.util
+
+import pytest
+
+pytest.importorskip('mido')
+pytest.importorskip('numpy')
+
+BENCH_SCUM_BARD = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'benchmarks', 'bench_scum_bard.py')
+
+
+@pytest.fixture(scope='module')
+def bench():
+    spec = importlib.util.spec_from_file_location('bench_scum_bard', BENCH_SCUM_BARD)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_tiny_synthetic_file(bench, tmp_path):
+    path = bench.write_synthetic_midi(str(tmp_path / 'tiny.mid'), notes_per_second=8, seconds=2)
+    result = bench.bench_file(path, press_cost=0.0)
+
+    assert result['notes'] == 16 and result['unmapped_notes'] == 0
+    assert result['jitter']['events'] == 16
+    # The virtual clock lands every event on its deadline
+    assert result['drift_s'] == 0.0 and result['jitter']['max_us'] == 0.0
+    assert result['song_notes_per_s'] == pytest.approx(8, rel=0.1)
+
+
+def test_slow_backend_shows_up_as_jitter(bench, tmp_path):
+    path = bench.write_synthetic_midi(str(tmp_path / 'tiny.mid'), notes_per_second=8, seconds=2)
+    # 100 ms per key action cannot keep up with 8 notes a second
+    result = bench.bench_file(path, press_cost=0.1)
+    assert result['drift_s'] > 0.5
+    assert result['jitter']['p99_us'] > 100000
+
+
+def test_command_line_writes_a_report(tmp_path):
+    output = tmp_path / 'results.json'
+    subprocess.run([sys.executable, BENCH_SCUM_BARD, '--no-synthetic', '--press-cost-ms', '0.5',
+                    '--output', str(output)], check=True, timeout=120)
+
+    report = json.loads(output.read_text())
+    assert report['benchmark'] == 'scum_bard_playback' and report['press_cost_ms'] == 0.5
+    assert report['results']
+    assert not [result for result in report['results'] if 'error' in result]
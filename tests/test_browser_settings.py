@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+# A missing system library surfaces as a plain ImportError, not ModuleNotFoundError
+pytest.importorskip('PyQt5.QtWebEngineWidgets', exc_type=ImportError)
+
+from browser_web.profile import DEFAULT_SETTINGS, load_profile_settings
+
+
+def load(tmp_path, stored):
+    path = tmp_path / 'scum_browser.json'
+    path.write_text(json.dumps(stored))
+    return load_profile_settings(str(path))
+
+
+def test_missing_file_is_written_with_the_defaults(tmp_path):
+    path = tmp_path / 'config' / 'scum_browser.json'
+    assert load_profile_settings(str(path)) == DEFAULT_SETTINGS
+    assert json.loads(path.read_text()) == DEFAULT_SETTINGS
+
+
+def test_valid_settings_are_kept(tmp_path):
+    stored = {'cache_size_mb': 64, 'warm_interval_hours': 0.5, 'http_cache': 'memory',
+              'persistent_cookies': 'none', 'warm_urls': [], 'content_blocking': False}
+    settings = load(tmp_path, stored)
+    assert {key: settings[key] for key in stored} == stored
+    assert settings['tab_freeze_after_s'] == DEFAULT_SETTINGS['tab_freeze_after_s']
+
+
+@pytest.mark.parametrize('key, value', [
+    # bool is an int subclass, but true is not a cache size...
+    ('cache_size_mb', True),
+    ('tab_memory_budget_mb', False),
+    # ...and a number is not a switch
+    ('content_blocking', 0),
+    ('content_blocking', 1),
+    ('content_blocking', 'false'),
+    ('cache_size_mb', -1),
+    ('cache_size_mb', '256'),
+    ('http_cache', 'tape'),
+    ('persistent_cookies', True),
+    ('warm_urls', ['https://scum.fandom.com', 3]),
+    ('warm_urls', 'https://scum.fandom.com'),
+    ('storage_dir', None),
+])
+def test_invalid_setting_falls_back_to_its_default(tmp_path, caplog, key, value):
+    settings = load(tmp_path, {key: value, 'tab_freeze_after_s': 30})
+    assert settings[key] == DEFAULT_SETTINGS[key]
+    assert type(settings[key]) is type(DEFAULT_SETTINGS[key])
+    assert f'Invalid browser setting {key}' in caplog.text
+    # The rest of the file still applies
+    assert settings['tab_freeze_after_s'] == 30
+
+
+@pytest.mark.parametrize('content', ['[1, 2]', '{not json'])
+def test_unreadable_file_gives_the_defaults(tmp_path, content):
+    path = tmp_path / 'scum_browser.json'
+    path.write_text(content)
+    assert load_profile_settings(str(path)) == DEFAULT_SETTINGS
+    assert path.read_text() == content
@@ -0,0 +1,160 @@
+import random
+
+import pytest
+
+from bard_engine.compiler import (ACTION_KEY_DOWN, ACTION_KEY_UP, ACTION_OCTAVE_DOWN, ACTION_OCTAVE_UP,
+                                  CHECKPOINT_INTERVAL, build_checkpoints, schedule_notes, seek)
+from bard_engine.keymap import DEFAULT_KEYMAP, OCTAVE_DOWN_KEY, OCTAVE_UP_KEY, KeyTable
+
+KEYS = KeyTable(DEFAULT_KEYMAP)
+C4, D4 = KEYS[60], KEYS[62]
+
+
+def actions(compiled):
+    return [(event.time, event.action, event.key) for event in compiled.events]
+
+
+def test_each_note_is_pressed_and_released():
+    compiled = schedule_notes([[0.0, 0.5, 60], [1.0, 1.25, 62]], 1.25, KEYS)
+    assert actions(compiled) == [
+        (0.0, ACTION_KEY_DOWN, C4), (0.5, ACTION_KEY_UP, C4),
+        (1.0, ACTION_KEY_DOWN, D4), (1.25, ACTION_KEY_UP, D4),
+    ]
+    assert compiled.keys == {C4, D4}
+    assert (compiled.note_count, compiled.unmapped_count) == (2, 0)
+
+
+def test_release_at_the_next_start_comes_first():
+    compiled = schedule_notes([[0.0, 0.5, 60], [0.5, 1.0, 60]], 1.0, KEYS)
+    assert actions(compiled) == [
+        (0.0, ACTION_KEY_DOWN, C4), (0.5, ACTION_KEY_UP, C4),
+        (0.5, ACTION_KEY_DOWN, C4), (1.0, ACTION_KEY_UP, C4),
+    ]
+
+
+def test_overlapping_note_strikes_the_key_again():
+    # The second C starts while the first is held and outlasts it
+    compiled = schedule_notes([[0.0, 1.0, 60], [0.5, 2.0, 60]], 2.0, KEYS)
+    assert actions(compiled) == [
+        (0.0, ACTION_KEY_DOWN, C4),
+        (0.5, ACTION_KEY_UP, C4), (0.5, ACTION_KEY_DOWN, C4),
+        (2.0, ACTION_KEY_UP, C4),
+    ]
+
+
+def test_key_is_released_by_the_last_hold():
+    # The first C outlasts the one struck during it
+    compiled = schedule_notes([[0.0, 2.0, 60], [0.5, 1.0, 60]], 2.0, KEYS)
+    assert actions(compiled) == [
+        (0.0, ACTION_KEY_DOWN, C4),
+        (0.5, ACTION_KEY_UP, C4), (0.5, ACTION_KEY_DOWN, C4),
+        (2.0, ACTION_KEY_UP, C4),
+    ]
+
+
+def test_downs_and_ups_pair_up():
+    notes = [[index * 0.1, index * 0.1 + 0.35, 48 + (index * 7) % 24] for index in range(40)]
+    compiled = schedule_notes(notes, 4.5, KEYS)
+
+    held = {}
+    for time, action, key in actions(compiled):
+        if action == ACTION_KEY_DOWN:
+            assert not held.get(key), f"{key} pressed while down at {time}"
+            held[key] = True
+        elif action == ACTION_KEY_UP:
+            held[key] = False
+    assert not any(held.values())
+    assert [event.time for event in compiled.events] == sorted(event.time for event in compiled.events)
+
+
+def test_octave_shifts_follow_the_notes():
+    compiled = schedule_notes([[0.0, 0.5, 48], [1.0, 1.5, 72], [2.0, 2.5, 60]], 2.5, KEYS)
+    assert compiled.first_octave == 3
+    assert actions(compiled) == [
+        (0.0, ACTION_KEY_DOWN, KEYS[48]), (0.5, ACTION_KEY_UP, KEYS[48]),
+        (1.0, ACTION_OCTAVE_UP, OCTAVE_UP_KEY), (1.0, ACTION_OCTAVE_UP, OCTAVE_UP_KEY),
+        (1.0, ACTION_KEY_DOWN, KEYS[72]), (1.5, ACTION_KEY_UP, KEYS[72]),
+        (2.0, ACTION_OCTAVE_DOWN, OCTAVE_DOWN_KEY),
+        (2.0, ACTION_KEY_DOWN, C4), (2.5, ACTION_KEY_UP, C4),
+    ]
+    assert compiled.octave_shifts == 3
+
+
+def test_unmapped_notes_do_not_shift_octaves():
+    keys = KeyTable({name: key for name, key in DEFAULT_KEYMAP.items() if name != 'd'})
+    # D5 and the low D2 are unmapped: neither moves the instrument or sets the first octave
+    compiled = schedule_notes([[0.0, 0.5, 60], [1.0, 1.5, 74], [2.0, 2.5, 62], [3.0, 3.5, 38]],
+                              3.5, keys)
+    assert compiled.unmapped_count == 3
+    assert compiled.octave_shifts == 0
+    assert compiled.first_octave == 4
+    assert actions(compiled) == [(0.0, ACTION_KEY_DOWN, C4), (0.5, ACTION_KEY_UP, C4)]
+
+
+def test_transpose_outside_the_midi_range_is_unmapped():
+    compiled = schedule_notes([[0.0, 0.5, 120], [1.0, 1.5, 60]], 1.5, KEYS, transpose=12)
+    assert compiled.unmapped_count == 1
+    assert [key for _, action, key in actions(compiled) if action == ACTION_KEY_DOWN] == [KEYS[72]]
+
+
+def test_without_octave_management():
+    compiled = schedule_notes([[0.0, 0.5, 48], [1.0, 1.5, 72]], 1.5, KEYS, octave_management=False)
+    assert compiled.octave_shifts == 0
+    assert [action for _, action, _ in actions(compiled)] == [ACTION_KEY_DOWN, ACTION_KEY_UP] * 2
+
+
+@pytest.mark.parametrize('transpose', [-5, 0, 7])
+def test_transposed_matches_a_fresh_schedule(transpose):
+    notes = [[index * 0.25, index * 0.25 + 0.2, 55 + index % 15] for index in range(30)]
+    compiled = schedule_notes(notes, 7.5, KEYS)
+    assert actions(compiled.transposed(transpose)) == \
+        actions(schedule_notes(notes, 7.5, KEYS, transpose=transpose))
+
+
+def linear_seek(compiled, position):
+    """Replay every event before ``position`` from the start"""
+    octave = compiled.first_octave
+    for index, event in enumerate(compiled.events):
+        if event.time >= position:
+            return index, octave
+        if event.action == ACTION_OCTAVE_UP:
+            octave += 1
+        elif event.action == ACTION_OCTAVE_DOWN:
+            octave -= 1
+    return len(compiled.events), octave
+
+
+@pytest.fixture(scope='module')
+def wandering():
+    """A long schedule that keeps changing octave"""
+    generator = random.Random(3)
+    notes = [[index * 0.05, index * 0.05 + generator.choice([0.04, 0.1, 0.3]), generator.randrange(36, 96)]
+             for index in range(1000)]
+    return schedule_notes(notes, 50.5, KEYS)
+
+
+def test_checkpoints_record_the_octave_every_interval(wandering):
+    # Octave before each event, replayed one event at a time
+    before = build_checkpoints(wandering.events, wandering.first_octave, interval=1)
+    assert [checkpoint.index for checkpoint in before] == list(range(len(wandering.events)))
+
+    checkpoints = wandering.checkpoints
+    assert len(checkpoints) == -(-len(wandering.events) // CHECKPOINT_INTERVAL)
+    assert checkpoints == before[::CHECKPOINT_INTERVAL]
+    assert len({checkpoint.octave for checkpoint in checkpoints}) > 1
+
+
+def test_seek_matches_replaying_from_the_start(wandering):
+    positions = [-1.0, 0.0, 0.001, wandering.duration, wandering.duration + 1.0]
+    positions += [checkpoint.time for checkpoint in wandering.checkpoints]
+    positions += [random.Random(position).uniform(0.0, wandering.duration) for position in range(300)]
+    for position in positions:
+        assert seek(wandering, position) == linear_seek(wandering, position), position
+
+
+def test_seek_lands_on_the_first_event_at_a_time():
+    # Several events share 1.0 s: a release, octave shifts and a key-down
+    compiled = schedule_notes([[0.0, 1.0, 48], [1.0, 2.0, 72]], 2.0, KEYS)
+    index, octave = seek(compiled, 1.0)
+    assert compiled.events[index].time == 1.0 and compiled.events[index - 1].time < 1.0
+    assert octave == compiled.first_octave == 3
@@ -0,0 +1,155 @@
+import itertools
+import os
+import random
+import threading
+
+import pytest
+
+from content_filter import engine
+from content_filter.engine import ContentFilter
+from content_filter.matcher import FilterSet, Request
+from content_filter.rules import parse_filter_list, parse_rule
+
+DEFAULT_FILTERS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'plugins', 'scum_browser', 'content_filter', 'default_filters.txt')
+
+RULES = [
+    '||ads.example.com^',
+    '||tracker.net^$third-party',
+    '0.0.0.0 metrics.example.org',
+    'pixel.example.io',
+    '/banner/ads/*',
+    '/banner\\/ads/',
+    '/sponsor/',
+    '/ad[0-9]+/',
+    '|https://cdn.example.com/ad*.js',
+    '||example.com/track^',
+    '/prebid.js$script',
+    '/pagead/js/*$script',
+    '&ad_type=',
+    '*/beacon?$ping,domain=wiki.example.com|~safe.example.com',
+    '.gif?id=$image,~third-party',
+    'ad.js|',
+    '^promo^',
+]
+
+HOSTS = ['ads.example.com', 'cdn.ads.example.com', 'example.com', 'www.example.com', 'tracker.net',
+         'metrics.example.org', 'pixel.example.io', 'cdn.example.com', 'wiki.example.com', 'safe.example.com']
+PATHS = ['/', '/banner/ads/top.png', '/img/banner-ads.png', '/sponsor/logo.png', '/ad7/x.js', '/ad.js',
+         '/ads.js', '/track/view', '/tracking', '/prebid.js', '/pagead/js/adsbygoogle.js', '/beacon?x=1',
+         '/p.gif?id=3', '/x?a=1&ad_type=video', '/promo/', '/a/promo?x', '/adx.js']
+PAGES = ['', 'https://wiki.example.com/page', 'https://safe.example.com/', 'https://tracker.net/',
+         'https://www.example.com/']
+TYPES = ['script', 'image', 'ping', 'xmlhttprequest', 'other']
+
+
+def linear_match(rules, request):
+    """Every rule tried in turn, the way the indexes must agree with"""
+    return [rule for rule in rules
+            if (rule.host is None or request.host == rule.host or request.host.endswith('.' + rule.host))
+            and rule.matches(request)]
+
+
+@pytest.fixture(scope='module')
+def rules():
+    parsed, skipped = parse_filter_list(RULES)
+    assert skipped == 1  # the /ad[0-9]+/ regular expression
+    return parsed
+
+
+def test_match_agrees_with_linear_scan(rules):
+    filters = FilterSet()
+    for rule in rules:
+        filters.add(rule)
+    filters.compile()
+
+    checked = 0
+    for host, path, page, resource_type in itertools.product(HOSTS, PATHS, PAGES, TYPES):
+        request = Request(f'https://{host}{path}', page, resource_type)
+        expected = linear_match(rules, request)
+        found = filters.match(request)
+        if expected:
+            assert found in expected, request.url
+        else:
+            assert found is None, (request.url, found)
+        checked += bool(expected)
+    assert checked > 100
+
+
+def test_default_list_agrees_with_linear_scan():
+    with open(DEFAULT_FILTERS) as f:
+        rules, _ = parse_filter_list(f)
+    filters = FilterSet()
+    for rule in rules:
+        filters.add(rule)
+    filters.compile()
+
+    generator = random.Random(0)
+    hosts = [rule.host for rule in rules if rule.host] + ['example.com', 'wiki.example.org']
+    for _ in range(2000):
+        host = generator.choice(hosts)
+        if generator.random() < 0.3:
+            host = 'cdn.' + host
+        request = Request(f'https://{host}{generator.choice(PATHS)}',
+                          generator.choice(PAGES), generator.choice(TYPES))
+        assert (filters.match(request) is None) == (not linear_match(rules, request)), request.url
+
+
+@pytest.mark.parametrize('line, literal', [
+    ('/banner/ads/', 'banner/ads'),
+    ('/banner\\/ads/', 'banner/ads'),
+    ('/ads\\.js/', 'ads.js'),
+    ('@@/sponsor/', 'sponsor'),
+    ('/banner/ads/$script', 'banner/ads'),
+])
+def test_regex_without_metacharacters_is_a_substring(line, literal):
+    rule = parse_rule(line)
+    assert rule is not None and rule.literal == literal
+    assert rule.matches(Request(f'https://example.com/x/{literal}/y.png', resource_type='script'))
+
+
+@pytest.mark.parametrize('line', ['/ad[0-9]/', '/\\d+x\\d+/', '/ads.js/', '/^https?:/', '/ab\\/'])
+def test_real_regular_expressions_are_skipped(line):
+    assert parse_rule(line) is None
+
+
+@pytest.fixture
+def content_filter(tmp_path):
+    path = tmp_path / 'filters.txt'
+    path.write_text('||ads.example.com^\n@@||ads.example.com/allowed^\n')
+    content_filter = ContentFilter([str(path)])
+    content_filter.load()
+    return content_filter
+
+
+def test_blocked_counts_per_page(content_filter, monkeypatch):
+    monkeypatch.setattr(engine, 'MAX_TRACKED_PAGES', 2)
+    assert content_filter.should_block('https://ads.example.com/x.js', 'https://a.example.org/')
+    assert not content_filter.should_block('https://ads.example.com/allowed/x.js', 'https://a.example.org/')
+    assert content_filter.should_block('https://ads.example.com/y.js', 'https://b.example.org/')
+    assert content_filter.should_block('https://ads.example.com/z.js', 'https://a.example.org/')
+    assert content_filter.page_blocked('https://a.example.org/') == 2
+
+    # The page blocked on least recently is forgotten first
+    content_filter.should_block('https://ads.example.com/x.js', 'https://c.example.org/')
+    assert content_filter.page_blocked('https://b.example.org/') == 0
+    content_filter.reset_page('https://a.example.org/')
+    assert content_filter.page_blocked('https://a.example.org/') == 0
+
+    stats = content_filter.stats()
+    assert (stats['rules'], stats['requests'], stats['blocked']) == (2, 5, 4)
+    assert 0 < stats['p50_us'] <= stats['p99_us'] <= stats['max_us']
+
+
+def test_requests_are_counted_under_the_statistics_lock(content_filter):
+    # should_block runs on Qt's IO thread while a GUI timer reads the figures
+    with content_filter._stats_lock:
+        worker = threading.Thread(target=content_filter.should_block,
+                                  args=('https://ads.example.com/x.js', 'https://a.example.org/'))
+        worker.start()
+        worker.join(0.2)
+        assert worker.is_alive()
+        assert content_filter.requests == 0 and not content_filter._latencies
+    worker.join(5)
+    assert content_filter.page_blocked('https://a.example.org/') == 1
+    assert content_filter.stats()['requests'] == 1
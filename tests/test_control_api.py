@@ -0,0 +1,137 @@
+import os
+import sys
+import json
+import socket
+import asyncio
+import stat
+
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from PyQt5.QtCore import QObject
+
+from core.control_api import (ControlServer, JSONRPC_INVALID_PARAMS, JSONRPC_INVALID_REQUEST,
+                              JSONRPC_METHOD_NOT_FOUND, JSONRPC_PARSE_ERROR, JSONRPC_UNAUTHORIZED)
+
+
+class FakeButton:
+    def __init__(self, name):
+        self.plugin_name = name
+        self.active_plugin = None
+
+    def open_plugin(self):
+        self.active_plugin = object()
+        return self.active_plugin
+
+
+class FakeLifecycle:
+    def is_suspended(self, plugin_name):
+        return False
+
+
+class FakeOverlay(QObject):
+    def __init__(self):
+        super().__init__()
+        self.plugin_buttons = [FakeButton('scum_bard'), FakeButton('scum_browser')]
+        self.plugin_pool = {}
+        self.lifecycle = FakeLifecycle()
+        self.commands = []
+
+    def get_plugin_button(self, plugin_name):
+        return next((button for button in self.plugin_buttons if button.plugin_name == plugin_name), None)
+
+    def handle_command(self, command):
+        self.commands.append(command)
+
+
+@pytest.fixture
+def server(tmp_path):
+    return ControlServer(FakeOverlay(), socket_path=str(tmp_path / 'control.sock'),
+                         token_path=str(tmp_path / 'control.token'))
+
+
+def call(server, request, session=None):
+    """One request line through the dispatcher; GUI calls run inline on this thread"""
+    session = {'authenticated': True} if session is None else session
+    line = request if isinstance(request, bytes) else json.dumps(request).encode()
+    return asyncio.run(server._handle_line(line, None, session))
+
+
+def test_dispatches_methods(server):
+    response = call(server, {'jsonrpc': '2.0', 'id': 1, 'method': 'plugins.list'})
+    assert response['id'] == 1
+    assert [plugin['name'] for plugin in response['result']] == ['scum_bard', 'scum_browser']
+
+    response = call(server, {'jsonrpc': '2.0', 'id': 2, 'method': 'plugins.open',
+                             'params': {'plugin': 'scum_bard'}})
+    assert response['result'] == {'opened': True}
+
+    response = call(server, {'jsonrpc': '2.0', 'id': 3, 'method': 'browser.navigate',
+                             'params': {'url': 'https://example.com'}})
+    assert response['result'] == {'navigating': 'https://example.com'}
+    assert server.overlay.commands[-1]['url'] == 'https://example.com'
+
+
+def test_notifications_get_no_response(server):
+    assert call(server, {'jsonrpc': '2.0', 'method': 'plugins.list'}) is None
+
+
+@pytest.mark.parametrize('request_line, code', [
+    (b'{not json', JSONRPC_PARSE_ERROR),
+    ([1, 2], JSONRPC_INVALID_REQUEST),
+    ({'id': 1}, JSONRPC_INVALID_REQUEST),
+    ({'id': 1, 'method': 'plugins.destroy'}, JSONRPC_METHOD_NOT_FOUND),
+    ({'id': 1, 'method': 'plugins.open', 'params': ['scum_bard']}, JSONRPC_INVALID_PARAMS),
+    ({'id': 1, 'method': 'plugins.open', 'params': 'scum_bard'}, JSONRPC_INVALID_PARAMS),
+    ({'id': 1, 'method': 'plugins.open', 'params': {}}, JSONRPC_INVALID_PARAMS),
+    ({'id': 1, 'method': 'plugins.open', 'params': {'plugin': 'missing'}}, JSONRPC_INVALID_PARAMS),
+])
+def test_errors(server, request_line, code):
+    response = call(server, request_line)
+    assert response['error']['code'] == code
+    assert 'result' not in response
+
+
+def test_token_handshake(server):
+    server._write_token()
+    with open(server.token_path) as f:
+        token = f.read()
+    if sys.platform != 'win32':
+        assert stat.S_IMODE(os.stat(server.token_path).st_mode) == 0o600
+
+    session = {'authenticated': False}
+    request = {'jsonrpc': '2.0', 'id': 1, 'method': 'plugins.list'}
+    assert call(server, request, session)['error']['code'] == JSONRPC_UNAUTHORIZED
+
+    for wrong in ('0' * len(token), None, 42):
+        response = call(server, {'id': 2, 'method': 'session.auth', 'params': {'token': wrong}}, session)
+        assert response['error']['code'] == JSONRPC_UNAUTHORIZED
+    assert session == {'authenticated': False}
+
+    response = call(server, {'id': 3, 'method': 'session.auth', 'params': {'token': token}}, session)
+    assert response['result'] == {'authenticated': True}
+    assert 'result' in call(server, request, session)
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='Unix socket transport')
+def test_unix_socket_is_private_from_the_start(server):
+    previous = os.umask(0o022)
+    try:
+        server.start()
+        try:
+            assert os.umask(0o022) == 0o022  # restored after binding
+            assert stat.S_IMODE(os.stat(server.socket_path).st_mode) & 0o077 == 0
+
+            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            client.settimeout(5)
+            client.connect(server.socket_path)
+            client.sendall(b'{"jsonrpc": "2.0", "id": 7, "method": "nope"}\n')
+            response = json.loads(client.makefile().readline())
+            client.close()
+        finally:
+            server.stop()
+    finally:
+        os.umask(previous)
+    assert response['id'] == 7 and response['error']['code'] == JSONRPC_METHOD_NOT_FOUND
+    assert not os.path.exists(server.socket_path)
@@ -0,0 +1,92 @@
+import json
+import socket
+
+import pytest
+
+from bard_engine.ensemble import Conductor, Follower, estimate_offset, validate_message
+from bard_engine.player import MAX_SPEED
+
+
+@pytest.fixture
+def conductor():
+    conductor = Conductor(port=0)
+    yield conductor
+    conductor.close()
+
+
+def test_conductor_listens_on_loopback_by_default(conductor):
+    assert conductor.sock.getsockname()[0] == '127.0.0.1'
+
+
+@pytest.mark.parametrize('message', [
+    [], 'sync', 42, {}, {'type': 'bogus'}, {'type': 'join'}, {'type': 'join', 'name': 7},
+    {'type': 'sync'}, {'type': 'sync', 't0': 'now'}, {'type': 'started', 'name': 'a', 'rtt': 'x'},
+])
+def test_malformed_messages_are_rejected(message):
+    with pytest.raises(ValueError):
+        validate_message(message)
+
+
+def test_malformed_datagrams_do_not_stop_the_conductor(conductor):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(2.0)
+    address = ('127.0.0.1', conductor.port)
+    for payload in (b'[]', b'{"type": "join"}', b'not json', b'\xff\xfe', b'{"type": "started"}'):
+        sock.sendto(payload, address)
+
+    sock.sendto(json.dumps({'type': 'sync', 't0': 1.5}).encode(), address)
+    reply = json.loads(sock.recvfrom(4096)[0])
+    sock.close()
+    assert reply['type'] == 'sync_reply' and reply['t0'] == 1.5
+    assert conductor.followers == {}
+
+
+def test_follower_joins_and_receives_the_start(conductor):
+    follower = Follower('127.0.0.1', conductor.port, name='bass')
+    try:
+        offset, rtt = follower.synchronize(samples=4)
+        follower.join(track=2)
+        assert conductor.wait_for_followers(1, timeout=2)
+        start_at = conductor.start(delay=0.5, speed=1.5)
+        local_start, speed = follower.wait_for_start(timeout=2)
+    finally:
+        follower.close()
+    assert speed == 1.5
+    # Same machine, same clock: the offset estimate is within the round trip
+    assert abs(local_start - start_at) <= rtt
+    assert abs(offset) <= rtt
+
+
+@pytest.mark.parametrize('bad_speed', [0, -1.0, 100.0, float('nan')])
+def test_follower_ignores_a_start_with_an_unplayable_speed(conductor, bad_speed):
+    follower = Follower('127.0.0.1', conductor.port, name='bass')
+    try:
+        follower.join()
+        assert conductor.wait_for_followers(1, timeout=2)
+        conductor.start(delay=0.5, speed=bad_speed)
+        conductor.start(delay=0.5, speed=MAX_SPEED)
+        _, speed = follower.wait_for_start(timeout=2)
+    finally:
+        follower.close()
+    assert speed == MAX_SPEED
+
+
+def test_estimate_offset_for_a_symmetric_path():
+    # Server clock 10 s ahead, 2 ms each way, 1 ms processing
+    offset, delay = estimate_offset(0.0, 10.002, 10.003, 0.005)
+    assert offset == pytest.approx(10.0)
+    assert delay == pytest.approx(0.004)
+
+
+def test_skew_report_is_an_estimate_with_uncertainty(conductor):
+    conductor.start_at = 100.0
+    conductor.reports = {
+        'conductor': {'first_note_at': 100.5, 'first_event_time': 0.5, 'rtt': 0.0},
+        'a': {'first_note_at': 100.503, 'first_event_time': 0.5, 'rtt': 0.002},
+        'b': {'first_note_at': 100.499, 'first_event_time': 0.5, 'rtt': 0.004},
+    }
+    report = conductor.skew_report()
+    assert report['estimate'] is True
+    assert report['skew_ms'] == pytest.approx(4.0)
+    assert report['uncertainty_ms'] == pytest.approx(3.0)
+    assert report['participants']['a']['start_error_ms'] == pytest.approx(3.0)
@@ -0,0 +1,50 @@
+import pytest
+
+from bard_engine.keymap import (DEFAULT_KEYMAP, MIDI_NOTE_COUNT, OCTAVE_UP_KEY, KeymapError, KeyTable,
+                                midi_to_note_name, note_octave)
+
+
+def test_table_covers_every_midi_note():
+    table = KeyTable(DEFAULT_KEYMAP)
+    assert len(table.keys) == len(table.octaves) == len(table.names) == MIDI_NOTE_COUNT
+    for note in range(MIDI_NOTE_COUNT):
+        assert table[note] == DEFAULT_KEYMAP[midi_to_note_name(note)]
+        assert table.octaves[note] == note_octave(note)
+
+
+@pytest.mark.parametrize('note, name', [(0, 'c'), (48, 'c'), (49, 'c#'), (59, 'b'), (60, 'c_high'),
+                                        (71, 'b'), (127, 'g')])
+def test_note_names(note, name):
+    assert KeyTable(DEFAULT_KEYMAP).names[note] == name
+
+
+def test_partial_keymap_leaves_notes_unmapped():
+    table = KeyTable({'c': 'z', 'g': 'h'})
+    assert table[48] == 'z' and table[55] == 'h'
+    assert table[50] is None and table[60] is None
+    assert 'd' in table.missing and 'c_high' in table.missing and 'c' not in table.missing
+
+
+@pytest.mark.parametrize('keymap', [
+    ['c', 'z'],
+    {'h': 'z'},
+    {'c': ''},
+    {'c': 5},
+    {'c': OCTAVE_UP_KEY},
+    {'c': 'CTRL'},
+])
+def test_invalid_keymaps_are_rejected(keymap):
+    with pytest.raises(KeymapError):
+        KeyTable(keymap)
+
+
+def test_errors_are_reported_together():
+    with pytest.raises(KeymapError) as error:
+        KeyTable({'h': 'z', 'c': None})
+    assert "'h'" in str(error.value) and "'c'" in str(error.value)
+
+
+def test_from_keymap_reuses_a_table():
+    table = KeyTable(DEFAULT_KEYMAP)
+    assert KeyTable.from_keymap(table) is table
+    assert KeyTable.from_keymap(DEFAULT_KEYMAP).keys == table.keys
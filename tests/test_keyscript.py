@@ -0,0 +1,81 @@
+import os
+
+import mido
+import pytest
+
+from bard_engine.compiler import collect_notes, schedule_notes, seek
+from bard_engine.keymap import DEFAULT_KEYMAP, KeyTable
+from bard_engine.keyscript import KeyScript, KeyScriptError, export_keyscript, HEADER
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'plugins', 'scum_bard', 'data')
+
+
+def make_track(notes):
+    """MIDI track of (delta ticks, note, length ticks) notes played one after another"""
+    track = mido.MidiTrack()
+    for delta, note, length in notes:
+        track.append(mido.Message('note_on', note=note, velocity=64, time=delta))
+        track.append(mido.Message('note_off', note=note, time=length))
+    return track
+
+
+@pytest.fixture
+def compiled():
+    track = make_track([(0, 48, 240), (0, 52, 240), (120, 55, 480), (0, 62, 240), (240, 71, 120)])
+    notes, duration = collect_notes(track)
+    return schedule_notes(notes, duration, KeyTable(DEFAULT_KEYMAP))
+
+
+def test_round_trip(compiled, tmp_path):
+    path = tmp_path / 'song.sbks'
+    size = export_keyscript(compiled, str(path), metadata={'source': 'test'})
+    assert size == path.stat().st_size
+
+    with KeyScript(str(path)) as script:
+        assert list(script.events) == list(compiled.events)
+        assert set(script.keys) == set(compiled.keys)
+        assert script.metadata == {'source': 'test'}
+        assert script.duration == pytest.approx(compiled.duration)
+        assert (script.note_count, script.octave_shifts, script.first_octave) == \
+            (compiled.note_count, compiled.octave_shifts, compiled.first_octave)
+        assert script.events[-1] == compiled.events[-1]
+        assert seek(script, 0.5) == seek(compiled, 0.5)
+
+
+def test_export_is_deterministic(tmp_path):
+    midi = mido.MidiFile(os.path.join(DATA_DIR, 'rainbow.mid'))
+    track = max(range(len(midi.tracks)), key=lambda index: len(midi.tracks[index]))
+    from bard_engine.compiler import compile_midi
+
+    outputs = []
+    for run in range(3):
+        path = tmp_path / f'{run}.sbks'
+        # A fresh compile builds a fresh set of held keys each time
+        export_keyscript(compile_midi(midi, track, DEFAULT_KEYMAP), str(path))
+        outputs.append(path.read_bytes())
+    assert outputs[0] == outputs[1] == outputs[2]
+
+
+@pytest.mark.parametrize('content', [b'', b'SB', b'SBKS', b'x' * (HEADER.size + 10)])
+def test_short_and_foreign_files_raise_key_script_error(tmp_path, content):
+    path = tmp_path / 'bad.sbks'
+    path.write_bytes(content)
+    with pytest.raises(KeyScriptError):
+        KeyScript(str(path))
+
+
+def test_truncated_events_raise_key_script_error(compiled, tmp_path):
+    path = tmp_path / 'song.sbks'
+    export_keyscript(compiled, str(path))
+    path.write_bytes(path.read_bytes()[:-3])
+    with pytest.raises(KeyScriptError):
+        KeyScript(str(path))
+
+
+def test_truncated_key_table_raises_key_script_error(compiled, tmp_path):
+    path = tmp_path / 'song.sbks'
+    export_keyscript(compiled, str(path))
+    path.write_bytes(path.read_bytes()[:HEADER.size + 2])
+    with pytest.raises(KeyScriptError):
+        KeyScript(str(path))
@@ -0,0 +1,85 @@
+import mido
+import pytest
+
+pytest.importorskip('numpy')
+
+from bard_engine import library
+from bard_engine.library import LibraryIndex, read_midi_names
+
+
+def write_song(path, title, instrument=None):
+    midi = mido.MidiFile()
+    track = mido.MidiTrack()
+    track.append(mido.MetaMessage('track_name', name=title))
+    if instrument:
+        track.append(mido.MetaMessage('instrument_name', name=instrument))
+    track.append(mido.Message('note_on', note=60, velocity=64, time=0))
+    track.append(mido.Message('note_off', note=60, time=480))
+    midi.tracks.append(track)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    midi.save(str(path))
+
+
+@pytest.fixture
+def songs(tmp_path):
+    root = tmp_path / 'midi'
+    write_song(root / 'classical' / 'beethoven_14.mid', 'Moonlight Sonata', 'Piano')
+    write_song(root / 'classical' / 'bach.mid', 'Toccata and Fugue', 'Organ')
+    write_song(root / 'games' / 'zelda.mid', 'Song of Storms', 'Ocarina')
+    (root / 'notes.txt').write_text('not a song')
+    return root
+
+
+def test_read_midi_names(songs):
+    assert read_midi_names(str(songs / 'games' / 'zelda.mid')) == (['Song of Storms'], ['Ocarina'])
+    with pytest.raises(ValueError):
+        read_midi_names(str(songs / 'notes.txt'))
+
+
+def test_fuzzy_search(songs):
+    index = LibraryIndex()
+    index.scan(str(songs))
+
+    assert len(index) == 3
+    assert [entry.title for entry in index.search('mnsnt')] == ['Moonlight Sonata']
+    # Every term must match, in the name, title or tags (folders, instruments)
+    assert [entry.title for entry in index.search('classical organ')] == ['Toccata and Fugue']
+    assert index.search('classical ocarina') == []
+    # A contiguous match ranks above a scattered one
+    assert index.search('song')[0].title == 'Song of Storms'
+    assert [entry.name for entry in index.search('')] == ['bach', 'beethoven_14', 'zelda']
+
+
+def test_search_results_follow_each_keystroke(songs):
+    index = LibraryIndex()
+    index.scan(str(songs))
+    for typed in ('s', 'st', 'sto', 'stor', 'sto', 'st', 'z'):
+        expected = LibraryIndex()
+        expected.scan(str(songs))
+        assert [entry.path for entry in index.search(typed)] == \
+            [entry.path for entry in expected.search(typed)]
+
+
+def test_rescan_reads_only_changed_files(songs, tmp_path, monkeypatch):
+    cache_path = str(tmp_path / 'library.json')
+    LibraryIndex(cache_path).scan(str(songs))
+
+    read = []
+    original = library.read_midi_names
+    monkeypatch.setattr(library, 'read_midi_names', lambda path: read.append(path) or original(path))
+
+    write_song(songs / 'games' / 'zelda.mid', 'Song of Healing', 'Ocarina')
+    index = LibraryIndex(cache_path)
+    index.scan(str(songs))
+
+    assert read == [str(songs / 'games' / 'zelda.mid')]
+    assert index.search('healing')[0].title == 'Song of Healing'
+
+
+def test_creating_an_index_reads_nothing(tmp_path, monkeypatch):
+    opened = []
+    monkeypatch.setattr(LibraryIndex, '_load_cache', lambda self: opened.append(self) or {})
+    index = LibraryIndex(str(tmp_path / 'library.json'))
+    assert opened == [] and len(index) == 0
+    index.scan(str(tmp_path))
+    assert opened == [index]
@@ -0,0 +1,119 @@
+import mido
+import pytest
+
+from bard_engine.keymap import DEFAULT_KEYMAP, OCTAVE_UP_KEY, OCTAVE_DOWN_KEY
+from bard_engine.live import LivePassthrough, LATENCY_BUDGET
+
+
+class MemoryPort:
+    """In-memory stand-in for a mido input port"""
+
+    name = 'memory'
+
+    def __init__(self):
+        self.callback = None
+        self.closed = False
+
+    def send(self, msg):
+        self.callback(msg)
+
+    def close(self):
+        self.closed = True
+
+
+class ListBackend:
+    def __init__(self):
+        self.actions = []
+
+    def press(self, key):
+        self.actions.append(('press', key))
+
+    def key_down(self, key):
+        self.actions.append(('down', key))
+
+    def key_up(self, key):
+        self.actions.append(('up', key))
+
+
+@pytest.fixture
+def live():
+    backend = ListBackend()
+    passthrough = LivePassthrough(DEFAULT_KEYMAP, backend)
+    port = MemoryPort()
+    passthrough.start(port=port)
+    return passthrough, port, backend
+
+
+def note_on(note, velocity=64):
+    return mido.Message('note_on', note=note, velocity=velocity)
+
+
+def note_off(note):
+    return mido.Message('note_off', note=note)
+
+
+def test_notes_go_through_the_keymap(live):
+    passthrough, port, backend = live
+    # D in octave 3, the octave passthrough starts in
+    port.send(note_on(50))
+    port.send(note_off(50))
+    assert backend.actions == [('down', DEFAULT_KEYMAP['d']), ('up', DEFAULT_KEYMAP['d'])]
+
+
+def test_note_on_with_zero_velocity_releases(live):
+    passthrough, port, backend = live
+    port.send(note_on(50))
+    port.send(note_on(50, velocity=0))
+    assert backend.actions[-1] == ('up', DEFAULT_KEYMAP['d'])
+
+
+def test_octave_planner_shifts_before_the_note(live):
+    passthrough, port, backend = live
+    port.send(note_on(74))   # D in octave 5: two octaves up
+    port.send(note_on(38))   # D in octave 2: three octaves down
+    assert backend.actions == [
+        ('press', OCTAVE_UP_KEY), ('press', OCTAVE_UP_KEY), ('down', DEFAULT_KEYMAP['d']),
+        ('press', OCTAVE_DOWN_KEY), ('press', OCTAVE_DOWN_KEY), ('press', OCTAVE_DOWN_KEY),
+        ('up', DEFAULT_KEYMAP['d']), ('down', DEFAULT_KEYMAP['d']),
+    ]
+    assert passthrough.octave_shifts == 5
+    assert passthrough.current_octave == 2
+
+
+def test_held_key_is_released_once_every_note_ends(live):
+    passthrough, port, backend = live
+    port.send(note_on(50))
+    port.send(note_on(50))
+    port.send(note_off(50))
+    assert backend.actions[-1] == ('down', DEFAULT_KEYMAP['d'])
+    port.send(note_off(50))
+    assert backend.actions[-1] == ('up', DEFAULT_KEYMAP['d'])
+
+
+def test_unmapped_notes_are_counted():
+    backend = ListBackend()
+    keymap = {name: key for name, key in DEFAULT_KEYMAP.items() if name != 'e'}
+    passthrough = LivePassthrough(keymap, backend, octave_management=False)
+    passthrough.feed(note_on(52))
+    assert backend.actions == []
+    assert passthrough.unmapped_count == 1
+
+
+def test_stop_closes_the_port_and_releases_held_keys(live):
+    passthrough, port, backend = live
+    port.send(note_on(50))
+    port.send(note_on(53))
+    stats = passthrough.stop()
+    assert port.closed
+    assert sorted(backend.actions[-2:]) == sorted([('up', DEFAULT_KEYMAP['d']), ('up', DEFAULT_KEYMAP['f'])])
+    assert stats['events'] == 2
+
+
+def test_latency_is_measured_within_budget(live):
+    passthrough, port, backend = live
+    for note in range(48, 60):
+        port.send(note_on(note))
+        port.send(note_off(note))
+    stats = passthrough.report()
+    assert stats['events'] == 12
+    assert stats['p99_us'] < LATENCY_BUDGET * 1e6
@@ -0,0 +1,126 @@
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from PyQt5.QtCore import QRect
+
+from bard_engine.compiler import schedule_notes
+from bard_engine.keymap import DEFAULT_KEYMAP, KeyTable
+from bard_engine.player import PlaybackControl
+from bard_ui.piano_roll import PLAYHEAD_STRIP, TILE_WIDTH, PianoRollWidget, roll_items
+from bard_ui import piano_roll
+
+WIDTH = 300
+PIXELS_PER_SECOND = 60
+
+
+def compile_notes(notes, duration, keymap=DEFAULT_KEYMAP):
+    return schedule_notes(notes, duration, KeyTable(keymap))
+
+
+@pytest.fixture
+def roll(qapp):
+    widget = PianoRollWidget(pixels_per_second=PIXELS_PER_SECOND)
+    widget.resize(WIDTH, 120)
+    yield widget
+    widget.follow(None)
+    widget.deleteLater()
+
+
+def record_updates(widget):
+    """Replace ``widget.update`` with a recorder of the regions it is asked to repaint"""
+    updates = []
+    widget.update = lambda *region: updates.append(region[0] if region else None)
+    return updates
+
+
+def test_roll_items_pairs_keys_and_marks_octave_shifts():
+    compiled = compile_notes([[0.0, 0.5, 50], [1.0, 1.5, 74], [2.0, 2.5, 52]], 3.0)
+    notes, shifts = roll_items(compiled)
+
+    assert sorted((start, end) for start, end, _, _ in notes) == [(0.0, 0.5), (1.0, 1.5), (2.0, 2.5)]
+    assert all(mapped for _, _, _, mapped in notes)
+    # Up two octaves for the D5, back down two for the E3
+    assert [up for _, up in shifts] == [True, True, False, False]
+    assert len(shifts) == compiled.octave_shifts
+    assert all(0.5 <= shift_time <= 2.0 for shift_time, _ in shifts)
+
+
+def test_roll_items_shows_unmapped_source_notes():
+    keymap = {name: key for name, key in DEFAULT_KEYMAP.items() if name != 'e'}
+    notes, _ = roll_items(compile_notes([[0.0, 0.5, 50], [0.5, 1.0, 52]], 1.0, keymap))
+    assert (0.5, 1.0, 52, False) in notes
+    assert [mapped for _, _, _, mapped in notes].count(True) == 1
+
+
+def test_notes_are_bucketed_by_the_tiles_they_touch(roll):
+    tile_seconds = TILE_WIDTH / PIXELS_PER_SECOND
+    # The second note straddles the boundary between tiles 0 and 1
+    roll.set_track(compile_notes([[0.0, 1.0, 50], [tile_seconds - 0.5, tile_seconds + 0.5, 52],
+                                  [tile_seconds * 2 + 1, tile_seconds * 2 + 2, 53]], tile_seconds * 3))
+
+    assert roll._tile_notes[0] == [0, 1]
+    assert roll._tile_notes[1] == [1]
+    assert roll._tile_notes[2] == [2]
+
+
+def test_playhead_repaints_only_the_strips_it_moved_between(roll):
+    roll.set_track(compile_notes([[0.0, 1.0, 50]], 20.0))
+    updates = record_updates(roll)
+
+    roll.set_position(1.0)
+    assert updates == [QRect(-PLAYHEAD_STRIP // 2, 0, PLAYHEAD_STRIP, 120),
+                       QRect(60 - PLAYHEAD_STRIP // 2, 0, PLAYHEAD_STRIP, 120)]
+
+    updates.clear()
+    roll.set_position(1.0)
+    assert updates == []
+
+
+def test_playhead_flips_the_page_at_the_right_edge(roll):
+    roll.set_track(compile_notes([[0.0, 1.0, 50]], 20.0))
+    updates = record_updates(roll)
+
+    roll.set_position(WIDTH / PIXELS_PER_SECOND + 0.5)
+    assert updates == [None]
+    assert roll._page == 1 and roll._playhead_x() == 30
+
+
+def test_tiles_render_once_and_stay_bounded(roll, monkeypatch):
+    monkeypatch.setattr(piano_roll, 'MAX_CACHED_TILES', 2)
+    tile_seconds = TILE_WIDTH / PIXELS_PER_SECOND
+    roll.set_track(compile_notes([[0.0, 1.0, 50]], tile_seconds * 4))
+
+    first = roll._tile(0)
+    assert roll._tile(0) is first
+    roll._tile(1)
+    roll._tile(2)
+    assert list(roll._tiles) == [1, 2]
+    # The widget paints whole pages through the cache without errors
+    roll.grab()
+
+
+def test_follow_polls_the_position_source(roll):
+    control = PlaybackControl()
+    roll.set_track(compile_notes([[0.0, 1.0, 50]], 20.0))
+    roll.show()
+    roll.follow(lambda: control.position(now=12.0))
+
+    roll._poll_position()
+    assert roll._position == 0.0  # nothing playing yet
+
+    control.update_timeline(10.0, 1.0, 2.0)
+    roll._poll_position()
+    assert roll._position == 5.0
+
+    roll.follow(None)
+    assert not roll._timer.isActive()
+
+
+def test_control_position_interpolates_the_timeline():
+    control = PlaybackControl()
+    assert control.position(now=5.0) is None
+    control.update_timeline(10.0, 3.0, 0.5)
+    assert control.position(now=14.0) == 5.0
+    # A clock read just before the anchor never moves the playhead backwards
+    assert control.position(now=9.0) == 3.0
@@ -0,0 +1,134 @@
+import pytest
+
+from bard_engine.backends import RecordingBackend
+from bard_engine.compiler import schedule_notes
+from bard_engine.keymap import DEFAULT_KEYMAP, KeyTable
+from bard_engine.player import PlaybackControl, play_compiled
+from bard_engine.timing import VirtualClock
+
+PITCHES = [60, 62, 64, 65, 67, 69, 71, 67, 64, 60]
+STEP = 0.5
+LENGTH = 0.25
+
+
+class ScriptedClock(VirtualClock):
+    """VirtualClock that runs ``action()`` once the time reaches ``at``"""
+
+    def __init__(self, at, action):
+        super().__init__()
+        self.at = at
+        self.action = action
+        self.fired_at = None
+
+    def sleep_until(self, deadline):
+        super().sleep_until(deadline)
+        if self.fired_at is None and self.time >= self.at:
+            self.fired_at = self.time
+            self.action()
+
+
+def compile_scale():
+    notes = [[index * STEP, index * STEP + LENGTH, pitch] for index, pitch in enumerate(PITCHES)]
+    return schedule_notes(notes, len(PITCHES) * STEP, KeyTable(DEFAULT_KEYMAP))
+
+
+def held_keys(timeline):
+    """Keys down at the end of a recorded timeline"""
+    held = set()
+    for _, action, key in timeline:
+        if action == 'down':
+            held.add(key)
+        elif action == 'up':
+            held.discard(key)
+    return held
+
+
+def downs(timeline):
+    return [(time, key) for time, action, key in timeline if action == 'down']
+
+
+def test_plays_on_schedule_without_control():
+    clock = VirtualClock()
+    backend = RecordingBackend(clock)
+    stats = play_compiled(compile_scale(), backend, clock)
+
+    key_table = KeyTable(DEFAULT_KEYMAP)
+    assert downs(backend.timeline) == [(pytest.approx(index * STEP), key_table.keys[pitch])
+                                       for index, pitch in enumerate(PITCHES)]
+    assert stats.key_presses == len(PITCHES) and not stats.stopped
+    assert held_keys(backend.timeline) == set()
+
+
+def test_speed_change_rebases_at_the_current_position():
+    control = PlaybackControl()
+    timelines = []
+    update_timeline = control.update_timeline
+    control.update_timeline = lambda *timeline: timelines.append(timeline) or update_timeline(*timeline)
+    clock = ScriptedClock(1.2, lambda: control.set_speed(2.0))
+    backend = RecordingBackend(clock)
+    play_compiled(compile_scale(), backend, clock, control=control)
+
+    changed = clock.fired_at
+    expected = [index * STEP if index * STEP <= changed else changed + (index * STEP - changed) / 2.0
+                for index in range(len(PITCHES))]
+    assert [time for time, _ in downs(backend.timeline)] == pytest.approx(expected)
+    # The timeline is re-anchored where the old speed had got to, not restarted
+    (start, origin, speed), (anchor_time, anchor_position, new_speed), _ = timelines
+    assert (start, origin, speed, new_speed) == (0.0, 0.0, 1.0, 2.0)
+    assert anchor_time == changed and anchor_position == pytest.approx(changed)
+
+
+def test_transpose_switches_schedule_at_the_same_position():
+    control = PlaybackControl()
+    clock = ScriptedClock(1.2, lambda: control.set_transpose(2))
+    backend = RecordingBackend(clock)
+    stats = play_compiled(compile_scale(), backend, clock, control=control)
+
+    key_table = KeyTable(DEFAULT_KEYMAP)
+    played = downs(backend.timeline)
+    # Every note plays exactly once, on its original time, in the new key after the change
+    assert [time for time, _ in played] == pytest.approx([index * STEP for index in range(len(PITCHES))])
+    assert [key for _, key in played] == [key_table.keys[pitch + (2 if index * STEP > 1.2 else 0)]
+                                          for index, pitch in enumerate(PITCHES)]
+    assert stats.position == pytest.approx(len(PITCHES) * STEP)
+
+
+def test_transpose_releases_held_keys_first():
+    control = PlaybackControl()
+    # The note at 1.0 s is still held at 1.1 s
+    clock = ScriptedClock(1.1, lambda: control.set_transpose(2))
+    backend = RecordingBackend(clock)
+    play_compiled(compile_scale(), backend, clock, control=control)
+
+    before = [entry for entry in backend.timeline if entry[0] < clock.fired_at]
+    at_change = [entry for entry in backend.timeline
+                 if entry[0] == clock.fired_at and entry[1] != 'down']
+    assert held_keys(before) != set()
+    assert held_keys(before + at_change) == set()
+    assert held_keys(backend.timeline) == set()
+
+
+def test_stop_leaves_no_key_down():
+    control = PlaybackControl()
+    clock = ScriptedClock(1.1, control.stop)
+    backend = RecordingBackend(clock)
+    stats = play_compiled(compile_scale(), backend, clock, control=control)
+
+    assert stats.stopped
+    assert stats.position == pytest.approx(1.25)  # the pending key-up
+    assert len(downs(backend.timeline)) == 3
+    assert held_keys(backend.timeline) == set()
+    # The reported position freezes where playback ended
+    assert control.position(clock.now() + 10) == pytest.approx(stats.position)
+
+
+def test_resume_from_stopped_position():
+    control = PlaybackControl()
+    clock = ScriptedClock(1.1, control.stop)
+    backend = RecordingBackend(clock)
+    compiled = compile_scale()
+    stopped = play_compiled(compiled, backend, clock, control=control)
+
+    resumed = RecordingBackend(clock)
+    play_compiled(compiled, resumed, clock, position=stopped.position, from_octave=stopped.end_octave)
+    assert len(downs(backend.timeline)) + len(downs(resumed.timeline)) == len(PITCHES)
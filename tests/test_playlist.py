@@ -0,0 +1,118 @@
+import weakref
+import threading
+
+import pytest
+
+from bard_engine.playlist import Playlist, PlaylistEntry, Preparer, preparation_key
+from bard_engine.profiles import SongProfile
+
+
+class CountingPrepare:
+    """Preparation function that records every call and can be held back"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, *args):
+        self.release.wait(5)
+        self.calls.append(args)
+        if args and args[0] == 'broken.mid':
+            raise ValueError('unreadable')
+        return ('compiled',) + args
+
+
+@pytest.fixture
+def prepare():
+    return CountingPrepare()
+
+
+@pytest.fixture
+def preparer(prepare):
+    preparer = Preparer(prepare)
+    yield preparer
+    preparer.discard()
+
+
+def test_prepared_song_is_taken_without_preparing_it_again(preparer, prepare):
+    key = preparation_key(PlaylistEntry('a.mid'), False, None, None, 1.0)
+    preparer.prepare(key, *key).result(5)
+    assert preparer.is_prepared(key)
+
+    assert preparer.take(key, *key) == ('compiled',) + key
+    assert len(prepare.calls) == 1
+    assert not preparer.is_prepared(key)
+
+
+def test_key_stays_stable_as_the_measured_rate_drifts(preparer, prepare):
+    # The widget fixes each entry's budget the first time it is prepared
+    entry_rates = weakref.WeakKeyDictionary()
+    entry = PlaylistEntry('a.mid', track=1)
+
+    def preparation(measured_rate):
+        return preparation_key(entry, False, entry_rates.setdefault(entry, measured_rate), None, 1.0)
+
+    key = preparation(12.0)
+    preparer.prepare(key, *key).result(5)
+
+    # Another song finished and measured a different backend rate meanwhile
+    assert preparation(9.5) == key
+    preparer.take(preparation(9.5), *key)
+    assert len(prepare.calls) == 1
+
+    # A budget taken from the live rate would have missed and compiled again
+    drifted = preparation_key(entry, False, 9.5, None, 1.0)
+    assert drifted != key
+    preparer.take(drifted, *drifted)
+    assert len(prepare.calls) == 2
+
+
+def test_speed_is_only_part_of_the_key_when_thinning():
+    entry = PlaylistEntry('a.mid')
+    assert preparation_key(entry, False, None, None, 1.5) == preparation_key(entry, False, None, None, 0.8)
+    assert preparation_key(entry, False, 12.0, None, 1.5) != preparation_key(entry, False, 12.0, None, 0.8)
+
+
+def test_profile_fills_in_track_and_budget():
+    profile = SongProfile('hash', track=3, max_rate=7.0)
+    assert preparation_key(PlaylistEntry('a.mid'), True, 12.0, 'highest', 1.0, profile) == \
+        ('a.mid', 3, 0, True, 7.0, 'highest', 1.0)
+    # An explicit track wins, and the saved budget applies only when thinning is on
+    assert preparation_key(PlaylistEntry('a.mid', track=1), True, None, None, 1.0, profile) == \
+        ('a.mid', 1, 0, True, None, None, 1.0)
+
+
+def test_preparing_another_song_drops_the_old_one(preparer, prepare):
+    prepare.release.clear()
+    first = preparer.prepare('a', 'a.mid')
+    preparer.prepare('b', 'b.mid')
+    assert not preparer.is_prepared('a')
+    prepare.release.set()
+    first.result(5)
+
+    # Nothing prepared for 'a' any more, so it is prepared on the calling thread
+    assert preparer.take('a', 'a.mid') == ('compiled', 'a.mid')
+    assert preparer.take('b', 'b.mid') == ('compiled', 'b.mid')
+
+
+def test_take_raises_what_the_preparation_raised(preparer):
+    preparer.prepare('broken', 'broken.mid')
+    with pytest.raises(ValueError, match='unreadable'):
+        preparer.take('broken', 'broken.mid')
+
+
+def test_playlist_round_trip(tmp_path):
+    path = str(tmp_path / 'playlist.json')
+    changes = []
+    playlist = Playlist(path, on_change=lambda: changes.append(1))
+    playlist.add('a.mid')
+    playlist.add('b.mid', track=2, transpose=-3)
+    playlist.set_current(1)
+    playlist.move(1, 0)
+
+    loaded = Playlist(path)
+    assert [(entry.file, entry.track, entry.transpose) for entry in loaded.entries] == \
+        [('b.mid', 2, -3), ('a.mid', None, 0)]
+    assert loaded.current == 0 and loaded.next_index() == 1 and loaded.remaining() == 1
+    assert len(changes) == 4
@@ -0,0 +1,204 @@
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from PyQt5.QtCore import QObject
+
+from core import plugin_lifecycle
+from core.plugin_lifecycle import PluginLifecycleManager, call_hook
+from core.plugin_pool import PluginWidgetPool
+
+
+class FakeWidget:
+    """Plugin widget implementing the whole lifecycle contract"""
+
+    def __init__(self, state=None):
+        self.calls = []
+        self.visible = True
+        self.state = state
+
+    def hide(self):
+        self.visible = False
+
+    def show(self):
+        self.visible = True
+
+    def close(self):
+        self.calls.append('close')
+
+    def deleteLater(self):
+        pass
+
+    def on_suspend(self):
+        self.calls.append('on_suspend')
+
+    def on_resume(self):
+        self.calls.append('on_resume')
+
+    def on_unload(self):
+        self.calls.append('on_unload')
+
+    def snapshot_state(self):
+        return self.state
+
+    def restore_state(self, state):
+        self.calls.append(('restore_state', state))
+
+
+class FakeButton:
+    def __init__(self, overlay, plugin_name):
+        self.overlay = overlay
+        self.plugin_name = plugin_name
+        self.active_plugin = None
+
+    def open_plugin(self, widget):
+        self.active_plugin = widget
+        self.overlay.lifecycle.plugin_loaded(self.plugin_name, widget)
+        return widget
+
+    def exit_plugin(self, destroy=False):
+        self.overlay.lifecycle.unload(self.plugin_name, self.active_plugin, destroy)
+        self.active_plugin.close()
+        self.active_plugin = None
+
+
+class FakeOverlay(QObject):
+    def __init__(self, names=('scum_bard', 'scum_browser', 'notes')):
+        super().__init__()
+        self.plugin_pool = PluginWidgetPool()
+        self.plugin_buttons = [FakeButton(self, name) for name in names]
+        self.lifecycle = None
+
+    def get_plugin_button(self, plugin_name):
+        return next((button for button in self.plugin_buttons if button.plugin_name == plugin_name), None)
+
+
+class Clock:
+    def __init__(self):
+        self.time = 1000.0
+
+    def __call__(self):
+        return self.time
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(plugin_lifecycle.time, 'monotonic', clock)
+    return clock
+
+
+@pytest.fixture
+def overlay(qapp, clock):
+    overlay = FakeOverlay()
+    overlay.lifecycle = PluginLifecycleManager(overlay, idle_timeout_ms=60 * 1000, memory_budget_mb=100)
+    return overlay
+
+
+def open_all(overlay):
+    widgets = {}
+    for button in overlay.plugin_buttons:
+        widgets[button.plugin_name] = button.open_plugin(FakeWidget({'plugin': button.plugin_name}))
+    return widgets
+
+
+def test_suspend_and_resume_call_hooks_once(overlay):
+    lifecycle = overlay.lifecycle
+    widget = overlay.get_plugin_button('scum_bard').open_plugin(FakeWidget())
+
+    lifecycle.suspend('scum_bard', widget)
+    lifecycle.suspend('scum_bard', widget)
+    assert lifecycle.is_suspended('scum_bard') and not widget.visible
+
+    lifecycle.resume('scum_bard', widget)
+    lifecycle.resume('scum_bard', widget)
+    assert not lifecycle.is_suspended('scum_bard') and widget.visible
+    assert widget.calls == ['on_suspend', 'on_resume']
+
+
+def test_state_survives_unload_and_reload(overlay):
+    button = overlay.get_plugin_button('scum_browser')
+    first = button.open_plugin(FakeWidget({'url': 'https://example.com', 'zoom': 1.25}))
+    button.exit_plugin(destroy=True)
+    assert first.calls == ['on_unload', 'close']
+
+    second = button.open_plugin(FakeWidget())
+    assert second.calls == [('restore_state', {'url': 'https://example.com', 'zoom': 1.25})]
+    # The snapshot is applied once, not on every later load
+    third = button.open_plugin(FakeWidget())
+    assert third.calls == []
+
+
+def test_parking_unload_skips_the_unload_hook(overlay):
+    button = overlay.get_plugin_button('notes')
+    widget = button.open_plugin(FakeWidget({'page': 3}))
+    overlay.lifecycle.unload('notes', widget, destroy=False)
+    assert 'on_unload' not in widget.calls
+    assert button.open_plugin(FakeWidget()).calls == [('restore_state', {'page': 3})]
+
+
+def test_idle_suspended_plugins_are_unloaded(overlay, clock, monkeypatch):
+    monkeypatch.setattr(overlay.lifecycle, '_memory_usage_mb', lambda: None)
+    widgets = open_all(overlay)
+    overlay.lifecycle.suspend('scum_bard', widgets['scum_bard'])
+    clock.time += 30
+    overlay.lifecycle.suspend('notes', widgets['notes'])
+
+    clock.time += 45
+    overlay.lifecycle.enforce_policy()
+    # Idle for 75 s: unloaded; idle for 45 s or still visible: kept
+    assert overlay.get_plugin_button('scum_bard').active_plugin is None
+    assert 'on_unload' in widgets['scum_bard'].calls
+    assert overlay.get_plugin_button('notes').active_plugin is widgets['notes']
+    assert overlay.get_plugin_button('scum_browser').active_plugin is widgets['scum_browser']
+
+    clock.time += 3600
+    overlay.lifecycle.enforce_policy()
+    assert overlay.get_plugin_button('notes').active_plugin is None
+    assert overlay.get_plugin_button('scum_browser').active_plugin is widgets['scum_browser']
+
+
+def test_over_budget_clears_the_pool_then_unloads_lru_one_per_pass(overlay, monkeypatch):
+    monkeypatch.setattr(overlay.lifecycle, '_memory_usage_mb', lambda: 500.0)
+    widgets = open_all(overlay)
+    for name in ('notes', 'scum_bard'):
+        overlay.lifecycle.suspend(name, widgets[name])
+
+    class Poolable(FakeWidget):
+        def reset_state(self):
+            pass
+
+    parked = Poolable()
+    overlay.plugin_pool.park('other', parked)
+
+    overlay.lifecycle.enforce_policy()
+    assert len(overlay.plugin_pool) == 0 and 'close' in parked.calls
+    assert all(button.active_plugin is not None for button in overlay.plugin_buttons)
+
+    overlay.lifecycle.enforce_policy()
+    assert overlay.get_plugin_button('notes').active_plugin is None
+    assert overlay.get_plugin_button('scum_bard').active_plugin is widgets['scum_bard']
+
+    overlay.lifecycle.enforce_policy()
+    assert overlay.get_plugin_button('scum_bard').active_plugin is None
+    # Visible plugins are never unloaded for memory
+    overlay.lifecycle.enforce_policy()
+    assert overlay.get_plugin_button('scum_browser').active_plugin is widgets['scum_browser']
+
+
+def test_under_budget_unloads_nothing(overlay, monkeypatch):
+    monkeypatch.setattr(overlay.lifecycle, '_memory_usage_mb', lambda: 50.0)
+    widgets = open_all(overlay)
+    overlay.lifecycle.suspend('notes', widgets['notes'])
+    overlay.lifecycle.enforce_policy()
+    assert overlay.get_plugin_button('notes').active_plugin is widgets['notes']
+
+
+def test_failing_hooks_are_contained():
+    class Broken:
+        def on_suspend(self):
+            raise RuntimeError('boom')
+
+    assert call_hook(Broken(), 'on_suspend') is None
+    assert call_hook(Broken(), 'missing_hook') is None
+    assert call_hook(FakeWidget({'a': 1}), 'snapshot_state') == {'a': 1}
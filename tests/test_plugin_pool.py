@@ -0,0 +1,123 @@
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from PyQt5.QtWidgets import QLineEdit, QVBoxLayout, QWidget
+
+from core import plugin_pool
+from core.plugin_button import PluginButton
+from core.plugin_lifecycle import PluginLifecycleManager
+from core.plugin_pool import PluginWidgetPool
+from core.scum_plug import ScumPlug
+
+
+class NotesWidget(QWidget):
+    """Poolable plugin: one text field as its user-visible state"""
+
+    created = 0
+
+    def __init__(self):
+        super().__init__()
+        NotesWidget.created += 1
+        self.calls = []
+        self.text = QLineEdit()
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.text)
+
+    def on_suspend(self):
+        self.calls.append('on_suspend')
+
+    def on_resume(self):
+        self.calls.append('on_resume')
+
+    def on_unload(self):
+        self.calls.append('on_unload')
+
+    def snapshot_state(self):
+        return {'text': self.text.text()}
+
+    def reset_state(self):
+        self.calls.append('reset_state')
+        self.text.clear()
+
+    def restore_state(self, state):
+        self.calls.append('restore_state')
+        self.text.setText(state['text'])
+
+
+class PlainWidget(QWidget):
+    """Plugin without reset_state(), which is never pooled"""
+
+
+class FakeOverlay(QWidget):
+    load_plugin = ScumPlug.load_plugin
+
+    def __init__(self, factory):
+        super().__init__()
+        self.factory = factory
+        self.plugin_pool = PluginWidgetPool()
+        self.lifecycle = PluginLifecycleManager(self)
+
+    def create_plugin_widget(self, plugin_name, button):
+        return self.factory()
+
+
+@pytest.fixture
+def notes(qapp):
+    NotesWidget.created = 0
+    overlay = FakeOverlay(NotesWidget)
+    return PluginButton('notes', overlay)
+
+
+def test_reopen_reuses_the_parked_widget_with_its_state(notes):
+    widget = notes.open_plugin()
+    widget.text.setText('draft')
+
+    notes.exit_plugin()
+    assert notes.active_plugin is None and not widget.isVisible()
+    # Parked widgets are reset, so they hold nothing of the last session
+    assert widget.text.text() == ''
+    assert widget.calls == ['on_suspend', 'reset_state']
+
+    reopened = notes.open_plugin()
+    assert reopened is widget and NotesWidget.created == 1
+    assert reopened.text.text() == 'draft' and reopened.isVisible()
+    assert widget.calls[2:] == ['on_resume', 'restore_state']
+
+
+def test_destroying_exit_rebuilds_but_keeps_state(notes):
+    widget = notes.open_plugin()
+    widget.text.setText('keep me')
+    notes.exit_plugin(destroy=True)
+    assert 'on_unload' in widget.calls
+    assert len(notes.overlay.plugin_pool) == 0
+
+    reopened = notes.open_plugin()
+    assert reopened is not widget and NotesWidget.created == 2
+    assert reopened.text.text() == 'keep me'
+
+
+def test_widgets_without_reset_are_not_pooled(qapp):
+    button = PluginButton('plain', FakeOverlay(PlainWidget))
+    widget = button.open_plugin()
+    button.exit_plugin()
+    assert len(button.overlay.plugin_pool) == 0
+    assert button.open_plugin() is not widget
+
+
+def test_pool_keeps_one_spare_per_plugin_and_evicts_idle(qapp, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(plugin_pool.time, 'monotonic', lambda: now[0])
+    pool = PluginWidgetPool()
+    first, second = NotesWidget(), NotesWidget()
+
+    assert pool.park('notes', first) and pool.park('notes', second)
+    assert len(pool) == 1 and 'on_unload' in first.calls
+
+    now[0] += 30
+    pool.evict_idle(60)
+    assert len(pool) == 1
+    now[0] += 31
+    pool.evict_idle(60)
+    assert len(pool) == 0 and 'on_unload' in second.calls
+    assert pool.acquire('notes') is None
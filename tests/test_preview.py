@@ -0,0 +1,97 @@
+import wave
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from bard_engine.compiler import schedule_notes
+from bard_engine.keymap import DEFAULT_KEYMAP, KeyTable
+from bard_engine.preview import PEAK_LEVEL, RELEASE, ToneBank, preview, render, sounded_notes, write_wav
+
+SAMPLE_RATE = 8000
+
+
+def dominant_frequency(samples, sample_rate=SAMPLE_RATE):
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return np.fft.rfftfreq(len(samples), 1 / sample_rate)[spectrum.argmax()]
+
+
+def test_sounded_notes_follow_keys_and_octave_shifts():
+    notes = [[0.0, 0.5, 48], [0.5, 1.0, 52], [1.0, 1.5, 67], [1.5, 2.0, 43]]
+    compiled = schedule_notes(notes, 2.0, KeyTable(DEFAULT_KEYMAP))
+    assert compiled.octave_shifts > 0
+    assert sounded_notes(compiled) == [tuple(note) for note in notes]
+
+
+def test_high_c_key_sounds_the_c_above_the_octave():
+    # The c_high key sounds the C above whatever octave the instrument is in
+    compiled = schedule_notes([[0.0, 0.5, 59], [0.5, 1.0, 60]], 1.0, KeyTable(DEFAULT_KEYMAP))
+    assert [pitch for _, _, pitch in sounded_notes(compiled)] == [59, 72]
+
+
+def test_unmapped_notes_are_silent():
+    keymap = {name: key for name, key in DEFAULT_KEYMAP.items() if name != 'e'}
+    compiled = schedule_notes([[0.0, 0.5, 50], [0.5, 1.0, 52]], 1.0, KeyTable(keymap))
+    assert sounded_notes(compiled) == [(0.0, 0.5, 50)]
+
+
+def test_note_held_past_the_end_stops_at_the_duration():
+    class Schedule:
+        first_octave = 4
+        duration = 2.0
+        events = [(0.5, 0, 'j', 69)]
+        key_table = None
+
+    assert sounded_notes(Schedule()) == [(0.5, 2.0, 69)]
+
+
+def test_render_places_a_tone_at_its_pitch_and_time():
+    samples = render([(0.25, 0.75, 69)], 1.0, SAMPLE_RATE)
+
+    assert samples.dtype == np.float32
+    assert len(samples) == int(1.0 * SAMPLE_RATE) + int(RELEASE * SAMPLE_RATE) + 1
+    assert float(np.abs(samples).max()) == pytest.approx(PEAK_LEVEL)
+
+    before = samples[:int(0.25 * SAMPLE_RATE)]
+    held = samples[int(0.3 * SAMPLE_RATE):int(0.7 * SAMPLE_RATE)]
+    after = samples[int((0.75 + RELEASE) * SAMPLE_RATE) + 1:]
+    assert not before.any() and not after.any()
+    assert dominant_frequency(held) == pytest.approx(440, abs=10)
+
+
+def test_render_mixes_overlapping_notes():
+    chord = render([(0.0, 1.0, 60), (0.0, 1.0, 64), (0.0, 1.0, 67)], 1.0, SAMPLE_RATE)
+    single = render([(0.0, 1.0, 60)], 1.0, SAMPLE_RATE)
+    assert not np.allclose(chord, single)
+    # Out-of-range pitches are skipped and silence stays silent
+    assert not render([(0.0, 1.0, 200)], 1.0, SAMPLE_RATE).any()
+
+
+def test_tone_bank_reuses_tables():
+    bank = ToneBank(SAMPLE_RATE)
+    assert bank.tone(60) is bank.tone(60)
+    short = bank.note(60, 100)
+    assert len(short) == 100 + int(RELEASE * SAMPLE_RATE)
+    assert short[-1] == pytest.approx(0.0, abs=1e-6)
+
+
+def test_preview_writes_a_wav_and_feeds_the_sink(tmp_path):
+    compiled = schedule_notes([[0.0, 0.25, 60], [0.25, 0.5, 62]], 0.5, KeyTable(DEFAULT_KEYMAP))
+    played = []
+    path = tmp_path / 'preview.wav'
+    samples, seconds = preview(compiled, str(path), sink=lambda *args: played.append(args),
+                               sample_rate=SAMPLE_RATE)
+
+    assert seconds >= 0 and played and played[0][1] == SAMPLE_RATE
+    with wave.open(str(path), 'rb') as f:
+        assert (f.getnchannels(), f.getsampwidth(), f.getframerate()) == (1, 2, SAMPLE_RATE)
+        pcm = np.frombuffer(f.readframes(f.getnframes()), dtype='<i2')
+    assert len(pcm) == len(samples)
+    assert np.allclose(pcm / 32767, samples, atol=1 / 32767)
+
+
+def test_write_wav_clips(tmp_path):
+    path = str(tmp_path / 'clip.wav')
+    write_wav(path, np.array([-2.0, 0.0, 2.0], dtype=np.float32), SAMPLE_RATE)
+    with wave.open(path, 'rb') as f:
+        assert list(np.frombuffer(f.readframes(3), dtype='<i2')) == [-32767, 0, 32767]
@@ -0,0 +1,100 @@
+import json
+import os
+
+import pytest
+
+from bard_engine.compiler import schedule_notes
+from bard_engine.keymap import DEFAULT_KEYMAP, KeyTable
+from bard_engine.player import MAX_SPEED, MAX_TRANSPOSE, MIN_SPEED
+from bard_engine.profiles import ProfileStore, SongProfile
+
+
+def test_from_dict_coerces_numeric_strings():
+    profile = SongProfile.from_dict({'hash': 'abc', 'track': '2', 'transpose': '-3', 'speed': '1.2',
+                                     'max_rate': '90'})
+    assert (profile.track, profile.transpose, profile.speed, profile.max_rate) == (2, -3, 1.2, 90.0)
+    assert round(profile.speed * 100) == 120
+
+
+def test_from_dict_clamps_speed_and_transpose():
+    fast = SongProfile.from_dict({'hash': 'abc', 'speed': 50, 'transpose': 99})
+    slow = SongProfile.from_dict({'hash': 'abc', 'speed': 0.01, 'transpose': -99})
+    assert (fast.speed, fast.transpose) == (MAX_SPEED, MAX_TRANSPOSE)
+    assert (slow.speed, slow.transpose) == (MIN_SPEED, -MAX_TRANSPOSE)
+
+
+@pytest.mark.parametrize('data', [
+    {'track': 0},
+    {'hash': 7},
+    {'hash': 'abc', 'track': -1},
+    {'hash': 'abc', 'track': 1.5},
+    {'hash': 'abc', 'speed': 'fast'},
+    {'hash': 'abc', 'speed': float('nan')},
+    {'hash': 'abc', 'transpose': True},
+    {'hash': 'abc', 'max_rate': -5},
+    {'hash': 'abc', 'skyline': ['highest']},
+    {'hash': 'abc', 'skyline': 'bogus'},
+    'abc',
+])
+def test_from_dict_rejects_unusable_fields(data):
+    with pytest.raises(ValueError):
+        SongProfile.from_dict(data)
+
+
+def test_import_skips_invalid_entries(tmp_path):
+    export = tmp_path / 'profiles.json'
+    export.write_text(json.dumps({'version': 1, 'profiles': [
+        {'hash': 'good', 'speed': '0.5'},
+        {'hash': 'bad', 'speed': 'fast'},
+        {'speed': 1.0},
+    ]}))
+
+    store = ProfileStore()
+    assert store.import_profiles(str(export)) == 1
+    assert 'good' in store and 'bad' not in store
+    assert store.get('good').speed == 0.5
+
+
+def test_import_drops_missing_keymaps(tmp_path):
+    keymap = tmp_path / 'keymap.json'
+    keymap.write_text(json.dumps(DEFAULT_KEYMAP))
+    export = tmp_path / 'profiles.json'
+    export.write_text(json.dumps({'version': 1, 'profiles': [
+        {'hash': 'local', 'keymap': str(keymap), 'skyline': 'salient'},
+        {'hash': 'remote', 'keymap': str(tmp_path / 'elsewhere.json')},
+    ]}))
+
+    store = ProfileStore()
+    assert store.import_profiles(str(export)) == 2
+    assert store.get('local').keymap == str(keymap)
+    assert store.get('local').skyline == 'salient'
+    assert store.get('remote').keymap is None
+
+
+def test_note_cache_evicts_least_recently_used(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    notes = [[index * 0.1, index * 0.1 + 0.05, 60 + index % 12] for index in range(100)]
+    compiled = schedule_notes(notes, 10.0, KeyTable(DEFAULT_KEYMAP))
+
+    songs = []
+    for index in range(5):
+        song = tmp_path / f'{index}.mid'
+        song.write_bytes(bytes([index]) * 32)
+        songs.append(str(song))
+
+    store = ProfileStore(cache_dir=str(cache_dir))
+    first = store.store_notes(songs[0], 0, compiled)
+    os.utime(first, (1, 1))
+    store.cache_limit = 3 * os.path.getsize(first)
+
+    for index, song in enumerate(songs[1:], 1):
+        path = store.store_notes(song, 0, compiled)
+        os.utime(path, (index * 10, index * 10))
+        if index == 2:
+            # Using the first song makes it the most recently used
+            assert store.load_compiled(songs[0], 0, KeyTable(DEFAULT_KEYMAP)) is not None
+
+    cached = set(os.listdir(cache_dir))
+    assert len(cached) == 3
+    assert os.path.basename(store.cache_path(store.hash_file(songs[0]), 0)) in cached
+    assert os.path.basename(store.cache_path(store.hash_file(songs[4]), 0)) in cached
@@ -0,0 +1,116 @@
+import sys
+import socket
+import threading
+
+import pytest
+
+pytest.importorskip('PyQt5')
+
+from PyQt5.QtCore import QCoreApplication, QEvent, QEventLoop, QTimer
+
+from core.single_instance import SingleInstanceGuard
+
+pytestmark = pytest.mark.skipif(sys.platform == 'win32', reason='socket files are a Unix detail')
+
+
+@pytest.fixture
+def server_name(tmp_path):
+    # An absolute path keeps the socket out of the shared temp directory
+    return str(tmp_path / 'scumplug.sock')
+
+
+@pytest.fixture
+def running(qapp, server_name):
+    guard = SingleInstanceGuard(server_name)
+    assert guard.listen()
+    received = []
+    guard.command_received.connect(received.append)
+    guard.received = received
+    yield guard
+    shut_down(guard)
+
+
+def shut_down(guard):
+    """Delete the server and its connections now, not whenever Python collects the guard"""
+    guard.server.close()
+    for connection in list(guard._buffers):
+        connection.abort()
+    guard.deleteLater()
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
+
+def spin_until(condition, timeout_ms=5000):
+    """Run the Qt event loop until ``condition()`` holds or the timeout passes"""
+    events = QEventLoop()
+    poll = QTimer()
+    poll.timeout.connect(lambda: condition() and events.quit())
+    poll.start(5)
+    QTimer.singleShot(timeout_ms, events.quit)
+    events.exec_()
+    poll.stop()
+    return condition()
+
+
+def in_thread(func):
+    """Run a blocking client call off the GUI thread so the server can answer it"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    return thread, result
+
+
+def test_second_launch_forwards_its_commands(running, server_name):
+    commands = [{'action': 'open_plugin', 'plugin': 'scum_bard'},
+                {'action': 'queue_midi', 'plugin': 'scum_bard', 'file': '/tmp/song.mid'}]
+    thread, result = in_thread(lambda: SingleInstanceGuard(server_name).forward(commands, 2000))
+
+    assert spin_until(lambda: len(running.received) == 2 and result)
+    thread.join()
+    assert result == [True]
+    assert running.received == commands
+
+
+def test_forward_without_a_running_instance(qapp, server_name):
+    guard = SingleInstanceGuard(server_name)
+    assert not guard.instance_running(100)
+    assert guard.forward([{'action': 'show'}], 100) is False
+
+
+def test_live_instance_is_not_taken_over(running, server_name):
+    assert SingleInstanceGuard(server_name).listen() is False
+
+    # The first instance still receives forwarded commands
+    thread, result = in_thread(lambda: SingleInstanceGuard(server_name).forward([{'action': 'show'}], 2000))
+    assert spin_until(lambda: running.received and result)
+    thread.join()
+    assert running.received == [{'action': 'show'}]
+
+
+def test_stale_socket_is_replaced(qapp, server_name):
+    # A crashed instance leaves its socket file behind with nobody listening
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(server_name)
+    stale.close()
+
+    guard = SingleInstanceGuard(server_name)
+    try:
+        assert guard.listen()
+        assert guard.instance_running(100)
+    finally:
+        shut_down(guard)
+
+
+def test_malformed_lines_are_refused(running, server_name):
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(5)
+    client.connect(server_name)
+    client.sendall(b'not json\n\n{"action": "show"}\n')
+
+    replies = []
+    reader = client.makefile('rb')
+    thread, _ = in_thread(lambda: replies.extend([reader.readline(), reader.readline()]))
+    assert spin_until(lambda: len(replies) == 2)
+    thread.join()
+    client.close()
+    assert replies == [b'{"ok": false}\n', b'{"ok": true}\n']
+    assert running.received == [{'action': 'show'}]
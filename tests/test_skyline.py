@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from bard_engine.skyline import MIN_NOTE_LENGTH, reduce_notes, skyline
+
+
+def linear_skyline(notes):
+    """Slice-by-slice reference for the 'highest' mode"""
+    notes = [(start, max(end, start + MIN_NOTE_LENGTH), pitch) for start, end, pitch in notes]
+    bounds = sorted({time for start, end, _ in notes for time in (start, end)})
+
+    reduced = []
+    previous = None
+    for left, right in zip(bounds, bounds[1:]):
+        sounding = [pitch for start, end, pitch in notes if start <= left and end >= right]
+        winner = max(sounding) if sounding else None
+        struck = any(start == left and pitch == winner for start, _, pitch in notes)
+        if winner != previous or struck:
+            if reduced and reduced[-1][1] is None:
+                reduced[-1][1] = left
+            if winner is not None and struck:
+                reduced.append([left, None, winner])
+        previous = winner
+    if reduced and reduced[-1][1] is None:
+        reduced[-1][1] = bounds[-1]
+    return reduced
+
+
+def test_chord_keeps_its_top_note():
+    notes = [[0.0, 1.0, 60], [0.0, 1.0, 64], [0.0, 1.0, 67]]
+    assert skyline(notes) == [[0.0, 1.0, 67]]
+
+
+def test_uncovered_note_is_not_struck_again():
+    # The low note is held under a short high one; it does not return
+    notes = [[0.0, 2.0, 60], [0.5, 1.0, 72]]
+    assert skyline(notes) == [[0.0, 0.5, 60], [0.5, 1.0, 72]]
+
+
+def test_salient_melody_survives_a_held_high_note():
+    notes = [[0.0, 4.0, 84]] + [[1.0 + index * 0.5, 1.5 + index * 0.5, 60 + index] for index in range(4)]
+
+    assert [pitch for _, _, pitch in skyline(notes, 'highest')] == [84]
+    assert [pitch for _, _, pitch in skyline(notes, 'salient')] == [84, 60, 61, 62, 63]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_highest_matches_linear_reference(seed):
+    generator = random.Random(seed)
+    notes = []
+    for _ in range(60):
+        # Coarse times so starts and ends often coincide
+        start = generator.randrange(0, 200) / 20
+        notes.append([start, start + generator.randrange(0, 30) / 20, generator.randrange(48, 84)])
+    notes.sort(key=lambda entry: entry[0])
+
+    reduced = skyline(notes)
+
+    assert reduced == linear_skyline(notes)
+    assert all(end <= next_start for (_, end, _), (next_start, _, _) in zip(reduced, reduced[1:]))
+
+
+def test_report_counts_notes():
+    notes = [[0.0, 1.0, 60], [0.0, 1.0, 67], [1.0, 2.0, 62]]
+    reduced, report = reduce_notes(notes, 'highest')
+    assert (report.mode, report.notes_in, report.notes_out) == ('highest', 3, len(reduced))
+
+
+def test_empty_and_unknown_mode():
+    assert skyline([]) == []
+    with pytest.raises(ValueError):
+        skyline([[0.0, 1.0, 60]], 'lowest')
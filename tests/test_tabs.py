@@ -0,0 +1,219 @@
+import pytest
+
+# A missing system library surfaces as a plain ImportError, not ModuleNotFoundError
+pytest.importorskip('PyQt5.QtWebEngineWidgets', exc_type=ImportError)
+
+from PyQt5.QtCore import QPointF, QUrl
+
+from browser_web import tabs
+from browser_web.tabs import TabLifecycle
+
+pytestmark = pytest.mark.skipif(not tabs.HAS_LIFECYCLE, reason='lifecycle states need Qt 5.14+')
+
+FREEZE_S = 60
+DISCARD_S = 600
+
+
+class Signal:
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def emit(self, *args):
+        for slot in self.slots:
+            slot(*args)
+
+
+class FakePage:
+    def __init__(self):
+        self.state = tabs.ACTIVE
+        self.transitions = []
+        self.scroll = QPointF(0, 0)
+        self.scripts = []
+
+    def lifecycleState(self):
+        return self.state
+
+    def setLifecycleState(self, state):
+        self.transitions.append(state)
+        self.state = state
+
+    def scrollPosition(self):
+        return self.scroll
+
+    def runJavaScript(self, script):
+        self.scripts.append(script)
+
+
+class FakeView:
+    """What TabLifecycle uses of a QWebEngineView"""
+
+    def __init__(self, url):
+        self._url = url
+        self._page = FakePage()
+        self.loadFinished = Signal()
+        self.loads = []
+
+    def page(self):
+        return self._page
+
+    def url(self):
+        return QUrl(self._url)
+
+    def setUrl(self, url):
+        self._url = url.toString()
+        self.loads.append(self._url)
+
+
+class FakeTabWidget:
+    def __init__(self):
+        self.views = []
+        self.index = -1
+        self.currentChanged = Signal()
+
+    def add(self, view):
+        self.views.append(view)
+        if self.index < 0:
+            self.index = 0
+        return view
+
+    def currentWidget(self):
+        return self.views[self.index] if self.index >= 0 else None
+
+    def widget(self, index):
+        return self.views[index] if 0 <= index < len(self.views) else None
+
+    def show(self, index):
+        self.index = index
+        self.currentChanged.emit(index)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tabs.time, 'monotonic', lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def browser(qapp, clock):
+    tab_widget = FakeTabWidget()
+    lifecycle = TabLifecycle(tab_widget, FREEZE_S * 1000, DISCARD_S * 1000, memory_budget_mb=1024)
+    lifecycle._memory_usage_mb = lambda: None
+    yield tab_widget, lifecycle
+    lifecycle._policy_timer.stop()
+    lifecycle.deleteLater()
+
+
+def open_tabs(tab_widget, lifecycle, count, pending=False):
+    views = []
+    for number in range(count):
+        view = tab_widget.add(FakeView('' if pending else f'https://example.com/{number}'))
+        lifecycle.track(view, f'https://example.com/{number}' if pending else None)
+        views.append(view)
+    return views
+
+
+def test_background_tabs_freeze_then_discard(browser, clock):
+    tab_widget, lifecycle = browser
+    shown, background = open_tabs(tab_widget, lifecycle, 2)
+
+    clock[0] += FREEZE_S - 1
+    lifecycle.enforce_policy()
+    assert lifecycle.state(background) == 'active'
+
+    clock[0] += 1
+    lifecycle.enforce_policy()
+    assert lifecycle.state(background) == 'frozen'
+
+    clock[0] += DISCARD_S
+    lifecycle.enforce_policy()
+    assert lifecycle.state(background) == 'discarded'
+    assert background.page().transitions == [tabs.FROZEN, tabs.DISCARDED]
+    # The visible tab is never touched
+    assert lifecycle.state(shown) == 'active' and shown.page().transitions == []
+
+
+def test_discarded_tab_comes_back_where_it_was_scrolled(browser, clock):
+    tab_widget, lifecycle = browser
+    _, background = open_tabs(tab_widget, lifecycle, 2)
+    background.page().scroll = QPointF(0, 900)
+
+    clock[0] += DISCARD_S
+    lifecycle.enforce_policy()
+    assert lifecycle.scroll_position(background) == (0, 900)
+
+    tab_widget.show(1)
+    assert lifecycle.state(background) == 'active'
+    background.loadFinished.emit(True)
+    assert background.page().scripts == ['window.scrollTo(0.0, 900.0);']
+    # Only the first load after the discard restores the position
+    background.loadFinished.emit(True)
+    assert len(background.page().scripts) == 1
+
+
+def test_switching_tabs_starts_the_background_timer(browser, clock):
+    tab_widget, lifecycle = browser
+    first, second = open_tabs(tab_widget, lifecycle, 2)
+
+    # The first tab was visible all along; its background time starts at the switch
+    clock[0] += DISCARD_S
+    tab_widget.show(1)
+    clock[0] += FREEZE_S - 1
+    lifecycle.enforce_policy()
+    assert lifecycle.state(first) == 'active' and lifecycle.state(second) == 'active'
+
+    clock[0] += 1
+    lifecycle.enforce_policy()
+    assert lifecycle.state(first) == 'frozen' and lifecycle.state(second) == 'active'
+
+
+def test_pending_tab_loads_only_when_shown(browser):
+    tab_widget, lifecycle = browser
+    first, second = open_tabs(tab_widget, lifecycle, 2, pending=True)
+
+    # The tab shown when it was added loads at once
+    assert first.loads == ['https://example.com/0'] and lifecycle.state(first) == 'active'
+    assert second.loads == [] and lifecycle.state(second) == 'pending'
+    assert lifecycle.url(second) == 'https://example.com/1'
+
+    tab_widget.show(1)
+    assert second.loads == ['https://example.com/1'] and lifecycle.state(second) == 'active'
+
+
+def test_suspend_freezes_every_tab_and_resume_wakes_the_visible_one(browser):
+    tab_widget, lifecycle = browser
+    shown, background = open_tabs(tab_widget, lifecycle, 2)
+
+    lifecycle.suspend()
+    assert lifecycle.state(shown) == 'frozen' and lifecycle.state(background) == 'frozen'
+    # Switching tabs while hidden does not wake anything
+    tab_widget.show(1)
+    assert lifecycle.state(background) == 'frozen'
+
+    lifecycle.resume()
+    assert lifecycle.state(background) == 'active' and lifecycle.state(shown) == 'frozen'
+
+
+def test_over_budget_discards_the_least_recently_shown_tab_per_pass(browser, clock):
+    tab_widget, lifecycle = browser
+    views = open_tabs(tab_widget, lifecycle, 3)
+    tab_widget.show(2)
+    clock[0] += 1
+    tab_widget.show(1)
+    clock[0] += 1
+    tab_widget.show(0)
+    lifecycle._memory_usage_mb = lambda: 2048
+
+    lifecycle.enforce_policy()
+    # Tab 2 was hidden first
+    assert [lifecycle.state(view) for view in views] == ['active', 'active', 'discarded']
+    lifecycle.enforce_policy()
+    assert [lifecycle.state(view) for view in views] == ['active', 'discarded', 'discarded']
+
+    lifecycle._memory_usage_mb = lambda: 512
+    lifecycle.forget(views[1])
+    lifecycle.enforce_policy()
+    assert lifecycle.state(views[0]) == 'active'
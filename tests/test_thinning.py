@@ -0,0 +1,87 @@
+import pytest
+
+from bard_engine.keymap import DEFAULT_KEYMAP, KeyTable
+from bard_engine.thinning import ACTIONS_PER_NOTE, thin_notes
+
+
+def run(starts, note=72, length=0.3):
+    """Notes of one pitch starting at ``starts``, each held ``length`` seconds"""
+    return [[start, start + length, note] for start in starts]
+
+
+def test_legato_within_budget_is_untouched():
+    # Overlapping notes 20 ms apart fall inside one chord window, but two
+    # notes every 40 ms are only 100 actions/s
+    notes = []
+    for index in range(20):
+        start = index * 0.04
+        notes.append([start, start + 0.05, 60 + index % 7])
+        notes.append([start + 0.02, start + 0.07, 62 + index % 5])
+
+    thinned, report = thin_notes([list(entry) for entry in notes], max_rate=120)
+
+    assert thinned == notes
+    assert report.quantized == 0
+    assert report.max_shift == 0.0
+    assert not report.changed
+
+
+def test_max_shift_covers_every_moved_note():
+    # Two-note legato pairs straddling the chord window, closer together
+    # than the backend can inject them
+    notes = []
+    for index in range(6):
+        start = index * 0.07
+        base = 36 + 8 * index
+        notes += [[start, start + 0.1, base], [start + 0.03, start + 0.1, base + 2],
+                  [start + 0.035, start + 0.1, base + 4], [start + 0.04, start + 0.1, base + 5]]
+
+    thinned, report = thin_notes([list(entry) for entry in notes], max_rate=120, max_shift=1.0)
+
+    written = {note: start for start, _, note in notes}
+    shifts = [start - written[note] for start, _, note in thinned]
+    assert min(shifts) >= 0
+    assert report.quantized == sum(1 for shift in shifts if shift) > 0
+    assert report.max_shift == pytest.approx(max(shifts))
+    assert [start for start, _, _ in thinned] == sorted(start for start, _, _ in thinned)
+
+
+def test_budget_counts_octave_shifts():
+    # 20 notes/s is 40 key actions/s, within a 50 actions/s budget, until
+    # each note also needs an octave shift
+    same_octave = run([index * 0.05 for index in range(10)], length=0.04)
+    octave_jumps = [[start, end, 60 + 12 * (index % 2)] for index, (start, end, _) in enumerate(same_octave)]
+    octaves = KeyTable(DEFAULT_KEYMAP).octaves
+
+    _, flat = thin_notes(same_octave, max_rate=50, octaves=octaves)
+    thinned, jumping = thin_notes(octave_jumps, max_rate=50, octaves=octaves, max_shift=1.0)
+    _, unmanaged = thin_notes(octave_jumps, max_rate=50)
+
+    assert flat.quantized == 0
+    assert unmanaged.quantized == 0
+    assert jumping.quantized > 0
+
+    # Each note, with the shift that leads into it, is injected before the next starts
+    assert len(thinned) == len(octave_jumps)
+    previous_octave = octaves[60]
+    for (start, _, note), (next_start, _, _) in zip(thinned, thinned[1:]):
+        actions = ACTIONS_PER_NOTE + abs(octaves[note] - previous_octave)
+        assert next_start - start >= actions / 50 - 1e-9
+        previous_octave = octaves[note]
+
+
+def test_budget_scales_with_speed():
+    notes = run([index * 0.02 for index in range(10)], length=0.015)
+
+    _, normal = thin_notes([list(entry) for entry in notes], max_rate=120)
+    _, doubled = thin_notes([list(entry) for entry in notes], max_rate=120, speed=2.0)
+
+    assert not normal.changed
+    assert doubled.changed
+    assert doubled.speed == 2.0
+
+
+@pytest.mark.parametrize('max_rate, speed', [(0, 1.0), (120, 0)])
+def test_rejects_non_positive_budget(max_rate, speed):
+    with pytest.raises(ValueError):
+        thin_notes(run([0.0]), max_rate=max_rate, speed=speed)
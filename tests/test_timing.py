@@ -0,0 +1,120 @@
+import pytest
+
+from bard_engine import timing
+from bard_engine.timing import HybridClock, JitterHistogram, MonotonicClock, VirtualClock
+
+
+class FakeTime:
+    """perf_counter/sleep pair where every sleep overshoots by ``oversleep``"""
+
+    def __init__(self, oversleep=0.0, tick=1e-6):
+        self.now = 100.0
+        self.oversleep = oversleep
+        self.tick = tick
+        self.sleeps = []
+        self.polls = 0
+
+    def perf_counter(self):
+        self.polls += 1
+        self.now += self.tick
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds + self.oversleep
+
+
+@pytest.fixture
+def fake_time(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(timing.time, 'perf_counter', fake.perf_counter)
+    monkeypatch.setattr(timing.time, 'sleep', fake.sleep)
+    return fake
+
+
+def test_percentiles_are_bucket_upper_bounds():
+    histogram = JitterHistogram(bucket_us=10, range_us=1000)
+    for lateness_us in range(100):
+        histogram.record(lateness_us / 1e6)
+
+    assert histogram.percentile(50) == 50.0
+    assert histogram.percentile(99) == 99.0  # capped at the exact maximum
+    assert histogram.percentile(100) == 99.0
+    summary = histogram.summary()
+    assert (summary['events'], summary['mean_us'], summary['max_us']) == (100, 49.5, 99.0)
+
+
+def test_early_events_count_as_on_time_and_outliers_as_the_maximum():
+    histogram = JitterHistogram(bucket_us=10, range_us=100)
+    histogram.record(-0.001)
+    histogram.record(0.5)
+    assert histogram.buckets[0] == 1 and histogram.buckets[-1] == 1
+    assert histogram.max_us == pytest.approx(500000.0)
+    assert histogram.percentile(100) == pytest.approx(500000.0)
+
+
+def test_empty_histogram():
+    histogram = JitterHistogram()
+    assert histogram.percentile(99) == 0.0
+    assert histogram.summary()['mean_us'] == 0.0
+    assert 'over 0 events' in histogram.format_summary()
+
+
+def test_hybrid_clock_sleeps_coarsely_then_spins_to_the_deadline(fake_time):
+    fake_time.oversleep = 0.0005
+    clock = HybridClock(spin_threshold=0.002, max_spin=0.005)
+    deadline = fake_time.now + 0.010
+
+    clock.sleep_until(deadline)
+
+    assert len(fake_time.sleeps) == 1 and fake_time.sleeps[0] == pytest.approx(0.008, abs=1e-5)
+    # The 1.5 ms left after the oversleep is spun, landing on the deadline
+    assert deadline <= fake_time.now <= deadline + 2 * fake_time.tick
+    assert fake_time.polls > 1000
+
+
+def test_hybrid_clock_only_spins_near_the_deadline(fake_time):
+    clock = HybridClock(spin_threshold=0.002)
+    deadline = fake_time.now + 0.001
+    clock.sleep_until(deadline)
+    assert fake_time.sleeps == [] and fake_time.now >= deadline
+
+    # A deadline already passed returns at once
+    polls = fake_time.polls
+    clock.sleep_until(fake_time.now - 1.0)
+    assert fake_time.polls - polls <= 3
+
+
+def test_hybrid_clock_spin_is_bounded(fake_time):
+    # The sleep returns far too early (e.g. interrupted); the spin still stops after max_spin
+    fake_time.oversleep = -0.050
+    clock = HybridClock(spin_threshold=0.002, max_spin=0.005)
+    start = fake_time.now
+    clock.sleep_until(start + 0.100)
+    assert fake_time.now - start == pytest.approx(0.048 + 0.005, abs=1e-4)
+
+
+def test_hybrid_clock_is_never_early_on_the_real_clock():
+    clock = HybridClock()
+    lateness = []
+    for _ in range(20):
+        deadline = clock.now() + 0.003
+        clock.sleep_until(deadline)
+        lateness.append(clock.now() - deadline)
+    assert min(lateness) >= 0.0
+    # Generous bound: the spin phase makes the typical wake-up far tighter than time.sleep's
+    assert sorted(lateness)[len(lateness) // 2] < 0.002
+
+
+def test_monotonic_and_virtual_clocks():
+    clock = MonotonicClock()
+    deadline = clock.now() + 0.005
+    clock.sleep_until(deadline)
+    assert clock.now() >= deadline
+
+    virtual = VirtualClock(start=5.0)
+    virtual.sleep_until(4.0)
+    assert virtual.now() == 5.0
+    virtual.sleep_until(7.5)
+    virtual.advance(0.5)
+    assert virtual.now() == 8.0